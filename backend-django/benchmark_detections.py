@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ingesta de detecciones fila por fila vs set-based
+
+Compara el camino anterior de VehicleDetectionViewSet.bulk_create
+(get_or_create + create por detección) con DetectionService.bulk_create_detections
+para lotes de 10/100/1000 detecciones. Cada corrida se hace dentro de una
+transacción que se revierte, así que la base de datos queda igual.
+
+Uso (contra el Postgres local de docker-compose):
+    python benchmark_detections.py [--sizes 10 100 1000] [--repeat 3] [--plate-reuse 0.5]
+"""
+import os
+import sys
+import argparse
+import random
+import statistics
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from infractions.models_detection import VehicleDetection
+from infractions.services_detection import DetectionService
+from vehicles.models import Vehicle
+
+
+class Rollback(Exception):
+    """Raised to undo a benchmark run"""
+
+
+def make_detections(size, plate_reuse, rng):
+    """Detections shaped like validated VehicleDetectionCreateSerializer rows"""
+    known = list(Vehicle.objects.values_list('license_plate', flat=True)[:200])
+    detections = []
+    for i in range(size):
+        if known and rng.random() < plate_reuse:
+            plate = rng.choice(known)
+        elif rng.random() < 0.8:
+            plate = f"BM{rng.randint(0, 9)}-{rng.randint(0, 999):03d}"
+        else:
+            plate = ''
+        detections.append({
+            'vehicle_type': rng.choice(['car', 'truck', 'bus', 'motorcycle']),
+            'confidence': round(rng.uniform(0.5, 0.99), 2),
+            'bbox': [0.1, 0.2, 0.3, 0.4],
+            'license_plate': plate,
+            'license_plate_confidence': 0.85 if plate else 0.0,
+            'speed': round(rng.uniform(20, 120), 1),
+            'has_infraction': False,
+            'metadata': {'frame': i},
+        })
+    return detections
+
+
+def legacy_create(detections, device, zone, source):
+    """Camino anterior: 2-3 consultas por detección"""
+    created = []
+    for det_data in detections:
+        bbox = det_data['bbox']
+        vehicle = None
+        if det_data.get('license_plate'):
+            vehicle, _ = Vehicle.objects.get_or_create(
+                license_plate=det_data['license_plate'],
+                defaults={
+                    'vehicle_type': det_data['vehicle_type'],
+                    'make': 'Unknown',
+                    'model': 'Unknown'
+                }
+            )
+        created.append(VehicleDetection.objects.create(
+            vehicle_type=det_data['vehicle_type'],
+            confidence=det_data['confidence'],
+            device=device,
+            zone=zone,
+            vehicle=vehicle,
+            license_plate_detected=det_data.get('license_plate', ''),
+            license_plate_confidence=det_data.get('license_plate_confidence', 0.0),
+            bbox_x1=bbox[0],
+            bbox_y1=bbox[1],
+            bbox_x2=bbox[2],
+            bbox_y2=bbox[3],
+            estimated_speed=det_data.get('speed'),
+            has_infraction=det_data.get('has_infraction', False),
+            metadata=det_data.get('metadata', {}),
+            source=source,
+            detected_at=timezone.now()
+        ))
+    return created
+
+
+def set_based_create(detections, device, zone, source):
+    return DetectionService.bulk_create_detections(detections, device=device, zone=zone, source=source)
+
+
+def run(func, detections, device, zone, source):
+    """Run one ingestion inside a rolled back transaction; returns (seconds, queries)"""
+    elapsed = 0.0
+    queries = []
+
+    def count_queries(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    try:
+        with transaction.atomic():
+            with connection.execute_wrapper(count_queries):
+                start = time.perf_counter()
+                created = func(detections, device, zone, source)
+                elapsed = time.perf_counter() - start
+            assert len(created) == len(detections)
+            raise Rollback()
+    except Rollback:
+        pass
+    return elapsed, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--plate-reuse', type=float, default=0.5,
+                        help="Fraction of detections with an already registered plate")
+    parser.add_argument('--source', default='benchmark')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    device, zone = DetectionService.get_device_and_zone(args.source)
+
+    print("\n" + "=" * 78)
+    print(f"📊 DETECTION INGESTION BENCHMARK ({connection.vendor}, repeat={args.repeat})")
+    print("=" * 78)
+    print(f"{'batch':>7}{'legacy ms':>12}{'legacy q':>10}{'bulk ms':>11}{'bulk q':>9}"
+          f"{'speedup':>10}{'det/s bulk':>13}")
+
+    for size in args.sizes:
+        results = {'legacy': [], 'bulk': []}
+        queries = {}
+        for _ in range(args.repeat):
+            detections = make_detections(size, args.plate_reuse, rng)
+            for name, func in (('legacy', legacy_create), ('bulk', set_based_create)):
+                elapsed, count = run(func, detections, device, zone, args.source)
+                results[name].append(elapsed)
+                queries[name] = count
+
+        legacy_ms = statistics.median(results['legacy']) * 1000
+        bulk_ms = statistics.median(results['bulk']) * 1000
+        print(f"{size:>7}{legacy_ms:>12.1f}{queries['legacy']:>10}{bulk_ms:>11.1f}{queries['bulk']:>9}"
+              f"{legacy_ms / bulk_ms:>9.1f}x{size / (bulk_ms / 1000):>13,.0f}")
+
+    print("=" * 78)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -497,6 +497,12 @@ if not DEBUG:
     CSRF_COOKIE_SECURE = True
     SESSION_COOKIE_SECURE = True
 
+# Camera MJPEG stream hub (devices/streaming.py)
+CAMERA_STREAM_IDLE_TIMEOUT = env.float('CAMERA_STREAM_IDLE_TIMEOUT', default=30.0)  # Segundos sin espectadores
+CAMERA_STREAM_JPEG_QUALITY = env.int('CAMERA_STREAM_JPEG_QUALITY', default=70)
+CAMERA_STREAM_RING_SIZE = env.int('CAMERA_STREAM_RING_SIZE', default=8)
+CAMERA_STREAM_VIEWER_LEASE = env.float('CAMERA_STREAM_VIEWER_LEASE', default=600.0)  # Segundos por espectador (0 = sin límite)
+
 # Email Configuration (for notifications)
 EMAIL_BACKEND = env(
     'EMAIL_BACKEND',
@@ -67,6 +67,7 @@ def api_root(request):
             'ml_predictions': '/api/ml/predictions/',
             'ml_predict_recidivism': '/api/ml/predictions/recidivism/',
             'ml_extract_features': '/api/ml/predictions/features/',
+            'ml_extract_features_batch': '/api/ml/predictions/features/batch/',
         }
     })
 
@@ -0,0 +1,369 @@
+"""
+Camera stream hub - one RTSP capture per camera shared by every MJPEG viewer
+
+Antes cada request a /api/devices/{id}/stream/ abría su propio
+cv2.VideoCapture, codificaba cada frame a JPEG y ocupaba un worker síncrono:
+diez espectadores = diez sesiones RTSP y diez encoders para la misma cámara.
+
+Ahora:
+- CameraStreamWorker (un hilo por cámara) captura, codifica una sola vez y
+  publica el último JPEG en un ring buffer compartido.
+- Cada espectador lee del ring buffer: asíncrono bajo ASGI (no ocupa hilos)
+  o síncrono bajo WSGI como respaldo.
+- El worker se detiene solo tras CAMERA_STREAM_IDLE_TIMEOUT segundos sin
+  espectadores.
+
+Despliegue: el camino asíncrono sólo se usa bajo ASGI (entrypoint.sh arranca
+uvicorn config.asgi:application; DJANGO_SERVER=runserver vuelve a WSGI, donde
+cada espectador ocupa un hilo pero la captura sigue siendo compartida).
+Django 4.2 no detecta la desconexión del cliente en respuestas streaming bajo
+ASGI, así que cada espectador tiene un lease de CAMERA_STREAM_VIEWER_LEASE
+segundos: al vencer se cierra su stream, se desregistra y el cliente debe
+reconectar. Sin el lease un espectador desconectado mantendría vivo el worker
+de captura indefinidamente.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BOUNDARY = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+
+# Reintentos de conexión RTSP antes de dar el stream por caído
+MAX_RECONNECT_ATTEMPTS = 3
+RECONNECT_DELAY_SECONDS = 1.0
+
+
+def mjpeg_part(jpeg: bytes) -> bytes:
+    """Wrap a JPEG in a multipart/x-mixed-replace part"""
+    return BOUNDARY + jpeg + b'\r\n'
+
+
+def error_part(message: str) -> bytes:
+    """Multipart part carrying an error message (legacy format)"""
+    return BOUNDARY + f'Error: {message}'.encode() + b'\r\n'
+
+
+class CameraStreamWorker(threading.Thread):
+    """
+    Capture-and-encode worker of one camera
+
+    Publica cada JPEG en un ring buffer de (seq, bytes). Los espectadores
+    siempre toman el frame más nuevo: uno lento salta frames en vez de
+    atrasarse o frenar al resto.
+    """
+
+    def __init__(
+        self,
+        device_id: str,
+        rtsp_url: str,
+        fps: int = 30,
+        jpeg_quality: int = 70,
+        ring_size: int = 8,
+        idle_timeout: float = 30.0,
+        viewer_lease: Optional[float] = 600.0,
+        on_stop=None
+    ):
+        super().__init__(name=f"camera-stream-{device_id}", daemon=True)
+        self.device_id = device_id
+        self.rtsp_url = rtsp_url
+        self.frame_interval = 1.0 / max(1, fps)
+        self.jpeg_quality = jpeg_quality
+        self.idle_timeout = idle_timeout
+        self.viewer_lease = viewer_lease
+        self.on_stop = on_stop
+
+        self._ring: deque = deque(maxlen=ring_size)
+        self._seq = 0
+        self._condition = threading.Condition()
+        self._waiters: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = {}
+        self._viewers = 0
+        self._idle_since: Optional[float] = time.monotonic()
+        self._stop_event = threading.Event()
+
+        self.error: Optional[str] = None
+        self.frames_encoded = 0
+        self.started_at = time.time()
+
+    # ------------------------------------------------------------------
+    # Espectadores
+    # ------------------------------------------------------------------
+
+    @property
+    def viewers(self) -> int:
+        return self._viewers
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def attach(self):
+        """Register a viewer"""
+        with self._condition:
+            self._viewers += 1
+            self._idle_since = None
+
+    def detach(self):
+        """Unregister a viewer; the idle countdown starts with the last one"""
+        with self._condition:
+            self._viewers = max(0, self._viewers - 1)
+            if self._viewers == 0:
+                self._idle_since = time.monotonic()
+
+    def _lease_deadline(self) -> Optional[float]:
+        """Monotonic time at which a viewer registered now must leave"""
+        return time.monotonic() + self.viewer_lease if self.viewer_lease else None
+
+    @staticmethod
+    def _wait_timeout(deadline: Optional[float], timeout: float) -> Optional[float]:
+        """Wait timeout bounded by the lease (None once the lease expired)"""
+        if deadline is None:
+            return timeout
+        remaining = deadline - time.monotonic()
+        return min(timeout, remaining) if remaining > 0 else None
+
+    def latest(self) -> Optional[Tuple[int, bytes]]:
+        """Newest (seq, jpeg) in the ring buffer"""
+        with self._condition:
+            return self._ring[-1] if self._ring else None
+
+    def wait_for_frame(self, after_seq: int, timeout: float) -> Optional[Tuple[int, bytes]]:
+        """Block until a frame newer than after_seq is published (sync viewers)"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._seq > after_seq or self.stopped,
+                timeout=timeout
+            )
+            if self._ring and self._ring[-1][0] > after_seq:
+                return self._ring[-1]
+            return None
+
+    async def wait_for_frame_async(self, after_seq: int, timeout: float) -> Optional[Tuple[int, bytes]]:
+        """Wait for a frame newer than after_seq without blocking a thread (async viewers)"""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        key = id(event)
+
+        with self._condition:
+            if self._seq > after_seq and self._ring:
+                return self._ring[-1]
+            if self.stopped:
+                return None
+            self._waiters[key] = (loop, event)
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._waiters.pop(key, None)
+
+        frame = self.latest()
+        return frame if frame and frame[0] > after_seq else None
+
+    def iter_frames(self, timeout: float = 5.0) -> Iterator[bytes]:
+        """Multipart MJPEG parts for a WSGI viewer (ends when the lease expires)"""
+        self.attach()
+        deadline = self._lease_deadline()
+        try:
+            seq = -1
+            while not self.stopped:
+                wait = self._wait_timeout(deadline, timeout)
+                if wait is None:
+                    return
+                frame = self.wait_for_frame(seq, wait)
+                if frame is None:
+                    continue
+                seq, jpeg = frame
+                yield mjpeg_part(jpeg)
+            if self.error:
+                yield error_part(self.error)
+        finally:
+            self.detach()
+
+    async def aiter_frames(self, timeout: float = 5.0) -> AsyncIterator[bytes]:
+        """
+        Multipart MJPEG parts for an ASGI viewer
+
+        Servir con uvicorn config.asgi:application. El espectador se
+        desregistra cuando vence su lease o cuando el servidor cierra el
+        iterador.
+        """
+        self.attach()
+        deadline = self._lease_deadline()
+        try:
+            seq = -1
+            while not self.stopped:
+                wait = self._wait_timeout(deadline, timeout)
+                if wait is None:
+                    return
+                frame = await self.wait_for_frame_async(seq, wait)
+                if frame is None:
+                    continue
+                seq, jpeg = frame
+                yield mjpeg_part(jpeg)
+            if self.error:
+                yield error_part(self.error)
+        finally:
+            self.detach()
+
+    # ------------------------------------------------------------------
+    # Captura
+    # ------------------------------------------------------------------
+
+    def stop(self):
+        """Ask the worker to stop"""
+        self._stop_event.set()
+        self._notify()
+
+    def run(self):
+        """Capture, encode and publish frames until idle or stopped"""
+        import cv2
+
+        cap = None
+        failures = 0
+        try:
+            while not self._stop_event.is_set():
+                if self._is_idle():
+                    logger.info(f"Camera stream {self.device_id} idle for {self.idle_timeout}s, stopping")
+                    break
+
+                if cap is None:
+                    cap = cv2.VideoCapture(self.rtsp_url)
+                    if not cap.isOpened():
+                        cap.release()
+                        cap = None
+                        failures += 1
+                        if failures >= MAX_RECONNECT_ATTEMPTS:
+                            self.error = 'Cannot connect to camera'
+                            break
+                        time.sleep(RECONNECT_DELAY_SECONDS)
+                        continue
+
+                started = time.monotonic()
+                ret, frame = cap.read()
+                if not ret:
+                    # Stream cortado: reconectar
+                    cap.release()
+                    cap = None
+                    failures += 1
+                    if failures >= MAX_RECONNECT_ATTEMPTS:
+                        self.error = 'Camera stream ended'
+                        break
+                    continue
+                failures = 0
+
+                ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if ok:
+                    self._publish(buffer.tobytes())
+
+                # Fuentes que entregan más rápido que el fps del dispositivo (archivos, HTTP)
+                elapsed = time.monotonic() - started
+                if elapsed < self.frame_interval:
+                    self._stop_event.wait(self.frame_interval - elapsed)
+
+        except Exception as e:
+            logger.error(f"Camera stream {self.device_id} failed: {str(e)}", exc_info=True)
+            self.error = str(e)
+        finally:
+            if cap is not None:
+                cap.release()
+            self._stop_event.set()
+            self._notify()
+            if self.on_stop:
+                self.on_stop(self)
+
+    def _is_idle(self) -> bool:
+        with self._condition:
+            return (
+                self._viewers == 0
+                and self._idle_since is not None
+                and time.monotonic() - self._idle_since > self.idle_timeout
+            )
+
+    def _publish(self, jpeg: bytes):
+        with self._condition:
+            self._seq += 1
+            self._ring.append((self._seq, jpeg))
+            self.frames_encoded += 1
+        self._notify()
+
+    def _notify(self):
+        """Wake sync and async viewers"""
+        with self._condition:
+            self._condition.notify_all()
+            waiters = list(self._waiters.values())
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Loop cerrado: el espectador ya se fue
+                pass
+
+
+class CameraStreamHub:
+    """Registry of running camera workers (one per device)"""
+
+    def __init__(self):
+        self._workers: Dict[str, CameraStreamWorker] = {}
+        self._lock = threading.Lock()
+
+    def get_worker(self, device) -> CameraStreamWorker:
+        """Get the running worker of a device, starting one if needed"""
+        key = str(device.pk)
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is None or worker.stopped or worker.rtsp_url != device.rtsp_url:
+                if worker is not None:
+                    worker.stop()
+                worker = CameraStreamWorker(
+                    device_id=key,
+                    rtsp_url=device.rtsp_url,
+                    fps=device.fps or 30,
+                    jpeg_quality=getattr(settings, 'CAMERA_STREAM_JPEG_QUALITY', 70),
+                    ring_size=getattr(settings, 'CAMERA_STREAM_RING_SIZE', 8),
+                    idle_timeout=getattr(settings, 'CAMERA_STREAM_IDLE_TIMEOUT', 30.0),
+                    viewer_lease=getattr(settings, 'CAMERA_STREAM_VIEWER_LEASE', 600.0),
+                    on_stop=self._remove
+                )
+                self._workers[key] = worker
+                worker.start()
+                logger.info(f"Started camera stream worker for device {key}")
+            return worker
+
+    def stop_all(self):
+        """Stop every worker"""
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-camera viewer and frame counters"""
+        with self._lock:
+            return {
+                key: {
+                    'viewers': worker.viewers,
+                    'frames_encoded': worker.frames_encoded,
+                    'uptime_seconds': round(time.time() - worker.started_at, 1),
+                    'error': worker.error,
+                }
+                for key, worker in self._workers.items()
+            }
+
+    def _remove(self, worker: CameraStreamWorker):
+        with self._lock:
+            if self._workers.get(worker.device_id) is worker:
+                del self._workers[worker.device_id]
+
+
+# Global hub shared by every request of this process
+stream_hub = CameraStreamHub()
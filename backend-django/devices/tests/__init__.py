@@ -0,0 +1 @@
+# Devices Tests Package
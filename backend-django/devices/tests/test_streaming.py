@@ -0,0 +1,187 @@
+"""
+Test cases for the camera MJPEG stream hub
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from authentication.models import User
+from devices.models import Device, Zone
+from devices.streaming import BOUNDARY, CameraStreamHub, CameraStreamWorker, stream_hub
+
+
+class FakeCapture:
+    """cv2.VideoCapture stand-in that always returns a small frame"""
+
+    def __init__(self, url):
+        self.url = url
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        return True, np.zeros((48, 64, 3), dtype=np.uint8)
+
+    def release(self):
+        pass
+
+
+def wait_until(predicate, timeout=2.0):
+    """Poll until predicate() is true or the timeout expires"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@patch('cv2.VideoCapture', FakeCapture)
+class CameraStreamWorkerTest(SimpleTestCase):
+    """Test cases for viewer registration and worker lifetime"""
+
+    def make_worker(self, **kwargs):
+        options = {'device_id': 'cam', 'rtsp_url': 'rtsp://camera/stream', 'fps': 30, 'idle_timeout': 30.0}
+        options.update(kwargs)
+        worker = CameraStreamWorker(**options)
+        worker.start()
+        self.addCleanup(worker.stop)
+        return worker
+
+    def test_viewer_registered_until_stream_closed(self):
+        """Test a viewer is counted while its stream is open"""
+        worker = self.make_worker()
+
+        frames = worker.iter_frames(timeout=1.0)
+        part = next(frames)
+
+        self.assertTrue(part.startswith(BOUNDARY))
+        self.assertEqual(worker.viewers, 1)
+
+        frames.close()
+        self.assertEqual(worker.viewers, 0)
+
+    def test_viewer_lease_expires(self):
+        """Test a viewer that never disconnects is released when its lease expires"""
+        worker = self.make_worker(viewer_lease=0.2)
+
+        started = time.monotonic()
+        parts = list(worker.iter_frames(timeout=1.0))
+
+        self.assertGreater(len(parts), 0)
+        self.assertLess(time.monotonic() - started, 2.0)
+        self.assertEqual(worker.viewers, 0)
+        self.assertFalse(worker.stopped)
+
+    def test_async_viewer_lease_expires(self):
+        """Test the async viewer path registers and releases the viewer"""
+        worker = self.make_worker(viewer_lease=0.2)
+
+        async def consume():
+            parts = []
+            async for part in worker.aiter_frames(timeout=1.0):
+                parts.append(part)
+                self.assertEqual(worker.viewers, 1)
+            return parts
+
+        parts = asyncio.run(consume())
+
+        self.assertGreater(len(parts), 0)
+        self.assertEqual(worker.viewers, 0)
+
+    def test_worker_stops_when_last_viewer_leaves(self):
+        """Test the capture worker stops after the idle timeout without viewers"""
+        worker = self.make_worker(idle_timeout=0.1)
+        first = worker.iter_frames(timeout=1.0)
+        second = worker.iter_frames(timeout=1.0)
+        next(first)
+        next(second)
+
+        first.close()
+        time.sleep(0.3)
+        self.assertFalse(worker.stopped)
+
+        second.close()
+        self.assertTrue(wait_until(lambda: worker.stopped))
+        worker.join(timeout=2.0)
+        self.assertFalse(worker.is_alive())
+
+    def test_hub_shares_and_forgets_workers(self):
+        """Test the hub keeps one worker per device and drops it once stopped"""
+        hub = CameraStreamHub()
+        self.addCleanup(hub.stop_all)
+        device = Device(rtsp_url='rtsp://camera/stream', fps=30)
+
+        with override_settings(CAMERA_STREAM_IDLE_TIMEOUT=0.1):
+            worker = hub.get_worker(device)
+            self.assertIs(hub.get_worker(device), worker)
+
+        self.assertTrue(wait_until(lambda: worker.stopped))
+        self.assertTrue(wait_until(lambda: hub.get_stats() == {}))
+
+
+@patch('cv2.VideoCapture', FakeCapture)
+@override_settings(CAMERA_STREAM_IDLE_TIMEOUT=0.1, SECURE_SSL_REDIRECT=False)
+class DeviceStreamAPITest(APITestCase):
+    """Test cases for the device stream endpoint"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='operator@example.com',
+            username='operator',
+            password='SecurePass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        zone = Zone.objects.create(name='Centro', code='ZN001', speed_limit=60)
+        self.device = Device.objects.create(
+            code='CAM001',
+            name='Camera 1',
+            zone=zone,
+            ip_address='10.0.0.10',
+            rtsp_url='rtsp://10.0.0.10/stream',
+            status='active'
+        )
+        self.addCleanup(stream_hub.stop_all)
+
+    def test_stream_viewers_share_worker_and_are_released(self):
+        """Test viewers share one capture worker and are released when they leave"""
+        url = reverse('device-stream', kwargs={'pk': self.device.pk})
+        stats_url = reverse('device-stream-stats')
+
+        first = self.client.get(url)
+        second = self.client.get(url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first['Content-Type'], 'multipart/x-mixed-replace; boundary=frame')
+        self.assertTrue(next(iter(first.streaming_content)).startswith(BOUNDARY))
+        next(iter(second.streaming_content))
+
+        stats = self.client.get(stats_url).json()
+        self.assertEqual(stats[str(self.device.pk)]['viewers'], 2)
+
+        worker = stream_hub.get_worker(self.device)
+        first.close()
+        second.close()
+        self.assertEqual(worker.viewers, 0)
+
+        # The worker stops after the idle timeout and leaves the hub
+        self.assertTrue(wait_until(lambda: worker.stopped))
+        self.assertTrue(wait_until(lambda: self.client.get(stats_url).json() == {}))
+
+    def test_stream_rejects_inactive_camera(self):
+        """Test an inactive camera does not start a worker"""
+        self.device.status = 'inactive'
+        self.device.save()
+
+        response = self.client.get(reverse('device-stream', kwargs={'pk': self.device.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(stream_hub.get_stats(), {})
@@ -8,11 +8,11 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Count
 from django.http import StreamingHttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
-import threading
-import time
+from django.core.handlers.asgi import ASGIRequest
 from urllib.parse import urlparse
 
 from .models import Device, Zone, DeviceEvent
+from .streaming import stream_hub
 from .serializers import (
     DeviceListSerializer,
     DeviceDetailSerializer,
@@ -58,43 +58,16 @@ class DeviceViewSet(viewsets.ModelViewSet):
                 'error': 'Camera is not active'
             }, status=400)
         
-        def generate_frames():
-            """Generator function to yield video frames"""
-            cap = None
-            try:
-                # Import cv2 only when needed
-                import cv2
-                
-                # Connect to RTSP stream
-                cap = cv2.VideoCapture(device.rtsp_url)
-                
-                if not cap.isOpened():
-                    yield b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + b'Error: Cannot connect to camera\r\n'
-                    return
-                
-                while True:
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-                    
-                    # Encode frame to JPEG
-                    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-                    frame_bytes = buffer.tobytes()
-                    
-                    # Yield frame in multipart format
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                    
-                    time.sleep(0.033)  # ~30 FPS
-                    
-            except Exception as e:
-                yield b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + f'Error: {str(e)}'.encode() + b'\r\n'
-            finally:
-                if cap:
-                    cap.release()
+        # Un worker de captura por cámara; los espectadores leen su ring buffer
+        worker = stream_hub.get_worker(device)
+        
+        if isinstance(request._request, ASGIRequest):
+            frames = worker.aiter_frames()
+        else:
+            frames = worker.iter_frames()
         
         response = StreamingHttpResponse(
-            generate_frames(),
+            frames,
             content_type='multipart/x-mixed-replace; boundary=frame'
         )
         response['Cache-Control'] = 'no-cache'
@@ -131,6 +104,13 @@ class DeviceViewSet(viewsets.ModelViewSet):
             'has_rtsp': bool(device.rtsp_url)
         })
     
+    @action(detail=False, methods=['get'])
+    def stream_stats(self, request):
+        """
+        Get running camera stream workers and their viewers
+        """
+        return Response(stream_hub.get_stats())
+    
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """
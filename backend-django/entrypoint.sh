@@ -53,5 +53,13 @@ echo "Recopilando archivos estáticos..."
 python manage.py collectstatic --noinput
 
 # Iniciar el servidor
-echo "Iniciando servidor Django..."
-exec python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+# ASGI (uvicorn) por defecto: los streams MJPEG de cámaras (devices/streaming.py)
+# se sirven sin ocupar un hilo por espectador. DJANGO_SERVER=runserver usa el
+# servidor de desarrollo WSGI.
+if [ "${DJANGO_SERVER:-asgi}" = "runserver" ]; then
+    echo "Iniciando servidor Django (runserver)..."
+    exec python manage.py runserver 0.0.0.0:8000
+fi
+
+echo "Iniciando servidor Django (uvicorn, ASGI)..."
+exec uvicorn config.asgi:application --host 0.0.0.0 --port 8000 --lifespan off
\ No newline at end of file
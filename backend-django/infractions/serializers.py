@@ -24,7 +24,7 @@ class DeviceSerializer(serializers.ModelSerializer):
 class VehicleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vehicle
-        fields = ['id', 'license_plate', 'vehicle_type', 'brand', 'model', 'year', 'color']
+        fields = ['id', 'license_plate', 'vehicle_type', 'make', 'model', 'year', 'color']
 
 
 class DriverSerializer(serializers.ModelSerializer):
@@ -66,6 +66,39 @@ class InfractionDetailSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class InfractionBulkCreateSerializer(serializers.Serializer):
+    """
+    Batch of detections from the inference service
+    Each detection uses the InfractionService.bulk_create_from_detections format
+    """
+    detections = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=500
+    )
+    device_id = serializers.UUIDField(required=False, allow_null=True)
+    source = serializers.CharField(required=False, default='webcam_local', max_length=50)
+
+
+class InfractionBulkResultSerializer(serializers.ModelSerializer):
+    """Created infraction with vehicle and driver inline (no follow-up requests needed)"""
+    vehicle = VehicleSerializer(read_only=True)
+    driver = DriverSerializer(read_only=True)
+    detection_id = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Infraction
+        fields = [
+            'id', 'infraction_code', 'infraction_type', 'severity', 'status',
+            'license_plate_detected', 'license_plate_confidence',
+            'detected_speed', 'speed_limit', 'detected_at',
+            'vehicle', 'driver', 'detection_id'
+        ]
+    
+    def get_detection_id(self, obj):
+        return (obj.evidence_metadata or {}).get('detection_id', '')
+
+
 class InfractionEventSerializer(serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.get_full_name', read_only=True, allow_null=True)
     event_type_display = serializers.CharField(source='get_event_type_display', read_only=True)
@@ -1,424 +1,318 @@
-""""""
-
-Service layer for infractions managementService layer for infraction management
-
-""""""
-
-import loggingimport logging
-
-from typing import List, Dict, Any, Optionalfrom datetime import datetime
-
-from django.utils import timezonefrom decimal import Decimal
-
-from django.db import transactionfrom typing import Dict, Optional, List
-
-from datetime import datetimefrom django.utils import timezone
-
+"""
+Service layer for infractions management
+"""
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from django.utils.dateparse import parse_datetime
 from django.db import transaction
+from datetime import datetime
 
-from .models import Infraction, InfractionEventfrom .models import Infraction
-
-from devices.models import Device, Zonefrom devices.models import Device, Zone
-
-from vehicles.models import Vehiclefrom vehicles.models import Vehicle
-
-
-
-logger = logging.getLogger(__name__)logger = logging.getLogger(__name__)
-
-
-
-
-
-class InfractionService:class InfractionService:
-
-    """Service for managing infractions and their lifecycle"""    """Service for creating and managing infractions from detections"""
-
-        
-
-    @staticmethod    @staticmethod
-
-    def bulk_create_from_detections(    def generate_infraction_code() -> str:
-
-        detections: List[Dict[str, Any]],        """Generate unique infraction code"""
-
-        device_id: Optional[str] = None,        from django.utils.crypto import get_random_string
-
-        source: str = 'webcam_local'        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-
-    ) -> List[Infraction]:        random = get_random_string(4, allowed_chars='0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ')
-
-        """        return f"INF-{timestamp}-{random}"
-
-        Create multiple infractions from detection data    
-
-            @staticmethod
-
-        Args:    @transaction.atomic
-
-            detections: List of detection dictionaries with infraction data    def create_from_detection(
-
-            device_id: Optional device UUID        detection_data: Dict,
-
-            source: Source of detection        device_id: Optional[str] = None,
-
-                    source: str = "webcam_local"
-
-        Returns:    ) -> Optional[Infraction]:
-
-            List of created Infraction objects        """
-
-        """        Create infraction from detection data
-
-        created_infractions = []        
-
-                Args:
-
-        # Get or create default device for webcam            detection_data: Dictionary with detection information
-
-        device = None            device_id: Device UUID (optional, will use default if not provided)
-
-        if device_id:            source: Source of detection (camera, webcam_local, etc)
-
-            try:            
-
-                device = Device.objects.get(id=device_id)        Returns:
-
-            except Device.DoesNotExist:            Created Infraction instance or None if no infraction detected
-
-                logger.warning(f"Device {device_id} not found")        """
-
-                try:
-
-        if not device:            # Extract detection info
-
-            # Get or create default webcam device            vehicle_type = detection_data.get('class_name', 'car')
-
-            device, _ = Device.objects.get_or_create(            confidence = detection_data.get('confidence', 0.0)
-
-                code='WEBCAM_LOCAL',            bbox = detection_data.get('bbox', [])
-
-                defaults={            license_plate = detection_data.get('license_plate')
-
-                    'name': 'Webcam Local',            detected_speed = detection_data.get('speed')
-
-                    'device_type': 'camera',            infraction_types = detection_data.get('infractions', [])
-
-                    'status': 'active',            
-
-                    'manufacturer': 'Local',            # If no infractions detected, don't create record
-
-                    'model': 'Webcam',            if not infraction_types or len(infraction_types) == 0:
-
-                }                logger.debug(f"No infractions detected for {vehicle_type}")
-
-            )                return None
-
-                    
-
-        # Get or create default zone            # Get or create device
-
-        zone, _ = Zone.objects.get_or_create(            device = None
-
-            code='ZONE_TEST',            if device_id:
-
-            defaults={                try:
-
-                'name': 'Zona de Prueba',                    device = Device.objects.get(id=device_id)
-
-                'zone_type': 'street',                except Device.DoesNotExist:
-
-                'speed_limit': 60,                    logger.warning(f"Device {device_id} not found")
-
-            }            
-
-        )            # Use default device for webcam local if not specified
-
-                    if not device:
-
-        with transaction.atomic():                device, _ = Device.objects.get_or_create(
-
-            for detection in detections:                    name="Webcam Local",
-
-                try:                    defaults={
-
-                    # Extract detection data                        "device_type": "webcam",
-
-                    license_plate = detection.get('license_plate', '')                        "status": "active",
-
-                    license_confidence = detection.get('ocr_confidence', 0.0)                        "ip_address": "127.0.0.1",
-
-                    detected_speed = detection.get('speed')                        "is_active": True
-
-                    infractions_list = detection.get('infractions', [])                    }
-
-                                    )
-
-                    if not infractions_list:            
-
-                        continue            # Get or create default zone
-
-                                zone, _ = Zone.objects.get_or_create(
-
-                    # Get or create vehicle if license plate is detected                name="Zona Local",
-
-                    vehicle = None                defaults={
-
-                    if license_plate:                    "description": "Detección desde webcam local",
-
-                        vehicle, created = Vehicle.objects.get_or_create(                    "speed_limit": 60
-
-                            license_plate=license_plate,                }
-
-                            defaults={            )
-
-                                'vehicle_type': detection.get('class_name', 'car'),            
-
-                                'status': 'active',            # Get the primary infraction type
-
-                            }            primary_infraction = infraction_types[0] if infraction_types else 'other'
-
-                        )            
-
-                        if created:            # Map infraction types
-
-                            logger.info(f"Created new vehicle: {license_plate}")            infraction_type_map = {
-
-                                    'speeding': 'speed',
-
-                    # Create infraction for each type detected                'speed': 'speed',
-
-                    for infraction_type_name in infractions_list:                'red_light': 'red_light',
-
-                        # Map detection infraction names to model choices                'wrong_lane': 'wrong_lane',
-
-                        infraction_type_map = {                'no_helmet': 'no_helmet',
-
-                            'speeding': 'speed',                'parking': 'parking',
-
-                            'speed': 'speed',                'phone_use': 'phone_use',
-
-                            'red_light': 'red_light',                'seatbelt': 'seatbelt',
-
-                            'lane_invasion': 'wrong_lane',            }
-
-                            'wrong_lane': 'wrong_lane',            
-
-                            'no_helmet': 'no_helmet',            mapped_type = infraction_type_map.get(primary_infraction, 'other')
-
-                            'parking': 'parking',            
-
-                            'phone_use': 'phone_use',            # Determine severity
-
-                            'seatbelt': 'seatbelt',            severity = 'medium'
-
-                        }            if detected_speed:
+from .models import Infraction, InfractionEvent
+from devices.models import Device, Zone
+from vehicles.models import Vehicle, Driver, VehicleOwnership
 
-                                        speed_over = detected_speed - zone.speed_limit
+logger = logging.getLogger(__name__)
 
-                        infraction_type = infraction_type_map.get(                if speed_over > 30:
 
-                            infraction_type_name.lower(),                    severity = 'critical'
+# Map detection infraction names to model choices
+INFRACTION_TYPE_MAP = {
+    'speeding': 'speed',
+    'speed': 'speed',
+    'red_light': 'red_light',
+    'lane_invasion': 'wrong_lane',
+    'wrong_lane': 'wrong_lane',
+    'no_helmet': 'no_helmet',
+    'parking': 'parking',
+    'phone_use': 'phone_use',
+    'seatbelt': 'seatbelt',
+}
 
-                            'other'                elif speed_over > 20:
+VEHICLE_TYPES = {choice for choice, _ in Vehicle.VEHICLE_TYPES}
 
-                        )                    severity = 'high'
 
-                                        elif speed_over > 10:
+class InfractionService:
+    """Service for managing infractions and their lifecycle"""
 
-                        # Determine severity based on type and speed                    severity = 'medium'
-
-                        severity = 'medium'                else:
-
-                        if infraction_type == 'speed' and detected_speed:                    severity = 'low'
-
-                            speed_limit = zone.speed_limit or 60            
-
-                            excess = detected_speed - speed_limit            # Get or create vehicle if license plate detected
-
-                            if excess > 40:            vehicle = None
-
-                                severity = 'critical'            if license_plate:
-
-                            elif excess > 20:                vehicle, created = Vehicle.objects.get_or_create(
-
-                                severity = 'high'                    license_plate=license_plate,
-
-                            elif excess > 10:                    defaults={
-
-                                severity = 'medium'                        'vehicle_type': vehicle_type,
-
-                            else:                        'make': 'Unknown',
-
-                                severity = 'low'                        'model': 'Unknown'
-
-                        elif infraction_type == 'red_light':                    }
-
-                            severity = 'high'                )
-
-                                        if created:
-
-                        # Create the infraction                    logger.info(f"Created new vehicle record: {license_plate}")
-
-                        infraction = Infraction.objects.create(            
-
-                            infraction_type=infraction_type,            # Create infraction
-
-                            severity=severity,            infraction = Infraction.objects.create(
-
-                            device=device,                infraction_code=InfractionService.generate_infraction_code(),
-
-                            zone=zone,                infraction_type=mapped_type,
-
-                            vehicle=vehicle,                severity=severity,
-
-                            license_plate_detected=license_plate,                device=device,
-
-                            license_plate_confidence=license_confidence,                zone=zone,
-
-                            detected_speed=detected_speed,                vehicle=vehicle,
-
-                            speed_limit=zone.speed_limit,                license_plate_detected=license_plate or '',
-
-                            status='pending',                license_plate_confidence=detection_data.get('ocr_confidence', 0.0),
-
-                            detected_at=timezone.now(),                detected_speed=detected_speed,
-
-                            evidence_metadata={                speed_limit=zone.speed_limit,
-
-                                'source': source,                detected_at=timezone.now(),
-
-                                'detection_confidence': detection.get('confidence', 0.0),                status='pending',
-
-                                'bbox': detection.get('bbox', []),                evidence_metadata={
-
-                                'vehicle_type': detection.get('class_name', 'unknown'),                    'source': source,
-
-                            }                    'confidence': confidence,
-
-                        )                    'bbox': bbox,
-
-                                            'vehicle_type': vehicle_type,
-
-                        # Create initial event                    'all_infractions': infraction_types,
-
-                        InfractionEvent.objects.create(                    'detection_timestamp': timezone.now().isoformat()
-
-                            infraction=infraction,                }
-
-                            event_type='detected',            )
-
-                            notes=f'Infraction detected by {source}',            
-
-                            metadata={            logger.info(
-
-                                'detection_data': detection,                f"Created infraction {infraction.infraction_code} - "
-
-                                'source': source,                f"Type: {mapped_type}, Vehicle: {license_plate or 'Unknown'}, "
-
-                            }                f"Severity: {severity}"
-
-                        )            )
-
-                                    
-
-                        created_infractions.append(infraction)            return infraction
-
-                                    
-
-                        logger.info(        except Exception as e:
-
-                            f"Created infraction {infraction.infraction_code}: "            logger.error(f"Error creating infraction from detection: {str(e)}", exc_info=True)
-
-                            f"{infraction_type} for vehicle {license_plate or 'UNKNOWN'}"            return None
-
-                        )    
-
-                    @staticmethod
-
-                except Exception as e:    def bulk_create_from_detections(
-
-                    logger.error(f"Error creating infraction from detection: {str(e)}", exc_info=True)        detections: List[Dict],
-
-                    # Continue with next detection        device_id: Optional[str] = None,
-
-                    continue        source: str = "webcam_local"
-
-            ) -> List[Infraction]:
-
-        return created_infractions        """
-
-            Create multiple infractions from detection list
-
-    @staticmethod        
-
-    def validate_infraction(infraction: Infraction, user, notes: str = '') -> bool:        Args:
-
-        """            detections: List of detection dictionaries
-
-        Validate an infraction            device_id: Device UUID (optional)
-
-                    source: Source of detections
-
-        Args:            
-
-            infraction: Infraction object to validate        Returns:
-
-            user: User performing validation            List of created Infraction instances
-
-            notes: Optional validation notes        """
-
-                    infractions = []
-
-        Returns:        
+    @staticmethod
+    def generate_infraction_code(infraction_type: str) -> str:
+        """
+        Generate unique infraction code (max 20 chars)
 
-            True if validated successfully        for detection in detections:
+        Format: INF-SPE-142530-7K2Q = 19 chars
+        """
+        timestamp = datetime.now().strftime('%H%M%S')
+        suffix = get_random_string(4, allowed_chars='0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+        return f"INF-{infraction_type[:3].upper()}-{timestamp}-{suffix}"
 
-        """            infraction = InfractionService.create_from_detection(
+    @staticmethod
+    def get_default_device_and_zone(device_id: Optional[str] = None) -> Tuple[Device, Zone]:
+        """
+        Resolve the device and zone for detections without explicit location
 
-        try:                detection_data=detection,
+        Same defaults as InfractionCreateSerializer: requested device, first
+        active device, or a local webcam device in a test zone.
+        """
+        device = None
+        if device_id:
+            try:
+                device = Device.objects.select_related('zone').get(id=device_id)
+            except Device.DoesNotExist:
+                logger.warning(f"Device {device_id} not found")
+
+        if not device:
+            device = Device.objects.select_related('zone').filter(is_active=True).first()
+
+        if device:
+            return device, device.zone
+
+        # Get or create default zone
+        zone, _ = Zone.objects.get_or_create(
+            code='ZONE_TEST',
+            defaults={
+                'name': 'Zona de Prueba',
+                'speed_limit': 60,
+            }
+        )
+
+        # Get or create default webcam device
+        device, _ = Device.objects.get_or_create(
+            code='WEBCAM_LOCAL',
+            defaults={
+                'name': 'Webcam Local',
+                'device_type': 'camera',
+                'status': 'active',
+                'zone': zone,
+                'ip_address': '127.0.0.1',
+                'rtsp_url': '',
+                'manufacturer': 'Local',
+                'model': 'Webcam',
+            }
+        )
+        return device, device.zone
 
-            with transaction.atomic():                device_id=device_id,
+    @staticmethod
+    def resolve_vehicles_and_drivers(
+        detections: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, Vehicle], Dict[Any, Driver]]:
+        """
+        Get or create the vehicles of all detected plates with a fixed number of queries
 
-                infraction.status = 'validated'                source=source
+        Returns:
+            Tuple of ({license_plate: Vehicle}, {vehicle_id: Driver})
+        """
+        plate_types = {}
+        for detection in detections:
+            plate = detection.get('license_plate')
+            if plate:
+                vehicle_type = detection.get('class_name') or detection.get('vehicle_type') or 'car'
+                plate_types.setdefault(plate, vehicle_type if vehicle_type in VEHICLE_TYPES else 'other')
+
+        if not plate_types:
+            return {}, {}
+
+        vehicles = Vehicle.objects.in_bulk(list(plate_types), field_name='license_plate')
+        missing = [plate for plate in plate_types if plate not in vehicles]
+        if missing:
+            Vehicle.objects.bulk_create(
+                [Vehicle(license_plate=plate, vehicle_type=plate_types[plate]) for plate in missing],
+                ignore_conflicts=True
+            )
+            vehicles = Vehicle.objects.in_bulk(list(plate_types), field_name='license_plate')
+            logger.info(f"Created {len(missing)} new vehicles")
+
+        # Driver: propietario principal vigente, o el DNI del propietario SUNARP
+        drivers = {}
+        ownerships = VehicleOwnership.objects.filter(
+            vehicle__in=vehicles.values(),
+            is_primary_owner=True,
+            end_date__isnull=True
+        ).select_related('driver')
+        for ownership in ownerships:
+            drivers.setdefault(ownership.vehicle_id, ownership.driver)
+
+        owner_dnis = {
+            vehicle.owner_dni: vehicle.id
+            for vehicle in vehicles.values()
+            if vehicle.owner_dni and vehicle.id not in drivers
+        }
+        if owner_dnis:
+            for driver in Driver.objects.filter(document_number__in=list(owner_dnis)):
+                drivers[owner_dnis[driver.document_number]] = driver
+
+        return vehicles, drivers
 
-                infraction.reviewed_by = user            )
+    @staticmethod
+    def bulk_create_from_detections(
+        detections: List[Dict[str, Any]],
+        device_id: Optional[str] = None,
+        source: str = 'webcam_local'
+    ) -> List[Infraction]:
+        """
+        Create multiple infractions from detection data
 
-                infraction.reviewed_at = timezone.now()            if infraction:
+        Vehicles, drivers, infractions and their 'detected' events are
+        resolved and inserted set-based: the number of queries does not grow
+        with the number of detections.
 
-                infraction.review_notes = notes                infractions.append(infraction)
+        Args:
+            detections: List of detection dictionaries with infraction data
+                (infractions, license_plate, ocr_confidence, speed, class_name,
+                confidence, bbox and optionally speed_limit, detected_at,
+                detection_id, processing_time_seconds, ml_prediction_time_ms,
+                recidivism_risk)
+            device_id: Optional device UUID
+            source: Source of detection
 
-                infraction.save()        
+        Returns:
+            List of created Infraction objects with vehicle and driver loaded
+        """
+        device, zone = InfractionService.get_default_device_and_zone(device_id)
+        vehicles, drivers = InfractionService.resolve_vehicles_and_drivers(detections)
+
+        infractions = []
+        events = []
+
+        for detection in detections:
+            try:
+                # Extract detection data
+                license_plate = detection.get('license_plate', '') or ''
+                license_confidence = detection.get('ocr_confidence', 0.0)
+                detected_speed = detection.get('speed')
+                infractions_list = detection.get('infractions', [])
+
+                if not infractions_list:
+                    continue
+
+                vehicle = vehicles.get(license_plate) if license_plate else None
+                driver = drivers.get(vehicle.id) if vehicle else None
+                speed_limit = detection.get('speed_limit') or zone.speed_limit
+
+                detected_at = timezone.now()
+                if detection.get('detected_at'):
+                    parsed = parse_datetime(str(detection['detected_at']))
+                    if parsed:
+                        detected_at = parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+                # Create infraction for each type detected
+                for infraction_type_name in infractions_list:
+                    infraction_type = INFRACTION_TYPE_MAP.get(infraction_type_name.lower(), 'other')
+
+                    # Determine severity based on type and speed
+                    severity = 'medium'
+                    if infraction_type == 'speed' and detected_speed:
+                        excess = detected_speed - (speed_limit or 60)
+                        if excess > 40:
+                            severity = 'critical'
+                        elif excess > 20:
+                            severity = 'high'
+                        elif excess > 10:
+                            severity = 'medium'
+                        else:
+                            severity = 'low'
+                    elif infraction_type == 'red_light':
+                        severity = 'high'
+
+                    infraction = Infraction(
+                        infraction_code=InfractionService.generate_infraction_code(infraction_type),
+                        infraction_type=infraction_type,
+                        severity=severity,
+                        device=device,
+                        zone=zone,
+                        vehicle=vehicle,
+                        driver=driver,
+                        license_plate_detected=license_plate,
+                        license_plate_confidence=license_confidence,
+                        detected_speed=detected_speed,
+                        speed_limit=speed_limit,
+                        status='pending',
+                        detected_at=detected_at,
+                        processing_time_seconds=detection.get('processing_time_seconds'),
+                        ml_prediction_time_ms=detection.get('ml_prediction_time_ms'),
+                        recidivism_risk=detection.get('recidivism_risk'),
+                        evidence_metadata={
+                            'source': source,
+                            'detection_confidence': detection.get('confidence', 0.0),
+                            'bbox': detection.get('bbox', []),
+                            'vehicle_type': detection.get('class_name', 'unknown'),
+                            'detection_id': detection.get('detection_id', ''),
+                        }
+                    )
+                    infractions.append(infraction)
+
+                    # Create initial event
+                    events.append(InfractionEvent(
+                        infraction=infraction,
+                        event_type='detected',
+                        notes=f'Infraction detected by {source}',
+                        metadata={
+                            'detection_data': detection,
+                            'source': source,
+                        }
+                    ))
+
+            except Exception as e:
+                logger.error(f"Error creating infraction from detection: {str(e)}", exc_info=True)
+                # Continue with next detection
+                continue
+
+        if not infractions:
+            return []
+
+        with transaction.atomic():
+            Infraction.objects.bulk_create(infractions)
+            InfractionEvent.objects.bulk_create(events)
+
+        logger.info(f"Created {len(infractions)} infractions from {len(detections)} detections")
+        return infractions
 
-                        logger.info(f"Created {len(infractions)} infractions from {len(detections)} detections")
+    @staticmethod
+    def validate_infraction(infraction: Infraction, user, notes: str = '') -> bool:
+        """
+        Validate an infraction
 
-                # Create event        
+        Args:
+            infraction: Infraction object to validate
+            user: User performing validation
+            notes: Optional validation notes
 
-                InfractionEvent.objects.create(        return infractions
+        Returns:
+            True if validated successfully
+        """
+        try:
+            with transaction.atomic():
+                infraction.status = 'validated'
+                infraction.reviewed_by = user
+                infraction.reviewed_at = timezone.now()
+                infraction.review_notes = notes
+                infraction.save()
 
+                # Create event
+                InfractionEvent.objects.create(
                     infraction=infraction,
                     event_type='validated',
                     user=user,
                     notes=notes or 'Infraction validated'
                 )
-                
+
                 logger.info(f"Infraction {infraction.infraction_code} validated by {user}")
                 return True
-                
+
         except Exception as e:
             logger.error(f"Error validating infraction: {str(e)}", exc_info=True)
             return False
-    
+
     @staticmethod
     def reject_infraction(infraction: Infraction, user, notes: str = '') -> bool:
         """
         Reject an infraction
-        
+
         Args:
             infraction: Infraction object to reject
             user: User performing rejection
             notes: Rejection reason
-            
+
         Returns:
             True if rejected successfully
         """
@@ -429,7 +323,7 @@ class InfractionService:class InfractionService:
                 infraction.reviewed_at = timezone.now()
                 infraction.review_notes = notes
                 infraction.save()
-                
+
                 # Create event
                 InfractionEvent.objects.create(
                     infraction=infraction,
@@ -437,11 +331,10 @@ class InfractionService:class InfractionService:
                     user=user,
                     notes=notes or 'Infraction rejected'
                 )
-                
+
                 logger.info(f"Infraction {infraction.infraction_code} rejected by {user}")
                 return True
-                
+
         except Exception as e:
             logger.error(f"Error rejecting infraction: {str(e)}", exc_info=True)
             return False
-
@@ -0,0 +1,217 @@
+"""
+Service layer for vehicle detections
+"""
+import hashlib
+import logging
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from django.utils import timezone
+from django.db import transaction
+
+from .models_detection import VehicleDetection
+from devices.models import Device, Zone
+from vehicles.models import Vehicle
+
+logger = logging.getLogger(__name__)
+
+
+# (source, device_id, zone_id) -> (device_pk, zone_pk, expires_at)
+# Solo PKs: las instancias se leen en cada lote para no servir datos editados
+# (límite de velocidad, dispositivo desactivado) ni compartirlas entre hilos.
+_LOCATION_CACHE: Dict[Tuple[str, Optional[str], Optional[str]], Tuple[Any, Optional[Any], float]] = {}
+LOCATION_CACHE_TTL_SECONDS = 300
+
+
+class DetectionService:
+    """Service for ingesting vehicle detections from the inference service"""
+
+    @staticmethod
+    def source_device_code(source: str) -> str:
+        """
+        Device code for a source without device_id
+
+        Device.code admite 20 caracteres: un source más largo se acorta a un
+        prefijo más un digest del source completo, así dos sources con el
+        mismo inicio no comparten dispositivo.
+        """
+        code = f"SRC-{source}"
+        max_length = Device._meta.get_field('code').max_length
+        if len(code) <= max_length:
+            return code
+        digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:8]
+        return f"{code[:max_length - len(digest) - 1]}-{digest}"
+
+    @staticmethod
+    def get_device_and_zone(
+        source: str,
+        device_id: Optional[str] = None,
+        zone_id: Optional[str] = None
+    ) -> Tuple[Device, Optional[Zone]]:
+        """
+        Resolve the device and zone of a detection batch
+
+        El inference service envía lotes continuamente desde la misma fuente,
+        así que la resolución (incluido el get_or_create del dispositivo por
+        fuente) se cachea por (source, device_id, zone_id) durante
+        LOCATION_CACHE_TTL_SECONDS. Se cachean PKs: con el cache caliente el
+        dispositivo y su zona se leen en una sola consulta.
+        """
+        key = (source, str(device_id) if device_id else None, str(zone_id) if zone_id else None)
+        cached = _LOCATION_CACHE.get(key)
+        if cached and cached[2] > time.monotonic():
+            device_pk, zone_pk, _ = cached
+            device = Device.objects.select_related('zone').filter(pk=device_pk).first()
+            if device is not None:
+                if zone_pk is None:
+                    return device, None
+                if zone_pk == device.zone_id:
+                    return device, device.zone
+                return device, Zone.objects.filter(pk=zone_pk).first()
+            # Borrado desde que se cacheó: resolver de nuevo
+            _LOCATION_CACHE.pop(key, None)
+
+        device = None
+        if device_id:
+            try:
+                device = Device.objects.select_related('zone').get(id=device_id)
+            except Device.DoesNotExist:
+                logger.warning(f"Device {device_id} not found, using device for source {source}")
+
+        if not device:
+            default_zone, _ = Zone.objects.get_or_create(
+                code='ZONE_TEST',
+                defaults={
+                    'name': 'Zona de Prueba',
+                    'speed_limit': 60,
+                }
+            )
+            device, _ = Device.objects.get_or_create(
+                code=DetectionService.source_device_code(source),
+                defaults={
+                    'name': f"Device-{source}",
+                    'device_type': 'camera',
+                    'status': 'active',
+                    'zone': default_zone,
+                    'ip_address': '127.0.0.1',
+                    'is_active': True,
+                }
+            )
+
+        zone = None
+        if zone_id:
+            try:
+                zone = Zone.objects.get(id=zone_id)
+            except Zone.DoesNotExist:
+                pass
+
+        _LOCATION_CACHE[key] = (
+            device.pk,
+            zone.pk if zone else None,
+            time.monotonic() + LOCATION_CACHE_TTL_SECONDS
+        )
+        return device, zone
+
+    @staticmethod
+    def clear_location_cache():
+        """Forget cached device/zone lookups"""
+        _LOCATION_CACHE.clear()
+
+    @staticmethod
+    def resolve_vehicles(detections_data: List[Dict[str, Any]]) -> Dict[str, Vehicle]:
+        """
+        Get or create the vehicles of every plate in the batch
+
+        Una consulta para las placas existentes, un bulk_create para las que
+        faltan y una consulta más solo si hubo placas nuevas.
+
+        Returns:
+            Dict of {license_plate: Vehicle}
+        """
+        plate_types = {}
+        for det_data in detections_data:
+            plate = det_data.get('license_plate')
+            if plate:
+                plate_types.setdefault(plate, det_data['vehicle_type'])
+
+        if not plate_types:
+            return {}
+
+        vehicles = {
+            vehicle.license_plate: vehicle
+            for vehicle in Vehicle.objects.filter(license_plate__in=list(plate_types))
+        }
+
+        missing = [plate for plate in plate_types if plate not in vehicles]
+        if missing:
+            Vehicle.objects.bulk_create(
+                [
+                    Vehicle(
+                        license_plate=plate,
+                        vehicle_type=plate_types[plate],
+                        make='Unknown',
+                        model='Unknown'
+                    )
+                    for plate in missing
+                ],
+                ignore_conflicts=True
+            )
+            # ignore_conflicts no devuelve PKs: releer solo las placas nuevas
+            vehicles.update({
+                vehicle.license_plate: vehicle
+                for vehicle in Vehicle.objects.filter(license_plate__in=missing)
+            })
+            logger.debug(f"Created up to {len(missing)} new vehicles from detections")
+
+        return vehicles
+
+    @staticmethod
+    def bulk_create_detections(
+        detections_data: List[Dict[str, Any]],
+        device: Device,
+        zone: Optional[Zone] = None,
+        source: str = 'webcam_local'
+    ) -> List[VehicleDetection]:
+        """
+        Create a batch of detections set-based
+
+        Args:
+            detections_data: Validated VehicleDetectionCreateSerializer rows
+            device: Device of the batch
+            zone: Optional zone of the batch
+            source: Source of detection
+
+        Returns:
+            List of created VehicleDetection objects
+        """
+        detected_at = timezone.now()
+
+        with transaction.atomic():
+            vehicles = DetectionService.resolve_vehicles(detections_data)
+
+            detections = []
+            for det_data in detections_data:
+                bbox = det_data['bbox']
+                license_plate = det_data.get('license_plate', '')
+
+                detections.append(VehicleDetection(
+                    vehicle_type=det_data['vehicle_type'],
+                    confidence=det_data['confidence'],
+                    device=device,
+                    zone=zone,
+                    vehicle=vehicles.get(license_plate) if license_plate else None,
+                    license_plate_detected=license_plate,
+                    license_plate_confidence=det_data.get('license_plate_confidence', 0.0),
+                    bbox_x1=bbox[0],
+                    bbox_y1=bbox[1],
+                    bbox_x2=bbox[2],
+                    bbox_y2=bbox[3],
+                    estimated_speed=det_data.get('speed'),
+                    has_infraction=det_data.get('has_infraction', False),
+                    metadata=det_data.get('metadata', {}),
+                    source=source,
+                    detected_at=detected_at
+                ))
+
+            VehicleDetection.objects.bulk_create(detections)
+
+        return detections
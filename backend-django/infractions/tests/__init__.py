@@ -0,0 +1 @@
+# Infractions Tests Package
@@ -0,0 +1,136 @@
+"""
+Test cases for bulk infraction ingestion
+"""
+from datetime import date
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from authentication.models import User
+from devices.models import Device, Zone
+from infractions.models import Infraction, InfractionEvent
+from vehicles.models import Driver, Vehicle, VehicleOwnership
+
+
+def detection(plate='', infractions=('speeding',), speed=95.0, detection_id=''):
+    """One detection as sent by the inference service flush queue"""
+    return {
+        'infractions': list(infractions),
+        'license_plate': plate,
+        'ocr_confidence': 0.9 if plate else 0.0,
+        'speed': speed,
+        'class_name': 'car',
+        'confidence': 0.85,
+        'bbox': [10, 20, 110, 220],
+        'detection_id': detection_id,
+    }
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BulkInfractionAPITest(APITestCase):
+    """Test cases for POST /api/infractions/bulk/"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        self.url = reverse('infraction-bulk')
+        self.user = User.objects.create_user(
+            email='operator@example.com',
+            username='operator',
+            password='SecurePass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.zone = Zone.objects.create(name='Centro', code='ZN001', speed_limit=60)
+        self.device = Device.objects.create(
+            code='CAM001',
+            name='Camera 1',
+            zone=self.zone,
+            ip_address='10.0.0.10',
+            status='active'
+        )
+
+    def post(self, detections, **extra):
+        payload = {'detections': detections, 'device_id': str(self.device.id), 'source': 'test', **extra}
+        return self.client.post(self.url, payload, format='json')
+
+    def test_bulk_create_infractions(self):
+        """Test each detected infraction type creates an infraction and a 'detected' event"""
+        response = self.post([
+            detection('ABC123', infractions=('speeding', 'red_light'), detection_id='d1'),
+            detection('XYZ789', detection_id='d2'),
+            detection(infractions=()),
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['received'], 3)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(Infraction.objects.count(), 3)
+        self.assertEqual(InfractionEvent.objects.filter(event_type='detected').count(), 3)
+
+        speed = Infraction.objects.get(license_plate_detected='XYZ789')
+        self.assertEqual(speed.infraction_type, 'speed')
+        self.assertEqual(speed.severity, 'high')  # 35 km/h over the zone limit
+        self.assertEqual(speed.speed_limit, 60)
+        self.assertEqual(speed.device, self.device)
+        self.assertEqual(
+            sorted(item['detection_id'] for item in response.data['infractions']),
+            ['d1', 'd1', 'd2']
+        )
+
+    def test_vehicle_and_driver_resolution(self):
+        """Test plates resolve to existing or new vehicles and to their current owner"""
+        owned = Vehicle.objects.create(license_plate='ABC123', vehicle_type='car')
+        owner = Driver.objects.create(document_number='12345678', first_name='Ana', last_name='Rojas')
+        VehicleOwnership.objects.create(vehicle=owned, driver=owner, start_date=date(2020, 1, 1))
+        sunarp = Vehicle.objects.create(license_plate='DEF456', vehicle_type='car', owner_dni='87654321')
+        sunarp_owner = Driver.objects.create(document_number='87654321', first_name='Luis', last_name='Paz')
+
+        response = self.post([detection('ABC123'), detection('DEF456'), detection('NEW001'), detection('NEW001')])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Vehicle.objects.filter(license_plate='NEW001').count(), 1)
+        by_plate = {item['license_plate_detected']: item for item in response.data['infractions']}
+        self.assertEqual(by_plate['ABC123']['vehicle']['id'], str(owned.id))
+        self.assertEqual(by_plate['ABC123']['driver']['id'], str(owner.id))
+        self.assertEqual(by_plate['DEF456']['vehicle']['id'], str(sunarp.id))
+        self.assertEqual(by_plate['DEF456']['driver']['id'], str(sunarp_owner.id))
+        self.assertIsNotNone(by_plate['NEW001']['vehicle'])
+        self.assertIsNone(by_plate['NEW001']['driver'])
+
+    def test_query_count_does_not_grow_with_batch(self):
+        """Test the number of queries is independent of the number of detections"""
+        def count_queries(size, prefix):
+            rows = [detection(f'{prefix}{i:03d}') for i in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post(rows)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(count_queries(2, 'AA'), count_queries(20, 'BB'))
+
+    def test_invalid_payload(self):
+        """Test malformed batches are rejected with 400 and nothing is created"""
+        for payload in (
+            {'detections': []},
+            {'detections': 'not-a-list'},
+            {'detections': [detection()], 'device_id': 'not-a-uuid'},
+            {'detections': [detection()] * 501},
+        ):
+            with self.subTest(payload=str(payload)[:40]):
+                response = self.client.post(self.url, payload, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertFalse(Infraction.objects.exists())
+
+    def test_requires_authentication(self):
+        """Test anonymous callers are rejected"""
+        self.client.force_authenticate(user=None)
+
+        response = self.post([detection('ABC123')])
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,141 @@
+"""
+Test cases for vehicle detection ingestion
+"""
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from devices.models import Device, Zone
+from infractions.models_detection import VehicleDetection
+from infractions.services_detection import DetectionService
+from vehicles.models import Vehicle
+
+
+def detection(plate='', vehicle_type='car'):
+    """One detection row as sent by the inference service"""
+    return {
+        'vehicle_type': vehicle_type,
+        'confidence': 0.9,
+        'bbox': [0.1, 0.2, 0.3, 0.4],
+        'license_plate': plate,
+        'license_plate_confidence': 0.8 if plate else 0.0,
+        'speed': 52.5,
+    }
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BulkDetectionAPITest(APITestCase):
+    """Test cases for POST /api/infractions/detections/bulk_create/"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        self.url = reverse('detection-bulk-create')
+        DetectionService.clear_location_cache()
+        self.addCleanup(DetectionService.clear_location_cache)
+
+        self.zone = Zone.objects.create(name='Centro', code='ZN001', speed_limit=60)
+        self.device = Device.objects.create(
+            code='CAM001',
+            name='Camera 1',
+            zone=self.zone,
+            ip_address='10.0.0.10',
+            status='active'
+        )
+
+    def post(self, detections, **extra):
+        payload = {'detections': detections, 'source': 'cam-test', **extra}
+        return self.client.post(self.url, payload, format='json')
+
+    def test_bulk_create_resolves_vehicles(self):
+        """Test detections are linked to existing and newly created vehicles"""
+        existing = Vehicle.objects.create(license_plate='ABC123', vehicle_type='car', make='Toyota', model='Yaris')
+
+        response = self.post(
+            [detection('ABC123'), detection('XYZ789', 'truck'), detection('XYZ789', 'truck'), detection()],
+            device_id=str(self.device.id)
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created_count'], 4)
+        self.assertEqual(Vehicle.objects.count(), 2)
+        new_vehicle = Vehicle.objects.get(license_plate='XYZ789')
+        self.assertEqual(new_vehicle.vehicle_type, 'truck')
+
+        detections = VehicleDetection.objects.filter(device=self.device)
+        self.assertEqual(detections.filter(vehicle=existing).count(), 1)
+        self.assertEqual(detections.filter(vehicle=new_vehicle).count(), 2)
+        self.assertEqual(detections.filter(vehicle__isnull=True).count(), 1)
+        self.assertEqual(response.data['detections'][0]['device_name'], 'Camera 1')
+
+    def test_query_count_does_not_grow_with_batch(self):
+        """Test the number of queries is independent of the batch size"""
+        self.post([detection('WARM01')], device_id=str(self.device.id))
+
+        def count_queries(size, prefix):
+            rows = [detection(f'{prefix}{i:03d}') for i in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post(rows, device_id=str(self.device.id))
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(count_queries(2, 'AA'), count_queries(25, 'BB'))
+
+    def test_fallback_device_per_source(self):
+        """Test a source without device_id gets its own device, created once"""
+        first = self.post([detection()])
+        second = self.post([detection()])
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Device.objects.filter(code='SRC-cam-test').count(), 1)
+        self.assertEqual(VehicleDetection.objects.filter(device__code='SRC-cam-test').count(), 2)
+
+    def test_long_sources_get_distinct_devices(self):
+        """Test sources sharing their first 20 characters do not share a device"""
+        sources = ['intersection-north-camera-01', 'intersection-north-camera-02']
+        for source in sources + sources:
+            response = self.client.post(self.url, {'detections': [detection()], 'source': source}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        codes = [DetectionService.source_device_code(source) for source in sources]
+        self.assertNotEqual(codes[0], codes[1])
+        self.assertTrue(all(len(code) <= 20 and code.startswith('SRC-interse') for code in codes))
+        for code in codes:
+            self.assertEqual(VehicleDetection.objects.filter(device__code=code).count(), 2)
+
+    def test_cached_location_reflects_edits(self):
+        """Test edits to a cached device or zone are visible in the next batch"""
+        extra = {'device_id': str(self.device.id), 'zone_id': str(self.zone.id)}
+        self.post([detection()], **extra)
+
+        self.device.name = 'Camera 1 (renamed)'
+        self.device.save()
+        self.zone.name = 'Centro Histórico'
+        self.zone.save()
+
+        response = self.post([detection()], **extra)
+
+        self.assertEqual(response.data['detections'][0]['device_name'], 'Camera 1 (renamed)')
+        self.assertEqual(response.data['detections'][0]['zone_name'], 'Centro Histórico')
+
+    def test_cached_device_deleted(self):
+        """Test a cached device that was deleted is resolved again"""
+        self.post([detection()])
+        Device.objects.filter(code='SRC-cam-test').delete()
+
+        response = self.post([detection()])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Device.objects.filter(code='SRC-cam-test').exists())
+
+    def test_invalid_payload(self):
+        """Test invalid detections are rejected with 400"""
+        response = self.post([{**detection(), 'bbox': [0.1, 0.2], 'confidence': 1.5}])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('details', response.data)
+        self.assertFalse(VehicleDetection.objects.exists())
@@ -10,10 +10,13 @@ from django.utils import timezone
 from datetime import timedelta
 
 from .models import Infraction, Appeal, InfractionEvent
+from .services import InfractionService
 from .serializers import (
     InfractionListSerializer,
     InfractionDetailSerializer,
     InfractionCreateSerializer,
+    InfractionBulkCreateSerializer,
+    InfractionBulkResultSerializer,
     AppealSerializer,
     InfractionEventSerializer
 )
@@ -82,6 +85,31 @@ class InfractionViewSet(viewsets.ModelViewSet):
             'pending_review': pending_review,
         })
     
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Create infractions for a batch of detections in one request
+        
+        Used by the inference service flush queue. Each created infraction is
+        returned with its vehicle and driver inline so the caller does not
+        need to fetch them afterwards.
+        """
+        serializer = InfractionBulkCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        device_id = serializer.validated_data.get('device_id')
+        infractions = InfractionService.bulk_create_from_detections(
+            serializer.validated_data['detections'],
+            device_id=str(device_id) if device_id else None,
+            source=serializer.validated_data['source']
+        )
+        
+        return Response({
+            'received': len(serializer.validated_data['detections']),
+            'created': len(infractions),
+            'infractions': InfractionBulkResultSerializer(infractions, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+    
     @action(detail=False, methods=['get'])
     def recent(self, request):
         """
@@ -19,8 +19,7 @@ from .serializers_detection import (
     DetectionStatisticsSerializer,
     DetectionSummarySerializer
 )
-from devices.models import Device, Zone
-from vehicles.models import Vehicle
+from .services_detection import DetectionService
 
 logger = logging.getLogger(__name__)
 
@@ -78,73 +77,14 @@ class VehicleDetectionViewSet(viewsets.ModelViewSet):
             zone_id = validated_data.get('zone_id')
             source = validated_data.get('source', 'webcam_local')
             
-            # Get or create device
-            if device_id:
-                try:
-                    device = Device.objects.get(id=device_id)
-                except Device.DoesNotExist:
-                    device = None
-            else:
-                device = None
-            
-            if not device:
-                device, _ = Device.objects.get_or_create(
-                    name=f"Device-{source}",
-                    defaults={
-                        "device_type": "webcam" if source == "webcam_local" else "camera",
-                        "status": "active",
-                        "ip_address": "127.0.0.1",
-                        "is_active": True
-                    }
-                )
-            
-            # Get zone if provided
-            zone = None
-            if zone_id:
-                try:
-                    zone = Zone.objects.get(id=zone_id)
-                except Zone.DoesNotExist:
-                    pass
-            
-            # Create detections
-            created_detections = []
-            
-            for det_data in detections_data:
-                bbox = det_data['bbox']
-                
-                # Get or create vehicle if license plate present
-                vehicle = None
-                if det_data.get('license_plate'):
-                    vehicle, _ = Vehicle.objects.get_or_create(
-                        license_plate=det_data['license_plate'],
-                        defaults={
-                            'vehicle_type': det_data['vehicle_type'],
-                            'make': 'Unknown',
-                            'model': 'Unknown'
-                        }
-                    )
-                
-                # Create detection
-                detection = VehicleDetection.objects.create(
-                    vehicle_type=det_data['vehicle_type'],
-                    confidence=det_data['confidence'],
-                    device=device,
-                    zone=zone,
-                    vehicle=vehicle,
-                    license_plate_detected=det_data.get('license_plate', ''),
-                    license_plate_confidence=det_data.get('license_plate_confidence', 0.0),
-                    bbox_x1=bbox[0],
-                    bbox_y1=bbox[1],
-                    bbox_x2=bbox[2],
-                    bbox_y2=bbox[3],
-                    estimated_speed=det_data.get('speed'),
-                    has_infraction=det_data.get('has_infraction', False),
-                    metadata=det_data.get('metadata', {}),
-                    source=source,
-                    detected_at=timezone.now()
-                )
-                
-                created_detections.append(detection)
+            # Device/zone cacheados por fuente; vehículos y detecciones en lote
+            device, zone = DetectionService.get_device_and_zone(source, device_id, zone_id)
+            created_detections = DetectionService.bulk_create_detections(
+                detections_data,
+                device=device,
+                zone=zone,
+                source=source
+            )
             
             logger.info(
                 f"Created {len(created_detections)} detections from source: {source}"
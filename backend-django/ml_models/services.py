@@ -3,17 +3,86 @@ Machine Learning Services for predictive analytics
 """
 from datetime import timedelta
 from typing import Dict, List, Optional
-import numpy as np
 from django.db import models
-from django.db.models import Count, Avg, Q, F
+from django.db.models import (
+    Count, Avg, Max, Min, Q, F, Case, When, Value, FloatField, ExpressionWrapper
+)
 from django.utils import timezone
 from infractions.models import Infraction
 from vehicles.models import Driver
 
 
+# Puntaje de severidad para avg_severity_score
+SEVERITY_SCORES = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
+
+
 class FeatureEngineeringService:
     """Extract features from driver history for ML models"""
     
+    @staticmethod
+    def feature_aggregates(now) -> Dict:
+        """
+        Conditional aggregates over a driver's infractions
+        
+        Todas las ventanas, tipos y patrones se calculan en una sola consulta
+        (COUNT ... FILTER / MAX / AVG) en vez de una consulta por feature.
+        """
+        speed_excess = ExpressionWrapper(
+            F('detected_speed') - F('speed_limit'),
+            output_field=FloatField()
+        )
+        speed_with_limit = Q(
+            infraction_type='speed',
+            detected_speed__isnull=False,
+            speed_limit__isnull=False
+        )
+        severity_score = Case(
+            *[When(severity=level, then=Value(score)) for level, score in SEVERITY_SCORES.items()],
+            default=Value(2),
+            output_field=FloatField()
+        )
+        
+        return {
+            # 1. Históricas
+            'infraction_count_total': Count('id'),
+            'infraction_count_7d': Count('id', filter=Q(detected_at__gte=now - timedelta(days=7))),
+            'infraction_count_30d': Count('id', filter=Q(detected_at__gte=now - timedelta(days=30))),
+            'infraction_count_90d': Count('id', filter=Q(detected_at__gte=now - timedelta(days=90))),
+            'infraction_count_365d': Count('id', filter=Q(detected_at__gte=now - timedelta(days=365))),
+            # 2. Por tipo
+            'speed_violations': Count('id', filter=Q(infraction_type='speed')),
+            'red_light_violations': Count('id', filter=Q(infraction_type='red_light')),
+            'lane_invasions': Count('id', filter=Q(infraction_type='wrong_lane')),
+            'no_helmet_violations': Count('id', filter=Q(infraction_type='no_helmet')),
+            'no_seatbelt_violations': Count('id', filter=Q(infraction_type='seatbelt')),
+            # 3. Severidad
+            'avg_speed_excess': Avg(speed_excess, filter=speed_with_limit),
+            'max_speed_excess': Max(speed_excess, filter=speed_with_limit),
+            'avg_severity_score': Avg(severity_score, filter=~Q(severity='')),
+            # 4. Recencia / 6. Tasa
+            'last_detected_at': Max('detected_at'),
+            'first_detected_at': Min('detected_at'),
+            # 5. Patrones temporales
+            'infractions_night': Count(
+                'id', filter=Q(detected_at__hour__gte=22) | Q(detected_at__hour__lte=6)
+            ),
+            'infractions_weekend': Count(
+                'id', filter=Q(detected_at__week_day__in=[1, 7])  # Sunday=1, Saturday=7 in Django
+            ),
+            'infractions_rush_hour': Count(
+                'id',
+                filter=Q(detected_at__hour__gte=7, detected_at__hour__lte=9) |
+                Q(detected_at__hour__gte=17, detected_at__hour__lte=19)
+            ),
+            # 8. Diversidad
+            'infraction_type_diversity': Count('infraction_type', distinct=True),
+            # 9. Tendencia: ventana 30-90 días
+            'infraction_count_30_90d': Count('id', filter=Q(
+                detected_at__lt=now - timedelta(days=30),
+                detected_at__gte=now - timedelta(days=90)
+            )),
+        }
+    
     @staticmethod
     def extract_features(driver_dni: str) -> Dict:
         """
@@ -31,100 +100,91 @@ class FeatureEngineeringService:
         except Driver.DoesNotExist:
             return FeatureEngineeringService.get_default_features()
         
-        # Get infractions
-        infractions = Infraction.objects.filter(
-            driver=driver
-        ).order_by('-detected_at')
+        now = timezone.now()
+        aggregates = Infraction.objects.filter(driver=driver).aggregate(
+            **FeatureEngineeringService.feature_aggregates(now)
+        )
+        return FeatureEngineeringService.build_features(driver, aggregates, now)
+    
+    @staticmethod
+    def extract_features_batch(driver_dnis: List[str]) -> Dict[str, Dict]:
+        """
+        Extract features for many drivers with one grouped query
         
-        if not infractions.exists():
-            return FeatureEngineeringService.get_default_features()
+        Args:
+            driver_dnis: Drivers' DNIs
+            
+        Returns:
+            Dictionary {driver_dni: features}; unknown DNIs get default features
+        """
+        dnis = list(dict.fromkeys(driver_dnis))
+        drivers = {
+            driver.id: driver
+            for driver in Driver.objects.filter(document_number__in=dnis)
+        }
         
         now = timezone.now()
-        features = {}
-        
-        # 1. Características históricas (cantidad por período)
-        features['infraction_count_total'] = infractions.count()
-        features['infraction_count_7d'] = infractions.filter(
-            detected_at__gte=now - timedelta(days=7)
-        ).count()
-        features['infraction_count_30d'] = infractions.filter(
-            detected_at__gte=now - timedelta(days=30)
-        ).count()
-        features['infraction_count_90d'] = infractions.filter(
-            detected_at__gte=now - timedelta(days=90)
-        ).count()
-        features['infraction_count_365d'] = infractions.filter(
-            detected_at__gte=now - timedelta(days=365)
-        ).count()
-        
-        # 2. Por tipo de infracción
-        features['speed_violations'] = infractions.filter(
-            infraction_type='speed'
-        ).count()
-        features['red_light_violations'] = infractions.filter(
-            infraction_type='red_light'
-        ).count()
-        features['lane_invasions'] = infractions.filter(
-            infraction_type='wrong_lane'
-        ).count()
-        features['no_helmet_violations'] = infractions.filter(
-            infraction_type='no_helmet'
-        ).count()
-        features['no_seatbelt_violations'] = infractions.filter(
-            infraction_type='seatbelt'
-        ).count()
+        rows = {}
+        if drivers:
+            grouped = (
+                Infraction.objects
+                .filter(driver_id__in=list(drivers))
+                .order_by()
+                .values('driver_id')
+                .annotate(**FeatureEngineeringService.feature_aggregates(now))
+            )
+            rows = {row['driver_id']: row for row in grouped}
         
-        # 3. Severidad
-        speed_infractions = infractions.filter(
-            infraction_type='speed',
-            detected_speed__isnull=False,
-            speed_limit__isnull=False
-        )
-        if speed_infractions.exists():
-            features['avg_speed_excess'] = float(
-                speed_infractions.aggregate(
-                    avg_excess=Avg(
-                        F('detected_speed') - F('speed_limit')
-                    )
-                )['avg_excess'] or 0
+        features = {
+            dni: FeatureEngineeringService.get_default_features()
+            for dni in dnis
+        }
+        for driver_id, driver in drivers.items():
+            features[driver.document_number] = FeatureEngineeringService.build_features(
+                driver, rows.get(driver_id), now
             )
-            features['max_speed_excess'] = float(
-                max([
-                    i.detected_speed - i.speed_limit
-                    for i in speed_infractions
-                    if i.detected_speed and i.speed_limit
-                ] or [0])
+        return features
+    
+    @staticmethod
+    def build_features(driver: Driver, aggregates: Optional[Dict], now) -> Dict:
+        """
+        Turn the aggregates of feature_aggregates() into the feature dictionary
+        
+        Args:
+            driver: Driver the aggregates belong to
+            aggregates: Aggregated values (None or zero count = no history)
+            now: Reference time used for the aggregates
+        """
+        if not aggregates or not aggregates['infraction_count_total']:
+            return FeatureEngineeringService.get_default_features()
+        
+        features = {
+            key: aggregates[key]
+            for key in (
+                'infraction_count_total', 'infraction_count_7d', 'infraction_count_30d',
+                'infraction_count_90d', 'infraction_count_365d',
+                'speed_violations', 'red_light_violations', 'lane_invasions',
+                'no_helmet_violations', 'no_seatbelt_violations',
             )
-        else:
-            features['avg_speed_excess'] = 0.0
-            features['max_speed_excess'] = 0.0
+        }
+        
+        # 3. Severidad
+        features['avg_speed_excess'] = float(aggregates['avg_speed_excess'] or 0)
+        features['max_speed_excess'] = float(aggregates['max_speed_excess'] or 0)
         
         # 4. Recencia
-        last_infraction = infractions.first()
-        if last_infraction:
-            days_since_last = max(0.01, (now - last_infraction.detected_at).days)  # Evitar división por cero
-            features['days_since_last_infraction'] = days_since_last
-            features['recency_score'] = 1.0 / (1.0 + days_since_last)  # Más reciente = mayor score
-        else:
-            features['days_since_last_infraction'] = 999
-            features['recency_score'] = 0.0
+        days_since_last = max(0.01, (now - aggregates['last_detected_at']).days)  # Evitar división por cero
+        features['days_since_last_infraction'] = days_since_last
+        features['recency_score'] = 1.0 / (1.0 + days_since_last)  # Más reciente = mayor score
         
         # 5. Patrones temporales
-        features['infractions_night'] = infractions.filter(
-            Q(detected_at__hour__gte=22) | Q(detected_at__hour__lte=6)
-        ).count()
-        features['infractions_weekend'] = infractions.filter(
-            detected_at__week_day__in=[1, 7]  # Sunday=1, Saturday=7 in Django
-        ).count()
-        features['infractions_rush_hour'] = infractions.filter(
-            Q(detected_at__hour__gte=7, detected_at__hour__lte=9) |
-            Q(detected_at__hour__gte=17, detected_at__hour__lte=19)
-        ).count()
+        features['infractions_night'] = aggregates['infractions_night']
+        features['infractions_weekend'] = aggregates['infractions_weekend']
+        features['infractions_rush_hour'] = aggregates['infractions_rush_hour']
         
         # 6. Tasa de reincidencia histórica
         if features['infraction_count_total'] > 1:
-            first_infraction = infractions.last()
-            time_span_days = (now - first_infraction.detected_at).days
+            time_span_days = (now - aggregates['first_detected_at']).days
             features['infraction_rate'] = features['infraction_count_total'] / max(time_span_days, 1)
         else:
             features['infraction_rate'] = 0.0
@@ -140,28 +200,19 @@ class FeatureEngineeringService:
         features['driver_is_suspended'] = 1 if driver.is_suspended else 0
         
         # 8. Diversidad de infracciones
-        infraction_types = infractions.values('infraction_type').distinct().count()
-        features['infraction_type_diversity'] = infraction_types
+        features['infraction_type_diversity'] = aggregates['infraction_type_diversity']
         
         # 9. Tendencia (infracciones recientes vs antiguas)
         recent_count = features['infraction_count_30d']
-        old_count = infractions.filter(
-            detected_at__lt=now - timedelta(days=30),
-            detected_at__gte=now - timedelta(days=90)
-        ).count()
+        old_count = aggregates['infraction_count_30_90d']
         if old_count > 0:
             features['infraction_trend'] = recent_count / old_count
         else:
             features['infraction_trend'] = float(recent_count) if recent_count > 0 else 0.0
         
         # 10. Severidad promedio
-        severity_map = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
-        severity_scores = [
-            severity_map.get(i.severity, 2)
-            for i in infractions
-            if i.severity
-        ]
-        features['avg_severity_score'] = np.mean(severity_scores) if severity_scores else 2.0
+        avg_severity = aggregates['avg_severity_score']
+        features['avg_severity_score'] = float(avg_severity) if avg_severity is not None else 2.0
         
         return features
     
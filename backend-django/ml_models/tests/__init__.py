@@ -0,0 +1 @@
+# ML Models Tests Package
@@ -0,0 +1,152 @@
+"""
+Test cases for driver feature extraction endpoints
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from authentication.models import User
+from devices.models import Device, Zone
+from infractions.models import Infraction
+from ml_models.services import FeatureEngineeringService
+from ml_models.views import MAX_FEATURE_BATCH_SIZE
+from vehicles.models import Driver
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FeatureExtractionAPITest(APITestCase):
+    """Test cases for POST /api/ml/predictions/features/ and features/batch/"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        self.url = reverse('ml_models:mlprediction-features')
+        self.batch_url = reverse('ml_models:mlprediction-features-batch')
+        self.user = User.objects.create_user(
+            email='analyst@example.com',
+            username='analyst',
+            password='SecurePass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.zone = Zone.objects.create(name='Centro', code='ZN001', speed_limit=60)
+        self.device = Device.objects.create(
+            code='CAM001',
+            name='Camera 1',
+            zone=self.zone,
+            ip_address='10.0.0.10',
+            status='active'
+        )
+        self.now = timezone.now()
+        self.code_seq = 0
+
+        self.driver = Driver.objects.create(
+            document_number='12345678',
+            first_name='Juan',
+            last_name='Perez',
+            risk_score=0.4
+        )
+        self.add_infraction(self.driver, 'speed', days_ago=2, severity='high', speed=90, limit=60)
+        self.add_infraction(self.driver, 'speed', days_ago=40, severity='critical', speed=100, limit=60)
+        self.add_infraction(self.driver, 'red_light', days_ago=200, severity='low')
+
+        self.other_driver = Driver.objects.create(
+            document_number='87654321',
+            first_name='Ana',
+            last_name='Lopez'
+        )
+        self.add_infraction(self.other_driver, 'wrong_lane', days_ago=1)
+
+    def add_infraction(self, driver, infraction_type, days_ago, severity='medium', speed=None, limit=None):
+        # infraction_code se asigna aquí: el save() del modelo usa una secuencia de PostgreSQL
+        self.code_seq += 1
+        return Infraction.objects.create(
+            infraction_code=f"INF{self.code_seq:06d}",
+            infraction_type=infraction_type,
+            severity=severity,
+            device=self.device,
+            zone=self.zone,
+            driver=driver,
+            detected_speed=speed,
+            speed_limit=limit,
+            detected_at=self.now - timedelta(days=days_ago)
+        )
+
+    def test_features_for_driver_with_history(self):
+        """Test features are aggregated from the driver's infractions"""
+        response = self.client.post(self.url, {'driver_dni': '12345678'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        features = response.data['features']
+        self.assertEqual(response.data['feature_count'], len(features))
+        self.assertEqual(features['infraction_count_total'], 3)
+        self.assertEqual(features['infraction_count_7d'], 1)
+        self.assertEqual(features['infraction_count_90d'], 2)
+        self.assertEqual(features['infraction_count_365d'], 3)
+        self.assertEqual(features['speed_violations'], 2)
+        self.assertEqual(features['red_light_violations'], 1)
+        self.assertEqual(features['max_speed_excess'], 40.0)
+        self.assertEqual(features['avg_speed_excess'], 35.0)
+        self.assertAlmostEqual(features['avg_severity_score'], (3 + 4 + 1) / 3)
+        self.assertEqual(features['infraction_type_diversity'], 2)
+        self.assertEqual(features['driver_risk_score'], 0.4)
+
+    def test_features_for_unknown_driver(self):
+        """Test unknown drivers get the default features"""
+        response = self.client.post(self.url, {'driver_dni': '00000000'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['features'], FeatureEngineeringService.get_default_features())
+
+    def test_features_requires_driver_dni(self):
+        """Test missing driver_dni is rejected"""
+        response = self.client.post(self.url, {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_features_batch(self):
+        """Test batch features match the single-driver endpoint"""
+        response = self.client.post(
+            self.batch_url,
+            {'driver_dnis': ['12345678', '87654321', '00000000', '12345678']},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        results = {row['driver_dni']: row['features'] for row in response.data['results']}
+        self.assertEqual(list(results), ['12345678', '87654321', '00000000'])
+
+        for dni in ('12345678', '87654321'):
+            single = self.client.post(self.url, {'driver_dni': dni}, format='json')
+            self.assertEqual(results[dni], single.data['features'])
+        self.assertEqual(results['00000000'], FeatureEngineeringService.get_default_features())
+
+    def test_features_batch_query_count_is_constant(self):
+        """Test the number of queries does not grow with the number of drivers"""
+        with CaptureQueriesContext(connection) as one_driver:
+            self.client.post(self.batch_url, {'driver_dnis': ['12345678']}, format='json')
+        with CaptureQueriesContext(connection) as two_drivers:
+            self.client.post(self.batch_url, {'driver_dnis': ['12345678', '87654321']}, format='json')
+
+        self.assertEqual(len(one_driver), len(two_drivers))
+
+    def test_features_batch_invalid_payload(self):
+        """Test empty, non-list and oversized driver_dnis are rejected"""
+        for driver_dnis in ([], '12345678', None, ['1'] * (MAX_FEATURE_BATCH_SIZE + 1)):
+            response = self.client.post(self.batch_url, {'driver_dnis': driver_dnis}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, driver_dnis)
+
+    def test_features_batch_requires_authentication(self):
+        """Test anonymous requests are rejected"""
+        self.client.force_authenticate(user=None)
+
+        response = self.client.post(self.batch_url, {'driver_dnis': ['12345678']}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
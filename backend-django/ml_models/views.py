@@ -13,6 +13,10 @@ from infractions.models import Infraction
 from vehicles.models import Driver
 
 
+# Máximo de DNIs por request en features/batch
+MAX_FEATURE_BATCH_SIZE = 500
+
+
 class MLModelViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for ML Models
@@ -207,3 +211,43 @@ class MLPredictionViewSet(viewsets.ModelViewSet):
             'features': features,
             'feature_count': len(features)
         })
+    
+    @action(detail=False, methods=['post'], url_path='features/batch')
+    def features_batch(self, request):
+        """
+        Extract features for many drivers with one grouped query
+        
+        POST /api/ml/predictions/features/batch/
+        {
+            "driver_dnis": ["12345678", "87654321"]
+        }
+        """
+        driver_dnis = request.data.get('driver_dnis')
+        
+        if not isinstance(driver_dnis, list) or not driver_dnis:
+            return Response(
+                {'error': 'driver_dnis must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(driver_dnis) > MAX_FEATURE_BATCH_SIZE:
+            return Response(
+                {'error': f'At most {MAX_FEATURE_BATCH_SIZE} driver_dnis per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        features = FeatureEngineeringService.extract_features_batch(
+            [str(dni) for dni in driver_dnis]
+        )
+        
+        return Response({
+            'count': len(features),
+            'results': [
+                {
+                    'driver_dni': dni,
+                    'features': driver_features,
+                    'feature_count': len(driver_features)
+                }
+                for dni, driver_features in features.items()
+            ]
+        })
@@ -12,7 +12,7 @@ from datetime import datetime
 
 from app.core import get_logger
 from app.services.model_service import model_service
-from app.api.websocket import detector
+from app.api.websocket import session_manager
 
 logger = get_logger(__name__)
 router = APIRouter()
@@ -43,6 +43,9 @@ class CameraStreamManager:
         """
         logger.info(f"Starting camera stream for device {device_id} from {camera_url}")
         
+        # Each camera stream gets its own detection session
+        detector = session_manager.open()
+        
         # Initialize detector models if needed
         if not model_service._initialized:
             await detector.initialize_models()
@@ -56,6 +59,7 @@ class CameraStreamManager:
                 "type": "error",
                 "error": "No se pudo conectar con la cámara"
             })
+            session_manager.close(detector)
             return
         
         # Store stream info
@@ -113,6 +117,7 @@ class CameraStreamManager:
         finally:
             # Cleanup
             cap.release()
+            session_manager.close(detector)
             if device_id in self.active_streams:
                 del self.active_streams[device_id]
             logger.info(f"Camera stream stopped for device {device_id}")
@@ -1,11 +1,10 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 import json
 import base64
 import numpy as np
 import cv2
 import asyncio
-import httpx
 import time
 from datetime import datetime
 from collections import defaultdict
@@ -14,9 +13,21 @@ import random
 from concurrent.futures import ThreadPoolExecutor
 import logging
 
-from app.core import get_logger
+from app.core import get_logger, settings
 from app.services.model_service import model_service
-from app.services.django_api import django_api
+from app.services.inference_scheduler import inference_scheduler
+from app.services.infraction_queue import infraction_queue
+from app.services.tracking import IoUTracker, TrackPlateCache
+from app.services.frame_control import AdaptiveFrameController, MotionGate
+from app.services.frame_context import FrameBufferPool, FrameContext
+from app.services.frame_protocol import (
+    ProtocolError,
+    ResultType,
+    decode_frame_message,
+    encode_result_message,
+    result_encoding,
+    PROTOCOL_VERSION,
+)
 
 logger = get_logger(__name__)
 router = APIRouter()
@@ -65,48 +76,223 @@ class VehicleTracker:
 
 class RealtimeDetector:
     """
-    Detector en tiempo real para identificación de vehículos e infracciones
+    Sesión de detección en tiempo real para identificación de vehículos e infracciones
     Integrado con YOLOv8, OCR y Django backend
+    
+    Se crea una instancia por conexión: el contador de frames, la caché de
+    detecciones y el tracker no se comparten entre clientes. La inferencia
+    YOLO se agrupa entre sesiones mediante inference_scheduler.
     """
     
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id = session_id or str(uuid.uuid4())
         self.tracker = VehicleTracker()
+        self.iou_tracker = IoUTracker()  # ids estables de vehículos entre frames
+        self.plate_cache = TrackPlateCache()  # placa votada por track: OCR una vez por vehículo
         self.frame_count = 0
         self.processed_infractions = set()  # Track processed infractions to avoid duplicates
         self.infraction_plates = {}  # Track plates with infractions: {plate: {type, timestamp, frame}}
         self.plate_cooldown_frames = 90  # ~3 segundos a 30fps - evitar duplicados de la misma placa
-        self.ocr_frame_interval = 5  # 🚀 Ejecutar OCR solo cada 5 frames (mejora FPS significativamente)
+        self.ocr_frame_interval = 5  # 🚀 Reintentar OCR de un track sin placa firme cada 5 frames
         
         # 🚀 NUEVAS OPTIMIZACIONES AGRESIVAS
         self.frame_skip_interval = 2  # Procesar solo 1 de cada 2 frames
         self.last_detections = None  # Cache de últimas detecciones
         self.last_processed_frame = None  # Último frame procesado
+        self.last_frame_annotated = False  # Si last_processed_frame ya tiene los recuadros dibujados
+        self.last_frame_id = None  # frame_id del cliente para last_processed_frame
         self.detection_resolution = (640, 480)  # Resolución reducida para YOLO (mejora velocidad 50-60%)
         self.output_quality = 75  # Calidad JPEG para output (70-85% reduce tamaño sin pérdida visible)
         self.log_level = logging.INFO  # Nivel de logging configurable
         self.pending_ocr_tasks = []  # Tareas de OCR en background
         
+        # 🎛️ Frame skip / intervalo OCR adaptativos según latencia medida y actividad de la escena
+        self.frame_controller = AdaptiveFrameController(
+            frame_skip=self.frame_skip_interval,
+            ocr_interval=self.ocr_frame_interval
+        )
+        self.motion_gate = MotionGate()  # Evita YOLO en frames sin cambios
+        self.frame_pool = FrameBufferPool()  # Buffers de preprocesamiento reutilizados entre frames
+        
+        # Protocolo binario: la configuración se envía una vez por sesión
+        self.binary_mode = False
+        self.config: Dict[str, Any] = {}
+        self.config_version = 0
+        
     async def initialize_models(self):
         """Initialize ML models on first use"""
         await model_service.initialize()
+    
+    def update_config(self, config: Dict[str, Any], version: Optional[int] = None):
+        """Store the session configuration used by binary frames"""
+        self.config = config or {}
+        self.config_version = version if version is not None else self.config_version + 1
+        logger.info(
+            "Session config updated",
+            session_id=self.session_id,
+            config_version=self.config_version
+        )
+    
+    def _adaptive_enabled(self, config: Dict[str, Any]) -> bool:
+        """Adaptive control applies unless disabled or frame_skip_interval is pinned by the client"""
+        return (
+            config.get('adaptive_frame_control', settings.ADAPTIVE_FRAME_CONTROL)
+            and 'frame_skip_interval' not in config
+        )
+    
+    def _frame_control_metadata(self, adaptive: bool, include_changes: bool = True) -> Dict[str, Any]:
+        """Frame skip / OCR interval in effect, reported in every response"""
+        if adaptive:
+            return self.frame_controller.snapshot(include_changes)
+        return {
+            "adaptive": False,
+            "frame_skip_interval": self.frame_skip_interval,
+            "ocr_frame_interval": self.ocr_frame_interval
+        }
+    
+    def _observe_frame_control(
+        self,
+        result: Dict[str, Any],
+        adaptive: bool,
+        config: Dict[str, Any],
+        processing_start_time: float,
+        vehicle_count: int
+    ):
+        """Feed the latency of a processed frame to the controller and report its state"""
+        if adaptive:
+            self.motion_gate.mark_processed()
+            latency_ms = (time.time() - processing_start_time) * 1000
+            self.frame_controller.observe(
+                latency_ms,
+                vehicle_count=vehicle_count,
+                motion_score=self.motion_gate.last_score,
+                adjust_ocr='ocr_frame_interval' not in config
+            )
+            self.frame_skip_interval = self.frame_controller.frame_skip
+        else:
+            self.frame_skip_interval = config.get('frame_skip_interval', self.frame_skip_interval)
+        result["frame_control"] = self._frame_control_metadata(adaptive)
+    
+    @staticmethod
+    def _bbox_to_dict(bbox) -> Optional[Dict[str, int]]:
+        """Convert a [x1, y1, x2, y2] bbox to the {x, y, width, height} format used by OCR"""
+        if isinstance(bbox, list) and len(bbox) == 4:
+            x1, y1, x2, y2 = bbox
+            return {
+                'x': int(x1),
+                'y': int(y1),
+                'width': int(x2 - x1),
+                'height': int(y2 - y1)
+            }
+        if isinstance(bbox, dict):
+            return bbox
+        return None
+    
+    def _update_tracks(self, bboxes: List[List[float]]) -> List[int]:
+        """Match this frame's boxes to the IoU tracks and drop the state of tracks that ended"""
+        track_ids, ended_tracks = self.iou_tracker.update(bboxes)
+        if ended_tracks:
+            self.plate_cache.discard(ended_tracks)
+            for track_id in ended_tracks:
+                self.tracker.tracks.pop(f"t{track_id}", None)
+        return track_ids
+    
+    def _encode_frame(self, frame: np.ndarray, binary: bool) -> Union[str, bytes]:
+        """Encode the output frame as JPEG (raw bytes in binary mode, base64 otherwise)"""
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.output_quality])
+        if binary:
+            return buffer.tobytes()
+        return base64.b64encode(buffer).decode('utf-8')
+    
+    def _annotate_frame(self, frame: np.ndarray, detections: List[Dict[str, Any]]) -> np.ndarray:
+        """Draw detection boxes and labels on the frame (in place)"""
+        for detection in detections:
+            x1, y1, x2, y2 = detection['bbox']
+            infraction_type = detection.get('infraction_type')
+            
+            if infraction_type:
+                # Dibujar recuadro ROJO para vehículos con infracción
+                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 0, 255), 3)
+                
+                # Agregar etiqueta con tipo de infracción y velocidad
+                label = f"INFRACCION: {infraction_type.upper()}"
+                if detection.get('speed'):
+                    label += f" - {detection['speed']:.0f} km/h"
+                
+                # Fondo para el texto
+                (text_width, text_height), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+                cv2.rectangle(frame, (int(x1), int(y1) - text_height - 10), 
+                            (int(x1) + text_width, int(y1)), (0, 0, 255), -1)
+                cv2.putText(frame, label, (int(x1), int(y1) - 5),
+                          cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            else:
+                # Dibujar recuadro verde para vehículos sin infracción
+                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+                
+                # Etiqueta con tipo de vehículo
+                label = detection.get('vehicle_type', 'vehicle').upper()
+                if detection.get('speed'):
+                    label += f" - {detection['speed']:.0f} km/h"
+                
+                cv2.putText(frame, label, (int(x1), int(y1) - 5),
+                          cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+        
+        return frame
+    
+    def render_snapshot(self, frame_id: Any = None, binary: bool = False) -> Dict[str, Any]:
+        """
+        Produce an annotated JPEG of the last processed frame on demand
         
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info("WebSocket client connected", total_connections=len(self.active_connections))
+        Usado en modo 'detections' para obtener evidencia visual sin
+        codificar cada frame.
+        
+        Args:
+            frame_id: Client frame id being requested (must be the last processed one)
+            binary: Return raw JPEG bytes instead of base64
+        """
+        if self.last_processed_frame is None or not self.last_detections:
+            return {"type": "snapshot", "frame_id": frame_id, "error": "No processed frame available"}
+        
+        if frame_id is not None and frame_id != self.last_frame_id:
+            return {
+                "type": "snapshot",
+                "frame_id": frame_id,
+                "error": "Frame no longer available",
+                "available_frame_id": self.last_frame_id
+            }
         
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-        logger.info("WebSocket client disconnected", total_connections=len(self.active_connections))
+        frame = self.last_processed_frame
+        if not self.last_frame_annotated:
+            frame = self._annotate_frame(frame.copy(), self.last_detections.get('detections', []))
+        
+        return {
+            "type": "snapshot",
+            "frame_id": self.last_frame_id,
+            "frame": self._encode_frame(frame, binary),
+            "timestamp": datetime.now().isoformat()
+        }
     
-    async def process_frame(self, frame_data: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_frame(
+        self,
+        frame_data: Union[str, bytes, memoryview],
+        config: Dict[str, Any],
+        binary: bool = False,
+        frame_id: Any = None
+    ) -> Dict[str, Any]:
         """
         Procesa un frame de video y retorna las detecciones usando YOLOv8 y OCR
         
         Args:
-            frame_data: Imagen en base64
+            frame_data: Imagen en base64 (modo JSON) o bytes JPEG/WebP crudos (modo binario)
             config: Configuración de detección (tipos de infracciones, umbrales, etc.)
+            binary: Si es True, el frame de salida se devuelve como bytes en lugar de base64
+            frame_id: Identificador del frame asignado por el cliente (se devuelve en la respuesta)
+        
+        Modos de respuesta (config['response_mode']):
+            'frame' (por defecto): incluye el frame anotado codificado en JPEG
+            'detections': solo geometría, placas y metadatos de infracción; el
+                cliente ya tiene el frame. Con 'snapshot_on_infraction' se adjunta
+                un JPEG anotado únicamente cuando hay infracciones.
         
         Returns:
             Detecciones encontradas en el frame
@@ -121,9 +307,12 @@ class RealtimeDetector:
                 await self.initialize_models()
                 logger.info("✅ Models initialized")
             
-            # Decodificar la imagen base64
+            # Decodificar la imagen (base64 en modo JSON, bytes crudos en modo binario)
             logger.info(f"📥 Decoding frame data (length: {len(frame_data) if frame_data else 0})...")
-            image_bytes = base64.b64decode(frame_data)
+            if isinstance(frame_data, str):
+                image_bytes = base64.b64decode(frame_data)
+            else:
+                image_bytes = frame_data
             nparr = np.frombuffer(image_bytes, np.uint8)
             frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
             
@@ -134,29 +323,55 @@ class RealtimeDetector:
             height, width = frame.shape[:2]
             self.frame_count += 1
             
+            # 🚀 Modo de respuesta: 'detections' evita re-codificar el frame completo
+            detections_only = config.get('response_mode', 'frame') == 'detections'
+            
             # 🚀 OPTIMIZACIÓN 1: Frame skipping inteligente
-            # Procesar solo 1 de cada N frames, retornar detecciones cacheadas para frames skipped
-            frame_skip_interval = config.get('frame_skip_interval', self.frame_skip_interval)
-            should_process_frame = (self.frame_count % frame_skip_interval == 0)
+            # Procesar solo 1 de cada N frames, retornar detecciones cacheadas para frames skipped.
+            # Sin frame_skip_interval fijado por el cliente, N lo ajusta el controlador adaptativo
+            # y los frames sin movimiento tampoco pasan por YOLO.
+            adaptive = self._adaptive_enabled(config)
+            skip_reason = 'interval'
+            if adaptive:
+                frame_skip_interval = self.frame_controller.frame_skip
+                should_process_frame = self.frame_controller.should_process(self.frame_count)
+                if should_process_frame and self.motion_gate.is_static(frame) and self.last_detections:
+                    should_process_frame = False
+                    skip_reason = 'static'
+            else:
+                frame_skip_interval = config.get('frame_skip_interval', self.frame_skip_interval)
+                should_process_frame = (self.frame_count % frame_skip_interval == 0)
             
             if not should_process_frame and self.last_detections:
-                logger.debug(f"⏭️ Skipping frame #{self.frame_count} (processing every {frame_skip_interval} frames)")
+                logger.debug(f"⏭️ Skipping frame #{self.frame_count} ({skip_reason}, processing every {frame_skip_interval} frames)")
                 
-                # Retornar último frame procesado con detecciones cacheadas
-                _, buffer = cv2.imencode('.jpg', self.last_processed_frame if self.last_processed_frame is not None else frame, 
-                                         [cv2.IMWRITE_JPEG_QUALITY, self.output_quality])
-                frame_base64 = base64.b64encode(buffer).decode('utf-8')
-                
-                return {
+                cached_result = {
                     **self.last_detections,
-                    "frame": frame_base64,
+                    "frame_id": frame_id,
                     "frame_number": self.frame_count,
                     "cached": True,  # Indicar que son detecciones cacheadas
+                    "skip_reason": skip_reason,
+                    "frame_control": self._frame_control_metadata(adaptive, include_changes=False),
                     "timestamp": datetime.now().isoformat()
                 }
+                cached_result.pop("snapshot", None)
+                
+                if detections_only:
+                    cached_result.pop("frame", None)
+                else:
+                    # Retornar último frame procesado con detecciones cacheadas
+                    cached_result["frame"] = self._encode_frame(
+                        self.last_processed_frame if self.last_processed_frame is not None else frame,
+                        binary
+                    )
+                
+                return cached_result
             
-            # 🚀 OPTIMIZACIÓN 2: Configuración dinámica desde frontend
-            ocr_interval = config.get('ocr_frame_interval', self.ocr_frame_interval)
+            # 🚀 OPTIMIZACIÓN 2: Configuración dinámica desde frontend (o del controlador adaptativo)
+            if adaptive and 'ocr_frame_interval' not in config:
+                ocr_interval = self.frame_controller.ocr_interval
+            else:
+                ocr_interval = config.get('ocr_frame_interval', self.ocr_frame_interval)
             if ocr_interval != self.ocr_frame_interval:
                 logger.info(f"🔧 OCR frame interval updated: {self.ocr_frame_interval} → {ocr_interval}")
                 self.ocr_frame_interval = ocr_interval
@@ -181,38 +396,28 @@ class RealtimeDetector:
             if verbose_logging:
                 logger.debug(f"🖼️ Frame #{self.frame_count}: {width}x{height}, OCR interval: every {self.ocr_frame_interval} frames")
             
+            # 🧮 Contexto de preprocesamiento: reducción, gris, HSV y suavizado se calculan
+            # una vez por frame (en buffers reutilizados) y los comparten YOLO, semáforo y carriles
+            frame_context = FrameContext(frame, self.frame_pool)
+            
             # 🚀 OPTIMIZACIÓN 5: Resize frame para YOLO detection (50-60% más rápido)
             # Mantener frame original para OCR (mayor precisión en placas)
             detection_frame = frame
-            detection_width, detection_height = self.detection_resolution
+            scale_x = scale_y = 1.0
             
             if config.get('enable_yolo_resize', True):  # Habilitado por defecto
-                if width > detection_width or height > detection_height:
-                    # Calcular aspect ratio para mantener proporciones
-                    aspect = width / height
-                    if aspect > (detection_width / detection_height):
-                        new_width = detection_width
-                        new_height = int(detection_width / aspect)
-                    else:
-                        new_height = detection_height
-                        new_width = int(detection_height * aspect)
-                    
-                    detection_frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
-                    scale_x = width / new_width
-                    scale_y = height / new_height
-                    logger.debug(f"🔍 Resized for YOLO: {width}x{height} → {new_width}x{new_height} (scale: {scale_x:.2f}x, {scale_y:.2f}y)")
-                else:
-                    scale_x = scale_y = 1.0
-            else:
-                scale_x = scale_y = 1.0
+                detection_frame, scale_x, scale_y = frame_context.downscaled(*self.detection_resolution)
+                if detection_frame is not frame:
+                    logger.debug(f"🔍 Resized for YOLO: {width}x{height} → {detection_frame.shape[1]}x{detection_frame.shape[0]} (scale: {scale_x:.2f}x, {scale_y:.2f}y)")
             
             # Detect vehicles using YOLOv8
             confidence_threshold = config.get('confidence_threshold', 0.5)
             logger.debug(f"🔍 Detecting vehicles with confidence >= {confidence_threshold}")
             
-            vehicle_detections = await model_service.detect_vehicles(
+            # 🚀 El scheduler agrupa este frame con los de otras sesiones en un solo predict
+            vehicle_detections = await inference_scheduler.submit(
                 detection_frame,  # 🚀 Usar frame con resolución reducida
-                confidence_threshold=confidence_threshold
+                confidence_threshold
             )
             
             # 🚀 Escalar bboxes de vuelta a resolución original si se hizo resize
@@ -230,11 +435,13 @@ class RealtimeDetector:
             
             if len(vehicle_detections) == 0:
                 logger.debug("⚠️ No vehicles detected, returning empty frame")
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.output_quality])
-                frame_base64 = base64.b64encode(buffer).decode('utf-8')
+                
+                # Los tracks también envejecen sin vehículos en el frame
+                self._update_tracks([])
+                self.plate_cache.evict_expired()
                 
                 result = {
-                    "frame": frame_base64,
+                    "frame_id": frame_id,
                     "detections": [],
                     "infractions_registered": 0,
                     "fps": 30.0,
@@ -243,9 +450,16 @@ class RealtimeDetector:
                     "timestamp": datetime.now().isoformat()
                 }
                 
+                if not detections_only:
+                    result["frame"] = self._encode_frame(frame, binary)
+                
+                self._observe_frame_control(result, adaptive, config, processing_start_time, 0)
+                
                 # 🚀 Cachear resultado para frame skipping
                 self.last_detections = result
                 self.last_processed_frame = frame
+                self.last_frame_annotated = False
+                self.last_frame_id = frame_id
                 
                 return result
             
@@ -258,7 +472,7 @@ class RealtimeDetector:
             if config.get('enable_traffic_light', False):
                 traffic_light_roi = config.get('traffic_light_roi')  # (x1, y1, x2, y2)
                 traffic_light_detection = await model_service.detect_traffic_light(
-                    frame,
+                    frame_context,
                     roi=traffic_light_roi
                 )
                 
@@ -278,7 +492,7 @@ class RealtimeDetector:
             if config.get('enable_lane_detection', False):
                 lane_roi = config.get('lane_roi')  # Vértices del ROI
                 lane_detection = await model_service.detect_lanes(
-                    frame,
+                    frame_context,
                     roi_vertices=lane_roi
                 )
                 
@@ -291,10 +505,16 @@ class RealtimeDetector:
             if verbose_logging:
                 logger.info(f"🔄 Processing {len(vehicle_detections)} vehicle detections...")
             
-            # Process each vehicle detection
+            # 🧭 Ids estables por vehículo (IoU con los tracks del frame anterior)
+            track_ids = self._update_tracks([v['bbox'] for v in vehicle_detections])
+            
+            # Process each vehicle detection: infracciones primero, luego OCR en lote
+            classified = []
             for idx, vehicle in enumerate(vehicle_detections):
                 try:
-                    vehicle_id = f"v{idx}"
+                    track_id = track_ids[idx]
+                    vehicle_id = f"t{track_id}"
+                    vehicle['track_id'] = track_id
                     
                     if verbose_logging:
                         logger.info(f"🚙 Processing vehicle #{idx+1}: {vehicle.get('vehicle_type', 'unknown')}")
@@ -302,10 +522,6 @@ class RealtimeDetector:
                     # Track vehicle
                     self.tracker.update(vehicle_id, vehicle)
                 
-                    # License plate variables (will be detected after infraction is confirmed)
-                    license_plate = None
-                    license_confidence = 0.0
-                    
                     # Check for infractions
                     infraction_type = None
                     infraction_data = {}
@@ -480,65 +696,56 @@ class RealtimeDetector:
                                     f"(type: {lane_violation['subtype']}, distance: {lane_violation['distance']:.1f}px)"
                                 )
                     
-                    # 🔍 Si hay infracción, intentar OCR para obtener placa
+                    classified.append((idx, vehicle, vehicle_type, infraction_type, infraction_data))
+                
+                except Exception as vehicle_error:
+                    logger.error(f"❌ Error processing vehicle #{idx+1}: {str(vehicle_error)}", exc_info=True)
+                    # Continue with next vehicle
+                    continue
+            
+            # 🔤 OCR en lote: las placas de todos los vehículos del frame en una sola pasada
+            # Con infracción se necesita la placa; con ocr_all_vehicles se lee la placa de
+            # todos los vehículos motorizados (útil para registrar placas sin infracción).
+            # Los tracks con placa ya firme en la caché no vuelven a pasar por OCR.
+            ocr_all_vehicles = config.get('ocr_all_vehicles', False)
+            ocr_targets = []
+            for idx, vehicle, vehicle_type, infraction_type, infraction_data in classified:
+                if not (infraction_type or ocr_all_vehicles):
+                    continue
+                if not self.plate_cache.should_read(vehicle['track_id'], self.frame_count, self.ocr_frame_interval):
+                    continue
+                bbox_dict = self._bbox_to_dict(vehicle['bbox'])
+                if bbox_dict and bbox_dict.get('width', 0) > 0 and bbox_dict.get('height', 0) > 0:
+                    ocr_targets.append((idx, bbox_dict))
+                else:
+                    logger.debug(f"⚠️ Invalid bbox dimensions for OCR: {bbox_dict}")
+            
+            plate_results = {}
+            if ocr_targets:
+                logger.debug(f"🔤 Batched OCR for {len(ocr_targets)} vehicle(s)")
+                results = await model_service.detect_license_plates(
+                    frame,
+                    [bbox_dict for _, bbox_dict in ocr_targets]
+                )
+                for (idx, _), result in zip(ocr_targets, results):
+                    self.plate_cache.record_attempt(vehicle_detections[idx]['track_id'], self.frame_count, result)
+                    plate_results[idx] = result
+            
+            for idx, vehicle, vehicle_type, infraction_type, infraction_data in classified:
+                try:
+                    license_plate = None
+                    license_confidence = 0.0
+                    
+                    # Placa votada del track (incluye la lectura de este frame si hubo OCR)
+                    plate_result = self.plate_cache.get(vehicle['track_id'])
+                    if plate_result:
+                        license_plate, license_confidence = plate_result
+                        vehicle['license_plate'] = license_plate
+                        vehicle['license_confidence'] = license_confidence
+                        if idx in plate_results:
+                            logger.info(f"✅ PLATE DETECTED: '{license_plate}' (conf: {license_confidence:.2f})")
+                    
                     if infraction_type:
-                        logger.debug(f"🚨 INFRACTION DETECTED: {infraction_type} for {vehicle_type}")
-                        logger.debug(f"   📍 Frame: {self.frame_count}, Vehicle Index: #{idx+1}")
-                        logger.debug(f"   📦 BBox: {vehicle['bbox']}, Confidence: {vehicle['confidence']:.2f}")
-                        
-                        # 🚀 OPTIMIZACIÓN: Ejecutar OCR solo cada N frames EXCEPTO cuando hay infracción
-                        # CRÍTICO: Si detectamos una infracción, SIEMPRE ejecutar OCR para capturar la placa
-                        is_ocr_interval_frame = (self.frame_count % self.ocr_frame_interval == 0)
-                        force_ocr_on_infraction = True  # Forzar OCR cuando hay infracción
-                        should_run_ocr = is_ocr_interval_frame or force_ocr_on_infraction
-                        
-                        if not is_ocr_interval_frame and force_ocr_on_infraction:
-                            logger.info(f"🎯 FORCING OCR due to infraction (frame {self.frame_count}, interval: every {self.ocr_frame_interval})")
-                        elif not should_run_ocr:
-                            logger.debug(f"⏭️ Skipping OCR this frame (interval: every {self.ocr_frame_interval} frames)")
-                        
-                        # 🚀 NUEVA OPTIMIZACIÓN: OCR en background (no bloquea frame processing)
-                        # Intentar detectar placa (UNIVERSAL para TODAS las infracciones)
-                        logger.debug(f"🔍 OCR Status: license_plate={license_plate!r}, should_run={should_run_ocr}")
-                        
-                        # 🚀 MODO BACKGROUND: No esperar resultado de OCR, continuar procesando
-                        # El OCR se ejecuta en paralelo y actualizará la detección después
-                        use_background_ocr = config.get('background_ocr', True)  # Activado por defecto
-                        
-                        if not license_plate and should_run_ocr:
-                            logger.debug(f"🔤 Attempting OCR for {infraction_type.upper()} infraction...")
-                            
-                            # Convertir bbox a formato dict para OCR
-                            bbox = vehicle['bbox']
-                            if isinstance(bbox, list) and len(bbox) == 4:
-                                x1, y1, x2, y2 = bbox
-                                bbox_dict = {
-                                    'x': int(x1),
-                                    'y': int(y1),
-                                    'width': int(x2 - x1),
-                                    'height': int(y2 - y1)
-                                }
-                            elif isinstance(bbox, dict):
-                                bbox_dict = bbox
-                            else:
-                                bbox_dict = None
-                            
-                            if bbox_dict and bbox_dict.get('width', 0) > 0 and bbox_dict.get('height', 0) > 0:
-                                    # MODO NORMAL: Esperar resultado (bloquea)
-                                    plate_result = await model_service.detect_license_plate(frame, bbox_dict)
-                                    if plate_result:
-                                        license_plate, license_confidence = plate_result
-                                        vehicle['license_plate'] = license_plate
-                                        vehicle['license_confidence'] = license_confidence
-                                        logger.info(f"✅ PLATE DETECTED: '{license_plate}' (conf: {license_confidence:.2f})")
-                                    else:
-                                        logger.debug(f"⚠️ OCR failed - Could not detect license plate")
-                            else:
-                                logger.debug(f"⚠️ Invalid bbox dimensions for OCR: {bbox_dict}")
-                        else:
-                            if license_plate:
-                                logger.debug(f"📋 Plate already available: '{license_plate}' (conf: {license_confidence:.2f})")
-                        
                         # 🚫 Verificar deduplicación por placa
                         if license_plate:
                             logger.info(f"🔍 Checking deduplication for plate: '{license_plate}'")
@@ -592,43 +799,10 @@ class RealtimeDetector:
                                 f"Will register but may create duplicates."
                             )
                     
-                    # 🔤 OCR para todos los vehículos motorizados (opcional)
-                    # Útil para registrar placas incluso sin infracciones
-                    if not license_plate and config.get('ocr_all_vehicles', False):
-                        # Solo para vehículos motorizados (no personas)
-                        vehicle_type = vehicle.get('vehicle_type', 'car')
-                        if vehicle_type not in ['person', 'pedestrian']:
-                            logger.info(f"🔤 OCR enabled for all vehicles - attempting detection on {vehicle_type}")
-                            
-                            # Convertir bbox a formato dict para OCR
-                            bbox = vehicle['bbox']
-                            if isinstance(bbox, list) and len(bbox) == 4:
-                                x1, y1, x2, y2 = bbox
-                                bbox_dict = {
-                                    'x': int(x1),
-                                    'y': int(y1),
-                                    'width': int(x2 - x1),
-                                    'height': int(y2 - y1)
-                                }
-                            elif isinstance(bbox, dict):
-                                bbox_dict = bbox
-                            else:
-                                bbox_dict = None
-                            
-                            if bbox_dict and bbox_dict.get('width', 0) > 0 and bbox_dict.get('height', 0) > 0:
-                                plate_result = await model_service.detect_license_plate(
-                                    frame,
-                                    bbox_dict
-                                )
-                                if plate_result:
-                                    license_plate, license_confidence = plate_result
-                                    vehicle['license_plate'] = license_plate
-                                    vehicle['license_confidence'] = license_confidence
-                                    logger.info(f"✅ PLATE DETECTED (no infraction): '{license_plate}' (conf: {license_confidence:.2f})")
-                    
                     # Create detection object
                     detection = {
                         'id': f"{self.frame_count}-{idx}",
+                        'track_id': vehicle['track_id'],
                         'type': 'infraction' if infraction_type else 'vehicle',
                         'vehicle_type': vehicle.get('vehicle_type', 'car'),
                         'confidence': vehicle['confidence'],
@@ -648,34 +822,6 @@ class RealtimeDetector:
                         detection['infraction_type'] = infraction_type
                         detection['infraction_data'] = infraction_data
                         infractions_detected.append(detection)
-                        
-                        # Dibujar recuadro ROJO para vehículos con infracción
-                        x1, y1, x2, y2 = vehicle['bbox']
-                        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 0, 255), 3)
-                        
-                        # Agregar etiqueta con tipo de infracción y velocidad
-                        label = f"INFRACCION: {infraction_type.upper()}"
-                        if vehicle.get('speed'):
-                            label += f" - {vehicle['speed']:.0f} km/h"
-                        
-                        # Fondo para el texto
-                        (text_width, text_height), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
-                        cv2.rectangle(frame, (int(x1), int(y1) - text_height - 10), 
-                                    (int(x1) + text_width, int(y1)), (0, 0, 255), -1)
-                        cv2.putText(frame, label, (int(x1), int(y1) - 5),
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                    else:
-                        # Dibujar recuadro verde para vehículos sin infracción
-                        x1, y1, x2, y2 = vehicle['bbox']
-                        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-                        
-                        # Etiqueta con tipo de vehículo
-                        label = vehicle.get('vehicle_type', 'vehicle').upper()
-                        if vehicle.get('speed'):
-                            label += f" - {vehicle['speed']:.0f} km/h"
-                        
-                        cv2.putText(frame, label, (int(x1), int(y1) - 5),
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
                     
                     detections.append(detection)
                     logger.info(f"✅ Detection added: {detection.get('vehicle_type')} - infraction={infraction_type is not None}")
@@ -740,6 +886,7 @@ class RealtimeDetector:
             # Clean old tracks periodically
             if self.frame_count % 100 == 0:
                 self.tracker.clear_old_tracks()
+                self.plate_cache.evict_expired()
                 # Also clear old processed infractions (keep last 1000)
                 if len(self.processed_infractions) > 1000:
                     self.processed_infractions = set(list(self.processed_infractions)[-500:])
@@ -754,21 +901,15 @@ class RealtimeDetector:
                     proc_time = inf.get('processing_time_seconds', 0)
                     logger.info(f"   {idx}. {inf_type} - Plate: '{plate}' - Vehicle: {inf.get('vehicle_type')} - Processing: {proc_time:.3f}s")
                 
-                asyncio.create_task(
-                    self._save_infractions_to_database(infractions_detected)
-                )
+                self._queue_infractions(infractions_detected)
             else:
                 logger.debug(f"ℹ️ No infractions to save this frame")
             
-            # 🚀 OPTIMIZACIÓN: Encode frame con calidad reducida para menor tamaño y transmisión más rápida
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.output_quality])
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
-            
             logger.debug(f"📤 Sending result with {len(detections)} detections to client")
             
             result = {
                 "type": "detection",
-                "frame": frame_base64,
+                "frame_id": frame_id,
                 "detections": detections,
                 "infractions_registered": len(infractions_detected),
                 "fps": 30.0,
@@ -787,9 +928,22 @@ class RealtimeDetector:
             if lane_detection:
                 result["lanes_detected"] = lane_detection.get('count', 0)
             
+            if not detections_only:
+                # 🚀 OPTIMIZACIÓN: Encode frame con calidad reducida para menor tamaño y transmisión más rápida
+                self._annotate_frame(frame, detections)
+                result["frame"] = self._encode_frame(frame, binary)
+            elif infractions_detected and config.get('snapshot_on_infraction', False):
+                # Evidencia: JPEG anotado solo cuando hay infracciones
+                snapshot = self._annotate_frame(frame.copy(), detections)
+                result["snapshot"] = self._encode_frame(snapshot, binary)
+            
+            self._observe_frame_control(result, adaptive, config, processing_start_time, len(vehicle_detections))
+            
             # 🚀 Cachear resultado y frame para frame skipping
             self.last_detections = result
             self.last_processed_frame = frame
+            self.last_frame_annotated = not detections_only
+            self.last_frame_id = frame_id
             
             return result
             
@@ -797,182 +951,110 @@ class RealtimeDetector:
             logger.error(f"Error processing frame: {str(e)}", exc_info=True)
             return {"error": str(e)}
     
-    async def _save_infractions_to_database(self, detections_with_infractions: List[Dict]):
+    def _queue_infractions(self, detections_with_infractions: List[Dict]):
         """
-        Save detected infractions to Django database
+        Queue detected infractions for the bulk flush to Django (non-blocking)
         GUARDA TODAS LAS INFRACCIONES, incluso sin placa identificada
         
         Args:
             detections_with_infractions: List of detections that have infractions
         """
         try:
-            logger.info(f"💾 🔄 Starting database save process...")
-            logger.info(f"💾 Received {len(detections_with_infractions)} infractions to process")
-            
-            # Preparar detecciones para el formato de Django API
-            formatted_detections = []
+            # Formato de InfractionService.bulk_create_from_detections
+            payloads = []
             
-            for idx, detection in enumerate(detections_with_infractions, 1):
-                logger.info(f"💾 [{idx}/{len(detections_with_infractions)}] Formatting infraction...")
-                
-                infraction_type = detection.get('infraction_type', 'speed')
-                vehicle_type = detection.get('vehicle_type', 'car')
+            for detection in detections_with_infractions:
+                infraction_data = detection.get('infraction_data') or {}
                 license_plate = detection.get('license_plate', '')
                 
-                logger.info(f"   📋 Type: {infraction_type}, Vehicle: {vehicle_type}, Plate: '{license_plate}'")
-                
-                # Formato correcto para Django InfractionCreateSerializer
-                formatted_detection = {
-                    'infraction_type': infraction_type,  # speed, red_light, etc
-                    'detected_at': datetime.now().isoformat(),  # Campo requerido
-                    'severity': 'medium',  # low, medium, high, critical
-                    'status': 'pending',  # pending, validated, rejected, etc
-                }
-                
-                # Agregar placa si existe
-                if license_plate:
-                    formatted_detection['license_plate_detected'] = license_plate
-                    formatted_detection['license_plate_confidence'] = detection.get('license_confidence', 0.0)
-                    logger.info(f"   ✅ License plate included: '{license_plate}' (conf: {formatted_detection['license_plate_confidence']:.2f})")
-                else:
-                    # Si NO hay placa, dejar vacío
-                    formatted_detection['license_plate_detected'] = ''
-                    formatted_detection['license_plate_confidence'] = 0.0
-                    logger.warning(f"   ⚠️ No license plate for this infraction")
-                
-                # Agregar velocidad si existe (para infracciones de velocidad)
-                if detection.get('speed'):
-                    formatted_detection['detected_speed'] = float(detection['speed'])
-                
-                # Agregar límite de velocidad si existe
-                if detection.get('infraction_data'):
-                    if 'speed_limit' in detection['infraction_data']:
-                        formatted_detection['speed_limit'] = int(detection['infraction_data']['speed_limit'])
-                    if 'detected_speed' in detection['infraction_data']:
-                        formatted_detection['detected_speed'] = float(detection['infraction_data']['detected_speed'])
-                
-                # ⏱️ Add processing time (tiempo de procesamiento y reconocimiento)
-                if detection.get('processing_time_seconds'):
-                    formatted_detection['processing_time_seconds'] = detection['processing_time_seconds']
-                    logger.info(f"   ⏱️  Processing time: {detection['processing_time_seconds']:.3f}s")
-                
-                # 🚀 Add ML prediction time (en milisegundos)
-                if detection.get('ml_prediction_time_ms'):
-                    formatted_detection['ml_prediction_time_ms'] = detection['ml_prediction_time_ms']
-                    logger.info(f"   ⏱️  ML Time: {detection['ml_prediction_time_ms']}ms")
-                
-                # 🎯 Add recidivism risk score
-                if detection.get('recidivism_risk'):
-                    formatted_detection['recidivism_risk'] = detection['recidivism_risk']
-                    logger.info(f"   🎯 Risk Score: {detection['recidivism_risk']:.3f}")
-                
-                # Metadata adicional
-                formatted_detection['evidence_metadata'] = {
-                    'vehicle_type': detection.get('vehicle_type', 'car'),
+                payload = {
+                    'infractions': [detection.get('infraction_type', 'speed')],
+                    'license_plate': license_plate,
+                    'ocr_confidence': detection.get('license_confidence', 0.0) if license_plate else 0.0,
+                    'class_name': detection.get('vehicle_type', 'car'),
                     'confidence': detection.get('confidence', 0.0),
                     'bbox': detection.get('bbox', []),
                     'detection_id': detection.get('id', ''),
-                    'timestamp': detection.get('timestamp', ''),
-                    'source': 'webcam_local'
+                    'detected_at': detection.get('timestamp') or datetime.now().isoformat(),
                 }
                 
-                formatted_detections.append(formatted_detection)
-                logger.info(f"   ✅ Infraction #{idx} formatted successfully")
-            
-            logger.info(f"💾 📤 Sending {len(formatted_detections)} infractions to Django API...")
-            
-            # Enviar a Django (una por una)
-            created_count = 0
-            created_infractions = []
-            
-            for idx, detection in enumerate(formatted_detections, 1):
-                logger.info(f"💾 [{idx}/{len(formatted_detections)}] Saving to database...")
-                logger.info(f"   📋 Plate: '{detection['license_plate_detected']}', Type: {detection['infraction_type']}")
+                # Velocidad y límite (para infracciones de velocidad)
+                speed = infraction_data.get('detected_speed', detection.get('speed'))
+                if speed:
+                    payload['speed'] = float(speed)
+                if 'speed_limit' in infraction_data:
+                    payload['speed_limit'] = int(infraction_data['speed_limit'])
                 
-                result = await django_api.create_infraction(
-                    infraction_data=detection
-                )
+                # ⏱️ Tiempos de procesamiento y 🎯 riesgo
+                for key in ('processing_time_seconds', 'ml_prediction_time_ms', 'recidivism_risk'):
+                    if detection.get(key):
+                        payload[key] = detection[key]
                 
-                if result:
-                    created_count += 1
-                    created_infractions.append(result)
-                    logger.info(f"   ✅ SUCCESS - Infraction saved with code: {result.get('infraction_code')}")
-                    logger.info(f"      ID: {result.get('id')}, Status: {result.get('status')}")
-                    
-                    # Si la infracción tiene vehículo asociado, solicitar predicción ML
-                    vehicle_id = result.get('vehicle')
-                    infraction_id = result.get('id')
-                    
-                    if vehicle_id and infraction_id:
-                        logger.info(f"   🤖 Infraction has vehicle, requesting ML prediction...")
-                        
-                        # Obtener información del vehículo para conseguir el driver
-                        try:
-                            async with httpx.AsyncClient(timeout=django_api.timeout) as client:
-                                vehicle_response = await client.get(
-                                    f"{django_api.base_url}/api/vehicles/{vehicle_id}/"
-                                )
-                                
-                                if vehicle_response.status_code == 200:
-                                    vehicle_data = vehicle_response.json()
-                                    driver = vehicle_data.get('driver')
-                                    
-                                    if driver:
-                                        driver_dni = driver.get('document_number')
-                                        if driver_dni:
-                                            logger.info(f"   👤 Driver found: {driver_dni}, requesting ML prediction")
-                                            
-                                            # Llamar al servicio ML
-                                            ml_result = await django_api.predict_recidivism(
-                                                driver_dni=driver_dni,
-                                                infraction_id=infraction_id
-                                            )
-                                            
-                                            if ml_result:
-                                                logger.info(
-                                                    f"   🎯 ML prediction completed: "
-                                                    f"risk={ml_result.get('recidivism_probability', 0)*100:.1f}%, "
-                                                    f"time={ml_result.get('prediction_time_ms', 0):.2f}ms"
-                                                )
-                                            else:
-                                                logger.warning(f"   ⚠️ ML prediction failed for driver {driver_dni}")
-                                        else:
-                                            logger.debug(f"   ℹ️ Driver has no DNI, skipping ML prediction")
-                                    else:
-                                        logger.debug(f"   ℹ️ Vehicle has no driver assigned, skipping ML prediction")
-                                else:
-                                    logger.warning(f"   ⚠️ Failed to fetch vehicle data: status={vehicle_response.status_code}")
-                        except Exception as e:
-                            logger.error(f"   ❌ Error fetching vehicle/driver for ML: {str(e)}")
-                    else:
-                        logger.debug(f"   ℹ️ No vehicle associated with infraction, skipping ML prediction")
-                else:
-                    logger.error(f"   ❌ FAILED - Could not save infraction")
+                if not license_plate:
+                    logger.warning(f"   ⚠️ No license plate for infraction {payload['detection_id']}")
+                
+                payloads.append(payload)
             
-            logger.info(f"💾 ====== DATABASE SAVE COMPLETE ======")
-            logger.info(f"💾 Total saved: {created_count}/{len(formatted_detections)}")
-            
-            if created_count > 0:
-                logger.info(f"💾 📊 Summary of saved infractions:")
-                for idx, infraction in enumerate(created_infractions, 1):
-                    license_plate = infraction.get('license_plate_detected') or 'NO_PLATE'
-                    code = infraction.get('infraction_code', 'N/A')
-                    inf_type = infraction.get('infraction_type', 'unknown')
-                    speed = infraction.get('detected_speed', 'N/A')
-                    
-                    logger.info(
-                        f"   {idx}. Code: {code} | Type: {inf_type} | "
-                        f"Plate: '{license_plate}' | Speed: {speed} km/h"
-                    )
-            else:
-                logger.error("💾 ⚠️ WARNING: No infractions were saved to database!")
+            infraction_queue.enqueue(payloads)
+            logger.info(f"💾 Queued {len(payloads)} infractions (pending: {len(infraction_queue)})")
             
         except Exception as e:
-            logger.error(f"❌ Error guardando infracciones en la base de datos: {str(e)}", exc_info=True)
+            logger.error(f"❌ Error encolando infracciones: {str(e)}", exc_info=True)
+
+
+class SessionManager:
+    """Registro de sesiones activas: una sesión RealtimeDetector por conexión"""
+    
+    def __init__(self):
+        self.sessions: Dict[str, RealtimeDetector] = {}
+    
+    def open(self) -> RealtimeDetector:
+        """Create and register a new detection session"""
+        session = RealtimeDetector()
+        self.sessions[session.session_id] = session
+        logger.info(
+            "Detection session opened",
+            session_id=session.session_id,
+            total_sessions=len(self.sessions)
+        )
+        return session
+    
+    def close(self, session: RealtimeDetector):
+        """Unregister a detection session"""
+        self.sessions.pop(session.session_id, None)
+        logger.info(
+            "Detection session closed",
+            session_id=session.session_id,
+            frames=session.frame_count,
+            total_sessions=len(self.sessions)
+        )
+
+
+# Registro global de sesiones
+session_manager = SessionManager()
 
 
-# Instancia global del detector
-detector = RealtimeDetector()
+async def _handle_binary_frame(websocket: WebSocket, session: RealtimeDetector, message: bytes):
+    """Process one binary frame message and reply with a binary result"""
+    try:
+        header, payload = decode_frame_message(message)
+    except ProtocolError as e:
+        logger.warning(f"Invalid binary frame: {str(e)}", session_id=session.session_id)
+        await websocket.send_bytes(encode_result_message({"error": str(e)}, 0, ResultType.ERROR))
+        return
+    
+    if header.config_version != session.config_version:
+        logger.warning(
+            "Binary frame references a stale config version",
+            session_id=session.session_id,
+            frame_config_version=header.config_version,
+            session_config_version=session.config_version
+        )
+    
+    result = await session.process_frame(payload, session.config, binary=True, frame_id=header.frame_id)
+    result_type = ResultType.ERROR if "error" in result else ResultType.DETECTION
+    
+    await websocket.send_bytes(encode_result_message(result, header.frame_id, result_type))
 
 
 @router.websocket("/ws/inference")
@@ -980,18 +1062,37 @@ async def websocket_inference(websocket: WebSocket):
     """
     WebSocket endpoint para detección en tiempo real
     
-    El cliente envía frames de video y recibe detecciones
+    El cliente envía frames de video y recibe detecciones.
+    
+    Modo JSON (por defecto): mensajes de texto con el frame en base64.
+    Modo binario: el cliente envía {"type": "hello", "protocol": "binary"},
+    luego la configuración una sola vez ({"type": "config", "version": N, "data": {...}})
+    y después frames binarios (ver app.services.frame_protocol).
+    
+    Con config['response_mode'] = 'detections' solo se devuelven las detecciones;
+    el cliente puede pedir el JPEG anotado con {"type": "snapshot", "frame_id": N}.
     """
     # Aceptar la conexión sin validación de origen (para desarrollo)
     await websocket.accept()
-    detector.active_connections.append(websocket)
-    logger.info("WebSocket client connected", total_connections=len(detector.active_connections))
+    session = session_manager.open()
     
     try:
         while True:
-            # Recibir datos del cliente
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            # Recibir datos del cliente (texto JSON o frame binario)
+            packet = await websocket.receive()
+            
+            if packet["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(packet.get("code", 1000))
+            
+            if packet.get("bytes") is not None:
+                if not session.binary_mode:
+                    logger.warning("Binary frame received before negotiation", session_id=session.session_id)
+                    await websocket.send_json({"type": "error", "error": "Binary mode not negotiated"})
+                    continue
+                await _handle_binary_frame(websocket, session, packet["bytes"])
+                continue
+            
+            message = json.loads(packet["text"])
             
             logger.debug(f"Received message type: {message.get('type')}")
             
@@ -1003,30 +1104,57 @@ async def websocket_inference(websocket: WebSocket):
                 logger.info(f"Processing frame with config: {config}")
                 
                 # Procesar y enviar resultado
-                result = await detector.process_frame(frame_data, config)
+                result = await session.process_frame(frame_data, config, frame_id=message.get('frame_id'))
                 
                 logger.info(f"Sending result with {len(result.get('detections', []))} detections")
                 
                 await websocket.send_json(result)
                 
+            elif message.get('type') == 'snapshot':
+                # Evidencia bajo demanda: JPEG anotado del último frame procesado
+                snapshot = session.render_snapshot(message.get('frame_id'), binary=session.binary_mode)
+                if session.binary_mode and "frame" in snapshot:
+                    await websocket.send_bytes(
+                        encode_result_message(snapshot, snapshot.get('frame_id') or 0, ResultType.SNAPSHOT)
+                    )
+                else:
+                    await websocket.send_json(snapshot)
+                
+            elif message.get('type') == 'hello':
+                # Negociación de protocolo
+                session.binary_mode = message.get('protocol') == 'binary'
+                if 'config' in message:
+                    session.update_config(message['config'], message.get('config_version'))
+                await websocket.send_json({
+                    "type": "hello_ack",
+                    "protocol": "binary" if session.binary_mode else "json",
+                    "protocol_version": PROTOCOL_VERSION,
+                    "encoding": result_encoding() if session.binary_mode else "json",
+                    "session_id": session.session_id,
+                    "config_version": session.config_version
+                })
+                
             elif message.get('type') == 'config':
-                # Client sent configuration
+                # Client sent configuration (stored once per session)
                 logger.info(f"Received config: {message.get('data')}")
-                await websocket.send_json({"type": "config_received", "status": "ok"})
+                session.update_config(message.get('data', {}), message.get('version'))
+                await websocket.send_json({
+                    "type": "config_received",
+                    "status": "ok",
+                    "config_version": session.config_version
+                })
                 
             elif message.get('type') == 'ping':
                 # Responder a ping para mantener la conexión
                 await websocket.send_json({"type": "pong"})
                 
     except WebSocketDisconnect:
-        if websocket in detector.active_connections:
-            detector.active_connections.remove(websocket)
-        logger.info("Client disconnected normally", total_connections=len(detector.active_connections))
+        logger.info("Client disconnected normally", session_id=session.session_id)
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}", exc_info=True)
-        if websocket in detector.active_connections:
-            detector.active_connections.remove(websocket)
         try:
             await websocket.close()
         except:
             pass
+    finally:
+        session_manager.close(session)
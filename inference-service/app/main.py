@@ -34,6 +34,18 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Traffic Inference Service")
+    try:
+        from app.services.inference_scheduler import inference_scheduler
+        await inference_scheduler.shutdown()
+    except Exception as e:
+        logger.error(f"Error stopping inference scheduler: {str(e)}")
+    try:
+        from app.services.infraction_queue import infraction_queue
+        from app.services.django_api import django_api
+        await infraction_queue.shutdown()
+        await django_api.close()
+    except Exception as e:
+        logger.error(f"Error flushing infractions: {str(e)}")
     try:
         from app.services.model_service import model_service
         model_service.shutdown()
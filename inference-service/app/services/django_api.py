@@ -1,8 +1,9 @@
 """
 Django API Service - Handles communication with Django backend
 """
+import asyncio
 import httpx
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 import uuid
 
@@ -17,8 +18,68 @@ class DjangoAPIService:
     def __init__(self):
         self.base_url = settings.DJANGO_API_URL
         self.timeout = settings.DJANGO_API_TIMEOUT
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
         logger.info(f"🔗 DjangoAPIService initialized with URL: {self.base_url}")
         logger.info(f"⏱️  Timeout: {self.timeout}s")
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Long-lived pooled HTTP client (keep-alive)
+        
+        Se crea de forma perezosa en el event loop actual: las conexiones de un
+        AsyncClient no se pueden reutilizar desde otro loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.DJANGO_API_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.DJANGO_API_MAX_KEEPALIVE,
+                    keepalive_expiry=30.0
+                )
+            )
+            self._client_loop = loop
+        return self._client
+    
+    async def close(self):
+        """Close the pooled client"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+    
+    async def bulk_create_infractions(
+        self,
+        detections: List[Dict[str, Any]],
+        device_id: Optional[str] = None,
+        source: str = 'webcam_local'
+    ) -> Dict[str, Any]:
+        """
+        Create a batch of infractions with one request to /api/infractions/bulk/
+        
+        Args:
+            detections: Detections in InfractionService.bulk_create_from_detections format
+            device_id: Optional device UUID
+            source: Source of detection
+            
+        Returns:
+            Response with created infractions (vehicle and driver inline)
+            
+        Raises:
+            httpx.TransportError: Connection/timeout errors (retryable)
+            httpx.HTTPStatusError: Non-2xx responses
+        """
+        payload: Dict[str, Any] = {'detections': detections, 'source': source}
+        if device_id:
+            payload['device_id'] = device_id
+        
+        response = await self.client.post("/api/infractions/bulk/", json=payload)
+        response.raise_for_status()
+        return response.json()
         
     async def create_infraction(
         self,
@@ -36,34 +97,34 @@ class DjangoAPIService:
         try:
             logger.info(f"📤 Attempting to create infraction: type={infraction_data.get('infraction_type')}, plate={infraction_data.get('license_plate_detected', 'N/A')}")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                url = f"{self.base_url}/api/infractions/"
-                logger.debug(f"POST {url}")
-                
-                response = await client.post(
-                    url,
-                    json=infraction_data
+            client = self.client
+            url = f"{self.base_url}/api/infractions/"
+            logger.debug(f"POST {url}")
+            
+            response = await client.post(
+                url,
+                json=infraction_data
+            )
+            
+            logger.info(f"📥 Django API response: status={response.status_code}")
+            
+            if response.status_code in [200, 201]:
+                result = response.json()
+                logger.info(
+                    f"✅ Infraction created successfully: "
+                    f"code={result.get('infraction_code')}, "
+                    f"id={result.get('id')}, "
+                    f"type={result.get('infraction_type')}"
                 )
+                return result
+            else:
+                logger.error(
+                    f"❌ Failed to create infraction: "
+                    f"status={response.status_code}, "
+                    f"response={response.text[:200]}"
+                )
+                return None
                 
-                logger.info(f"📥 Django API response: status={response.status_code}")
-                
-                if response.status_code in [200, 201]:
-                    result = response.json()
-                    logger.info(
-                        f"✅ Infraction created successfully: "
-                        f"code={result.get('infraction_code')}, "
-                        f"id={result.get('id')}, "
-                        f"type={result.get('infraction_type')}"
-                    )
-                    return result
-                else:
-                    logger.error(
-                        f"❌ Failed to create infraction: "
-                        f"status={response.status_code}, "
-                        f"response={response.text[:200]}"
-                    )
-                    return None
-                    
         except httpx.ConnectError as e:
             logger.error(f"🔌 Connection error to Django API ({self.base_url}): {str(e)}")
             logger.error("⚠️ Verifica que el backend Django esté corriendo en el puerto correcto")
@@ -91,41 +152,41 @@ class DjangoAPIService:
             Vehicle data or None
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                # Try to get existing vehicle
-                response = await client.get(
-                    f"{self.base_url}/api/vehicles/",
-                    params={'license_plate': license_plate}
-                )
-                
-                if response.status_code == 200:
-                    results = response.json().get('results', [])
-                    if results:
-                        logger.info(f"Vehicle found: {license_plate}")
-                        return results[0]
-                
-                # Create new vehicle if not found
-                vehicle_data = {
-                    'license_plate': license_plate,
-                    'vehicle_type': vehicle_type,
-                }
-                
-                response = await client.post(
-                    f"{self.base_url}/api/vehicles/",
-                    json=vehicle_data
+            client = self.client
+            # Try to get existing vehicle
+            response = await client.get(
+                f"{self.base_url}/api/vehicles/",
+                params={'license_plate': license_plate}
+            )
+            
+            if response.status_code == 200:
+                results = response.json().get('results', [])
+                if results:
+                    logger.info(f"Vehicle found: {license_plate}")
+                    return results[0]
+            
+            # Create new vehicle if not found
+            vehicle_data = {
+                'license_plate': license_plate,
+                'vehicle_type': vehicle_type,
+            }
+            
+            response = await client.post(
+                f"{self.base_url}/api/vehicles/",
+                json=vehicle_data
+            )
+            
+            if response.status_code in [200, 201]:
+                logger.info(f"Vehicle created: {license_plate}")
+                return response.json()
+            else:
+                logger.error(
+                    "Failed to create vehicle",
+                    license_plate=license_plate,
+                    status_code=response.status_code
                 )
+                return None
                 
-                if response.status_code in [200, 201]:
-                    logger.info(f"Vehicle created: {license_plate}")
-                    return response.json()
-                else:
-                    logger.error(
-                        "Failed to create vehicle",
-                        license_plate=license_plate,
-                        status_code=response.status_code
-                    )
-                    return None
-                    
         except Exception as e:
             logger.error(f"Error with vehicle: {str(e)}")
             return None
@@ -133,19 +194,19 @@ class DjangoAPIService:
     async def get_device(self, device_code: str) -> Optional[Dict[str, Any]]:
         """Get device information by code"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/api/devices/",
-                    params={'code': device_code}
-                )
-                
-                if response.status_code == 200:
-                    results = response.json().get('results', [])
-                    if results:
-                        return results[0]
-                
-                return None
-                
+            client = self.client
+            response = await client.get(
+                f"{self.base_url}/api/devices/",
+                params={'code': device_code}
+            )
+            
+            if response.status_code == 200:
+                results = response.json().get('results', [])
+                if results:
+                    return results[0]
+            
+            return None
+            
         except Exception as e:
             logger.error(f"Error getting device: {str(e)}")
             return None
@@ -153,19 +214,19 @@ class DjangoAPIService:
     async def get_zone(self, zone_code: str) -> Optional[Dict[str, Any]]:
         """Get zone information by code"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/api/zones/",
-                    params={'code': zone_code}
-                )
-                
-                if response.status_code == 200:
-                    results = response.json().get('results', [])
-                    if results:
-                        return results[0]
-                
-                return None
-                
+            client = self.client
+            response = await client.get(
+                f"{self.base_url}/api/zones/",
+                params={'code': zone_code}
+            )
+            
+            if response.status_code == 200:
+                results = response.json().get('results', [])
+                if results:
+                    return results[0]
+            
+            return None
+            
         except Exception as e:
             logger.error(f"Error getting zone: {str(e)}")
             return None
@@ -216,40 +277,40 @@ class DjangoAPIService:
         try:
             logger.info(f"🤖 Requesting ML prediction for driver {driver_dni}, infraction {infraction_id}")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                url = f"{self.base_url}/api/ml/predictions/recidivism/"
-                
-                payload = {
-                    "driver_dni": driver_dni,
-                    "infraction_id": infraction_id
-                }
-                
-                logger.debug(f"POST {url} with payload: {payload}")
-                
-                response = await client.post(
-                    url,
-                    json=payload
+            client = self.client
+            url = f"{self.base_url}/api/ml/predictions/recidivism/"
+            
+            payload = {
+                "driver_dni": driver_dni,
+                "infraction_id": infraction_id
+            }
+            
+            logger.debug(f"POST {url} with payload: {payload}")
+            
+            response = await client.post(
+                url,
+                json=payload
+            )
+            
+            logger.info(f"📥 ML API response: status={response.status_code}")
+            
+            if response.status_code in [200, 201]:
+                result = response.json()
+                logger.info(
+                    f"✅ ML prediction successful: "
+                    f"risk={result.get('recidivism_probability', 0)*100:.1f}%, "
+                    f"category={result.get('risk_category')}, "
+                    f"time={result.get('prediction_time_ms', 0):.2f}ms"
                 )
+                return result
+            else:
+                logger.error(
+                    f"❌ ML prediction failed: "
+                    f"status={response.status_code}, "
+                    f"response={response.text[:200]}"
+                )
+                return None
                 
-                logger.info(f"📥 ML API response: status={response.status_code}")
-                
-                if response.status_code in [200, 201]:
-                    result = response.json()
-                    logger.info(
-                        f"✅ ML prediction successful: "
-                        f"risk={result.get('recidivism_probability', 0)*100:.1f}%, "
-                        f"category={result.get('risk_category')}, "
-                        f"time={result.get('prediction_time_ms', 0):.2f}ms"
-                    )
-                    return result
-                else:
-                    logger.error(
-                        f"❌ ML prediction failed: "
-                        f"status={response.status_code}, "
-                        f"response={response.text[:200]}"
-                    )
-                    return None
-                    
         except httpx.ConnectError as e:
             logger.error(f"🔌 Connection error to ML API: {str(e)}")
             return None
@@ -0,0 +1,196 @@
+"""
+Frame Preprocessing Context - derived images computed once per frame
+
+En un process_frame el frame se reducía para YOLO, el detector de semáforos
+corría su propio YOLO sobre el frame completo y convertía a HSV cada recorte,
+y el detector de carriles convertía el frame completo a gris, lo suavizaba y
+aplicaba Canny. Cada etapa asignaba sus propios buffers.
+
+- FrameBufferPool guarda buffers reutilizables por (nombre, forma, dtype); los
+  cv2.* escriben en ellos con dst= y no se asigna memoria nueva frame a frame.
+- FrameContext envuelve un frame y calcula bajo demanda (memoizado) la versión
+  reducida, gris, HSV y suavizada, siempre sobre vistas (ROI) del frame y no
+  sobre copias. Las etapas reciben el contexto en lugar del frame.
+
+Los buffers del pool se reutilizan en el siguiente frame: los resultados de un
+contexto sólo son válidos hasta que se crea el contexto del frame siguiente.
+"""
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+Box = Tuple[int, int, int, int]
+
+
+class FrameBufferPool:
+    """
+    Pool LRU de buffers numpy reutilizables
+
+    Un buffer se identifica por (nombre, forma, dtype); si la forma cambia
+    (otra resolución u otro ROI) se asigna uno nuevo y el más antiguo sale
+    del pool cuando se supera max_buffers.
+    """
+
+    def __init__(self, max_buffers: int = 32):
+        self.max_buffers = max_buffers
+        self._buffers: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+
+        # Estadísticas
+        self.allocations = 0
+        self.reuses = 0
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def get(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """Buffer for (name, shape, dtype), reused across frames"""
+        key = (name, tuple(shape), np.dtype(dtype).str)
+        buffer = self._buffers.get(key)
+        if buffer is not None:
+            self._buffers.move_to_end(key)
+            self.reuses += 1
+            return buffer
+
+        buffer = np.empty(shape, dtype=dtype)
+        self._buffers[key] = buffer
+        self.allocations += 1
+        while len(self._buffers) > self.max_buffers:
+            self._buffers.popitem(last=False)
+        return buffer
+
+
+class FrameContext:
+    """
+    Imágenes derivadas de un frame, calculadas una sola vez
+
+    Todas las operaciones aceptan un ROI (x1, y1, x2, y2) en coordenadas del
+    frame; el ROI se recorta a los límites del frame y se trabaja sobre la
+    vista frame[y1:y2, x1:x2], sin copiar.
+    """
+
+    def __init__(self, frame: np.ndarray, pool: Optional[FrameBufferPool] = None):
+        self.frame = frame
+        self.height, self.width = frame.shape[:2]
+        self.pool = pool if pool is not None else FrameBufferPool()
+        self._cache: Dict[Hashable, object] = {}
+        self._claimed: Dict[Hashable, int] = {}
+
+    @classmethod
+    def wrap(cls, frame: Union[np.ndarray, "FrameContext"]) -> "FrameContext":
+        """Accept either a frame or an existing context"""
+        if isinstance(frame, FrameContext):
+            return frame
+        return cls(frame)
+
+    def buffer(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Pool buffer for this frame
+
+        Dos ROIs del mismo tamaño en un frame reciben buffers distintos
+        (name0, name1, ...); en el frame siguiente se vuelven a usar los mismos.
+        """
+        key = (name, tuple(shape))
+        index = self._claimed.get(key, 0)
+        self._claimed[key] = index + 1
+        return self.pool.get(f'{name}{index}', shape)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.frame.shape
+
+    def clip(self, roi: Optional[Sequence[float]]) -> Box:
+        """ROI clipped to the frame (full frame if None)"""
+        if roi is None:
+            return (0, 0, self.width, self.height)
+        x1, y1, x2, y2 = (int(v) for v in roi)
+        x1 = min(max(x1, 0), self.width)
+        x2 = min(max(x2, 0), self.width)
+        y1 = min(max(y1, 0), self.height)
+        y2 = min(max(y2, 0), self.height)
+        return (x1, y1, max(x1, x2), max(y1, y2))
+
+    def roi(self, roi: Optional[Sequence[float]] = None) -> np.ndarray:
+        """Zero-copy view of a region of the frame"""
+        x1, y1, x2, y2 = self.clip(roi)
+        return self.frame[y1:y2, x1:x2]
+
+    def downscaled(self, max_width: int, max_height: int) -> Tuple[np.ndarray, float, float]:
+        """
+        Frame reduced to fit (max_width, max_height) keeping the aspect ratio
+
+        Se memoiza por tamaño de salida, así YOLO de vehículos y YOLO de
+        semáforos comparten la misma reducción aunque pidan límites distintos.
+
+        Returns:
+            Tuple of (image, scale_x, scale_y) to map boxes back to the frame
+        """
+        if self.width <= max_width and self.height <= max_height:
+            return self.frame, 1.0, 1.0
+
+        aspect = self.width / self.height
+        if aspect > (max_width / max_height):
+            new_width, new_height = max_width, int(max_width / aspect)
+        else:
+            new_width, new_height = int(max_height * aspect), max_height
+
+        key = ('downscaled', new_width, new_height)
+        image = self._cache.get(key)
+        if image is None:
+            buffer = self.buffer('downscaled', (new_height, new_width) + self.frame.shape[2:])
+            image = cv2.resize(self.frame, (new_width, new_height), dst=buffer,
+                               interpolation=cv2.INTER_LINEAR)
+            self._cache[key] = image
+        return image, self.width / new_width, self.height / new_height
+
+    def gray(self, roi: Optional[Sequence[float]] = None) -> np.ndarray:
+        """Grayscale of a region (the full-frame gray is reused when already computed)"""
+        box = self.clip(roi)
+        full = self._cache.get(('gray', self.clip(None)))
+        if full is not None:
+            x1, y1, x2, y2 = box
+            return full[y1:y2, x1:x2]
+
+        key = ('gray', box)
+        image = self._cache.get(key)
+        if image is None:
+            view = self.roi(box)
+            buffer = self.buffer('gray', view.shape[:2])
+            image = cv2.cvtColor(view, cv2.COLOR_BGR2GRAY, dst=buffer)
+            self._cache[key] = image
+        return image
+
+    def hsv(self, roi: Optional[Sequence[float]] = None) -> np.ndarray:
+        """HSV of a region"""
+        box = self.clip(roi)
+        key = ('hsv', box)
+        image = self._cache.get(key)
+        if image is None:
+            view = self.roi(box)
+            buffer = self.buffer('hsv', view.shape)
+            image = cv2.cvtColor(view, cv2.COLOR_BGR2HSV, dst=buffer)
+            self._cache[key] = image
+        return image
+
+    def blurred(self, roi: Optional[Sequence[float]] = None, ksize: int = 5) -> np.ndarray:
+        """
+        Gaussian-blurred grayscale of a region
+
+        El suavizado se calcula sobre el ROI ampliado en ksize píxeles y luego
+        se recorta, así el borde interior del ROI usa los píxeles reales del
+        frame (igual que al suavizar el frame completo) en lugar de reflejarlos.
+        """
+        box = self.clip(roi)
+        key = ('blurred', box, ksize)
+        image = self._cache.get(key)
+        if image is None:
+            x1, y1, x2, y2 = box
+            padded = self.clip((x1 - ksize, y1 - ksize, x2 + ksize, y2 + ksize))
+            gray = self.gray(padded)
+            buffer = self.buffer('blurred', gray.shape)
+            blurred = cv2.GaussianBlur(gray, (ksize, ksize), 0, dst=buffer)
+            px1, py1 = padded[0], padded[1]
+            image = blurred[y1 - py1:y2 - py1, x1 - px1:x2 - px1]
+            self._cache[key] = image
+        return image
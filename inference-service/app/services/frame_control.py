@@ -0,0 +1,278 @@
+"""
+Adaptive Frame Control - per-session frame skip / OCR interval for the realtime channel
+
+RealtimeDetector procesaba 1 de cada frame_skip_interval frames y reintentaba
+OCR cada ocr_frame_interval frames con valores fijos enviados por el cliente,
+sin importar si el servidor iba holgado o atrasado ni si la escena estaba vacía.
+
+- MotionGate compara el frame contra el último frame procesado en gris y a
+  baja resolución; si la escena está quieta se evita YOLO y se devuelven las
+  detecciones cacheadas (con un refresco forzado cada max_static_frames).
+- AdaptiveFrameController mide la latencia de cada frame procesado (EWMA) y la
+  compara con un presupuesto: si se pasa sube el intervalo de OCR o el salto
+  de frames, si sobra margen y hay actividad los baja. Cada ajuste se devuelve
+  para informarlo al cliente en la respuesta.
+"""
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from app.core import get_logger, settings
+
+logger = get_logger(__name__)
+
+
+class MotionGate:
+    """
+    Pre-chequeo barato de movimiento
+
+    El score es la diferencia absoluta media (0-255) entre el frame actual y
+    el de referencia, ambos en gris y reducidos a sample_width de ancho. La
+    referencia es el último frame procesado, así el movimiento lento se
+    acumula en lugar de perderse entre frames consecutivos.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        max_static_frames: Optional[int] = None,
+        sample_width: int = 64
+    ):
+        self.threshold = settings.MOTION_GATE_THRESHOLD if threshold is None else threshold
+        self.max_static_frames = (
+            settings.MOTION_GATE_MAX_STATIC_FRAMES if max_static_frames is None else max_static_frames
+        )
+        self.sample_width = sample_width
+        self._reference: Optional[np.ndarray] = None
+        self._pending: Optional[np.ndarray] = None
+        self.static_frames = 0
+        self.last_score: Optional[float] = None
+
+    def _sample(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        sample_height = max(1, int(round(height * self.sample_width / max(width, 1))))
+        small = cv2.resize(frame, (self.sample_width, sample_height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def score(self, frame: np.ndarray) -> Optional[float]:
+        """Mean absolute difference against the reference (None without reference)"""
+        sample = self._sample(frame)
+        if self._reference is None or self._reference.shape != sample.shape:
+            self.last_score = None
+        else:
+            self.last_score = float(cv2.absdiff(sample, self._reference).mean())
+        self._pending = sample
+        return self.last_score
+
+    def is_static(self, frame: np.ndarray) -> bool:
+        """
+        Decide whether YOLO can be skipped for this frame
+
+        Returns:
+            True if the scene did not change since the last processed frame
+            and the forced refresh is not due yet
+        """
+        score = self.score(frame)
+        if score is None or score >= self.threshold:
+            return False
+        if self.static_frames >= self.max_static_frames:
+            return False
+        self.static_frames += 1
+        return True
+
+    def mark_processed(self):
+        """The last scored frame was processed: it becomes the reference"""
+        if self._pending is not None:
+            self._reference = self._pending
+        self.static_frames = 0
+
+    def reset(self):
+        self._reference = None
+        self._pending = None
+        self.static_frames = 0
+        self.last_score = None
+
+
+@dataclass
+class FrameControlChange:
+    """One adjustment made by the controller"""
+    parameter: str
+    old: int
+    new: int
+    reason: str
+
+
+class AdaptiveFrameController:
+    """
+    Controlador por sesión del salto de frames y del intervalo de OCR
+
+    Después de cada frame procesado se llama a observe() con la latencia de
+    ese frame, el número de vehículos y el score de movimiento:
+
+    - latencia EWMA > presupuesto * (1 + tolerance): sube ocr_frame_interval
+      si hay vehículos (el OCR es lo más caro), si no (o ya está al máximo)
+      sube frame_skip_interval
+    - latencia EWMA < presupuesto * headroom con escena activa: baja
+      frame_skip_interval y luego ocr_frame_interval
+    - escena vacía (sin vehículos ni movimiento): sube frame_skip_interval
+      hasta idle_frame_skip
+    - primer frame activo después de la escena vacía: vuelve al
+      frame_skip_interval previo, sin esperar margen de latencia ni cooldown
+
+    Entre dos ajustes deben pasar cooldown_frames frames procesados para que
+    la EWMA refleje el cambio anterior.
+    """
+
+    def __init__(
+        self,
+        target_latency_ms: Optional[float] = None,
+        frame_skip: int = 2,
+        ocr_interval: int = 5,
+        min_frame_skip: int = 1,
+        max_frame_skip: Optional[int] = None,
+        idle_frame_skip: Optional[int] = None,
+        min_ocr_interval: Optional[int] = None,
+        max_ocr_interval: Optional[int] = None,
+        smoothing: float = 0.3,
+        tolerance: float = 0.1,
+        headroom: float = 0.6,
+        cooldown_frames: Optional[int] = None,
+        motion_threshold: Optional[float] = None
+    ):
+        self.target_latency_ms = (
+            settings.ADAPTIVE_TARGET_LATENCY_MS if target_latency_ms is None else target_latency_ms
+        )
+        self.min_frame_skip = min_frame_skip
+        self.max_frame_skip = max_frame_skip or settings.ADAPTIVE_MAX_FRAME_SKIP
+        self.idle_frame_skip = min(
+            idle_frame_skip or settings.ADAPTIVE_IDLE_FRAME_SKIP, self.max_frame_skip
+        )
+        self.min_ocr_interval = min_ocr_interval or settings.ADAPTIVE_MIN_OCR_INTERVAL
+        self.max_ocr_interval = max_ocr_interval or settings.ADAPTIVE_MAX_OCR_INTERVAL
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.headroom = headroom
+        self.cooldown_frames = (
+            settings.ADAPTIVE_COOLDOWN_FRAMES if cooldown_frames is None else cooldown_frames
+        )
+        self.motion_threshold = (
+            settings.MOTION_GATE_THRESHOLD if motion_threshold is None else motion_threshold
+        )
+
+        self.frame_skip = self._clamp(frame_skip, self.min_frame_skip, self.max_frame_skip)
+        self.ocr_interval = self._clamp(ocr_interval, self.min_ocr_interval, self.max_ocr_interval)
+        self.latency_ms: Optional[float] = None
+        self.observations = 0
+        self._frames_since_change = 0
+        self._last_selected_frame: Optional[int] = None
+        # frame_skip antes de que la escena vacía lo subiera
+        self._pre_idle_frame_skip: Optional[int] = None
+        self.last_changes: List[FrameControlChange] = []
+
+    @staticmethod
+    def _clamp(value: int, low: int, high: int) -> int:
+        return max(low, min(high, int(value)))
+
+    def should_process(self, frame_number: int) -> bool:
+        """
+        Frame-skip decision for a frame number
+
+        Cuenta desde el último frame elegido (no frame_number % frame_skip)
+        para que un cambio de intervalo no deje un hueco más largo.
+        """
+        if (self._last_selected_frame is not None
+                and frame_number - self._last_selected_frame < self.frame_skip):
+            return False
+        self._last_selected_frame = frame_number
+        return True
+
+    def observe(
+        self,
+        latency_ms: float,
+        vehicle_count: int = 0,
+        motion_score: Optional[float] = None,
+        adjust_ocr: bool = True
+    ) -> List[FrameControlChange]:
+        """
+        Feed the measurement of a processed frame and adjust the intervals
+
+        Args:
+            latency_ms: Processing time of the frame
+            vehicle_count: Vehicles detected in the frame
+            motion_score: MotionGate score of the frame (None if unknown)
+            adjust_ocr: False when the client pinned ocr_frame_interval
+
+        Returns:
+            Adjustments made (empty if none)
+        """
+        if self.latency_ms is None:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += self.smoothing * (latency_ms - self.latency_ms)
+        self.observations += 1
+        self._frames_since_change += 1
+        self.last_changes = []
+
+        moving = motion_score is None or motion_score >= self.motion_threshold
+        active = vehicle_count > 0 or moving
+
+        # El salto de escena vacía no depende de la latencia: se deshace en
+        # cuanto vuelve la actividad, aunque la EWMA no deje margen
+        if active and self._pre_idle_frame_skip is not None:
+            pre_idle, self._pre_idle_frame_skip = self._pre_idle_frame_skip, None
+            if self.frame_skip > pre_idle:
+                self._set('frame_skip', pre_idle, 'scene_active')
+                return self.last_changes
+
+        if self._frames_since_change < self.cooldown_frames:
+            return self.last_changes
+
+        if self.latency_ms > self.target_latency_ms * (1 + self.tolerance):
+            if adjust_ocr and vehicle_count > 0 and self.ocr_interval < self.max_ocr_interval:
+                self._set('ocr_interval', self.ocr_interval + 1, 'over_budget')
+            elif self.frame_skip < self.max_frame_skip:
+                self._pre_idle_frame_skip = None
+                self._set('frame_skip', self.frame_skip + 1, 'over_budget')
+        elif not active:
+            if self.frame_skip < self.idle_frame_skip:
+                if self._pre_idle_frame_skip is None:
+                    self._pre_idle_frame_skip = self.frame_skip
+                self._set('frame_skip', self.frame_skip + 1, 'idle_scene')
+        elif self.latency_ms < self.target_latency_ms * self.headroom:
+            if self.frame_skip > self.min_frame_skip:
+                self._set('frame_skip', self.frame_skip - 1, 'under_budget')
+            elif adjust_ocr and vehicle_count > 0 and self.ocr_interval > self.min_ocr_interval:
+                self._set('ocr_interval', self.ocr_interval - 1, 'under_budget')
+
+        return self.last_changes
+
+    def _set(self, attribute: str, value: int, reason: str):
+        parameter = 'frame_skip_interval' if attribute == 'frame_skip' else 'ocr_frame_interval'
+        old = getattr(self, attribute)
+        setattr(self, attribute, value)
+        self._frames_since_change = 0
+        self.last_changes.append(FrameControlChange(parameter, old, value, reason))
+        logger.info(
+            "Adaptive frame control adjusted",
+            parameter=parameter,
+            old=old,
+            new=value,
+            reason=reason,
+            latency_ms=round(self.latency_ms, 1),
+            target_latency_ms=self.target_latency_ms
+        )
+
+    def snapshot(self, include_changes: bool = True) -> Dict[str, Any]:
+        """State reported in the response metadata (changes only for the frame that caused them)"""
+        return {
+            "adaptive": True,
+            "frame_skip_interval": self.frame_skip,
+            "ocr_frame_interval": self.ocr_interval,
+            "latency_ms": round(self.latency_ms, 2) if self.latency_ms is not None else None,
+            "target_latency_ms": self.target_latency_ms,
+            "changes": [asdict(change) for change in self.last_changes] if include_changes else []
+        }
@@ -0,0 +1,152 @@
+"""
+Frame Protocol - Binary WebSocket framing for the realtime inference channel
+
+Modo JSON (legacy): {"type": "frame", "image": <base64>, "config": {...}}
+Modo binario (negociado con un mensaje "hello"):
+
+    Cliente -> servidor: FRAME_HEADER + bytes JPEG/WebP crudos
+    Servidor -> cliente: RESULT_HEADER + detecciones codificadas con msgpack
+
+La configuración se envía una sola vez por sesión con {"type": "config",
+"version": N, "data": {...}} y cada frame binario referencia esa versión.
+"""
+import base64
+import json
+import struct
+from enum import IntEnum
+from dataclasses import dataclass
+from typing import Dict, Any, Tuple
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:  # pragma: no cover - depende del entorno
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+
+PROTOCOL_VERSION = 1
+
+# version (u8), codec (u8), frame_id (u32), config_version (u16)
+FRAME_HEADER = struct.Struct('<BBIH')
+
+# version (u8), message type (u8), frame_id (u32)
+RESULT_HEADER = struct.Struct('<BBI')
+
+
+class FrameCodec(IntEnum):
+    """Image codec of an incoming binary frame"""
+    JPEG = 0
+    WEBP = 1
+
+
+class ResultType(IntEnum):
+    """Type of an outgoing binary message"""
+    DETECTION = 0
+    ERROR = 1
+    SNAPSHOT = 2
+
+
+class ProtocolError(ValueError):
+    """Malformed binary message"""
+
+
+@dataclass
+class FrameHeader:
+    """Decoded header of an incoming binary frame"""
+    frame_id: int
+    config_version: int
+    codec: FrameCodec
+
+
+def decode_frame_message(message: bytes) -> Tuple[FrameHeader, memoryview]:
+    """
+    Split a binary frame message into header and image payload
+
+    Args:
+        message: Raw WebSocket binary message
+
+    Returns:
+        Tuple of (header, image bytes view) - the payload is not copied
+    """
+    if len(message) <= FRAME_HEADER.size:
+        raise ProtocolError(f"Binary frame too short: {len(message)} bytes")
+
+    version, codec, frame_id, config_version = FRAME_HEADER.unpack_from(message)
+
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version: {version}")
+
+    try:
+        codec = FrameCodec(codec)
+    except ValueError:
+        raise ProtocolError(f"Unknown frame codec: {codec}")
+
+    payload = memoryview(message)[FRAME_HEADER.size:]
+    return FrameHeader(frame_id, config_version, codec), payload
+
+
+def encode_frame_message(
+    image: bytes,
+    frame_id: int,
+    config_version: int = 0,
+    codec: FrameCodec = FrameCodec.JPEG
+) -> bytes:
+    """Build a binary frame message (client side, used by tests and benchmarks)"""
+    return FRAME_HEADER.pack(PROTOCOL_VERSION, codec, frame_id, config_version) + bytes(image)
+
+
+def encode_result_message(
+    result: Dict[str, Any],
+    frame_id: int,
+    result_type: ResultType = ResultType.DETECTION
+) -> bytes:
+    """
+    Encode a detection result for the binary channel
+
+    Los bytes de imagen (si existen) viajan como binario de msgpack, sin base64.
+    Sin msgpack el cuerpo es JSON y los bytes van en base64, como en el modo
+    JSON legacy.
+    """
+    header = RESULT_HEADER.pack(PROTOCOL_VERSION, result_type, frame_id)
+
+    if MSGPACK_AVAILABLE:
+        body = msgpack.packb(result, use_bin_type=True, default=_msgpack_default)
+    else:
+        body = json.dumps(result, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+    return header + body
+
+
+def decode_result_message(message: bytes) -> Tuple[int, ResultType, Dict[str, Any]]:
+    """Decode a binary result message (client side, used by tests and benchmarks)"""
+    version, result_type, frame_id = RESULT_HEADER.unpack_from(message)
+    body = memoryview(message)[RESULT_HEADER.size:]
+
+    if MSGPACK_AVAILABLE:
+        result = msgpack.unpackb(body, raw=False)
+    else:
+        result = json.loads(bytes(body))
+
+    return frame_id, ResultType(result_type), result
+
+
+def result_encoding() -> str:
+    """Encoding used for binary result bodies"""
+    return 'msgpack' if MSGPACK_AVAILABLE else 'json'
+
+
+def _msgpack_default(obj):
+    """Fallback for numpy scalars and other non-native types"""
+    if hasattr(obj, 'item'):
+        return obj.item()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+def _json_default(obj):
+    """JSON fallback: bytes as base64 text, the rest as in msgpack"""
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return base64.b64encode(obj).decode('ascii')
+    return _msgpack_default(obj)
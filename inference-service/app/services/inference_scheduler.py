@@ -0,0 +1,172 @@
+"""
+Batch Inference Scheduler - Coalesces YOLO requests from every realtime session
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from app.core import get_logger, settings
+from app.services.model_service import model_service
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class InferenceRequest:
+    """Frame waiting to be included in the next YOLO batch"""
+    frame: np.ndarray
+    confidence_threshold: float
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class BatchInferenceScheduler:
+    """
+    Scheduler central para detección de vehículos
+
+    Cada sesión de WebSocket envía su frame con submit() y espera el resultado.
+    Un único worker junta los frames pendientes de todas las sesiones hasta
+    max_batch_size o hasta que vence max_wait_ms desde el primer frame, ejecuta
+    un solo predict de YOLO y reparte las detecciones a cada sesión.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None
+    ):
+        self.max_batch_size = max_batch_size or settings.INFERENCE_BATCH_MAX_SIZE
+        self.max_wait_ms = (
+            settings.INFERENCE_BATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Estadísticas
+        self.batches_processed = 0
+        self.frames_processed = 0
+
+    async def submit(
+        self,
+        frame: np.ndarray,
+        confidence_threshold: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Queue a frame for batched vehicle detection
+
+        Args:
+            frame: Frame already resized for YOLO
+            confidence_threshold: Minimum confidence for this session
+
+        Returns:
+            Vehicle detections for this frame (same format as detect_vehicles)
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put(InferenceRequest(frame, confidence_threshold, future))
+        return await future
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        avg_batch = (
+            self.frames_processed / self.batches_processed
+            if self.batches_processed else 0.0
+        )
+        return {
+            'batches_processed': self.batches_processed,
+            'frames_processed': self.frames_processed,
+            'avg_batch_size': round(avg_batch, 2),
+            'pending': self._queue.qsize() if self._queue else 0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms
+        }
+
+    async def shutdown(self):
+        """Stop the batching worker and cancel the frames still waiting for it"""
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+        pending = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._cancel_requests(pending)
+
+    def _ensure_worker(self):
+        """Start the worker lazily on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        """Collect pending requests into batches until cancelled"""
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+            deadline = first.enqueued_at + self.max_wait_ms / 1000.0
+
+            try:
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - time.perf_counter()
+                    try:
+                        if remaining <= 0:
+                            batch.append(self._queue.get_nowait())
+                        else:
+                            batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                        break
+
+                await self._run_batch(batch)
+            except asyncio.CancelledError:
+                # Las sesiones de este lote no deben quedar esperando para siempre
+                self._cancel_requests(batch)
+                raise
+
+    @staticmethod
+    def _cancel_requests(requests: List[InferenceRequest]):
+        """Cancel the futures of requests that will never be run"""
+        for request in requests:
+            if not request.future.done():
+                request.future.cancel()
+
+    async def _run_batch(self, batch: List[InferenceRequest]):
+        """Run one YOLO predict for the batch and resolve each session's future"""
+        batch_start = time.perf_counter()
+
+        try:
+            results = await model_service.detect_vehicles_batch(
+                [request.frame for request in batch],
+                [request.confidence_threshold for request in batch]
+            )
+        except Exception as e:
+            logger.error(f"Batch inference failed ({len(batch)} frames): {str(e)}")
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        for request, detections in zip(batch, results):
+            if not request.future.done():
+                request.future.set_result(detections)
+
+        self.batches_processed += 1
+        self.frames_processed += len(batch)
+
+        logger.debug(
+            f"🧮 Batch #{self.batches_processed}: {len(batch)} frames in "
+            f"{(time.perf_counter() - batch_start) * 1000:.1f}ms"
+        )
+
+
+# Global scheduler instance shared by all realtime sessions
+inference_scheduler = BatchInferenceScheduler()
@@ -0,0 +1,313 @@
+"""
+Infraction Flush Queue - Batched, retried delivery of infractions to Django
+
+Antes cada infracción era un POST /api/infractions/ con un AsyncClient nuevo
+(handshake TCP por request), seguido de un GET /api/vehicles/{id}/ para obtener
+el conductor, y un fallo de Django perdía la infracción.
+
+Ahora:
+- process_frame solo encola (no bloquea ni crea tareas por frame).
+- Un worker junta infracciones de todas las sesiones hasta max_batch o hasta
+  max_wait_ms y las envía con un solo POST /api/infractions/bulk/ usando el
+  cliente HTTP con keep-alive de django_api.
+- Errores de conexión y 5xx se reintentan con backoff exponencial + jitter;
+  un 4xx descarta el lote (reintentar no lo arreglaría).
+- La respuesta trae vehicle/driver inline, así que la predicción de
+  reincidencia se pide sin requests adicionales. Las predicciones de un lote
+  corren en paralelo en una tarea aparte, con un límite de
+  INFRACTION_PREDICTION_TIMEOUT_S, para no frenar el envío del lote siguiente.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+import httpx
+
+from app.core import get_logger, settings
+from app.services.django_api import django_api
+
+logger = get_logger(__name__)
+
+
+class InfractionFlushQueue:
+    """
+    Cola central de infracciones hacia Django
+
+    enqueue() nunca espera a la red. Si Django no responde por mucho tiempo la
+    cola se limita a max_pending y se descartan las infracciones más antiguas.
+    """
+
+    def __init__(
+        self,
+        max_batch: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_base_s: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        prediction_timeout_s: Optional[float] = None
+    ):
+        self.max_batch = max_batch or settings.INFRACTION_FLUSH_MAX_BATCH
+        self.max_wait_ms = (
+            settings.INFRACTION_FLUSH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+        )
+        self.max_retries = (
+            settings.INFRACTION_FLUSH_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.backoff_base_s = (
+            settings.INFRACTION_FLUSH_BACKOFF_BASE_S if backoff_base_s is None else backoff_base_s
+        )
+        self.max_pending = max_pending or settings.INFRACTION_FLUSH_MAX_PENDING
+        self.prediction_timeout_s = (
+            settings.INFRACTION_PREDICTION_TIMEOUT_S if prediction_timeout_s is None else prediction_timeout_s
+        )
+
+        # (enqueued_at, device_id, payload)
+        self._pending: Deque[Tuple[float, Optional[str], Dict[str, Any]]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._prediction_tasks: Set[asyncio.Task] = set()
+
+        # Estadísticas
+        self.batches_sent = 0
+        self.infractions_sent = 0
+        self.infractions_created = 0
+        self.retries = 0
+        self.dropped = 0
+        self.prediction_timeouts = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, payloads: Sequence[Dict[str, Any]], device_id: Optional[str] = None):
+        """
+        Queue infractions for the next bulk request (non-blocking)
+
+        Args:
+            payloads: Detections in InfractionService.bulk_create_from_detections format
+            device_id: Optional device UUID
+        """
+        if not payloads:
+            return
+
+        self._ensure_worker()
+        now = time.perf_counter()
+        for payload in payloads:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append((now, device_id, payload))
+
+        if self.dropped and self.dropped % 100 == 0:
+            logger.warning(f"⚠️ Infraction queue full, {self.dropped} infractions dropped so far")
+
+        self._wakeup.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get flush statistics"""
+        avg_batch = (
+            self.infractions_sent / self.batches_sent
+            if self.batches_sent else 0.0
+        )
+        return {
+            'pending': len(self._pending),
+            'batches_sent': self.batches_sent,
+            'infractions_sent': self.infractions_sent,
+            'infractions_created': self.infractions_created,
+            'avg_batch_size': round(avg_batch, 2),
+            'retries': self.retries,
+            'dropped': self.dropped,
+            'predictions_in_flight': len(self._prediction_tasks),
+            'prediction_timeouts': self.prediction_timeouts,
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait_ms
+        }
+
+    async def flush(self):
+        """Send everything that is pending now (one attempt per batch, used on shutdown)"""
+        while self._pending:
+            await self._send_batch(self._take_batch(), max_retries=0)
+
+    async def shutdown(self):
+        """Stop the worker, flush pending infractions and wait for their predictions"""
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+        if self._pending:
+            logger.info(f"💾 Flushing {len(self._pending)} pending infractions before shutdown")
+            await self.flush()
+
+        # Cada tarea termina sola en prediction_timeout_s como máximo
+        if self._prediction_tasks:
+            await asyncio.gather(*self._prediction_tasks, return_exceptions=True)
+
+    def _ensure_worker(self):
+        """Start the worker lazily on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        """Flush batches by size or time window until cancelled"""
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            deadline = self._pending[0][0] + self.max_wait_ms / 1000.0
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            # El lote ya salió de _pending: si shutdown() cancela el worker antes
+            # de que Django lo confirme, se devuelve a la cola para el flush final
+            item = self._take_batch()
+            try:
+                created = await self._deliver_batch(item)
+            except asyncio.CancelledError:
+                self._requeue(item)
+                raise
+
+            if created:
+                self._spawn_predictions(created)
+
+    def _take_batch(self) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """Pop up to max_batch pending infractions of the same device"""
+        device_id = self._pending[0][1]
+        batch = []
+        while self._pending and len(batch) < self.max_batch and self._pending[0][1] == device_id:
+            batch.append(self._pending.popleft()[2])
+        return device_id, batch
+
+    def _requeue(self, item: Tuple[Optional[str], List[Dict[str, Any]]]):
+        """Put an unsent batch back at the front of the queue, keeping its order"""
+        device_id, batch = item
+        now = time.perf_counter()
+        self._pending.extendleft((now, device_id, payload) for payload in reversed(batch))
+
+    async def _send_batch(
+        self,
+        item: Tuple[Optional[str], List[Dict[str, Any]]],
+        max_retries: Optional[int] = None
+    ):
+        """POST one batch and request predictions for the created infractions"""
+        created = await self._deliver_batch(item, max_retries=max_retries)
+        if created:
+            self._spawn_predictions(created)
+
+    def _spawn_predictions(self, created: List[Dict[str, Any]]):
+        """Request predictions in a background task so the next batch is not delayed"""
+        task = asyncio.get_running_loop().create_task(self._request_predictions(created))
+        self._prediction_tasks.add(task)
+        task.add_done_callback(self._prediction_tasks.discard)
+
+    async def _deliver_batch(
+        self,
+        item: Tuple[Optional[str], List[Dict[str, Any]]],
+        max_retries: Optional[int] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        POST one batch, retrying transient failures with exponential backoff
+
+        Returns:
+            Created infractions, or None if the batch was dropped
+        """
+        device_id, batch = item
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+
+        while True:
+            try:
+                result = await django_api.bulk_create_infractions(batch, device_id=device_id)
+                break
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status < 500:
+                    logger.error(
+                        f"❌ Django rejected infraction batch ({len(batch)}): "
+                        f"status={status}, response={e.response.text[:200]}"
+                    )
+                    self.dropped += len(batch)
+                    return None
+                error = f"status={status}"
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {str(e)}"
+            except Exception as e:
+                logger.error(f"❌ Unexpected error sending infraction batch: {str(e)}", exc_info=True)
+                self.dropped += len(batch)
+                return None
+
+            if attempt >= max_retries:
+                logger.error(f"❌ Giving up on infraction batch ({len(batch)}) after {attempt + 1} attempts: {error}")
+                self.dropped += len(batch)
+                return None
+
+            delay = self.backoff_base_s * (2 ** attempt) * random.uniform(0.5, 1.5)
+            attempt += 1
+            self.retries += 1
+            logger.warning(f"⚠️ Infraction batch failed ({error}), retry {attempt}/{max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+        created = result.get('infractions', [])
+        self.batches_sent += 1
+        self.infractions_sent += len(batch)
+        self.infractions_created += len(created)
+
+        logger.info(f"💾 Saved {len(created)} infractions from {len(batch)} detections in one request")
+        for infraction in created:
+            logger.debug(
+                f"   Code: {infraction.get('infraction_code', 'N/A')} | "
+                f"Type: {infraction.get('infraction_type', 'unknown')} | "
+                f"Plate: '{infraction.get('license_plate_detected') or 'NO_PLATE'}'"
+            )
+
+        return created
+
+    async def _request_predictions(self, created: List[Dict[str, Any]]):
+        """Request recidivism predictions for infractions with a known driver"""
+        requests = []
+        for infraction in created:
+            driver = infraction.get('driver') or {}
+            driver_dni = driver.get('document_number')
+            if driver_dni and infraction.get('id'):
+                requests.append(django_api.predict_recidivism(
+                    driver_dni=driver_dni,
+                    infraction_id=infraction['id']
+                ))
+
+        if not requests:
+            return
+
+        logger.info(f"🤖 Requesting {len(requests)} ML predictions")
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(*requests, return_exceptions=True),
+                self.prediction_timeout_s
+            )
+        except asyncio.TimeoutError:
+            self.prediction_timeouts += 1
+            logger.warning(f"⚠️ {len(requests)} ML predictions timed out after {self.prediction_timeout_s}s")
+            return
+        failed = sum(1 for r in results if not r or isinstance(r, Exception))
+        if failed:
+            logger.warning(f"⚠️ {failed}/{len(requests)} ML predictions failed")
+
+
+# Global flush queue shared by all realtime sessions
+infraction_queue = InfractionFlushQueue()
@@ -5,10 +5,12 @@ Detector ligero de carriles usando Hough Lines
 """
 
 import logging
-from typing import Optional, Tuple, Dict, Any, List
+from typing import Optional, Tuple, Dict, Any, List, Union
 import numpy as np
 import cv2
 
+from app.services.frame_context import FrameContext
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,6 +41,10 @@ class SimpleLaneDetector:
         self.lane_history = []
         self.max_history = 5
         
+        # Máscara del ROI (se rehace sólo si cambian los vértices o el tamaño del frame)
+        self._roi_mask = None
+        self._roi_mask_key = None
+        
         logger.info("SimpleLaneDetector initialized")
     
     def set_roi(self, vertices: np.ndarray):
@@ -47,30 +53,30 @@ class SimpleLaneDetector:
     
     def detect(
         self,
-        frame: np.ndarray,
+        frame: Union[np.ndarray, FrameContext],
         roi_vertices: Optional[np.ndarray] = None
     ) -> Dict[str, Any]:
         """
         Detectar carriles en el frame
         
+        Sólo se procesa el rectángulo que contiene el ROI: gris y suavizado
+        salen del FrameContext (vistas del frame) y Canny escribe en un buffer
+        reutilizable.
+        
         Args:
-            frame: Frame BGR
+            frame: Frame BGR o su FrameContext
             roi_vertices: Vértices del ROI (opcional)
             
         Returns:
             Dict con 'lanes', 'has_center_line', 'lane_count'
         """
-        if roi_vertices is not None:
-            self.roi_vertices = roi_vertices
+        context = FrameContext.wrap(frame)
         
-        # Preprocesar
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (5, 5), 0)
-        edges = cv2.Canny(blur, self.canny_low, self.canny_high)
+        if roi_vertices is not None:
+            self.roi_vertices = np.asarray(roi_vertices, dtype=np.int32).reshape(1, -1, 2)
         
-        # Aplicar máscara ROI
         if self.roi_vertices is None:
-            height, width = frame.shape[:2]
+            height, width = context.height, context.width
             self.roi_vertices = np.array([[
                 (int(width * 0.1), height),
                 (int(width * 0.4), int(height * 0.6)),
@@ -78,11 +84,23 @@ class SimpleLaneDetector:
                 (int(width * 0.9), height)
             ]], dtype=np.int32)
         
-        mask = np.zeros_like(edges)
-        cv2.fillPoly(mask, [self.roi_vertices], 255)
-        masked_edges = cv2.bitwise_and(edges, mask)
+        # Rectángulo del ROI dentro del frame
+        x, y, w, h = cv2.boundingRect(self.roi_vertices.reshape(-1, 2))
+        x1, y1, x2, y2 = context.clip((x, y, x + w, y + h))
+        if x2 <= x1 or y2 <= y1:
+            return {'lanes': {}, 'has_center_line': False, 'lane_count': 0, 'confidence': 0.0}
+        
+        # Preprocesar sólo el ROI (con margen para que Canny no vea el borde del recorte)
+        px1, py1, px2, py2 = context.clip((x1 - 4, y1 - 4, x2 + 4, y2 + 4))
+        blur = context.blurred((px1, py1, px2, py2), ksize=5)
+        edges = cv2.Canny(blur, self.canny_low, self.canny_high,
+                          edges=context.buffer('edges', blur.shape))
+        edges = edges[y1 - py1:y2 - py1, x1 - px1:x2 - px1]
         
-        # Detectar líneas
+        # Aplicar máscara ROI
+        masked_edges = cv2.bitwise_and(edges, self._get_roi_mask((x1, y1, x2, y2)), dst=edges)
+        
+        # Detectar líneas (coordenadas del ROI → coordenadas del frame)
         lines = cv2.HoughLinesP(
             masked_edges,
             rho=2,
@@ -91,9 +109,11 @@ class SimpleLaneDetector:
             minLineLength=self.hough_min_line_length,
             maxLineGap=self.hough_max_line_gap
         )
+        if lines is not None:
+            lines = lines.reshape(-1, 1, 4) + np.array([x1, y1, x1, y1], dtype=lines.dtype)
         
         # Clasificar líneas
-        lanes = self._classify_lanes(lines, frame.shape)
+        lanes = self._classify_lanes(lines, context.shape)
         self.lanes = lanes
         
         return {
@@ -103,6 +123,17 @@ class SimpleLaneDetector:
             'confidence': 0.8 if lanes else 0.0
         }
     
+    def _get_roi_mask(self, box: Tuple[int, int, int, int]) -> np.ndarray:
+        """Máscara del polígono ROI recortada al rectángulo box (cacheada)"""
+        key = (box, self.roi_vertices.tobytes())
+        if self._roi_mask_key != key:
+            x1, y1, x2, y2 = box
+            mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+            cv2.fillPoly(mask, [self.roi_vertices.reshape(-1, 2)], 255, offset=(-x1, -y1))
+            self._roi_mask = mask
+            self._roi_mask_key = key
+        return self._roi_mask
+    
     def _classify_lanes(
         self,
         lines: Optional[np.ndarray],
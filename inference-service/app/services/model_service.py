@@ -2,7 +2,7 @@
 ML Models Service - Handles loading and inference with YOLOv8 and OCR
 """
 import os
-from typing import Optional, List, Tuple, Dict, Any
+from typing import Optional, List, Tuple, Dict, Any, Union
 import numpy as np
 import cv2
 from pathlib import Path
@@ -12,6 +12,8 @@ from concurrent.futures import ThreadPoolExecutor
 from app.core import get_logger, settings
 from app.services.traffic_light_detector import SimpleTrafficLightDetector
 from app.services.lane_detector import SimpleLaneDetector
+from app.services.frame_context import FrameContext
+from app.services.plate_ocr import PlateOCREngine
 
 logger = get_logger(__name__)
 
@@ -19,9 +21,21 @@ logger = get_logger(__name__)
 class ModelService:
     """Service for managing ML models (YOLO, OCR, Traffic Light, Lane Detection)"""
     
+    # YOLO vehicle classes (COCO dataset)
+    # NOTA: Para pruebas, también detectamos personas (class=0)
+    VEHICLE_CLASSES = {
+        0: 'person',      # 👤 Para pruebas y peatones
+        1: 'bicycle',     # 🚲 Bicicletas
+        2: 'car',         # 🚗 Autos
+        3: 'motorcycle',  # 🏍️ Motos
+        5: 'bus',         # 🚌 Buses
+        7: 'truck'        # 🚚 Camiones
+    }
+    
     def __init__(self):
         self.yolo_model = None
         self.ocr_reader = None
+        self.plate_ocr = None
         self.traffic_light_detector = None
         self.lane_detector = None
         self.executor = ThreadPoolExecutor(max_workers=2)
@@ -47,6 +61,12 @@ class ModelService:
                     self.executor,
                     self._load_ocr_reader
                 )
+                self.plate_ocr = PlateOCREngine(
+                    self.ocr_reader,
+                    self.executor,
+                    is_valid_plate=self._is_valid_plate_format,
+                    normalize_plate=self._normalize_plate
+                )
                 logger.info("OCR reader loaded successfully")
             except Exception as ocr_error:
                 logger.warning(f"Failed to load OCR reader: {str(ocr_error)}")
@@ -162,55 +182,8 @@ class ModelService:
             )
             
             detections = []
-            
-            # YOLO vehicle classes (COCO dataset)
-            # NOTA: Para pruebas, también detectamos personas (class=0)
-            vehicle_classes = {
-                0: 'person',      # 👤 Para pruebas y peatones
-                1: 'bicycle',     # 🚲 Bicicletas
-                2: 'car',         # 🚗 Autos
-                3: 'motorcycle',  # 🏍️ Motos
-                5: 'bus',         # 🚌 Buses
-                7: 'truck'        # 🚚 Camiones
-            }
-            
-            # Process results
             for result in results:
-                boxes = result.boxes
-                logger.info(f"🔍 YOLO detected {len(boxes)} objects total")
-                
-                vehicle_count = 0
-                for idx, box in enumerate(boxes):
-                    cls = int(box.cls[0])
-                    conf = float(box.conf[0])
-                    
-                    # Log cada objeto detectado
-                    logger.info(f"📦 Object #{idx+1}: class={cls}, confidence={conf:.2f}")
-                    
-                    # Only process vehicle classes
-                    if cls in vehicle_classes:
-                        vehicle_count += 1
-                        xyxy = box.xyxy[0].cpu().numpy()
-                        
-                        # Formato correcto: [x1, y1, x2, y2]
-                        bbox = [float(xyxy[0]), float(xyxy[1]), float(xyxy[2]), float(xyxy[3])]
-                        
-                        detection = {
-                            'type': 'vehicle',
-                            'vehicle_type': vehicle_classes[cls],
-                            'confidence': conf,
-                            'bbox': bbox  # [x1, y1, x2, y2]
-                        }
-                        detections.append(detection)
-                        
-                        logger.info(
-                            f"✅ Vehicle detected: {vehicle_classes[cls]} "
-                            f"(conf={conf:.2f}, bbox={bbox})"
-                        )
-                    else:
-                        logger.debug(f"⏭️  Skipping non-vehicle class: {cls}")
-                
-                logger.info(f"🚗 Filtered to {vehicle_count} vehicles from {len(boxes)} objects")
+                detections.extend(self._parse_vehicle_result(result, confidence_threshold))
             
             return detections
             
@@ -218,6 +191,102 @@ class ModelService:
             logger.error(f"Vehicle detection failed: {str(e)}")
             return []
     
+    async def detect_vehicles_batch(
+        self,
+        frames: List[np.ndarray],
+        confidence_thresholds: List[float]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Detect vehicles in several frames with a single YOLO predict call
+        
+        El modelo se ejecuta una sola vez con el umbral más bajo del lote y
+        luego cada resultado se filtra con el umbral de su propia sesión.
+        
+        Args:
+            frames: Input images (may have different sizes)
+            confidence_thresholds: Minimum confidence per frame
+            
+        Returns:
+            One list of detections per input frame, in the same order
+        """
+        if not self._initialized:
+            await self.initialize()
+        
+        if not frames:
+            return []
+        
+        thresholds = [
+            settings.YOLO_CONFIDENCE_THRESHOLD if t is None else t
+            for t in confidence_thresholds
+        ]
+        
+        # Run YOLO inference in thread pool (one hop for the whole batch)
+        results = await asyncio.get_event_loop().run_in_executor(
+            self.executor,
+            lambda: self.yolo_model.predict(
+                list(frames),
+                conf=min(thresholds),
+                iou=settings.YOLO_IOU_THRESHOLD,
+                verbose=False
+            )
+        )
+        
+        logger.debug(f"🧮 YOLO batch of {len(frames)} frames completed")
+        
+        return [
+            self._parse_vehicle_result(result, threshold)
+            for result, threshold in zip(results, thresholds)
+        ]
+    
+    def _parse_vehicle_result(self, result, confidence_threshold: float) -> List[Dict[str, Any]]:
+        """
+        Convert a single ultralytics result into vehicle detections
+        
+        Args:
+            result: YOLO result for one image
+            confidence_threshold: Minimum confidence for detection
+            
+        Returns:
+            List of detections with bbox [x1, y1, x2, y2], confidence and class
+        """
+        detections = []
+        boxes = result.boxes
+        logger.info(f"🔍 YOLO detected {len(boxes)} objects total")
+        
+        vehicle_count = 0
+        for idx, box in enumerate(boxes):
+            cls = int(box.cls[0])
+            conf = float(box.conf[0])
+            
+            # Log cada objeto detectado
+            logger.info(f"📦 Object #{idx+1}: class={cls}, confidence={conf:.2f}")
+            
+            # Only process vehicle classes above this frame's threshold
+            if cls in self.VEHICLE_CLASSES and conf >= confidence_threshold:
+                vehicle_count += 1
+                xyxy = box.xyxy[0].cpu().numpy()
+                
+                # Formato correcto: [x1, y1, x2, y2]
+                bbox = [float(xyxy[0]), float(xyxy[1]), float(xyxy[2]), float(xyxy[3])]
+                
+                detection = {
+                    'type': 'vehicle',
+                    'vehicle_type': self.VEHICLE_CLASSES[cls],
+                    'confidence': conf,
+                    'bbox': bbox  # [x1, y1, x2, y2]
+                }
+                detections.append(detection)
+                
+                logger.info(
+                    f"✅ Vehicle detected: {self.VEHICLE_CLASSES[cls]} "
+                    f"(conf={conf:.2f}, bbox={bbox})"
+                )
+            else:
+                logger.debug(f"⏭️  Skipping non-vehicle class: {cls}")
+        
+        logger.info(f"🚗 Filtered to {vehicle_count} vehicles from {len(boxes)} objects")
+        return detections
+    
     async def detect_license_plate(
         self,
         frame: np.ndarray,
@@ -233,144 +302,49 @@ class ModelService:
         Returns:
             Tuple of (plate_text, confidence) or None
         """
+        results = await self.detect_license_plates(frame, [bbox])
+        return results[0]
+    
+    async def detect_license_plates(
+        self,
+        frame: np.ndarray,
+        bboxes: List[Dict[str, int]]
+    ) -> List[Optional[Tuple[str, float]]]:
+        """
+        Detect and read the license plates of several vehicles of one frame
+        
+        Las variantes (original, CLAHE, sharpening) de todos los vehículos se
+        leen en lote con PlateOCREngine; un vehículo con placa válida y
+        confianza >= OCR_EARLY_STOP_CONFIDENCE no pasa a las demás variantes.
+        
+        Args:
+            frame: Full frame
+            bboxes: Bounding boxes of vehicles {x, y, width, height}
+            
+        Returns:
+            One (plate_text, confidence) or None per bbox, in the same order
+        """
+        if not bboxes:
+            return []
+        
         if not self._initialized:
             await self.initialize()
         
         # Check if OCR is available
-        if self.ocr_reader is None:
+        if self.plate_ocr is None:
             logger.debug("OCR reader not available, skipping plate detection")
-            return None
+            return [None] * len(bboxes)
         
         try:
-            # Extract vehicle region
-            x, y, w, h = bbox['x'], bbox['y'], bbox['width'], bbox['height']
-            
-            # ✅ Filtrar vehículos muy pequeños (no vale la pena hacer OCR)
-            if w < 60 or h < 40:
-                logger.debug(f"⏭️ Vehicle too small for OCR: {w}x{h} (min: 60x40)")
-                return None
-            
-            # ✅ Aumentar padding para capturar más área (especialmente donde está la placa)
-            padding = 20  # Aumentado de 10 a 20
-            x1 = max(0, x - padding)
-            y1 = max(0, y - padding)
-            x2 = min(frame.shape[1], x + w + padding)
-            y2 = min(frame.shape[0], y + h + padding)
-            
-            vehicle_crop = frame[y1:y2, x1:x2]
-            
-            logger.debug(f"🖼️ Vehicle crop size: {vehicle_crop.shape[1]}x{vehicle_crop.shape[0]} (bbox: {w}x{h})")
-            
-            if vehicle_crop.size == 0:
-                logger.warning("⚠️ Empty vehicle crop, skipping OCR")
-                return None
-            
-            # ✅ Mejorar calidad de imagen para OCR
-            # Resize si es muy pequeño (mínimo 150px de ancho)
-            if vehicle_crop.shape[1] < 150:
-                scale = 150 / vehicle_crop.shape[1]
-                new_width = 150
-                new_height = int(vehicle_crop.shape[0] * scale)
-                vehicle_crop = cv2.resize(vehicle_crop, (new_width, new_height), interpolation=cv2.INTER_CUBIC)
-                logger.debug(f"   🔍 Resized to: {new_width}x{new_height}")
-            
-            # ✅ Estrategia: Probar MÚLTIPLES versiones de la imagen y tomar la mejor
-            # Versión 1: Original (a veces funciona mejor)
-            # Versión 2: Escala de grises con CLAHE (mejor contraste)
-            # Versión 3: Con sharpening (mejora bordes de texto)
-            images_to_try = [vehicle_crop]  # Original primero
-            
-            # Crear versión mejorada con CLAHE (sin threshold binario que puede ser demasiado agresivo)
-            if len(vehicle_crop.shape) == 3:
-                gray = cv2.cvtColor(vehicle_crop, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = vehicle_crop
-            
-            # CLAHE para mejorar contraste
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-            enhanced = clahe.apply(gray)
-            enhanced_bgr = cv2.cvtColor(enhanced, cv2.COLOR_GRAY2BGR)
-            images_to_try.append(enhanced_bgr)
-            
-            # Versión 3: Aplicar sharpening para mejorar bordes de texto
-            kernel_sharpening = np.array([
-                [-1, -1, -1],
-                [-1,  9, -1],
-                [-1, -1, -1]
-            ])
-            sharpened = cv2.filter2D(vehicle_crop, -1, kernel_sharpening)
-            images_to_try.append(sharpened)
-            
-            logger.debug(f"   🎨 Will try {len(images_to_try)} image versions for OCR")
-            
-            # Run OCR in thread pool for each version
-            all_results = []
-            for idx, img in enumerate(images_to_try):
-                results = await asyncio.get_event_loop().run_in_executor(
-                    self.executor,
-                    lambda i=img: self.ocr_reader.readtext(
-                        i,
-                        detail=1,              # Return bbox, text, confidence
-                        paragraph=False,       # Detect by line/word, not paragraph
-                        min_size=10,          # ✅ Detect smaller text (default: 20)
-                        text_threshold=0.3,   # ✅ Lower text detection threshold
-                        low_text=0.2,         # ✅ More permissive for weak text
-                        link_threshold=0.2,   # ✅ Link text boxes more easily
-                        canvas_size=2560,     # ✅ Internal resolution (default: 2560)
-                        mag_ratio=1.5,        # ✅ Magnification ratio for better detection
-                        slope_ths=0.3,        # ✅ Allow more text rotation
-                        ycenter_ths=0.5,      # ✅ Y-center threshold for grouping
-                        height_ths=0.7,       # ✅ Height ratio for grouping
-                        width_ths=0.9,        # ✅ Width threshold
-                        add_margin=0.15       # ✅ Add margin around detected text
-                    )
-                )
-                if results:
-                    logger.debug(f"   📊 Version {idx+1}: {len(results)} text(s) detected")
-                    all_results.extend(results)
-            
-            # Usar todos los resultados combinados
-            results = all_results
-            
-            logger.info(f"🔍 OCR raw results: {len(results)} text(s) detected")
+            results = await self.plate_ocr.read_plates(frame, bboxes)
             
-            # Process OCR results
-            plates = []
-            for (bbox, text, conf) in results:
-                logger.debug(f"   📝 Raw text: '{text}' (conf: {conf:.2f})")
-                
-                # Clean text: remove spaces, keep only alphanumeric and hyphens
-                text = text.replace(' ', '').upper()
-                text = ''.join(c for c in text if c.isalnum() or c == '-')
-                
-                logger.debug(f"   📝 Cleaned text: '{text}'")
-                
-                # ✅ Filtrar por confianza mínima (ULTRA AGRESIVO: 0.10 para capturar más placas)
-                if conf < 0.10:
-                    logger.debug(f"   ⚠️ Low confidence: {conf:.2f} < 0.10")
-                    continue
-                
-                # Validate plate format (basic)
-                if self._is_valid_plate_format(text):
-                    # ✅ Normalizar placa al formato con guion
-                    normalized_text = self._normalize_plate(text)
-                    logger.info(f"   ✅ Valid plate format: '{text}' → '{normalized_text}' (conf: {conf:.2f})")
-                    plates.append((normalized_text, conf))
-                else:
-                    logger.debug(f"   ❌ Invalid plate format: '{text}'")
-            
-            # Return best match
-            if plates:
-                plates.sort(key=lambda x: x[1], reverse=True)
-                logger.info(f"🎯 Best plate match: '{plates[0][0]}' (conf: {plates[0][1]:.2f})")
-                return plates[0]
-            
-            logger.warning(f"⚠️ No valid plates found from {len(results)} OCR results")
-            return None
+            found = sum(1 for r in results if r)
+            logger.info(f"🔍 OCR batch: {found}/{len(bboxes)} plate(s) found")
+            return results
             
         except Exception as e:
             logger.error(f"License plate detection failed: {str(e)}")
-            return None
+            return [None] * len(bboxes)
     
     def _is_valid_plate_format(self, text: str) -> bool:
         """
@@ -552,14 +526,14 @@ class ModelService:
     
     async def detect_traffic_light(
         self,
-        frame: np.ndarray,
+        frame: Union[np.ndarray, FrameContext],
         roi: Optional[Tuple[int, int, int, int]] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Detect traffic light state in frame
         
         Args:
-            frame: Input frame
+            frame: Input frame, or its FrameContext to reuse the shared preprocessing
             roi: Region of interest (x1, y1, x2, y2) or None for auto-detect
             
         Returns:
@@ -609,14 +583,14 @@ class ModelService:
     
     async def detect_lanes(
         self,
-        frame: np.ndarray,
+        frame: Union[np.ndarray, FrameContext],
         roi_vertices: Optional[np.ndarray] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Detect lane markings in frame
         
         Args:
-            frame: Input frame
+            frame: Input frame, or its FrameContext to reuse the shared preprocessing
             roi_vertices: ROI vertices for lane detection
             
         Returns:
@@ -0,0 +1,439 @@
+"""
+Plate OCR Engine - Batched EasyOCR execution for license plates
+
+Antes cada vehículo generaba 3 variantes (original, CLAHE, sharpening) y cada
+una tenía su propio readtext(): 3 pasadas del detector de texto por placa.
+
+Ahora:
+- Las variantes de todos los vehículos del frame se apilan verticalmente en un
+  mosaico y se leen con una sola llamada a readtext() (detector y reconocedor
+  en lote).
+- Por etapas: primero los originales; solo los vehículos sin una placa válida
+  con confianza >= OCR_EARLY_STOP_CONFIDENCE pasan a CLAHE + sharpening.
+- canvas_size se ajusta al tamaño del mosaico en vez de un 2560 fijo.
+- El detector de texto cuesta por píxel, así que los tiles se agrupan por
+  ancho y se abre otro mosaico cuando el relleno superaría
+  1 - OCR_MOSAIC_MIN_FILL.
+- En CPU el relleno del mosaico cuesta más de lo que ahorra juntar llamadas
+  (0.82x con 0.85 de llenado), y readtext() en CPU reconoce los textos de a
+  uno. Por defecto en CPU no hay mosaico: detect() por tile, las variantes
+  CLAHE/sharpening reusan las cajas que el detector encontró en el original
+  y todos los recortes de texto de la etapa van al reconocedor en lotes de
+  OCR_RECOGNIZER_BATCH_SIZE (benchmarks/benchmark_plate_ocr.py --untrained,
+  16 placas, 4 por frame, sin early stop: 3566 -> 1228 ms por placa, 2.90x).
+"""
+import asyncio
+import math
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.core import get_logger, settings
+
+logger = get_logger(__name__)
+
+
+# Filtros de recorte heredados de detect_license_plate
+MIN_VEHICLE_WIDTH = 60
+MIN_VEHICLE_HEIGHT = 40
+CROP_PADDING = 20
+MIN_CROP_WIDTH = 150
+
+# Confianza mínima de un texto para considerarlo candidato a placa
+MIN_TEXT_CONFIDENCE = 0.10
+
+# Separación entre tiles del mosaico (evita que readtext una textos de dos tiles)
+TILE_GAP = 32
+
+# Etapas de variantes: si la etapa 1 da una placa confiable no se ejecuta la 2
+VARIANT_STAGES: Tuple[Tuple[str, ...], ...] = (
+    ('original',),
+    ('clahe', 'sharpened'),
+)
+
+SHARPEN_KERNEL = np.array([
+    [-1, -1, -1],
+    [-1,  9, -1],
+    [-1, -1, -1]
+])
+
+# Parámetros de readtext (mismos que el modo secuencial)
+READTEXT_PARAMS = dict(
+    detail=1,              # Return bbox, text, confidence
+    paragraph=False,       # Detect by line/word, not paragraph
+    min_size=10,           # Detect smaller text (default: 20)
+    text_threshold=0.3,    # Lower text detection threshold
+    low_text=0.2,          # More permissive for weak text
+    link_threshold=0.2,    # Link text boxes more easily
+    slope_ths=0.3,         # Allow more text rotation
+    ycenter_ths=0.5,       # Y-center threshold for grouping
+    height_ths=0.7,        # Height ratio for grouping
+    width_ths=0.9,         # Width threshold
+    add_margin=0.15        # Add margin around detected text
+)
+
+# Parámetros de detect() en CPU: los de detección de READTEXT_PARAMS
+DETECT_PARAMS = {k: v for k, v in READTEXT_PARAMS.items() if k not in ('detail', 'paragraph')}
+
+# Alto de los recortes de texto que espera el reconocedor de EasyOCR
+RECOGNIZER_HEIGHT = 64
+
+PlateResult = Optional[Tuple[str, float]]
+
+# (horizontal_list, free_list) de EasyOCR para una imagen
+TextBoxes = Tuple[list, list]
+
+
+def crop_vehicle(frame: np.ndarray, bbox: Dict[str, int]) -> Optional[np.ndarray]:
+    """
+    Extract the padded vehicle region used for plate OCR
+
+    Args:
+        frame: Full frame
+        bbox: Bounding box of vehicle {x, y, width, height}
+
+    Returns:
+        Vehicle crop (upscaled to MIN_CROP_WIDTH if needed) or None if too small
+    """
+    x, y, w, h = bbox['x'], bbox['y'], bbox['width'], bbox['height']
+
+    if w < MIN_VEHICLE_WIDTH or h < MIN_VEHICLE_HEIGHT:
+        logger.debug(f"⏭️ Vehicle too small for OCR: {w}x{h} (min: {MIN_VEHICLE_WIDTH}x{MIN_VEHICLE_HEIGHT})")
+        return None
+
+    x1 = max(0, x - CROP_PADDING)
+    y1 = max(0, y - CROP_PADDING)
+    x2 = min(frame.shape[1], x + w + CROP_PADDING)
+    y2 = min(frame.shape[0], y + h + CROP_PADDING)
+
+    crop = frame[y1:y2, x1:x2]
+    if crop.size == 0:
+        logger.warning("⚠️ Empty vehicle crop, skipping OCR")
+        return None
+
+    if crop.shape[1] < MIN_CROP_WIDTH:
+        scale = MIN_CROP_WIDTH / crop.shape[1]
+        crop = cv2.resize(
+            crop,
+            (MIN_CROP_WIDTH, int(crop.shape[0] * scale)),
+            interpolation=cv2.INTER_CUBIC
+        )
+
+    return crop
+
+
+def build_variant(crop: np.ndarray, name: str) -> np.ndarray:
+    """Build one OCR image variant ('original', 'clahe' or 'sharpened') as BGR"""
+    if name == 'original':
+        return crop if crop.ndim == 3 else cv2.cvtColor(crop, cv2.COLOR_GRAY2BGR)
+
+    if name == 'clahe':
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        return cv2.cvtColor(clahe.apply(gray), cv2.COLOR_GRAY2BGR)
+
+    if name == 'sharpened':
+        sharpened = cv2.filter2D(crop, -1, SHARPEN_KERNEL)
+        return sharpened if sharpened.ndim == 3 else cv2.cvtColor(sharpened, cv2.COLOR_GRAY2BGR)
+
+    raise ValueError(f"Unknown OCR variant: {name}")
+
+
+class PlateOCREngine:
+    """
+    Motor OCR por lotes para placas
+
+    Lee las placas de varios vehículos de un mismo frame con el menor número
+    posible de pasadas de EasyOCR. Con min_fill (GPU) todas las variantes de
+    una etapa van en un mosaico vertical y cada texto reconocido se asigna al
+    tile que lo contiene; con min_fill=None (CPU) se detecta por tile y se
+    reconoce en lote.
+    """
+
+    def __init__(
+        self,
+        reader,
+        executor: Executor,
+        is_valid_plate: Callable[[str], bool],
+        normalize_plate: Callable[[str], str],
+        early_stop_confidence: Optional[float] = None,
+        max_canvas_size: Optional[int] = None,
+        mag_ratio: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        min_fill: Optional[float] = None
+    ):
+        self.reader = reader
+        self.executor = executor
+        self.is_valid_plate = is_valid_plate
+        self.normalize_plate = normalize_plate
+        self.early_stop_confidence = (
+            settings.OCR_EARLY_STOP_CONFIDENCE if early_stop_confidence is None else early_stop_confidence
+        )
+        self.max_canvas_size = max_canvas_size or settings.OCR_MAX_CANVAS_SIZE
+        self.mag_ratio = mag_ratio or settings.OCR_MAG_RATIO
+        self.batch_size = batch_size or settings.OCR_RECOGNIZER_BATCH_SIZE
+        if min_fill is None:
+            min_fill = settings.OCR_MOSAIC_MIN_FILL
+        if min_fill is None and settings.OCR_GPU:
+            min_fill = 0.85
+        self.min_fill = min_fill
+
+        # Estadísticas
+        self.readtext_calls = 0
+        self.detect_calls = 0
+        self.recognizer_batches = 0
+        self.tiles_processed = 0
+        self.plates_requested = 0
+        self.early_stops = 0
+
+    async def read_plates(
+        self,
+        frame: np.ndarray,
+        bboxes: Sequence[Dict[str, int]]
+    ) -> List[PlateResult]:
+        """
+        Read the license plates of several vehicles of the same frame
+
+        Args:
+            frame: Full frame
+            bboxes: Vehicle bounding boxes {x, y, width, height}
+
+        Returns:
+            One (plate_text, confidence) or None per bbox, in the same order
+        """
+        crops = [crop_vehicle(frame, bbox) for bbox in bboxes]
+        if all(crop is None for crop in crops):
+            return [None] * len(crops)
+
+        return await asyncio.get_event_loop().run_in_executor(
+            self.executor,
+            self.read_crops,
+            crops
+        )
+
+    def read_crops(self, crops: Sequence[Optional[np.ndarray]]) -> List[PlateResult]:
+        """
+        Run the staged, batched OCR over already cropped vehicles (blocking)
+
+        Args:
+            crops: Vehicle crops; None entries are skipped
+
+        Returns:
+            Best valid plate per crop or None
+        """
+        candidates: List[List[Tuple[str, float]]] = [[] for _ in crops]
+        pending = [i for i, crop in enumerate(crops) if crop is not None]
+        self.plates_requested += len(pending)
+        # Cajas de texto encontradas en el original de cada vehículo (modo CPU)
+        detected: Dict[int, TextBoxes] = {}
+
+        for stage, variants in enumerate(VARIANT_STAGES):
+            if not pending:
+                break
+
+            owners = [i for i in pending for _ in variants]
+            tiles = [build_variant(crops[i], name) for i in pending for name in variants]
+
+            if self.min_fill is None:
+                per_tile, boxes = self._detect_recognize_tiles(tiles, [detected.get(i) for i in owners])
+                for owner, (horizontal, free) in zip(owners, boxes):
+                    if horizontal or free:
+                        detected.setdefault(owner, (horizontal, free))
+            else:
+                per_tile = self._readtext_tiles(tiles)
+
+            for owner, results in zip(owners, per_tile):
+                candidates[owner].extend(self._parse_results(results))
+
+            still_pending = [
+                i for i in pending
+                if not candidates[i] or max(conf for _, conf in candidates[i]) < self.early_stop_confidence
+            ]
+            if stage < len(VARIANT_STAGES) - 1:
+                self.early_stops += len(pending) - len(still_pending)
+            pending = still_pending
+
+        best: List[PlateResult] = []
+        for plates in candidates:
+            if plates:
+                plate = max(plates, key=lambda p: p[1])
+                logger.info(f"🎯 Best plate match: '{plate[0]}' (conf: {plate[1]:.2f})")
+                best.append(plate)
+            else:
+                best.append(None)
+        return best
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get OCR batching statistics"""
+        # Pasadas del detector: un readtext por mosaico o un detect por tile
+        detector_passes = self.readtext_calls + self.detect_calls
+        return {
+            'readtext_calls': self.readtext_calls,
+            'detect_calls': self.detect_calls,
+            'recognizer_batches': self.recognizer_batches,
+            'tiles_processed': self.tiles_processed,
+            'plates_requested': self.plates_requested,
+            'early_stops': self.early_stops,
+            'calls_per_plate': round(detector_passes / self.plates_requested, 3) if self.plates_requested else 0.0
+        }
+
+    def canvas_size_for(self, height: int, width: int) -> int:
+        """Smallest 32-aligned canvas that fits the magnified image, capped at max_canvas_size"""
+        target = int(math.ceil(max(height, width) * self.mag_ratio / 32.0)) * 32
+        return max(32, min(self.max_canvas_size, target))
+
+    def _readtext_tiles(self, tiles: List[np.ndarray]) -> List[list]:
+        """Read every tile with as few readtext calls as the canvas and fill limits allow"""
+        per_tile: List[list] = [[] for _ in tiles]
+        max_height = int(self.max_canvas_size / self.mag_ratio)
+
+        # De más ancho a más angosto: el mosaico toma el ancho del primer tile
+        order = sorted(range(len(tiles)), key=lambda i: tiles[i].shape[1], reverse=True)
+
+        group: List[int] = []
+        group_height = group_area = width = 0
+        for idx in order:
+            tile_h, tile_w = tiles[idx].shape[:2]
+            if group:
+                height = group_height + TILE_GAP + tile_h
+                fill = (group_area + tile_h * tile_w) / (height * width)
+                if height > max_height or fill < self.min_fill:
+                    self._readtext_mosaic(tiles, group, per_tile)
+                    group = []
+            if not group:
+                group_height, group_area, width = tile_h, tile_h * tile_w, tile_w
+            else:
+                group_height += TILE_GAP + tile_h
+                group_area += tile_h * tile_w
+            group.append(idx)
+
+        if group:
+            self._readtext_mosaic(tiles, group, per_tile)
+
+        self.tiles_processed += len(tiles)
+        return per_tile
+
+    def _readtext_mosaic(self, tiles: List[np.ndarray], group: List[int], per_tile: List[list]):
+        """Stack the tiles of a group vertically, run one readtext and split the results"""
+        width = max(tiles[i].shape[1] for i in group)
+        tops = []
+        height = 0
+        for i in group:
+            tops.append(height)
+            height += tiles[i].shape[0] + TILE_GAP
+        height -= TILE_GAP
+
+        mosaic = np.zeros((height, width, 3), dtype=np.uint8)
+        for top, i in zip(tops, group):
+            tile_h, tile_w = tiles[i].shape[:2]
+            mosaic[top:top + tile_h, :tile_w] = tiles[i]
+
+        results = self.reader.readtext(
+            mosaic,
+            canvas_size=self.canvas_size_for(height, width),
+            mag_ratio=self.mag_ratio,
+            batch_size=self.batch_size,
+            **READTEXT_PARAMS
+        )
+        self.readtext_calls += 1
+
+        tops_array = np.asarray(tops)
+        for result in results:
+            box = np.asarray(result[0], dtype=np.float32)
+            center_y = float(box[:, 1].mean())
+            position = int(np.searchsorted(tops_array, center_y, side='right')) - 1
+            if position < 0:
+                continue
+            tile_idx = group[position]
+            if center_y < tops[position] + tiles[tile_idx].shape[0]:
+                per_tile[tile_idx].append(result)
+
+    def _detect_recognize_tiles(
+        self,
+        tiles: List[np.ndarray],
+        known_boxes: List[Optional[TextBoxes]]
+    ) -> Tuple[List[list], List[TextBoxes]]:
+        """
+        Detect text per tile, then recognize every text crop of the stage in batches
+
+        Args:
+            tiles: Variant images of the stage
+            known_boxes: Boxes already found on the same vehicle (None to detect)
+
+        Returns:
+            Raw readtext-style results per tile and the boxes used per tile
+        """
+        boxes: List[TextBoxes] = []
+        for tile, known in zip(tiles, known_boxes):
+            if known is None:
+                horizontal, free = self.reader.detect(
+                    tile,
+                    canvas_size=self.canvas_size_for(*tile.shape[:2]),
+                    mag_ratio=self.mag_ratio,
+                    **DETECT_PARAMS
+                )
+                self.detect_calls += 1
+                known = (horizontal[0], free[0])
+            boxes.append(known)
+
+        self.tiles_processed += len(tiles)
+        return self._recognize_batched(tiles, boxes), boxes
+
+    def _recognize_batched(self, tiles: List[np.ndarray], boxes: List[TextBoxes]) -> List[list]:
+        """Run the EasyOCR recognizer over the text crops of all tiles, batch_size crops per pass"""
+        from easyocr.recognition import get_text
+        from easyocr.utils import get_image_list
+
+        text_crops = []
+        for idx, (tile, (horizontal, free)) in enumerate(zip(tiles, boxes)):
+            if not horizontal and not free:
+                continue
+            grey = cv2.cvtColor(tile, cv2.COLOR_BGR2GRAY)
+            image_list, _ = get_image_list(horizontal, free, grey, model_height=RECOGNIZER_HEIGHT)
+            text_crops.extend((idx, box, image) for box, image in image_list)
+
+        # Por ancho: cada lote se rellena solo hasta su recorte más ancho
+        text_crops.sort(key=lambda item: item[2].shape[1])
+        ignore_char = ''.join(set(self.reader.character) - set(self.reader.lang_char))
+
+        per_tile: List[list] = [[] for _ in tiles]
+        for start in range(0, len(text_crops), self.batch_size):
+            batch = text_crops[start:start + self.batch_size]
+            width = int(math.ceil(batch[-1][2].shape[1] / RECOGNIZER_HEIGHT)) * RECOGNIZER_HEIGHT
+            results = get_text(
+                self.reader.character,
+                RECOGNIZER_HEIGHT,
+                max(width, RECOGNIZER_HEIGHT),
+                self.reader.recognizer,
+                self.reader.converter,
+                [(box, image) for _, box, image in batch],
+                ignore_char,
+                batch_size=self.batch_size,
+                workers=0,
+                device=self.reader.device
+            )
+            self.recognizer_batches += 1
+            for (idx, _, _), result in zip(batch, results):
+                per_tile[idx].append(result)
+        return per_tile
+
+    def _parse_results(self, results: list) -> List[Tuple[str, float]]:
+        """Clean, filter and normalize raw readtext results into plate candidates"""
+        plates = []
+        for (_, text, conf) in results:
+            logger.debug(f"   📝 Raw text: '{text}' (conf: {conf:.2f})")
+
+            # Clean text: remove spaces, keep only alphanumeric and hyphens
+            text = text.replace(' ', '').upper()
+            text = ''.join(c for c in text if c.isalnum() or c == '-')
+
+            if conf < MIN_TEXT_CONFIDENCE:
+                continue
+
+            if self.is_valid_plate(text):
+                plates.append((self.normalize_plate(text), float(conf)))
+            else:
+                logger.debug(f"   ❌ Invalid plate format: '{text}'")
+        return plates
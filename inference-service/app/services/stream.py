@@ -1,9 +1,10 @@
 import asyncio
 import cv2
+import threading
 import time
 import uuid
+import numpy as np
 from typing import Optional, Dict, Any, Callable
-from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
 
@@ -19,14 +20,216 @@ class StreamInfo:
     stream_id: str
     camera_id: str
     rtsp_url: str
-    status: str = "stopped"  # stopped, starting, running, error
-    fps: float = 0.0
+    status: str = "stopped"  # stopped, starting, running, reconnecting, error
+    fps: float = 0.0  # Frames processed per second (consumer pace)
+    capture_fps: float = 0.0  # Frames grabbed per second (camera pace)
     frames_processed: int = 0
+    frames_dropped: int = 0  # Frames grabbed while the consumer was busy
+    reconnects: int = 0
     last_frame_timestamp: Optional[datetime] = None
     error_message: Optional[str] = None
     created_at: datetime = field(default_factory=datetime.utcnow)
 
 
+@dataclass
+class GrabbedFrame:
+    """Decoded frame published by a grabber"""
+    seq: int
+    frame: np.ndarray
+    captured_at: float
+
+
+class LatestFrameSlot:
+    """
+    Latest-value slot between a grabber thread and an asyncio consumer
+
+    Solo guarda el frame más nuevo: si el consumidor va más lento que la
+    cámara, los frames intermedios se descartan en vez de encolarse, así la
+    latencia nunca crece.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._latest: Optional[GrabbedFrame] = None
+        self._consumed_seq = 0
+        self._waiter: Optional[asyncio.Event] = None
+
+        # Estadísticas
+        self.published = 0
+        self.dropped = 0  # Publicados y reemplazados antes de consumirse
+
+    @property
+    def wanted(self) -> bool:
+        """Whether the consumer already took the newest frame (thread-safe)"""
+        with self._lock:
+            return self._latest is None or self._latest.seq <= self._consumed_seq
+
+    def publish(self, frame: np.ndarray, captured_at: Optional[float] = None) -> int:
+        """Replace the newest frame and wake the consumer (grabber thread)"""
+        with self._lock:
+            if self._latest is not None and self._latest.seq > self._consumed_seq:
+                self.dropped += 1
+            seq = (self._latest.seq if self._latest else 0) + 1
+            self._latest = GrabbedFrame(seq, frame, captured_at or time.time())
+            self.published += 1
+            waiter = self._waiter
+
+        if waiter is not None:
+            try:
+                self._loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                # Loop cerrado: el consumidor ya terminó
+                pass
+        return seq
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[GrabbedFrame]:
+        """Wait for a frame newer than the last one returned (None on timeout)"""
+        with self._lock:
+            latest = self._latest
+            if latest is not None and latest.seq > self._consumed_seq:
+                self._consumed_seq = latest.seq
+                return latest
+            event = self._waiter = asyncio.Event()
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                if self._waiter is event:
+                    self._waiter = None
+
+        with self._lock:
+            latest = self._latest
+            if latest is not None and latest.seq > self._consumed_seq:
+                self._consumed_seq = latest.seq
+                return latest
+            return None
+
+
+class FrameGrabber(threading.Thread):
+    """
+    Dedicated capture thread of one stream
+
+    Hace grab() de cada frame para vaciar el buffer de la cámara, pero solo
+    decodifica (retrieve) cuando el consumidor ya tomó el frame anterior.
+    Una lectura bloqueada de una cámara caída ocupa este hilo, no el
+    executor compartido. Reconecta con backoff exponencial.
+    """
+
+    def __init__(
+        self,
+        stream_id: str,
+        rtsp_url: str,
+        slot: LatestFrameSlot,
+        capture_factory: Callable[[str], Optional[cv2.VideoCapture]],
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        max_attempts: int = 10
+    ):
+        super().__init__(name=f"stream-grabber-{stream_id[:8]}", daemon=True)
+        self.stream_id = stream_id
+        self.rtsp_url = rtsp_url
+        self.slot = slot
+        self.capture_factory = capture_factory
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+
+        self._stop_event = threading.Event()
+        self.state = "starting"  # starting, running, reconnecting, failed, stopped
+        self.error: Optional[str] = None
+
+        # Estadísticas
+        self.frames_grabbed = 0
+        self.frames_skipped = 0
+        self.reconnects = 0
+        self.capture_fps = 0.0
+
+    def stop(self):
+        """Ask the grabber to stop (a blocked read returns at its timeout)"""
+        self._stop_event.set()
+
+    def run(self):
+        cap = None
+        failures = 0
+        connected_once = False
+        fps_count = 0
+        fps_start = time.monotonic()
+
+        try:
+            while not self._stop_event.is_set():
+                if cap is None:
+                    cap = self.capture_factory(self.rtsp_url)
+                    if cap is None or not cap.isOpened():
+                        if cap is not None:
+                            cap.release()
+                        cap = None
+                        failures += 1
+                        if not self._backoff(failures, "Failed to open RTSP stream"):
+                            break
+                        continue
+                    if connected_once:
+                        self.reconnects += 1
+                    connected_once = True
+
+                if not cap.grab():
+                    cap.release()
+                    cap = None
+                    failures += 1
+                    logger.warning(
+                        "Failed to grab frame, reconnecting",
+                        stream_id=self.stream_id,
+                        failures=failures
+                    )
+                    if not self._backoff(failures, "Failed to reconnect to RTSP stream"):
+                        break
+                    continue
+
+                failures = 0
+                self.state = "running"
+                self.frames_grabbed += 1
+                fps_count += 1
+                elapsed = time.monotonic() - fps_start
+                if elapsed >= 1.0:
+                    self.capture_fps = fps_count / elapsed
+                    fps_count = 0
+                    fps_start = time.monotonic()
+
+                # Consumidor ocupado: descartar sin decodificar
+                if not self.slot.wanted:
+                    self.frames_skipped += 1
+                    continue
+
+                ok, frame = cap.retrieve()
+                if ok and frame is not None:
+                    self.slot.publish(frame)
+
+        except Exception as e:
+            logger.error("Stream grabber error", stream_id=self.stream_id, error=str(e))
+            self.state = "failed"
+            self.error = str(e)
+        finally:
+            if cap is not None:
+                cap.release()
+            if self.state != "failed":
+                self.state = "stopped"
+
+    def _backoff(self, failures: int, message: str) -> bool:
+        """Wait before the next connection attempt; False when giving up"""
+        if self.max_attempts and failures >= self.max_attempts:
+            self.state = "failed"
+            self.error = f"{message}: {self.rtsp_url}"
+            return False
+
+        self.state = "reconnecting"
+        delay = min(self.max_delay, self.base_delay * (2 ** (failures - 1)))
+        self._stop_event.wait(delay)
+        return True
+
+
 class StreamService:
     """Service for managing RTSP video streams"""
     
@@ -34,7 +237,7 @@ class StreamService:
         self.max_concurrent_streams = max_concurrent_streams
         self.active_streams: Dict[str, StreamInfo] = {}
         self.stream_tasks: Dict[str, asyncio.Task] = {}
-        self.executor = ThreadPoolExecutor(max_workers=max_concurrent_streams)
+        self.grabbers: Dict[str, FrameGrabber] = {}
         
     async def start_stream(
         self, 
@@ -144,25 +347,26 @@ class StreamService:
         """
         Process frames from an RTSP stream
         
-        This method runs in a separate task and continuously reads frames
-        from the RTSP stream.
+        A dedicated FrameGrabber thread reads the camera and publishes the
+        newest frame; this task consumes it at the callback's own pace.
         """
-        cap = None
+        slot = LatestFrameSlot(asyncio.get_running_loop())
+        grabber = FrameGrabber(
+            stream_id=stream_info.stream_id,
+            rtsp_url=stream_info.rtsp_url,
+            slot=slot,
+            capture_factory=self._create_video_capture,
+            base_delay=settings.STREAM_RECONNECT_BASE_DELAY,
+            max_delay=settings.STREAM_RECONNECT_MAX_DELAY,
+            max_attempts=settings.STREAM_RECONNECT_MAX_ATTEMPTS
+        )
+        self.grabbers[stream_info.stream_id] = grabber
+        grabber.start()
+        
+        fps_counter = 0
+        start_time = time.time()
+        
         try:
-            # Open video capture in executor to avoid blocking
-            cap = await asyncio.get_event_loop().run_in_executor(
-                self.executor,
-                self._create_video_capture,
-                stream_info.rtsp_url
-            )
-            
-            if not cap or not cap.isOpened():
-                raise ValueError(f"Failed to open RTSP stream: {stream_info.rtsp_url}")
-            
-            stream_info.status = "running"
-            fps_counter = 0
-            start_time = time.time()
-            
             logger.info(
                 "Stream processing started",
                 stream_id=stream_info.stream_id,
@@ -170,27 +374,12 @@ class StreamService:
             )
             
             while True:
-                # Read frame in executor to avoid blocking
-                ret, frame = await asyncio.get_event_loop().run_in_executor(
-                    self.executor,
-                    cap.read
-                )
+                grabbed = await slot.get(timeout=1.0)
+                self._sync_stream_info(stream_info, grabber, slot)
                 
-                if not ret:
-                    logger.warning(
-                        "Failed to read frame, attempting reconnection",
-                        stream_id=stream_info.stream_id
-                    )
-                    # Attempt to reconnect
-                    cap.release()
-                    await asyncio.sleep(1)
-                    cap = await asyncio.get_event_loop().run_in_executor(
-                        self.executor,
-                        self._create_video_capture,
-                        stream_info.rtsp_url
-                    )
-                    if not cap or not cap.isOpened():
-                        raise ValueError("Failed to reconnect to RTSP stream")
+                if grabbed is None:
+                    if grabber.state == "failed":
+                        raise ValueError(grabber.error or "Stream grabber failed")
                     continue
                 
                 # Update stream info
@@ -208,7 +397,7 @@ class StreamService:
                 # Process frame with callback if provided
                 if frame_callback:
                     try:
-                        await frame_callback(frame, stream_info)
+                        await frame_callback(grabbed.frame, stream_info)
                     except Exception as e:
                         logger.error(
                             "Frame callback error",
@@ -216,9 +405,6 @@ class StreamService:
                             error=str(e)
                         )
                 
-                # Add small delay to prevent CPU overload
-                await asyncio.sleep(0.001)
-                
         except asyncio.CancelledError:
             logger.info(
                 "Stream processing cancelled",
@@ -235,16 +421,26 @@ class StreamService:
             stream_info.status = "error"
             stream_info.error_message = str(e)
         finally:
-            if cap:
-                cap.release()
+            # No se espera al hilo: una lectura bloqueada termina sola con su timeout
+            grabber.stop()
+            self.grabbers.pop(stream_info.stream_id, None)
             logger.info(
                 "Stream processing ended",
                 stream_id=stream_info.stream_id,
                 frames_processed=stream_info.frames_processed
             )
     
+    @staticmethod
+    def _sync_stream_info(stream_info: StreamInfo, grabber: FrameGrabber, slot: LatestFrameSlot):
+        """Copy grabber state and counters into the stream info"""
+        if grabber.state in ("running", "reconnecting"):
+            stream_info.status = grabber.state
+        stream_info.capture_fps = grabber.capture_fps
+        stream_info.frames_dropped = grabber.frames_skipped + slot.dropped
+        stream_info.reconnects = grabber.reconnects
+    
     def _create_video_capture(self, rtsp_url: str) -> Optional[cv2.VideoCapture]:
-        """Create OpenCV VideoCapture object (runs in thread executor)"""
+        """Create OpenCV VideoCapture object (runs in the grabber thread)"""
         try:
             cap = cv2.VideoCapture(rtsp_url)
             # Set buffer size to reduce latency
@@ -263,8 +459,10 @@ class StreamService:
         for stream_id in list(self.active_streams.keys()):
             await self.stop_stream(stream_id)
         
-        # Shutdown thread executor
-        self.executor.shutdown(wait=True)
+        # Give grabbers a moment to release their captures
+        for grabber in list(self.grabbers.values()):
+            grabber.stop()
+            grabber.join(timeout=1.0)
 
 
 # Global instance
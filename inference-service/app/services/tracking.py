@@ -0,0 +1,278 @@
+"""
+Vehicle Tracking - IoU tracker and per-track plate cache for the realtime channel
+
+El canal realtime identificaba vehículos como f"v{idx}" según el orden de
+detección dentro del frame, así que el mismo auto cambiaba de id y el OCR de
+placa se repetía en cada frame con infracción.
+
+- IoUTracker asigna ids estables entre frames por solapamiento de bboxes.
+- TrackPlateCache guarda las lecturas de placa por track, elige la placa por
+  votación ponderada por confianza y deja de pedir OCR cuando la lectura ya
+  es firme. Las entradas se eliminan cuando el track muere (o por TTL) y la
+  caché tiene un tamaño máximo.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core import get_logger, settings
+
+logger = get_logger(__name__)
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU between two sets of [x1, y1, x2, y2] boxes
+
+    Returns:
+        Array of shape (len(boxes_a), len(boxes_b))
+    """
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = inter_w * inter_h
+
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - intersection
+
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0).astype(np.float32)
+
+
+@dataclass
+class Track:
+    """Vehicle track kept by IoUTracker"""
+    track_id: int
+    bbox: np.ndarray
+    hits: int = 1
+    missed: int = 0
+
+
+class IoUTracker:
+    """
+    Tracker greedy por IoU
+
+    En cada frame procesado empareja las detecciones con los tracks vivos de
+    mayor a menor IoU. Una detección sin pareja abre un track nuevo y un track
+    sin detección durante max_missed_frames frames se da por terminado.
+    """
+
+    def __init__(
+        self,
+        iou_threshold: Optional[float] = None,
+        max_missed_frames: Optional[int] = None
+    ):
+        self.iou_threshold = (
+            settings.TRACKER_IOU_THRESHOLD if iou_threshold is None else iou_threshold
+        )
+        self.max_missed_frames = (
+            settings.TRACKER_MAX_MISSED_FRAMES if max_missed_frames is None else max_missed_frames
+        )
+        self.tracks: Dict[int, Track] = {}
+        self._next_id = 1
+
+    def update(self, bboxes: Sequence[Sequence[float]]) -> Tuple[List[int], List[int]]:
+        """
+        Match the detections of a frame to existing tracks
+
+        Args:
+            bboxes: Detection boxes [x1, y1, x2, y2]
+
+        Returns:
+            Tuple of (track id per detection, ids of tracks that ended)
+        """
+        detections = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        track_ids = list(self.tracks.keys())
+        assigned: List[Optional[int]] = [None] * len(detections)
+
+        if track_ids and len(detections):
+            track_boxes = np.stack([self.tracks[tid].bbox for tid in track_ids])
+            ious = iou_matrix(detections, track_boxes)
+
+            # Greedy: pares ordenados por IoU descendente
+            det_idx, trk_idx = np.nonzero(ious >= self.iou_threshold)
+            order = np.argsort(-ious[det_idx, trk_idx], kind='stable')
+            used_tracks = set()
+            for k in order:
+                d, t = int(det_idx[k]), int(trk_idx[k])
+                if assigned[d] is not None or t in used_tracks:
+                    continue
+                assigned[d] = track_ids[t]
+                used_tracks.add(t)
+
+        matched = set()
+        for d, track_id in enumerate(assigned):
+            if track_id is None:
+                track_id = self._next_id
+                self._next_id += 1
+                self.tracks[track_id] = Track(track_id, detections[d].copy())
+                assigned[d] = track_id
+            else:
+                track = self.tracks[track_id]
+                track.bbox = detections[d].copy()
+                track.hits += 1
+                track.missed = 0
+            matched.add(track_id)
+
+        ended = []
+        for track_id in list(self.tracks.keys()):
+            if track_id in matched:
+                continue
+            track = self.tracks[track_id]
+            track.missed += 1
+            if track.missed > self.max_missed_frames:
+                del self.tracks[track_id]
+                ended.append(track_id)
+
+        return assigned, ended
+
+
+@dataclass
+class PlateVote:
+    """Accumulated readings of one plate text for a track"""
+    total_confidence: float = 0.0
+    count: int = 0
+    best_confidence: float = 0.0
+
+
+@dataclass
+class TrackPlateEntry:
+    """Plate readings of one track"""
+    votes: Dict[str, PlateVote] = field(default_factory=dict)
+    attempts: int = 0
+    last_attempt_frame: Optional[int] = None
+    updated_at: float = field(default_factory=time.monotonic)
+
+
+class TrackPlateCache:
+    """
+    Caché de placas por track
+
+    Cada lectura OCR suma su confianza al voto de ese texto; la placa del
+    track es la de mayor confianza acumulada. Cuando la placa ganadora tiene
+    settle_votes lecturas o una lectura >= settle_confidence, el track ya no
+    necesita OCR.
+    """
+
+    def __init__(
+        self,
+        max_tracks: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        settle_votes: Optional[int] = None,
+        settle_confidence: Optional[float] = None
+    ):
+        self.max_tracks = max_tracks or settings.PLATE_CACHE_MAX_TRACKS
+        self.ttl_seconds = (
+            settings.PLATE_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        )
+        self.settle_votes = settle_votes or settings.PLATE_CACHE_SETTLE_VOTES
+        self.settle_confidence = (
+            settings.PLATE_CACHE_SETTLE_CONFIDENCE if settle_confidence is None else settle_confidence
+        )
+        self._entries: "OrderedDict[int, TrackPlateEntry]" = OrderedDict()
+
+        # Estadísticas
+        self.hits = 0
+        self.ocr_requests = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def should_read(self, track_id: int, frame_number: int, retry_interval: int) -> bool:
+        """
+        Decide whether this track still needs plate OCR on this frame
+
+        Args:
+            track_id: Track id
+            frame_number: Current processed frame number
+            retry_interval: Minimum frames between OCR attempts of an unsettled track
+        """
+        entry = self._entries.get(track_id)
+        if entry is None or entry.last_attempt_frame is None:
+            return True
+
+        if self._is_settled(entry):
+            self.hits += 1
+            return False
+
+        return frame_number - entry.last_attempt_frame >= retry_interval
+
+    def record_attempt(
+        self,
+        track_id: int,
+        frame_number: int,
+        reading: Optional[Tuple[str, float]]
+    ):
+        """Store the result of an OCR attempt (reading may be None)"""
+        entry = self._touch(track_id)
+        entry.attempts += 1
+        entry.last_attempt_frame = frame_number
+        self.ocr_requests += 1
+
+        if reading:
+            plate, confidence = reading
+            vote = entry.votes.setdefault(plate, PlateVote())
+            vote.total_confidence += confidence
+            vote.count += 1
+            vote.best_confidence = max(vote.best_confidence, confidence)
+
+    def get(self, track_id: int) -> Optional[Tuple[str, float]]:
+        """Voted plate of a track as (plate_text, best confidence) or None"""
+        entry = self._entries.get(track_id)
+        if entry is None or not entry.votes:
+            return None
+        plate, vote = max(entry.votes.items(), key=lambda item: item[1].total_confidence)
+        return plate, vote.best_confidence
+
+    def discard(self, track_ids: Sequence[int]):
+        """Drop the entries of tracks that ended"""
+        for track_id in track_ids:
+            self._entries.pop(track_id, None)
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """Drop entries not updated within ttl_seconds; returns how many were removed"""
+        now = time.monotonic() if now is None else now
+        expired = [
+            track_id for track_id, entry in self._entries.items()
+            if now - entry.updated_at > self.ttl_seconds
+        ]
+        for track_id in expired:
+            del self._entries[track_id]
+        return len(expired)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get cache statistics"""
+        return {
+            'tracks': len(self._entries),
+            'hits': self.hits,
+            'ocr_requests': self.ocr_requests,
+            'max_tracks': self.max_tracks
+        }
+
+    def _is_settled(self, entry: TrackPlateEntry) -> bool:
+        if not entry.votes:
+            return False
+        vote = max(entry.votes.values(), key=lambda v: v.total_confidence)
+        return vote.count >= self.settle_votes or vote.best_confidence >= self.settle_confidence
+
+    def _touch(self, track_id: int) -> TrackPlateEntry:
+        """Get or create an entry, marking it as most recently used"""
+        entry = self._entries.get(track_id)
+        if entry is None:
+            entry = TrackPlateEntry()
+            self._entries[track_id] = entry
+            while len(self._entries) > self.max_tracks:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.debug(f"🧹 Plate cache full, evicted track {evicted}")
+        else:
+            self._entries.move_to_end(track_id)
+        entry.updated_at = time.monotonic()
+        return entry
@@ -7,11 +7,13 @@ Detector de semáforos que combina:
 """
 
 import logging
-from typing import Optional, Tuple, Dict, Any, List
+from typing import Optional, Tuple, Dict, Any, List, Union
 from enum import Enum
 import numpy as np
 import cv2
 
+from app.services.frame_context import FrameContext
+
 logger = logging.getLogger(__name__)
 
 
@@ -63,31 +65,34 @@ class SimpleTrafficLightDetector:
         self.state_history = []
         self.max_history = 5
         self.detected_traffic_lights = []  # Cache de semáforos detectados
+        self.yolo_max_size = (640, 640)  # YOLO sobre el frame reducido (compartido con la detección de vehículos)
         
         logger.info(f"SimpleTrafficLightDetector initialized with YOLO: {yolo_model is not None}")
     
     def detect(
         self,
-        frame: np.ndarray,
+        frame: Union[np.ndarray, FrameContext],
         roi: Optional[Tuple[int, int, int, int]] = None
     ) -> Dict[str, Any]:
         """
         Detectar estado del semáforo
         
         Args:
-            frame: Frame completo (BGR)
+            frame: Frame completo (BGR) o su FrameContext (reutiliza la reducción
+                y las conversiones HSV ya calculadas para el frame)
             roi: Región de interés (x1, y1, x2, y2). Si None, usa detección YOLO
             
         Returns:
             Dict con 'state', 'confidence', 'bbox', 'detections'
         """
-        height, width = frame.shape[:2]
+        context = FrameContext.wrap(frame)
+        height, width = context.height, context.width
         
         # Paso 1: Detectar semáforos con YOLO si está disponible
         traffic_light_boxes = []
         
         if self.yolo_model is not None:
-            traffic_light_boxes = self._detect_traffic_lights_yolo(frame)
+            traffic_light_boxes = self._detect_traffic_lights_yolo(context)
             
         # Si no hay detecciones YOLO y no hay ROI, usar ROI por defecto
         if len(traffic_light_boxes) == 0 and roi is None:
@@ -100,7 +105,7 @@ class SimpleTrafficLightDetector:
             )
             traffic_light_boxes = [roi]
         elif roi is not None:
-            traffic_light_boxes = [roi]
+            traffic_light_boxes = [tuple(int(v) for v in roi)]
         
         # Paso 2: Analizar color en cada semáforo detectado
         best_state = TrafficLightState.UNKNOWN
@@ -115,14 +120,14 @@ class SimpleTrafficLightDetector:
             if x2 <= x1 or y2 <= y1 or x1 < 0 or y1 < 0 or x2 > width or y2 > height:
                 continue
             
-            # Extraer región del semáforo
-            traffic_light_region = frame[y1:y2, x1:x2]
+            # HSV de la región del semáforo (vista del frame, sin copia)
+            traffic_light_hsv = context.hsv(bbox)
             
-            if traffic_light_region.size == 0:
+            if traffic_light_hsv.size == 0:
                 continue
             
             # Detectar estado por color
-            state, confidence = self._detect_state_by_color(traffic_light_region)
+            state, confidence = self._detect_state_by_color(traffic_light_hsv)
             
             detection = {
                 'state': state,
@@ -164,23 +169,24 @@ class SimpleTrafficLightDetector:
         
         return result
     
-    def _detect_traffic_lights_yolo(self, frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    def _detect_traffic_lights_yolo(self, context: FrameContext) -> List[Tuple[int, int, int, int]]:
         """
         Detectar objetos "traffic light" usando YOLO
         
         Args:
-            frame: Frame BGR
+            context: FrameContext del frame BGR
             
         Returns:
-            Lista de bounding boxes (x1, y1, x2, y2)
+            Lista de bounding boxes (x1, y1, x2, y2) en coordenadas del frame completo
         """
         if self.yolo_model is None:
             logger.warning("YOLO model not available for traffic light detection")
             return []
         
         try:
-            # Ejecutar YOLO con imgsz más grande para detectar objetos pequeños
-            results = self.yolo_model(frame, verbose=False, imgsz=640, conf=self.yolo_confidence_threshold)
+            # YOLO reescala a imgsz=640 de todos modos: se le pasa el frame ya reducido
+            detection_frame, scale_x, scale_y = context.downscaled(*self.yolo_max_size)
+            results = self.yolo_model(detection_frame, verbose=False, imgsz=640, conf=self.yolo_confidence_threshold)
             
             traffic_light_boxes = []
             all_detections_info = []
@@ -208,8 +214,10 @@ class SimpleTrafficLightDetector:
                     class_name = result.names[cls_id]
                     confidence = float(box.conf[0])
                     
-                    # Obtener bbox
+                    # Obtener bbox (de vuelta a resolución original)
                     x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                    x1, x2 = x1 * scale_x, x2 * scale_x
+                    y1, y2 = y1 * scale_y, y2 * scale_y
                     bbox_width = x2 - x1
                     bbox_height = y2 - y1
                     
@@ -242,19 +250,16 @@ class SimpleTrafficLightDetector:
     
     def _detect_state_by_color(
         self,
-        roi_image: np.ndarray
+        hsv: np.ndarray
     ) -> Tuple[TrafficLightState, float]:
-        """Detectar estado mediante análisis HSV"""
-        # Convertir a HSV
-        hsv = cv2.cvtColor(roi_image, cv2.COLOR_BGR2HSV)
-        
+        """Detectar estado mediante análisis HSV (hsv: región ya convertida)"""
         # Calcular scores para cada color
         red_score = self._calculate_color_score(hsv, 'red')
         yellow_score = self._calculate_color_score(hsv, 'yellow')
         green_score = self._calculate_color_score(hsv, 'green')
         
         # ✅ Log detallado de scores para debugging
-        height, width = roi_image.shape[:2]
+        height, width = hsv.shape[:2]
         logger.debug(f"Color scores for {width}x{height} ROI: red={red_score:.3f}, yellow={yellow_score:.3f}, green={green_score:.3f}")
         
         scores = {
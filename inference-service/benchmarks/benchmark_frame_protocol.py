@@ -0,0 +1,179 @@
+"""
+Benchmark: JSON/base64 vs binary WebSocket frame protocol.
+
+Mide bytes por frame (entrada y salida) y tiempo de CPU del servidor por frame
+para el trabajo de protocolo en /ws/inference: parsear el mensaje, decodificar
+la imagen, codificar el frame de salida y serializar las detecciones. YOLO y
+OCR no se ejecutan porque su costo es idéntico en ambos modos.
+
+Uso:
+    python benchmarks/benchmark_frame_protocol.py [--video test_videos/VIDEO1.mp4] [--frames 200]
+"""
+
+import argparse
+import base64
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.frame_protocol import (  # noqa: E402
+    encode_frame_message,
+    decode_frame_message,
+    encode_result_message,
+    result_encoding,
+)
+
+
+CONFIG = {
+    'confidence_threshold': 0.5,
+    'infractions': ['speeding', 'red_light', 'wrong_lane'],
+    'speed_limit': 60,
+    'frame_skip_interval': 2,
+    'ocr_frame_interval': 5,
+    'output_quality': 75,
+    'enable_traffic_light': True,
+    'traffic_light_roi': [1000, 50, 1200, 300],
+    'stop_line_y': 500,
+}
+
+
+def load_frames(video_path: str, count: int, size=(1280, 720)) -> List[np.ndarray]:
+    """Read frames from a test video, or synthesize noisy frames if unavailable."""
+    frames = []
+    if video_path and Path(video_path).exists():
+        cap = cv2.VideoCapture(video_path)
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+
+    rng = np.random.default_rng(42)
+    while len(frames) < count:
+        frame = np.full((size[1], size[0], 3), 90, dtype=np.uint8)
+        noise = rng.integers(0, 40, size=frame.shape, dtype=np.uint8)
+        frames.append(cv2.add(frame, noise))
+    return frames
+
+
+def fake_detections(n: int = 6) -> List[Dict[str, Any]]:
+    """Detections shaped like RealtimeDetector.process_frame output."""
+    return [
+        {
+            'id': f"120-{i}",
+            'type': 'vehicle',
+            'vehicle_type': 'car',
+            'confidence': 0.87,
+            'bbox': [100.5 + i * 50, 200.25, 300.75 + i * 50, 380.0],
+            'timestamp': '2025-11-05T17:40:48.123456',
+            'has_infraction': False,
+            'ml_prediction_time_ms': 42.5,
+        }
+        for i in range(n)
+    ]
+
+
+def bench_json(jpegs: List[bytes], detections) -> Dict[str, float]:
+    """Legacy mode: base64 JPEG inside JSON text in both directions."""
+    bytes_in, bytes_out, cpu = [], [], []
+
+    for jpeg in jpegs:
+        # Client side (not measured as server CPU)
+        message = json.dumps({
+            'type': 'frame',
+            'image': base64.b64encode(jpeg).decode('utf-8'),
+            'config': CONFIG,
+        })
+        bytes_in.append(len(message))
+
+        start = time.process_time()
+        parsed = json.loads(message)
+        image_bytes = base64.b64decode(parsed['image'])
+        frame = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 75])
+        reply = json.dumps({
+            'type': 'detection',
+            'frame': base64.b64encode(buffer).decode('utf-8'),
+            'detections': detections,
+            'frame_number': 120,
+        })
+        cpu.append(time.process_time() - start)
+        bytes_out.append(len(reply))
+
+    return summarize(bytes_in, bytes_out, cpu)
+
+
+def bench_binary(jpegs: List[bytes], detections) -> Dict[str, float]:
+    """Binary mode: fixed header + raw JPEG in, header + msgpack out."""
+    bytes_in, bytes_out, cpu = [], [], []
+
+    for frame_id, jpeg in enumerate(jpegs):
+        message = encode_frame_message(jpeg, frame_id, config_version=1)
+        bytes_in.append(len(message))
+
+        start = time.process_time()
+        header, payload = decode_frame_message(message)
+        frame = cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 75])
+        reply = encode_result_message({
+            'type': 'detection',
+            'frame': buffer.tobytes(),
+            'detections': detections,
+            'frame_number': 120,
+        }, header.frame_id)
+        cpu.append(time.process_time() - start)
+        bytes_out.append(len(reply))
+
+    return summarize(bytes_in, bytes_out, cpu)
+
+
+def summarize(bytes_in, bytes_out, cpu) -> Dict[str, float]:
+    return {
+        'bytes_in': statistics.mean(bytes_in),
+        'bytes_out': statistics.mean(bytes_out),
+        'cpu_ms': statistics.mean(cpu) * 1000,
+        'cpu_p95_ms': float(np.percentile(cpu, 95)) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', default=str(Path(__file__).resolve().parent.parent / 'test_videos' / 'VIDEO1.mp4'))
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--quality', type=int, default=80, help="Client JPEG quality")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    jpegs = [
+        cv2.imencode('.jpg', f, [cv2.IMWRITE_JPEG_QUALITY, args.quality])[1].tobytes()
+        for f in frames
+    ]
+    detections = fake_detections()
+
+    json_stats = bench_json(jpegs, detections)
+    binary_stats = bench_binary(jpegs, detections)
+
+    h, w = frames[0].shape[:2]
+    print(f"\nFrame protocol benchmark: {len(frames)} frames, {w}x{h}, result encoding={result_encoding()}")
+    print("=" * 72)
+    print(f"{'mode':<10}{'bytes in/frame':>16}{'bytes out/frame':>17}{'CPU ms/frame':>15}{'CPU p95 ms':>13}")
+    for name, stats in (('json', json_stats), ('binary', binary_stats)):
+        print(f"{name:<10}{stats['bytes_in']:>16,.0f}{stats['bytes_out']:>17,.0f}"
+              f"{stats['cpu_ms']:>15.2f}{stats['cpu_p95_ms']:>13.2f}")
+    print("-" * 72)
+    print(f"bytes in saved:  {100 * (1 - binary_stats['bytes_in'] / json_stats['bytes_in']):.1f}%")
+    print(f"bytes out saved: {100 * (1 - binary_stats['bytes_out'] / json_stats['bytes_out']):.1f}%")
+    print(f"CPU saved:       {100 * (1 - binary_stats['cpu_ms'] / json_stats['cpu_ms']):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
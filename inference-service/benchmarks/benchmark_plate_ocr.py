@@ -0,0 +1,227 @@
+"""
+Benchmark: per-plate OCR latency, sequential variants vs PlateOCREngine.
+
+Reproduce el OCR de placas de process_frame de dos formas:
+
+- sequential: como detect_license_plate antes de PlateOCREngine: por vehículo
+  3 variantes (original, CLAHE, sharpening) y un readtext() por variante con
+  canvas_size=2560
+- batched: PlateOCREngine.read_crops con los vehículos de cada frame y early
+  stop; en CPU (por defecto) detect() por tile, cajas del original reusadas
+  en CLAHE/sharpening y el reconocedor en lotes; con --min-fill, un
+  readtext() por etapa sobre el mosaico
+
+Los recortes son vehículos sintéticos con una placa peruana dibujada (texto
+conocido, así también se mide la precisión).
+
+Pesos: usa los modelos de EasyOCR de ~/.EasyOCR si están descargados. Con
+--untrained (o si no están y no se pueden descargar) se construyen las mismas
+redes CRAFT + VGG con pesos aleatorios: el costo de cómputo por píxel y por
+recorte es el mismo. CRAFT sin entrenar no encuentra texto, así que después de
+correrlo se devuelve la caja de la placa dibujada para que el reconocedor
+trabaje como con pesos reales. No se leen placas: no hay early stop (cota
+superior del modo batched) y la precisión no se reporta.
+
+Uso:
+    python benchmarks/benchmark_plate_ocr.py [--plates 48] [--vehicles-per-frame 4] [--untrained]
+"""
+
+import argparse
+import logging
+import statistics
+import string
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services import plate_ocr  # noqa: E402
+from app.services.model_service import ModelService  # noqa: E402
+from app.services.plate_ocr import (  # noqa: E402
+    READTEXT_PARAMS,
+    VARIANT_STAGES,
+    PlateOCREngine,
+    build_variant,
+)
+
+
+def plate_box(height: int, width: int) -> Tuple[int, int, int, int]:
+    """Plate rectangle (x1, y1, x2, y2) drawn by synthetic_vehicles on a crop of this size"""
+    plate_w, plate_h = int(width * 0.45), int(width * 0.45 * 0.3)
+    x1, y1 = (width - plate_w) // 2, int(height * 0.7)
+    return x1, y1, x1 + plate_w, y1 + plate_h
+
+
+def synthetic_vehicles(count: int, seed: int = 42) -> List[Tuple[np.ndarray, str]]:
+    """Vehicle crops (as produced by crop_vehicle) with a readable plate drawn on them."""
+    rng = np.random.default_rng(seed)
+    vehicles = []
+    for _ in range(count):
+        letters = ''.join(rng.choice(list(string.ascii_uppercase), 3))
+        digits = ''.join(rng.choice(list(string.digits), 3))
+        plate = f"{letters}-{digits}"
+
+        width = int(rng.integers(200, 380))
+        height = int(width * rng.uniform(0.65, 0.85))
+        color = tuple(int(c) for c in rng.integers(40, 200, 3))
+        crop = np.full((height, width, 3), color, dtype=np.uint8)
+        noise = rng.integers(0, 25, size=crop.shape, dtype=np.uint8)
+        crop = cv2.add(crop, noise)
+
+        x1, y1, x2, y2 = plate_box(height, width)
+        plate_w, plate_h = x2 - x1, y2 - y1
+        cv2.rectangle(crop, (x1, y1), (x2, y2), (235, 235, 235), -1)
+        cv2.rectangle(crop, (x1, y1), (x2, y2), (20, 20, 20), 2)
+        scale = plate_h / 38.0
+        (text_w, text_h), _ = cv2.getTextSize(plate, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+        cv2.putText(crop, plate, (x1 + (plate_w - text_w) // 2, y1 + (plate_h + text_h) // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, scale, (10, 10, 10), 2, cv2.LINE_AA)
+        vehicles.append((crop, plate))
+    return vehicles
+
+
+def load_reader(untrained: bool):
+    """EasyOCR reader with the service settings; random weights if requested or unavailable."""
+    import easyocr
+
+    if not untrained:
+        try:
+            return easyocr.Reader(['en'], gpu=False, verbose=False), True
+        except Exception as e:
+            print(f"EasyOCR weights unavailable ({type(e).__name__}: {e}); using untrained networks")
+
+    import torch
+    from easyocr.craft import CRAFT
+    from easyocr.detection import get_textbox
+    from easyocr.model.vgg_model import Model
+    from easyocr.utils import CTCLabelConverter
+
+    torch.manual_seed(0)
+    reader = easyocr.Reader(['en'], gpu=False, detector=False, recognizer=False,
+                            download_enabled=False, verbose=False)
+    dict_list = {'en': str(Path(easyocr.__file__).parent / 'dict' / 'en.txt')}
+    converter = CTCLabelConverter(reader.character, {}, dict_list)
+    recognizer = Model(num_class=len(converter.character), input_channel=1, output_channel=256, hidden_size=256)
+    detector = CRAFT()
+    # Igual que get_detector / get_recognizer en CPU
+    for net in (detector, recognizer):
+        torch.quantization.quantize_dynamic(net, dtype=torch.qint8, inplace=True)
+        net.eval()
+    def plate_textbox(*args, **kwargs):
+        # CRAFT corre igual (costo real); las cajas son las de la placa dibujada
+        image = args[1]
+        get_textbox(*args, **kwargs)
+        x1, y1, x2, y2 = plate_box(*image.shape[:2])
+        return [[np.array([x1, y1, x2, y1, x2, y2, x1, y2], dtype=np.int32)]]
+
+    reader.detector, reader.get_textbox = detector, plate_textbox
+    reader.recognizer, reader.converter = recognizer, converter
+    return reader, False
+
+
+def run_sequential(reader, engine: PlateOCREngine, vehicles) -> Tuple[List[float], int, int]:
+    variants = [name for stage in VARIANT_STAGES for name in stage]
+    times, correct = [], 0
+    for crop, plate in vehicles:
+        start = time.perf_counter()
+        candidates = []
+        for name in variants:
+            results = reader.readtext(build_variant(crop, name), canvas_size=2560, mag_ratio=1.5, **READTEXT_PARAMS)
+            candidates.extend(engine._parse_results(results))
+        times.append(time.perf_counter() - start)
+        if candidates and max(candidates, key=lambda c: c[1])[0] == plate:
+            correct += 1
+    return times, correct, len(variants) * len(vehicles)
+
+
+def run_batched(engine: PlateOCREngine, vehicles, per_frame: int) -> Tuple[List[float], int]:
+    times, correct = [], 0
+    for i in range(0, len(vehicles), per_frame):
+        group = vehicles[i:i + per_frame]
+        start = time.perf_counter()
+        plates = engine.read_crops([crop for crop, _ in group])
+        elapsed = time.perf_counter() - start
+        times.extend([elapsed / len(group)] * len(group))
+        correct += sum(1 for result, (_, plate) in zip(plates, group) if result and result[0] == plate)
+    return times, correct
+
+
+def summary(times: List[float]) -> Dict[str, float]:
+    return {
+        'ms': statistics.mean(times) * 1000,
+        'p95_ms': float(np.percentile(times, 95)) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--plates', type=int, default=48)
+    parser.add_argument('--vehicles-per-frame', type=int, default=4)
+    parser.add_argument('--untrained', action='store_true', help='random weights (latency only)')
+    parser.add_argument('--min-fill', type=float, default=None, help='OCR_MOSAIC_MIN_FILL override')
+    args = parser.parse_args()
+
+    logging.getLogger(plate_ocr.__name__).setLevel(logging.WARNING)
+    reader, trained = load_reader(args.untrained)
+    service = ModelService()
+    engine = PlateOCREngine(
+        reader,
+        executor=None,
+        is_valid_plate=service._is_valid_plate_format,
+        normalize_plate=service._normalize_plate,
+        min_fill=args.min_fill
+    )
+    vehicles = synthetic_vehicles(args.plates)
+
+    # Calentar (asignaciones de torch / OpenCV)
+    warmup = synthetic_vehicles(args.vehicles_per_frame, seed=7)
+    run_sequential(reader, engine, warmup[:1])
+    run_batched(engine, warmup, args.vehicles_per_frame)
+    engine.readtext_calls = engine.detect_calls = engine.recognizer_batches = 0
+    engine.plates_requested = engine.early_stops = engine.tiles_processed = 0
+
+    # Frame a frame, alternando qué modo va primero, para que la carga de la
+    # máquina afecte por igual a ambos
+    seq_times, batch_times = [], []
+    seq_correct = batch_correct = seq_calls = 0
+    per_frame = args.vehicles_per_frame
+    for n, i in enumerate(range(0, len(vehicles), per_frame)):
+        group = vehicles[i:i + per_frame]
+        for mode in (('sequential', 'batched') if n % 2 == 0 else ('batched', 'sequential')):
+            if mode == 'sequential':
+                times, correct, calls = run_sequential(reader, engine, group)
+                seq_times += times
+                seq_correct += correct
+                seq_calls += calls
+            else:
+                times, correct = run_batched(engine, group, per_frame)
+                batch_times += times
+                batch_correct += correct
+    stats = engine.get_stats()
+    seq, batched = summary(seq_times), summary(batch_times)
+
+    batching = 'detect per tile + batched recognizer' if engine.min_fill is None else f"mosaic, min fill {engine.min_fill}"
+    print(f"\nPlate OCR benchmark: {len(vehicles)} plates, {args.vehicles_per_frame} vehicles/frame, "
+          f"{'trained' if trained else 'untrained'} EasyOCR on CPU, {batching}")
+    print("=" * 72)
+    print(f"{'mode':<12}{'ms/plate':>12}{'p95 ms':>10}{'detector/plate':>16}{'accuracy':>12}")
+    rows = (
+        ('sequential', seq, seq_calls / len(vehicles), seq_correct),
+        ('batched', batched, stats['calls_per_plate'], batch_correct),
+    )
+    for name, timing, calls, correct in rows:
+        accuracy = f"{correct / len(vehicles):.1%}" if trained else 'n/a'
+        print(f"{name:<12}{timing['ms']:>12.1f}{timing['p95_ms']:>10.1f}{calls:>16.2f}{accuracy:>12}")
+    print("-" * 72)
+    print(f"speedup:          {seq['ms'] / batched['ms']:.2f}x")
+    print(f"early stop rate:  {stats['early_stops'] / len(vehicles):.1%}")
+    print(f"recognizer batches: {stats['recognizer_batches']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Benchmark: per-stage preprocessing vs shared FrameContext.
+
+Reproduce el preprocesamiento de un process_frame con las tres etapas activas
+(YOLO de vehículos, semáforo y carriles) de dos formas:
+
+- legacy: cada etapa hace su propio resize / cvtColor / GaussianBlur / Canny
+  sobre el frame completo (como antes de FrameContext)
+- context: un FrameContext por frame con FrameBufferPool compartido entre
+  frames; semáforo y carriles trabajan sobre vistas ROI
+
+Por frame se mide el tiempo, los buffers de imagen nuevos que devuelven las
+llamadas a cv2 / numpy (los buffers del pool reutilizados no cuentan) y el
+pico de memoria transitoria (tracemalloc). YOLO se sustituye por un modelo que
+sólo hace el letterbox a 640 que hace ultralytics antes de inferir.
+
+Uso:
+    python benchmarks/benchmark_preprocessing.py [--video test_videos/VIDEO1.mp4] [--frames 200]
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from benchmark_frame_protocol import load_frames  # noqa: E402
+from app.services import frame_context, lane_detector, traffic_light_detector  # noqa: E402
+from app.services.frame_context import FrameBufferPool, FrameContext  # noqa: E402
+from app.services.lane_detector import SimpleLaneDetector  # noqa: E402
+from app.services.traffic_light_detector import SimpleTrafficLightDetector  # noqa: E402
+
+
+DETECTION_RESOLUTION = (640, 480)
+
+
+def traffic_light_roi(frame: np.ndarray):
+    """Fixed traffic light ROI (upper right), as sent in config['traffic_light_roi']."""
+    height, width = frame.shape[:2]
+    return (int(width * 0.78), int(height * 0.07), int(width * 0.94), int(height * 0.42))
+
+
+class CountingCV2:
+    """cv2 proxy that counts image buffers newly allocated by each call."""
+
+    def __init__(self):
+        self.pool: FrameBufferPool = None
+        self.allocations = 0
+
+    def _is_new(self, result: Any) -> bool:
+        if not isinstance(result, np.ndarray) or not result.flags.owndata:
+            return False
+        if self.pool is not None and any(result is b for b in self.pool._buffers.values()):
+            return False
+        return True
+
+    def count(self, result: Any) -> Any:
+        if self._is_new(result):
+            self.allocations += 1
+        return result
+
+    def __getattr__(self, name: str):
+        attr = getattr(cv2, name)
+        if not callable(attr) or isinstance(attr, type):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            for item in (result if isinstance(result, tuple) else (result,)):
+                self.count(item)
+            return result
+        return wrapper
+
+
+class LetterboxModel:
+    """YOLO stand-in: only the letterbox to imgsz done before inference."""
+
+    def __init__(self, cv):
+        self.cv = cv
+
+    def __call__(self, frame: np.ndarray, imgsz: int = 640, **kwargs) -> List:
+        height, width = frame.shape[:2]
+        scale = imgsz / max(height, width)
+        if scale != 1.0:
+            frame = self.cv.resize(frame, (int(round(width * scale)), int(round(height * scale))))
+        pad_h = (-frame.shape[0]) % 32
+        pad_w = (-frame.shape[1]) % 32
+        self.cv.copyMakeBorder(frame, 0, pad_h, 0, pad_w, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+        return []
+
+
+def legacy_frame(frame: np.ndarray, cv: CountingCV2, model: LetterboxModel,
+                 tl: SimpleTrafficLightDetector, lanes: SimpleLaneDetector):
+    """Preprocessing as done before FrameContext: every stage on the full frame."""
+    height, width = frame.shape[:2]
+
+    # YOLO de vehículos
+    max_w, max_h = DETECTION_RESOLUTION
+    if width > max_w or height > max_h:
+        model(cv.resize(frame, (max_w, int(max_w * height / width))))
+
+    # Semáforo: YOLO sobre el frame completo + HSV del recorte
+    model(frame)
+    x1, y1, x2, y2 = traffic_light_roi(frame)
+    hsv = cv.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2HSV)
+    tl._detect_state_by_color(hsv)
+
+    # Carriles: gris / blur / Canny del frame completo + máscara nueva
+    gray = cv.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    blur = cv.GaussianBlur(gray, (5, 5), 0)
+    edges = cv.Canny(blur, lanes.canny_low, lanes.canny_high)
+    vertices = np.array([[
+        (int(width * 0.1), height),
+        (int(width * 0.4), int(height * 0.6)),
+        (int(width * 0.6), int(height * 0.6)),
+        (int(width * 0.9), height)
+    ]], dtype=np.int32)
+    mask = cv.count(np.zeros_like(edges))
+    cv.fillPoly(mask, [vertices], 255)
+    masked = cv.bitwise_and(edges, mask)
+    lines = cv.HoughLinesP(masked, rho=2, theta=np.pi / 180, threshold=lanes.hough_threshold,
+                           minLineLength=lanes.hough_min_line_length, maxLineGap=lanes.hough_max_line_gap)
+    lanes._classify_lanes(None if lines is None else lines.reshape(-1, 1, 4), frame.shape)
+
+
+def context_frame(frame: np.ndarray, pool: FrameBufferPool, model: LetterboxModel,
+                  tl: SimpleTrafficLightDetector, lanes: SimpleLaneDetector):
+    """Preprocessing with a shared FrameContext."""
+    context = FrameContext(frame, pool)
+    detection_frame, _, _ = context.downscaled(*DETECTION_RESOLUTION)
+    model(detection_frame)
+    tl.detect(context, traffic_light_roi(frame))
+    lanes.detect(context)
+
+
+def run(frames: List[np.ndarray], step: Callable[[np.ndarray], None], cv: CountingCV2) -> Dict[str, float]:
+    times, allocations, peaks = [], [], []
+
+    for frame in frames[:5]:  # calentar el pool y los cachés de OpenCV
+        step(frame)
+
+    tracemalloc.start()
+    for frame in frames:
+        cv.allocations = 0
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        step(frame)
+        times.append(time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+        allocations.append(cv.allocations)
+        peaks.append(peak - base)
+    tracemalloc.stop()
+
+    return {
+        'ms': statistics.mean(times) * 1000,
+        'p95_ms': float(np.percentile(times, 95)) * 1000,
+        'allocations': statistics.mean(allocations),
+        'peak_mb': statistics.mean(peaks) / (1024 * 1024),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', default=str(Path(__file__).resolve().parent.parent / 'test_videos' / 'VIDEO1.mp4'))
+    parser.add_argument('--frames', type=int, default=200)
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    logging.getLogger(traffic_light_detector.__name__).setLevel(logging.ERROR)
+
+    cv = CountingCV2()
+    for module in (frame_context, lane_detector, traffic_light_detector):
+        module.cv2 = cv
+    model = LetterboxModel(cv)
+
+    legacy_tl, legacy_lanes = SimpleTrafficLightDetector(), SimpleLaneDetector()
+    legacy_stats = run(frames, lambda f: legacy_frame(f, cv, model, legacy_tl, legacy_lanes), cv)
+
+    pool = FrameBufferPool()
+    cv.pool = pool
+    tl = SimpleTrafficLightDetector(yolo_model=model)
+    lanes = SimpleLaneDetector()
+    context_stats = run(frames, lambda f: context_frame(f, pool, model, tl, lanes), cv)
+
+    h, w = frames[0].shape[:2]
+    print(f"\nPreprocessing benchmark: {len(frames)} frames, {w}x{h}, YOLO + traffic light + lanes")
+    print("=" * 72)
+    print(f"{'mode':<10}{'ms/frame':>12}{'p95 ms':>10}{'new buffers/frame':>20}{'peak MB/frame':>16}")
+    for name, stats in (('legacy', legacy_stats), ('context', context_stats)):
+        print(f"{name:<10}{stats['ms']:>12.2f}{stats['p95_ms']:>10.2f}"
+              f"{stats['allocations']:>20.1f}{stats['peak_mb']:>16.2f}")
+    print("-" * 72)
+    print(f"time saved:       {100 * (1 - context_stats['ms'] / legacy_stats['ms']):.1f}%")
+    print(f"peak memory saved: {100 * (1 - context_stats['peak_mb'] / legacy_stats['peak_mb']):.1f}%")
+    print(f"pool: {len(pool)} buffers, {pool.allocations} allocations, {pool.reuses} reuses")
+
+
+if __name__ == "__main__":
+    main()
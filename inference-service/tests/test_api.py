@@ -4,6 +4,7 @@ from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock, patch
 
 from app.main import app
+from app.api.websocket import RealtimeDetector
 
 
 @pytest.fixture
@@ -243,4 +244,125 @@ class TestInferenceEndpoints:
         assert "streams" in data
         assert "total_streams" in data
         assert data["total_streams"] == 2
-        assert len(data["streams"]) == 2
\ No newline at end of file
+        assert len(data["streams"]) == 2
+
+
+class TestRealtimeResponseModes:
+    """Test RealtimeDetector response modes (full frame vs detections only)"""
+    
+    @pytest.fixture
+    def frame_b64(self):
+        """A small encoded test frame"""
+        import base64
+        import cv2
+        import numpy as np
+        
+        frame = np.zeros((120, 160, 3), dtype=np.uint8)
+        _, buffer = cv2.imencode('.jpg', frame)
+        return base64.b64encode(buffer).decode('utf-8')
+    
+    @pytest.fixture
+    def session(self):
+        """Detection session with YOLO replaced by a single fake car"""
+        detections = [{'type': 'vehicle', 'vehicle_type': 'car', 'confidence': 0.9, 'bbox': [10.0, 20.0, 60.0, 80.0]}]
+        with patch('app.api.websocket.model_service') as mock_model, \
+             patch('app.api.websocket.inference_scheduler') as mock_scheduler:
+            mock_model._initialized = True
+            mock_scheduler.submit = AsyncMock(side_effect=lambda *args: [dict(d) for d in detections])
+            yield RealtimeDetector()
+    
+    BASE_CONFIG = {'frame_skip_interval': 1, 'simulate_infractions': False, 'infractions': []}
+    
+    def test_frame_mode_returns_encoded_frame(self, session, frame_b64):
+        """Default mode keeps returning the annotated frame"""
+        result = asyncio.run(session.process_frame(frame_b64, dict(self.BASE_CONFIG), frame_id=5))
+        
+        assert isinstance(result["frame"], str)
+        assert result["frame_id"] == 5
+        assert len(result["detections"]) == 1
+    
+    def test_detections_mode_skips_jpeg_encoding(self, session, frame_b64):
+        """Detections-only mode never calls cv2.imencode"""
+        config = {**self.BASE_CONFIG, 'response_mode': 'detections'}
+        
+        with patch('app.api.websocket.cv2.imencode') as mock_imencode:
+            result = asyncio.run(session.process_frame(frame_b64, config, frame_id=7))
+            mock_imencode.assert_not_called()
+        
+        assert "frame" not in result
+        assert result["frame_id"] == 7
+        assert result["detections"][0]["bbox"] == [10.0, 20.0, 60.0, 80.0]
+    
+    def test_snapshot_on_demand(self, session, frame_b64):
+        """An annotated JPEG can be requested for the last processed frame"""
+        config = {**self.BASE_CONFIG, 'response_mode': 'detections'}
+        asyncio.run(session.process_frame(frame_b64, config, frame_id=9))
+        
+        snapshot = session.render_snapshot(frame_id=9)
+        assert snapshot["type"] == "snapshot"
+        assert isinstance(snapshot["frame"], str)
+        
+        stale = session.render_snapshot(frame_id=3)
+        assert "error" in stale
+    
+    def test_plate_ocr_runs_once_per_track(self, session, frame_b64):
+        """The same vehicle across frames keeps its track id and is OCR'd once"""
+        config = {**self.BASE_CONFIG, 'response_mode': 'detections', 'ocr_all_vehicles': True}
+        
+        with patch('app.api.websocket.model_service') as mock_model:
+            mock_model._initialized = True
+            mock_model.detect_license_plates = AsyncMock(return_value=[('ABC-123', 0.9)])
+            
+            results = [
+                asyncio.run(session.process_frame(frame_b64, config, frame_id=i))
+                for i in range(4)
+            ]
+            
+            mock_model.detect_license_plates.assert_awaited_once()
+        
+        track_ids = {r["detections"][0]["track_id"] for r in results}
+        assert len(track_ids) == 1
+        assert all(r["detections"][0]["license_plate"] == 'ABC-123' for r in results)
+
+    def test_empty_frames_end_tracks(self, session, frame_b64):
+        """Frames without vehicles still age the tracks and drop their cached state"""
+        config = {**self.BASE_CONFIG, 'response_mode': 'detections'}
+        asyncio.run(session.process_frame(frame_b64, config, frame_id=0))
+        track_id = next(iter(session.iou_tracker.tracks))
+        session.plate_cache.record_attempt(track_id, 0, ('ABC-123', 0.9))
+        
+        with patch('app.api.websocket.inference_scheduler') as mock_scheduler:
+            mock_scheduler.submit = AsyncMock(return_value=[])
+            for i in range(1, session.iou_tracker.max_missed_frames + 2):
+                result = asyncio.run(session.process_frame(frame_b64, config, frame_id=i))
+                assert result["detections"] == []
+        
+        assert session.iou_tracker.tracks == {}
+        assert session.tracker.tracks == {}
+        assert len(session.plate_cache) == 0
+    
+    def test_adaptive_mode_skips_static_frames(self, session, frame_b64):
+        """Without a pinned frame_skip_interval, unchanged frames reuse the cached detections"""
+        config = {'simulate_infractions': False, 'infractions': [], 'response_mode': 'detections'}
+        session.frame_controller.frame_skip = 1
+        
+        results = [
+            asyncio.run(session.process_frame(frame_b64, config, frame_id=i))
+            for i in range(3)
+        ]
+        
+        assert results[0]["cached"] is False
+        assert results[0]["frame_control"]["adaptive"] is True
+        assert results[1]["cached"] is True
+        assert results[1]["skip_reason"] == "static"
+        assert results[2]["frame_control"]["changes"] == []
+    
+    def test_pinned_frame_skip_disables_adaptive_control(self, session, frame_b64):
+        """An explicit frame_skip_interval keeps the fixed behaviour"""
+        result = asyncio.run(session.process_frame(frame_b64, dict(self.BASE_CONFIG), frame_id=1))
+        
+        assert result["frame_control"] == {
+            "adaptive": False,
+            "frame_skip_interval": 1,
+            "ocr_frame_interval": session.ocr_frame_interval
+        }
@@ -1,10 +1,31 @@
 import pytest
 import asyncio
+import time
+import httpx
+import numpy as np
+import cv2
 from unittest.mock import AsyncMock, patch, MagicMock
 from datetime import datetime
 
-from app.services.stream import StreamService, StreamInfo
+from app.services.stream import StreamService, StreamInfo, LatestFrameSlot, FrameGrabber
 from app.services.health import HealthService
+from app.services.inference_scheduler import BatchInferenceScheduler
+from app.services.infraction_queue import InfractionFlushQueue
+from app.services.model_service import ModelService
+from app.services.plate_ocr import PlateOCREngine, TILE_GAP
+from app.services.tracking import IoUTracker, TrackPlateCache
+from app.services.frame_control import AdaptiveFrameController, MotionGate
+from app.services.frame_context import FrameBufferPool, FrameContext
+from app.services.lane_detector import SimpleLaneDetector
+from app.services.frame_protocol import (
+    FrameCodec,
+    ProtocolError,
+    ResultType,
+    encode_frame_message,
+    decode_frame_message,
+    encode_result_message,
+    decode_result_message,
+)
 from app.models import ServiceStatus, ServiceHealth
 
 
@@ -120,6 +141,100 @@ class TestStreamService:
         assert "stream-2" in result
 
 
+class _FakeCapture:
+    """VideoCapture stand-in that yields a fixed number of frames"""
+
+    def __init__(self, frames: int):
+        self.frames = frames
+        self.grabbed = 0
+        self.retrieved = 0
+        self.released = False
+
+    def isOpened(self):
+        return True
+
+    def grab(self):
+        if self.grabbed >= self.frames:
+            return False
+        self.grabbed += 1
+        return True
+
+    def retrieve(self):
+        self.retrieved += 1
+        return True, np.full((4, 4, 3), self.grabbed, dtype=np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+class TestFrameGrabber:
+    """Test the per-stream grabber thread and latest-frame slot"""
+
+    @pytest.mark.asyncio
+    async def test_slot_keeps_only_newest_frame(self):
+        slot = LatestFrameSlot(asyncio.get_running_loop())
+        for value in range(3):
+            slot.publish(np.full((2, 2), value, dtype=np.uint8))
+
+        grabbed = await slot.get(timeout=0.1)
+        assert grabbed.seq == 3
+        assert grabbed.frame[0, 0] == 2
+        assert slot.dropped == 2
+        assert await slot.get(timeout=0.05) is None
+
+        # Wakes a waiting consumer from another thread
+        timer = asyncio.get_running_loop().call_later(
+            0.02, lambda: slot.publish(np.zeros((2, 2), dtype=np.uint8))
+        )
+        grabbed = await slot.get(timeout=1.0)
+        assert grabbed is not None and grabbed.seq == 4
+        timer.cancel()
+
+    @pytest.mark.asyncio
+    async def test_grabber_skips_frames_while_consumer_busy(self):
+        slot = LatestFrameSlot(asyncio.get_running_loop())
+        capture = _FakeCapture(frames=50)
+        grabber = FrameGrabber(
+            "stream-1", "rtsp://test", slot,
+            capture_factory=lambda url: capture,
+            base_delay=0.01, max_attempts=1
+        )
+        grabber.start()
+        grabber.join(timeout=2.0)
+
+        # Nobody consumed: only the first frame was decoded
+        assert capture.grabbed == 50
+        assert capture.retrieved == 1
+        assert grabber.frames_skipped == 49
+        assert grabber.state == "failed"
+        assert capture.released
+
+    @pytest.mark.asyncio
+    async def test_grabber_reconnects_with_backoff(self):
+        slot = LatestFrameSlot(asyncio.get_running_loop())
+        attempts = []
+
+        def factory(url):
+            attempts.append(time.monotonic())
+            return None if len(attempts) < 3 else _FakeCapture(frames=5)
+
+        grabber = FrameGrabber(
+            "stream-2", "rtsp://test", slot,
+            capture_factory=factory,
+            base_delay=0.02, max_delay=1.0, max_attempts=4
+        )
+        grabber.start()
+
+        grabbed = await slot.get(timeout=2.0)
+        assert grabbed is not None
+        assert len(attempts) == 3
+        # Delays double: 0.02 then 0.04
+        assert attempts[2] - attempts[1] >= attempts[1] - attempts[0]
+
+        grabber.stop()
+        grabber.join(timeout=2.0)
+
+
 class TestHealthService:
     """Test HealthService functionality"""
     
@@ -246,4 +361,658 @@ class TestHealthService:
         """Test uptime calculation"""
         uptime = health_service.get_uptime()
         assert uptime >= 0
-        assert isinstance(uptime, float)
\ No newline at end of file
+        assert isinstance(uptime, float)
+
+
+class TestBatchInferenceScheduler:
+    """Test BatchInferenceScheduler functionality"""
+    
+    @pytest.fixture
+    def scheduler(self):
+        """Create a scheduler with a generous wait window for testing"""
+        return BatchInferenceScheduler(max_batch_size=4, max_wait_ms=50)
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_frames_share_one_batch(self, scheduler):
+        """Frames submitted by several sessions are run in a single predict"""
+        frames = [MagicMock(name=f"frame{i}") for i in range(3)]
+        
+        async def fake_batch(batch_frames, thresholds):
+            return [[{'frame': f, 'conf': t}] for f, t in zip(batch_frames, thresholds)]
+        
+        with patch('app.services.inference_scheduler.model_service') as mock_model:
+            mock_model.detect_vehicles_batch = AsyncMock(side_effect=fake_batch)
+            
+            results = await asyncio.gather(*[
+                scheduler.submit(frame, 0.5 + i / 10) for i, frame in enumerate(frames)
+            ])
+            
+            mock_model.detect_vehicles_batch.assert_awaited_once()
+            for i, result in enumerate(results):
+                assert result[0]['frame'] is frames[i]
+                assert result[0]['conf'] == pytest.approx(0.5 + i / 10)
+        
+        stats = scheduler.get_stats()
+        assert stats['batches_processed'] == 1
+        assert stats['frames_processed'] == 3
+        await scheduler.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_batch_size_is_bounded(self, scheduler):
+        """No batch exceeds max_batch_size"""
+        batch_sizes = []
+        
+        async def fake_batch(batch_frames, thresholds):
+            batch_sizes.append(len(batch_frames))
+            return [[] for _ in batch_frames]
+        
+        with patch('app.services.inference_scheduler.model_service') as mock_model:
+            mock_model.detect_vehicles_batch = AsyncMock(side_effect=fake_batch)
+            
+            await asyncio.gather(*[scheduler.submit(MagicMock(), 0.5) for _ in range(10)])
+        
+        assert sum(batch_sizes) == 10
+        assert max(batch_sizes) <= 4
+        await scheduler.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_batch_failure_propagates_to_sessions(self, scheduler):
+        """Every waiting session receives the inference error"""
+        with patch('app.services.inference_scheduler.model_service') as mock_model:
+            mock_model.detect_vehicles_batch = AsyncMock(side_effect=RuntimeError("GPU error"))
+            
+            results = await asyncio.gather(
+                scheduler.submit(MagicMock(), 0.5),
+                scheduler.submit(MagicMock(), 0.5),
+                return_exceptions=True
+            )
+        
+        assert all(isinstance(r, RuntimeError) for r in results)
+        await scheduler.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_shutdown_cancels_waiting_sessions(self, scheduler):
+        """Sessions waiting on the batch or the queue do not hang after shutdown"""
+        started = asyncio.Event()
+        
+        async def slow_batch(batch_frames, thresholds):
+            started.set()
+            await asyncio.sleep(10)
+        
+        with patch('app.services.inference_scheduler.model_service') as mock_model:
+            mock_model.detect_vehicles_batch = AsyncMock(side_effect=slow_batch)
+            
+            in_batch = asyncio.ensure_future(scheduler.submit(MagicMock(), 0.5))
+            await asyncio.wait_for(started.wait(), 1)
+            queued = asyncio.ensure_future(scheduler.submit(MagicMock(), 0.5))
+            await asyncio.sleep(0)
+            
+            await scheduler.shutdown()
+            results = await asyncio.wait_for(
+                asyncio.gather(in_batch, queued, return_exceptions=True), 1
+            )
+        
+        assert all(isinstance(r, asyncio.CancelledError) for r in results)
+
+
+class TestFrameProtocol:
+    """Test binary WebSocket frame protocol"""
+    
+    def test_frame_message_roundtrip(self):
+        """Header fields and payload survive encoding"""
+        image = b'\xff\xd8fake-jpeg-bytes\xff\xd9'
+        message = encode_frame_message(image, frame_id=1234, config_version=3, codec=FrameCodec.WEBP)
+        
+        header, payload = decode_frame_message(message)
+        
+        assert header.frame_id == 1234
+        assert header.config_version == 3
+        assert header.codec == FrameCodec.WEBP
+        assert bytes(payload) == image
+    
+    def test_frame_message_too_short(self):
+        """A message without payload is rejected"""
+        with pytest.raises(ProtocolError):
+            decode_frame_message(b'\x01\x00')
+    
+    def test_frame_message_wrong_version(self):
+        """Unknown protocol versions are rejected"""
+        message = bytearray(encode_frame_message(b'data', frame_id=1))
+        message[0] = 99
+        with pytest.raises(ProtocolError, match="version"):
+            decode_frame_message(bytes(message))
+    
+    def test_result_message_roundtrip(self):
+        """Detections and raw frame bytes survive encoding without base64"""
+        result = {
+            'detections': [{'bbox': [1.5, 2.0, 30.0, 40.0], 'vehicle_type': 'car'}],
+            'frame': b'\x00\x01raw',
+            'frame_number': 7
+        }
+        
+        message = encode_result_message(result, frame_id=42)
+        frame_id, result_type, decoded = decode_result_message(message)
+        
+        assert frame_id == 42
+        assert result_type == ResultType.DETECTION
+        assert decoded['detections'] == result['detections']
+        assert decoded['frame_number'] == 7
+    
+    def test_result_message_json_fallback_base64_bytes(self):
+        """Without msgpack, frame bytes are sent as base64 and numpy scalars as numbers"""
+        import base64
+        result = {'frame': b'\xff\xd8raw\x00', 'latency_ms': np.float32(1.5), 'frame_number': 7}
+        
+        with patch('app.services.frame_protocol.MSGPACK_AVAILABLE', False):
+            message = encode_result_message(result, frame_id=42)
+            frame_id, _, decoded = decode_result_message(message)
+        
+        assert frame_id == 42
+        assert base64.b64decode(decoded['frame']) == result['frame']
+        assert decoded['latency_ms'] == 1.5
+        assert decoded['frame_number'] == 7
+
+
+class TestPlateOCREngine:
+    """Test batched plate OCR"""
+    
+    @staticmethod
+    def _box(y):
+        return [[10, y], [90, y], [90, y + 20], [10, y + 20]]
+    
+    @pytest.fixture
+    def reader(self):
+        """EasyOCR reader mock returning no text by default"""
+        reader = MagicMock()
+        reader.readtext.return_value = []
+        return reader
+    
+    @pytest.fixture
+    def engine(self, reader):
+        """Create an engine using ModelService plate validation"""
+        service = ModelService()
+        return PlateOCREngine(
+            reader,
+            executor=None,
+            is_valid_plate=service._is_valid_plate_format,
+            normalize_plate=service._normalize_plate,
+            early_stop_confidence=0.6,
+            min_fill=0.85
+        )
+    
+    def test_confident_plate_stops_early(self, engine, reader):
+        """A valid plate on the original variant skips CLAHE/sharpened"""
+        reader.readtext.return_value = [(self._box(40), 'ABC123', 0.9)]
+        crop = np.zeros((100, 200, 3), dtype=np.uint8)
+        
+        results = engine.read_crops([crop])
+        
+        assert results == [('ABC-123', 0.9)]
+        assert reader.readtext.call_count == 1
+        assert engine.get_stats()['early_stops'] == 1
+    
+    def test_vehicles_share_one_readtext_call(self, engine, reader):
+        """Text is assigned to the tile that contains it in the mosaic"""
+        second_tile_top = 100 + TILE_GAP
+        reader.readtext.side_effect = [
+            [(self._box(second_tile_top + 40), 'XYZ789', 0.8)],
+            [],
+        ]
+        crops = [np.zeros((100, 200, 3), dtype=np.uint8) for _ in range(2)]
+        
+        results = engine.read_crops(crops)
+        
+        assert results == [None, ('XYZ-789', 0.8)]
+        # Stage 1: both originals; stage 2: only the unresolved vehicle
+        assert reader.readtext.call_count == 2
+        first_mosaic = reader.readtext.call_args_list[0].args[0]
+        second_mosaic = reader.readtext.call_args_list[1].args[0]
+        assert first_mosaic.shape[0] == 200 + TILE_GAP
+        assert second_mosaic.shape[0] == 200 + TILE_GAP
+    
+    def test_mismatched_widths_use_separate_mosaics(self, engine, reader):
+        """Tiles are not stacked when padding would exceed the fill budget"""
+        crops = [
+            np.zeros((100, 150, 3), dtype=np.uint8),
+            np.zeros((100, 400, 3), dtype=np.uint8),
+            np.zeros((100, 400, 3), dtype=np.uint8),
+        ]
+        
+        engine.read_crops(crops)
+        
+        # Stage 1: the two wide crops share a mosaic, the narrow one goes alone
+        widths = sorted(call.args[0].shape[1] for call in reader.readtext.call_args_list[:2])
+        assert widths == [150, 400]
+        assert engine.get_stats()['tiles_processed'] == 9
+    
+    def test_cpu_default_detects_per_tile_and_batches_recognizer(self, reader):
+        """Without GPU: one detect per tile, variants reuse the original's boxes, one recognizer batch per stage"""
+        service = ModelService()
+        engine = PlateOCREngine(
+            reader,
+            executor=None,
+            is_valid_plate=service._is_valid_plate_format,
+            normalize_plate=service._normalize_plate,
+            early_stop_confidence=0.6
+        )
+        plate_box = [20, 120, 60, 90]
+        reader.detect.side_effect = [
+            ([[plate_box]], [[]]),  # vehículo 0, original
+            ([[]], [[]]),           # vehículo 1, original: sin texto
+            ([[]], [[]]),           # vehículo 1, clahe
+            ([[]], [[]]),           # vehículo 1, sharpened
+        ]
+        
+        def get_text(*args, **kwargs):
+            image_list = args[5]
+            texts = ['A1', 'ABC123', 'X'] if len(image_list) == 2 else ['A1']
+            return [(box, text, 0.8) for (box, _), text in zip(image_list, texts)]
+        
+        crops = [np.zeros((100, 200, 3), dtype=np.uint8) for _ in range(2)]
+        with patch('easyocr.recognition.get_text', side_effect=get_text) as recognize:
+            results = engine.read_crops(crops)
+        
+        assert engine.min_fill is None
+        assert results == [('ABC-123', 0.8), None]
+        assert reader.readtext.call_count == 0
+        # Etapa 2: CLAHE y sharpening del vehículo 0 sin detect, en un solo lote
+        assert reader.detect.call_count == 4
+        assert recognize.call_count == 2
+        assert len(recognize.call_args_list[1].args[5]) == 2
+        stats = engine.get_stats()
+        assert stats['recognizer_batches'] == 2
+        assert stats['calls_per_plate'] == 2.0
+    
+    def test_canvas_size_follows_crop(self, engine):
+        """canvas_size is sized to the image instead of a fixed 2560"""
+        assert engine.canvas_size_for(100, 200) == 320
+        assert engine.canvas_size_for(4000, 200) == 2560
+
+
+class TestIoUTracker:
+    """Test IoU vehicle tracker"""
+    
+    def test_ids_are_stable_when_detection_order_changes(self):
+        """A vehicle keeps its id regardless of its index in the frame"""
+        tracker = IoUTracker(iou_threshold=0.3, max_missed_frames=2)
+        car_a = [0, 0, 100, 100]
+        car_b = [300, 0, 400, 100]
+        
+        first, _ = tracker.update([car_a, car_b])
+        second, _ = tracker.update([[305, 2, 405, 102], [3, 1, 103, 101]])
+        
+        assert second == [first[1], first[0]]
+    
+    def test_track_ends_after_max_missed_frames(self):
+        """Tracks without detections are reported as ended"""
+        tracker = IoUTracker(iou_threshold=0.3, max_missed_frames=1)
+        (track_id,), _ = tracker.update([[0, 0, 100, 100]])
+        
+        _, ended = tracker.update([])
+        assert ended == []
+        _, ended = tracker.update([])
+        assert ended == [track_id]
+        assert tracker.tracks == {}
+
+
+class TestTrackPlateCache:
+    """Test per-track plate cache"""
+    
+    def test_confidence_voting(self):
+        """The plate with the highest accumulated confidence wins"""
+        cache = TrackPlateCache(max_tracks=10, ttl_seconds=30, settle_votes=5, settle_confidence=0.99)
+        cache.record_attempt(1, 0, ('ABC-123', 0.5))
+        cache.record_attempt(1, 5, ('A8C-123', 0.7))
+        cache.record_attempt(1, 10, ('ABC-123', 0.4))
+        
+        assert cache.get(1) == ('ABC-123', 0.5)
+    
+    def test_settled_track_skips_ocr(self):
+        """A confident reading stops further OCR; failed reads retry after the interval"""
+        cache = TrackPlateCache(max_tracks=10, ttl_seconds=30, settle_votes=3, settle_confidence=0.8)
+        assert cache.should_read(1, 0, retry_interval=5)
+        
+        cache.record_attempt(1, 0, None)
+        assert not cache.should_read(1, 2, retry_interval=5)
+        assert cache.should_read(1, 5, retry_interval=5)
+        
+        cache.record_attempt(1, 5, ('ABC-123', 0.9))
+        assert not cache.should_read(1, 50, retry_interval=5)
+    
+    def test_size_bound_and_eviction(self):
+        """Oldest tracks are evicted when full; ended and expired tracks are dropped"""
+        cache = TrackPlateCache(max_tracks=2, ttl_seconds=30)
+        for track_id in (1, 2, 3):
+            cache.record_attempt(track_id, 0, ('ABC-123', 0.5))
+        
+        assert len(cache) == 2
+        assert cache.get(1) is None
+        
+        cache.discard([2])
+        assert cache.get(2) is None
+        
+        assert cache.evict_expired(now=float('inf')) == 1
+        assert len(cache) == 0
+
+
+class TestMotionGate:
+    """Test motion pre-check used to skip YOLO on static frames"""
+    
+    def test_static_scene_is_skipped_until_forced_refresh(self):
+        """Identical frames are static, but YOLO runs again every max_static_frames"""
+        gate = MotionGate(threshold=2.0, max_static_frames=2)
+        frame = np.full((120, 160, 3), 80, dtype=np.uint8)
+        
+        assert gate.is_static(frame) is False  # sin referencia
+        gate.mark_processed()
+        
+        assert gate.is_static(frame.copy()) is True
+        assert gate.is_static(frame.copy()) is True
+        assert gate.is_static(frame.copy()) is False
+        assert gate.last_score == 0.0
+    
+    def test_motion_is_detected(self):
+        """A change against the last processed frame is not static"""
+        gate = MotionGate(threshold=2.0)
+        frame = np.zeros((120, 160, 3), dtype=np.uint8)
+        gate.is_static(frame)
+        gate.mark_processed()
+        
+        moved = frame.copy()
+        moved[30:90, 40:120] = 255
+        assert gate.is_static(moved) is False
+        assert gate.last_score > 2.0
+
+
+class TestAdaptiveFrameController:
+    """Test latency-driven frame skip / OCR interval controller"""
+    
+    def make_controller(self, **kwargs):
+        params = dict(
+            target_latency_ms=100.0, frame_skip=2, ocr_interval=5,
+            max_frame_skip=6, idle_frame_skip=4, min_ocr_interval=2,
+            max_ocr_interval=15, cooldown_frames=1, smoothing=1.0, motion_threshold=2.0
+        )
+        params.update(kwargs)
+        return AdaptiveFrameController(**params)
+    
+    def test_over_budget_backs_off_ocr_then_frame_skip(self):
+        """With vehicles, OCR is throttled first; without them, frames are skipped"""
+        controller = self.make_controller()
+        
+        changes = controller.observe(200.0, vehicle_count=3, motion_score=10.0)
+        assert [(c.parameter, c.old, c.new, c.reason) for c in changes] == [
+            ('ocr_frame_interval', 5, 6, 'over_budget')
+        ]
+        
+        changes = controller.observe(200.0, vehicle_count=0, motion_score=10.0)
+        assert [(c.parameter, c.new) for c in changes] == [('frame_skip_interval', 3)]
+    
+    def test_headroom_with_activity_processes_more_frames(self):
+        """Fast frames in a busy scene lower frame skip, then the OCR interval"""
+        controller = self.make_controller()
+        
+        controller.observe(20.0, vehicle_count=2, motion_score=10.0)
+        assert controller.frame_skip == 1
+        controller.observe(20.0, vehicle_count=2, motion_score=10.0)
+        assert controller.ocr_interval == 4
+        
+        # ocr_frame_interval fijado por el cliente: no se toca
+        controller.observe(20.0, vehicle_count=2, motion_score=10.0, adjust_ocr=False)
+        assert controller.ocr_interval == 4
+    
+    def test_idle_scene_and_cooldown(self):
+        """An empty, still scene raises frame skip up to idle_frame_skip, one step per cooldown"""
+        controller = self.make_controller(cooldown_frames=2)
+        
+        assert controller.observe(20.0, vehicle_count=0, motion_score=0.5) == []
+        controller.observe(20.0, vehicle_count=0, motion_score=0.5)
+        assert controller.frame_skip == 3
+        for _ in range(10):
+            controller.observe(20.0, vehicle_count=0, motion_score=0.5)
+        assert controller.frame_skip == 4
+        
+        snapshot = controller.snapshot()
+        assert snapshot["adaptive"] is True
+        assert snapshot["frame_skip_interval"] == 4
+        assert snapshot["latency_ms"] == 20.0
+    
+    def test_activity_after_idle_restores_frame_skip(self):
+        """Busy frames after an idle period restore the pre-idle skip without latency headroom"""
+        controller = self.make_controller(target_latency_ms=120.0)
+        
+        for _ in range(5):
+            controller.observe(30.0, vehicle_count=0, motion_score=0.5)
+        assert controller.frame_skip == 4
+        
+        # 90 ms: dentro del presupuesto pero sin margen (< 120 * 0.6 = 72 ms)
+        changes = controller.observe(90.0, vehicle_count=2, motion_score=10.0)
+        assert [(c.parameter, c.old, c.new, c.reason) for c in changes] == [
+            ('frame_skip_interval', 4, 2, 'scene_active')
+        ]
+        for _ in range(5):
+            assert controller.observe(90.0, vehicle_count=2, motion_score=10.0) == []
+        assert controller.frame_skip == 2
+    
+    def test_should_process_counts_from_last_selected_frame(self):
+        """Frame selection follows the current interval"""
+        controller = self.make_controller(frame_skip=3)
+        selected = [n for n in range(1, 11) if controller.should_process(n)]
+        assert selected == [1, 4, 7, 10]
+
+
+class TestFrameContext:
+    """Test shared per-frame preprocessing"""
+    
+    @pytest.fixture
+    def frame(self):
+        rng = np.random.default_rng(7)
+        return rng.integers(0, 255, size=(360, 640, 3), dtype=np.uint8)
+    
+    def test_derived_images_are_memoized_and_buffers_reused(self, frame):
+        """Each derived image is computed once per frame; buffers are reused by the next frame"""
+        pool = FrameBufferPool()
+        context = FrameContext(frame, pool)
+        
+        small, scale_x, scale_y = context.downscaled(320, 240)
+        assert small.shape == (180, 320, 3)
+        assert (scale_x, scale_y) == (2.0, 2.0)
+        assert context.downscaled(320, 320)[0] is small  # mismo tamaño de salida
+        assert context.hsv((10, 10, 50, 90)) is context.hsv((10, 10, 50, 90))
+        allocations = pool.allocations
+        
+        next_context = FrameContext(frame.copy(), pool)
+        assert next_context.downscaled(320, 240)[0] is small
+        next_context.hsv((10, 10, 50, 90))
+        assert pool.allocations == allocations
+    
+    def test_roi_results_match_full_frame(self, frame):
+        """ROI views give the same pixels as processing the whole frame"""
+        context = FrameContext(frame)
+        roi = (100, 50, 300, 200)
+        
+        assert context.roi(roi).base is not None  # vista, no copia
+        np.testing.assert_array_equal(
+            context.hsv(roi), cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)[50:200, 100:300]
+        )
+        full_blur = cv2.GaussianBlur(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        np.testing.assert_array_equal(context.blurred(roi), full_blur[50:200, 100:300])
+        assert context.clip((-10, -10, 5000, 5000)) == (0, 0, 640, 360)
+    
+    def test_lane_detector_accepts_context(self):
+        """Lane lines found in the ROI are reported in frame coordinates"""
+        image = np.zeros((360, 640, 3), dtype=np.uint8)
+        cv2.line(image, (100, 359), (250, 220), (255, 255, 255), 5)
+        
+        result = SimpleLaneDetector().detect(FrameContext(image))
+        
+        assert 'left' in result['lanes']
+        left = result['lanes']['left']
+        assert left['slope'] < 0
+        # La recta pasa por (100, 359) en coordenadas del frame
+        assert abs(left['slope'] * 100 + left['intercept'] - 359) < 15
+
+
+class TestInfractionFlushQueue:
+    """Test InfractionFlushQueue functionality"""
+    
+    @pytest.fixture
+    def queue(self):
+        """Create a queue with small batches and no real backoff for testing"""
+        return InfractionFlushQueue(max_batch=3, max_wait_ms=20, max_retries=2, backoff_base_s=0.001)
+    
+    @staticmethod
+    def bulk_response(detections):
+        return {
+            'received': len(detections),
+            'created': len(detections),
+            'infractions': [
+                {'id': f"id-{d['detection_id']}", 'driver': {'document_number': '12345678'}}
+                for d in detections
+            ]
+        }
+    
+    @pytest.mark.asyncio
+    async def test_infractions_are_sent_in_bounded_batches(self, queue):
+        """Infractions from several frames are coalesced into bulk requests"""
+        batch_sizes = []
+        
+        async def fake_bulk(detections, device_id=None):
+            batch_sizes.append(len(detections))
+            return self.bulk_response(detections)
+        
+        with patch('app.services.infraction_queue.django_api') as mock_api:
+            mock_api.bulk_create_infractions = AsyncMock(side_effect=fake_bulk)
+            mock_api.predict_recidivism = AsyncMock(return_value={'recidivism_probability': 0.5})
+            
+            for frame in range(4):
+                queue.enqueue([{'detection_id': f"{frame}-{i}"} for i in range(2)])
+            await asyncio.sleep(0.1)
+            
+            assert sum(batch_sizes) == 8
+            assert max(batch_sizes) <= 3
+            assert len(batch_sizes) < 8
+            assert mock_api.predict_recidivism.await_count == 8
+        
+        assert queue.get_stats()['infractions_created'] == 8
+        await queue.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_transient_errors_are_retried(self, queue):
+        """Connection errors and 5xx responses are retried with backoff"""
+        request = httpx.Request('POST', 'http://django/api/infractions/bulk/')
+        responses = [
+            httpx.ConnectError("connection refused", request=request),
+            httpx.HTTPStatusError("unavailable", request=request, response=httpx.Response(503, request=request)),
+            self.bulk_response([{'detection_id': 'a'}]),
+        ]
+        
+        with patch('app.services.infraction_queue.django_api') as mock_api:
+            mock_api.bulk_create_infractions = AsyncMock(side_effect=responses)
+            mock_api.predict_recidivism = AsyncMock(return_value=None)
+            
+            queue.enqueue([{'detection_id': 'a'}])
+            await asyncio.sleep(0.1)
+            
+            assert mock_api.bulk_create_infractions.await_count == 3
+        
+        stats = queue.get_stats()
+        assert stats['retries'] == 2
+        assert stats['dropped'] == 0
+        assert stats['infractions_created'] == 1
+        await queue.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_client_errors_drop_the_batch(self, queue):
+        """A 4xx response is not retried"""
+        request = httpx.Request('POST', 'http://django/api/infractions/bulk/')
+        error = httpx.HTTPStatusError("bad request", request=request, response=httpx.Response(400, request=request))
+        
+        with patch('app.services.infraction_queue.django_api') as mock_api:
+            mock_api.bulk_create_infractions = AsyncMock(side_effect=error)
+            
+            queue.enqueue([{'detection_id': 'a'}, {'detection_id': 'b'}])
+            await asyncio.sleep(0.1)
+            
+            mock_api.bulk_create_infractions.assert_awaited_once()
+        
+        assert queue.get_stats()['dropped'] == 2
+        assert len(queue) == 0
+        await queue.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_pending_queue_is_bounded(self):
+        """When Django is down the oldest infractions are dropped"""
+        queue = InfractionFlushQueue(max_batch=10, max_wait_ms=10_000, max_pending=3)
+        
+        queue.enqueue([{'detection_id': str(i)} for i in range(5)])
+        
+        assert len(queue) == 3
+        assert queue.get_stats()['dropped'] == 2
+        
+        with patch('app.services.infraction_queue.django_api') as mock_api:
+            mock_api.bulk_create_infractions = AsyncMock(side_effect=self.bulk_response)
+            mock_api.predict_recidivism = AsyncMock(return_value=None)
+            
+            await queue.shutdown()
+            
+            sent = mock_api.bulk_create_infractions.await_args.args[0]
+            assert [d['detection_id'] for d in sent] == ['2', '3', '4']
+        assert len(queue) == 0
+    
+    @pytest.mark.asyncio
+    async def test_shutdown_keeps_in_flight_batch(self):
+        """A batch taken by the worker but not confirmed is flushed on shutdown"""
+        queue = InfractionFlushQueue(max_batch=10, max_wait_ms=0)
+        started = asyncio.Event()
+        calls = []
+        
+        async def fake_bulk(detections, device_id=None):
+            calls.append([d['detection_id'] for d in detections])
+            if len(calls) == 1:
+                started.set()
+                await asyncio.sleep(10)
+            return self.bulk_response(detections)
+        
+        with patch('app.services.infraction_queue.django_api') as mock_api:
+            mock_api.bulk_create_infractions = AsyncMock(side_effect=fake_bulk)
+            mock_api.predict_recidivism = AsyncMock(return_value=None)
+            
+            queue.enqueue([{'detection_id': 'a'}, {'detection_id': 'b'}])
+            await asyncio.wait_for(started.wait(), 1)
+            assert len(queue) == 0
+            
+            await queue.shutdown()
+        
+        assert calls == [['a', 'b'], ['a', 'b']]
+        assert queue.get_stats()['infractions_created'] == 2
+        assert len(queue) == 0
+    
+    @pytest.mark.asyncio
+    async def test_slow_predictions_do_not_block_batches(self):
+        """Predictions run beside the worker and are cut off at the timeout"""
+        queue = InfractionFlushQueue(max_batch=2, max_wait_ms=0, prediction_timeout_s=0.05)
+        
+        async def fake_bulk(detections, device_id=None):
+            return self.bulk_response(detections)
+        
+        async def slow_predict(**kwargs):
+            await asyncio.sleep(10)
+        
+        with patch('app.services.infraction_queue.django_api') as mock_api:
+            mock_api.bulk_create_infractions = AsyncMock(side_effect=fake_bulk)
+            mock_api.predict_recidivism = AsyncMock(side_effect=slow_predict)
+            
+            queue.enqueue([{'detection_id': 'a'}, {'detection_id': 'b'}])
+            await asyncio.sleep(0.01)
+            queue.enqueue([{'detection_id': 'c'}, {'detection_id': 'd'}])
+            await asyncio.sleep(0.01)
+            
+            assert mock_api.bulk_create_infractions.await_count == 2
+            assert queue.get_stats()['predictions_in_flight'] == 2
+            
+            await queue.shutdown()
+        
+        stats = queue.get_stats()
+        assert stats['prediction_timeouts'] == 2
+        assert stats['predictions_in_flight'] == 0
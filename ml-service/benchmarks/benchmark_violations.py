@@ -13,12 +13,17 @@ import statistics
 from contextlib import contextmanager
 import psutil
 import os
+import json
+import socketserver
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 from ..violation_detector import (
     ViolationDetector, TrafficViolation, ViolationType, ViolationSeverity, ViolationLocation
 )
 from ..lane_detector import LaneDetector
-from ..notification_system import NotificationSystem, NotificationChannel
+from ..notification_system import NotificationSystem, NotificationChannel, NotificationConfig
 from ..violation_manager import ViolationManager
 from ...speed.speed_analyzer import SpeedViolation
 from ...tracking.vehicle_tracker import TrackedVehicle
@@ -504,6 +509,183 @@ class BenchmarkNotificationSystem:
         assert throughput > 50  # Should handle >50 alerts per second
 
 
+class _StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server session (no TLS/auth) counting messages."""
+    
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.wfile.write(b"220 stand-in ESMTP\r\n")
+        
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.strip().upper()
+            if command.startswith(b"EHLO") or command.startswith(b"HELO"):
+                self.wfile.write(b"250 stand-in\r\n")
+            elif command == b"DATA":
+                self.wfile.write(b"354 end with .\r\n")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with server.lock:
+                    server.messages += 1
+                self.wfile.write(b"250 OK\r\n")
+            elif command == b"QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                # MAIL, RCPT, RSET, NOOP
+                self.wfile.write(b"250 OK\r\n")
+
+
+class _StandInWebhookHandler(BaseHTTPRequestHandler):
+    """Keep-alive HTTP endpoint counting requests and alerts."""
+    
+    protocol_version = "HTTP/1.1"
+    
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.alerts += payload.get("count", 1)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class BenchmarkNotificationDispatcher:
+    """Benchmark notification dispatch against local SMTP and HTTP stand-ins."""
+    
+    def setup_method(self):
+        """Setup benchmark fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.smtp_server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _StandInSMTPHandler)
+        self.smtp_server.daemon_threads = True
+        self.smtp_server.lock = threading.Lock()
+        self.smtp_server.connections = 0
+        self.smtp_server.messages = 0
+        
+        self.http_server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInWebhookHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.lock = threading.Lock()
+        self.http_server.requests = 0
+        self.http_server.alerts = 0
+        
+        for server in (self.smtp_server, self.http_server):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        
+        self.test_violations = [
+            TrafficViolation(
+                violation_id=f"burst_violation_{i}",
+                timestamp=time.time(),
+                violation_type=ViolationType.SPEED_VIOLATION,
+                severity=ViolationSeverity.MODERATE,
+                vehicle_id=i % 50,
+                description=f"Burst violation {i}",
+                confidence=0.9,
+                location=ViolationLocation(f"zone_{i % 5}", f"Zone {i % 5}", (100, 100)),
+                speed_limit=60.0,
+                measured_speed=85.0
+            )
+            for i in range(500)
+        ]
+    
+    def teardown_method(self):
+        """Stop stand-in servers."""
+        self.smtp_server.shutdown()
+        self.smtp_server.server_close()
+        self.http_server.shutdown()
+        self.http_server.server_close()
+    
+    def _notification_system(self, digest_size: int, digest_window: float, workers: int) -> NotificationSystem:
+        system = NotificationSystem()
+        system.db_path = os.path.join(self.temp_dir, "notifications.db")
+        system._init_database()
+        system.notification_configs[NotificationChannel.DATABASE].config["db_path"] = system.db_path
+        system.notification_configs[NotificationChannel.FILE].enabled = False
+        
+        system.add_notification_config(NotificationConfig(
+            channel=NotificationChannel.EMAIL,
+            enabled=True,
+            config={
+                "smtp_server": "127.0.0.1",
+                "smtp_port": self.smtp_server.server_address[1],
+                "from_email": "alerts@example.com",
+                "to_emails": ["ops@example.com"],
+                "use_tls": False
+            },
+            digest_size=digest_size,
+            digest_window=digest_window,
+            workers=workers
+        ))
+        system.add_notification_config(NotificationConfig(
+            channel=NotificationChannel.WEBHOOK,
+            enabled=True,
+            config={"url": f"http://127.0.0.1:{self.http_server.server_address[1]}/alerts", "timeout": 10},
+            digest_size=digest_size,
+            digest_window=digest_window,
+            workers=workers
+        ))
+        return system
+    
+    def _run_burst(self, label: str, digest_size: int, digest_window: float, workers: int) -> float:
+        system = self._notification_system(digest_size, digest_window, workers)
+        system.start()
+        
+        messages_before = self.smtp_server.messages
+        requests_before = self.http_server.requests
+        channels = [NotificationChannel.EMAIL, NotificationChannel.WEBHOOK]
+        
+        enqueue_times = []
+        start_time = time.perf_counter()
+        for violation in self.test_violations:
+            enqueue_start = time.perf_counter()
+            system.send_violation_alert(violation, channels=channels)
+            enqueue_times.append(time.perf_counter() - enqueue_start)
+        
+        def delivered(channel):
+            stats = system.dispatcher.stats.get(channel, {})
+            return stats.get("delivered", 0) + stats.get("failed", 0)
+        
+        while min(delivered(channel) for channel in channels) < len(self.test_violations):
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - start_time
+        system.stop()
+        
+        enqueue_times.sort()
+        throughput = len(self.test_violations) / elapsed
+        print(f"{label:<24} {throughput:8.1f} alerts/sec | "
+              f"enqueue p50 {enqueue_times[len(enqueue_times) // 2] * 1e6:6.1f}us "
+              f"p99 {enqueue_times[int(len(enqueue_times) * 0.99)] * 1e6:7.1f}us | "
+              f"{self.smtp_server.messages - messages_before} emails, "
+              f"{self.http_server.requests - requests_before} webhook requests")
+        
+        stats = system.dispatcher.get_statistics()["channels"]
+        assert stats["email"]["delivered"] == len(self.test_violations)
+        assert stats["webhook"]["delivered"] == len(self.test_violations)
+        return throughput
+    
+    def test_burst_dispatch(self):
+        """Benchmark a burst of violations over email and webhook."""
+        print("\n=== Notification Dispatch Burst Benchmark ===")
+        
+        per_alert = self._run_burst("one message per alert", digest_size=1, digest_window=0.0, workers=1)
+        digest = self._run_burst("digests of 50", digest_size=50, digest_window=0.2, workers=2)
+        
+        print(f"SMTP connections opened: {self.smtp_server.connections}")
+        
+        assert digest > per_alert
+        # Sessions are reused, not opened per alert
+        assert self.smtp_server.connections < 10
+
+
 class BenchmarkViolationManager:
     """Benchmark violation manager performance."""
     
@@ -667,6 +849,11 @@ def run_all_benchmarks():
     notification_bench.test_violation_alert_performance()
     notification_bench.test_notification_throughput()
     
+    dispatcher_bench = BenchmarkNotificationDispatcher()
+    dispatcher_bench.setup_method()
+    dispatcher_bench.test_burst_dispatch()
+    dispatcher_bench.teardown_method()
+    
     # Violation Manager Benchmarks
     print("\n" + "="*40)
     print("VIOLATION MANAGER BENCHMARKS")
@@ -384,6 +384,37 @@ class YOLOv8Benchmark:
         self.results["memory_benchmark"] = memory_results
         return memory_results
     
+    def run_postprocess_benchmark(self, iterations: int = 100, batch_sizes=(1, 4, 8)) -> Dict[str, Any]:
+        """
+        Run postprocessing micro-benchmark (reported separately from inference)
+        
+        Args:
+            iterations: Iterations per batch size
+            batch_sizes: Batch sizes to test
+            
+        Returns:
+            Postprocess benchmark results per batch size
+        """
+        console.print("[bold blue]🧮 Running Postprocess Benchmark[/bold blue]")
+        
+        results = {}
+        for batch_size in batch_sizes:
+            try:
+                result = self.detector.benchmark_postprocess(iterations, batch_size=batch_size)
+            except Exception as e:
+                # Static-batch ONNX exports only accept batch_size=1
+                console.print(f"  ⚠️ batch={batch_size} not supported by model: {e}")
+                continue
+            
+            results[f"batch_{batch_size}"] = result
+            console.print(
+                f"  batch={batch_size}: inference {result['inference_time_ms']['per_frame_mean']:.2f}ms/frame, "
+                f"postprocess {result['postprocessing_time_ms']['per_frame_mean']:.3f}ms/frame"
+            )
+        
+        self.results["postprocess_benchmark"] = results
+        return results
+    
     def generate_report(self) -> str:
         """Generate comprehensive benchmark report"""
         console.print("[bold cyan]📊 Generating Benchmark Report[/bold cyan]")
@@ -467,6 +498,8 @@ def main():
                        help="Skip stress test")
     parser.add_argument("--skip-memory", action="store_true",
                        help="Skip memory benchmark")
+    parser.add_argument("--skip-postprocess", action="store_true",
+                       help="Skip postprocess micro-benchmark")
     
     args = parser.parse_args()
     
@@ -502,6 +535,10 @@ def main():
         if not args.skip_memory:
             benchmark.run_memory_benchmark()
         
+        # 5. Postprocess micro-benchmark
+        if not args.skip_postprocess:
+            benchmark.run_postprocess_benchmark(args.latency_iterations)
+        
         # Generate report
         report_file = benchmark.generate_report()
         
@@ -29,6 +29,8 @@ class MLSettings(BaseSettings):
     DATASETS_DIR: Path = BASE_DIR / "datasets"
     OUTPUTS_DIR: Path = BASE_DIR / "outputs"
     LOGS_DIR: Path = BASE_DIR / "logs"
+    EVIDENCE_SPILL_DIR: Path = OUTPUTS_DIR / "evidence"
+    EVIDENCE_SPILL_MAX_FILES: int = 2000  # Oldest spilled snapshots are deleted past this
     
     # YOLOv8 Detection Settings
     YOLO_MODEL_SIZE: str = "x"  # n, s, m, l, x
@@ -214,6 +214,23 @@ class YOLOv8VehicleDetector:
         
         return tensor, scale
     
+    def _letterbox_padding(self, original_shape: Tuple[int, int], scale: float) -> Tuple[int, int]:
+        """Padding offsets (pad_x, pad_y) applied by preprocess for a frame shape"""
+        original_height, original_width = original_shape[:2]
+        new_width = int(original_width * scale)
+        new_height = int(original_height * scale)
+        return (self.input_size[0] - new_width) // 2, (self.input_size[1] - new_height) // 2
+    
+    def _class_mask(self, num_classes: int) -> np.ndarray:
+        """Boolean lookup table of vehicle classes indexed by class id"""
+        mask = getattr(self, '_vehicle_class_mask', None)
+        if mask is None or mask.shape[0] != num_classes:
+            mask = np.zeros(num_classes, dtype=bool)
+            valid = [c for c in self.vehicle_classes if 0 <= c < num_classes]
+            mask[valid] = True
+            self._vehicle_class_mask = mask
+        return mask
+    
     def postprocess(
         self, 
         outputs: List[np.ndarray], 
@@ -234,100 +251,162 @@ class YOLOv8VehicleDetector:
         if not outputs or len(outputs) == 0:
             return []
         
-        # YOLOv8 output format: [batch, 84, 8400] where 84 = 4 bbox + 80 classes
-        predictions = outputs[0]
+        predictions = np.asarray(outputs[0])
+        if predictions.ndim == 2:
+            predictions = predictions[np.newaxis]
         
-        if len(predictions.shape) == 3:
-            predictions = predictions[0]  # Remove batch dimension
-        
-        # Transpose to [8400, 84]
-        if predictions.shape[0] == 84:
-            predictions = predictions.T
+        return self.postprocess_batch(predictions[:1], [scale], [original_shape])[0]
+    
+    def postprocess_batch(
+        self,
+        predictions: np.ndarray,
+        scales: List[float],
+        original_shapes: List[Tuple[int, int]]
+    ) -> List[List[Detection]]:
+        """
+        Vectorized postprocessing for a batch of YOLOv8 outputs
         
-        detections = []
+        Class selection, confidence filtering, box conversion and clamping
+        run as array operations over all anchors; Detection objects are only
+        built for boxes that survive per-class NMS.
         
-        for prediction in predictions:
-            # Extract bbox and confidence
-            x_center, y_center, width, height = prediction[:4]
-            class_scores = prediction[4:]
-            
-            # Find best class
-            class_id = np.argmax(class_scores)
-            confidence = class_scores[class_id]
-            
-            # Filter by confidence and vehicle classes
-            if confidence < self.confidence_threshold or class_id not in self.vehicle_classes:
-                continue
-            
-            # Convert to corner coordinates
-            x1 = int((x_center - width / 2) / scale)
-            y1 = int((y_center - height / 2) / scale)
-            x2 = int((x_center + width / 2) / scale)
-            y2 = int((y_center + height / 2) / scale)
-            
-            # Clamp to image bounds
-            x1 = max(0, min(x1, original_shape[1]))
-            y1 = max(0, min(y1, original_shape[0]))
-            x2 = max(0, min(x2, original_shape[1]))
-            y2 = max(0, min(y2, original_shape[0]))
+        Args:
+            predictions: Raw output with shape [batch, 4 + classes, anchors]
+                (or already transposed to [batch, anchors, 4 + classes])
+            scales: Scale factor from preprocessing, one per frame
+            original_shapes: Original frame dimensions (height, width), one per frame
             
-            # Skip invalid boxes
-            if x2 <= x1 or y2 <= y1:
+        Returns:
+            List of vehicle detections per frame
+        """
+        predictions = np.asarray(predictions)
+        if predictions.ndim == 2:
+            predictions = predictions[np.newaxis]
+        
+        # YOLOv8 output format: [batch, 84, 8400] -> [batch, 8400, 84]
+        if predictions.shape[1] < predictions.shape[2]:
+            predictions = predictions.transpose(0, 2, 1)
+        
+        class_scores = predictions[..., 4:]
+        class_ids = class_scores.argmax(axis=2)
+        confidences = np.take_along_axis(class_scores, class_ids[..., np.newaxis], axis=2)[..., 0]
+        
+        # Filter by confidence and vehicle classes for every anchor at once
+        candidates = (confidences >= self.confidence_threshold) & \
+            self._class_mask(class_scores.shape[2])[class_ids]
+        
+        batch_detections = []
+        for i in range(predictions.shape[0]):
+            indices = np.flatnonzero(candidates[i])
+            if indices.size == 0:
+                batch_detections.append([])
                 continue
             
-            # Calculate center and area
-            center_x = (x1 + x2) // 2
-            center_y = (y1 + y2) // 2
-            area = (x2 - x1) * (y2 - y1)
-            
-            detection = Detection(
+            batch_detections.append(self._build_detections(
+                predictions[i, indices, :4],
+                confidences[i, indices],
+                class_ids[i, indices],
+                scales[i],
+                original_shapes[i]
+            ))
+        
+        return batch_detections
+    
+    def _build_detections(
+        self,
+        boxes_xywh: np.ndarray,
+        confidences: np.ndarray,
+        class_ids: np.ndarray,
+        scale: float,
+        original_shape: Tuple[int, int]
+    ) -> List[Detection]:
+        """Convert candidate boxes to image coordinates, run NMS and build detections"""
+        original_height, original_width = original_shape[:2]
+        pad_x, pad_y = self._letterbox_padding(original_shape, scale)
+        
+        # Convert center format to corner coordinates in the original frame
+        x_center, y_center, width, height = boxes_xywh.T
+        corners = np.stack([
+            x_center - width / 2 - pad_x,
+            y_center - height / 2 - pad_y,
+            x_center + width / 2 - pad_x,
+            y_center + height / 2 - pad_y
+        ], axis=1) / scale
+        corners = corners.astype(np.int32)
+        
+        # Clamp to image bounds
+        np.clip(corners[:, 0::2], 0, original_width, out=corners[:, 0::2])
+        np.clip(corners[:, 1::2], 0, original_height, out=corners[:, 1::2])
+        
+        # Skip invalid boxes
+        valid = (corners[:, 2] > corners[:, 0]) & (corners[:, 3] > corners[:, 1])
+        corners, confidences, class_ids = corners[valid], confidences[valid], class_ids[valid]
+        
+        if len(corners) == 0:
+            return []
+        
+        # Apply Non-Maximum Suppression
+        keep = self._nms_indices(corners, confidences, class_ids)
+        
+        detections = []
+        for (x1, y1, x2, y2), confidence, class_id in zip(
+            corners[keep].tolist(), confidences[keep].tolist(), class_ids[keep].tolist()
+        ):
+            detections.append(Detection(
                 class_id=class_id,
                 class_name=self.class_names.get(class_id, f"class_{class_id}"),
-                confidence=float(confidence),
+                confidence=confidence,
                 bbox=(x1, y1, x2, y2),
-                center=(center_x, center_y),
-                area=area
-            )
-            
-            detections.append(detection)
-        
-        # Apply Non-Maximum Suppression
-        if len(detections) > 1:
-            detections = self._apply_nms(detections)
+                center=((x1 + x2) // 2, (y1 + y2) // 2),
+                area=(x2 - x1) * (y2 - y1)
+            ))
         
         return detections
     
-    def _apply_nms(self, detections: List[Detection]) -> List[Detection]:
-        """Apply Non-Maximum Suppression to remove duplicate detections"""
-        if len(detections) <= 1:
-            return detections
+    def _nms_indices(
+        self,
+        corners: np.ndarray,
+        confidences: np.ndarray,
+        class_ids: np.ndarray
+    ) -> np.ndarray:
+        """
+        Per-class NMS in a single cv2.dnn.NMSBoxes call
+        
+        Boxes of each class are shifted by a class-dependent offset so that
+        boxes of different classes never overlap.
+        """
+        if len(corners) <= 1:
+            return np.arange(len(corners))
         
-        # Prepare data for cv2.dnn.NMSBoxes
-        boxes = []
-        scores = []
+        offsets = class_ids.astype(np.float32)[:, np.newaxis] * (float(corners.max()) + 1.0)
+        shifted = corners.astype(np.float32) + offsets
         
-        for det in detections:
-            x1, y1, x2, y2 = det.bbox
-            boxes.append([x1, y1, x2 - x1, y2 - y1])  # Convert to x, y, w, h
-            scores.append(det.confidence)
+        # cv2.dnn.NMSBoxes expects x, y, w, h
+        boxes = np.concatenate([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]], axis=1)
         
-        # Apply NMS
         indices = cv2.dnn.NMSBoxes(
-            boxes, 
-            scores, 
-            self.confidence_threshold, 
-            self.nms_threshold
+            boxes.tolist(),
+            confidences.astype(np.float32).tolist(),
+            self.confidence_threshold,
+            self.nms_threshold,
+            top_k=ml_settings.MAX_DETECTIONS
         )
         
         if len(indices) == 0:
-            return []
+            return np.empty(0, dtype=np.int64)
+        
+        return np.asarray(indices).flatten()
+    
+    def _apply_nms(self, detections: List[Detection]) -> List[Detection]:
+        """Apply Non-Maximum Suppression to remove duplicate detections"""
+        if len(detections) <= 1:
+            return detections
         
-        # Return filtered detections
-        filtered_detections = []
-        for i in indices.flatten():
-            filtered_detections.append(detections[i])
+        corners = np.array([det.bbox for det in detections], dtype=np.int32)
+        confidences = np.array([det.confidence for det in detections], dtype=np.float32)
+        class_ids = np.array([det.class_id for det in detections], dtype=np.int64)
         
-        return filtered_detections
+        return [detections[i] for i in self._nms_indices(corners, confidences, class_ids)]
     
     def detect(self, frame: np.ndarray) -> Tuple[List[Detection], PerformanceMetrics]:
         """
@@ -376,6 +455,55 @@ class YOLOv8VehicleDetector:
         
         return detections, metrics
     
+    def detect_batch(self, frames: List[np.ndarray]) -> Tuple[List[List[Detection]], PerformanceMetrics]:
+        """
+        Detect vehicles in several frames with one ONNX Runtime call
+        
+        Requires a model exported with a dynamic batch dimension.
+        
+        Args:
+            frames: Input frames (BGR format)
+            
+        Returns:
+            Tuple of (detections per frame, performance_metrics for the batch)
+        """
+        if not frames:
+            return [], PerformanceMetrics(0.0, 0.0, 0.0, 0.0, 0.0, 0)
+        
+        total_start = time.time()
+        
+        # Preprocessing
+        preprocess_start = time.time()
+        tensors, scales = zip(*(self.preprocess(frame) for frame in frames))
+        input_tensor = np.concatenate(tensors, axis=0)
+        preprocess_time = (time.time() - preprocess_start) * 1000
+        
+        # Inference
+        inference_start = time.time()
+        outputs = self.session.run(self.output_names, {self.input_name: input_tensor})
+        inference_time = (time.time() - inference_start) * 1000
+        
+        # Postprocessing
+        postprocess_start = time.time()
+        batch_detections = self.postprocess_batch(
+            outputs[0], list(scales), [frame.shape[:2] for frame in frames]
+        )
+        postprocess_time = (time.time() - postprocess_start) * 1000
+        
+        total_time = (time.time() - total_start) * 1000
+        fps = len(frames) * 1000 / total_time if total_time > 0 else 0
+        
+        metrics = PerformanceMetrics(
+            inference_time_ms=inference_time,
+            preprocessing_time_ms=preprocess_time,
+            postprocessing_time_ms=postprocess_time,
+            total_time_ms=total_time,
+            fps=fps,
+            detections_count=sum(len(d) for d in batch_detections)
+        )
+        
+        return batch_detections, metrics
+    
     def get_average_performance(self, last_n: int = 50) -> Dict[str, float]:
         """Get average performance metrics from recent detections"""
         if not self.performance_history:
@@ -536,6 +664,71 @@ class YOLOv8VehicleDetector:
         
         return benchmark_results
 
+    
+    def benchmark_postprocess(self, num_iterations: int = 100, batch_size: int = 1) -> Dict[str, Any]:
+        """
+        Micro-benchmark of postprocessing, reported separately from inference
+        
+        Runs inference once per iteration on a dummy batch and times
+        postprocess_batch on the resulting raw outputs.
+        
+        Args:
+            num_iterations: Number of test iterations
+            batch_size: Frames per inference/postprocess call
+            
+        Returns:
+            Benchmark results
+        """
+        logger.info(f"Running postprocess benchmark: {num_iterations} iterations, batch={batch_size}")
+        
+        dummy_frames = [
+            np.random.randint(0, 255, (720, 1280, 3), dtype=np.uint8)
+            for _ in range(batch_size)
+        ]
+        tensors, scales = zip(*(self.preprocess(frame) for frame in dummy_frames))
+        input_tensor = np.concatenate(tensors, axis=0)
+        shapes = [frame.shape[:2] for frame in dummy_frames]
+        
+        inference_times = []
+        postprocess_times = []
+        detections_counts = []
+        
+        for _ in range(num_iterations):
+            start = time.perf_counter()
+            outputs = self.session.run(self.output_names, {self.input_name: input_tensor})
+            inference_times.append((time.perf_counter() - start) * 1000)
+            
+            start = time.perf_counter()
+            batch_detections = self.postprocess_batch(outputs[0], list(scales), shapes)
+            postprocess_times.append((time.perf_counter() - start) * 1000)
+            detections_counts.append(sum(len(d) for d in batch_detections))
+        
+        def _stats(values: List[float]) -> Dict[str, float]:
+            return {
+                "mean": np.mean(values),
+                "std": np.std(values),
+                "min": np.min(values),
+                "max": np.max(values),
+                "p95": np.percentile(values, 95),
+                "per_frame_mean": np.mean(values) / batch_size
+            }
+        
+        results = {
+            "iterations": num_iterations,
+            "batch_size": batch_size,
+            "inference_time_ms": _stats(inference_times),
+            "postprocessing_time_ms": _stats(postprocess_times),
+            "postprocess_share": float(np.sum(postprocess_times) / max(np.sum(inference_times) + np.sum(postprocess_times), 1e-9)),
+            "avg_detections": float(np.mean(detections_counts))
+        }
+        
+        logger.info(f"Postprocess benchmark completed:")
+        logger.info(f"  Average inference time: {results['inference_time_ms']['mean']:.2f}ms")
+        logger.info(f"  Average postprocess time: {results['postprocessing_time_ms']['mean']:.3f}ms")
+        logger.info(f"  Postprocess share of inference+postprocess: {results['postprocess_share'] * 100:.1f}%")
+        
+        return results
+
 
 def create_detector(model_path: Optional[Path] = None) -> YOLOv8VehicleDetector:
     """Factory function to create a YOLOv8 vehicle detector"""
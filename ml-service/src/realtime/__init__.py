@@ -7,6 +7,7 @@ complete real-time traffic analysis system.
 
 from .analysis_pipeline import RealTimeAnalysisPipeline, PipelineConfig, StreamProcessor
 from .stream_service import VideoStreamService, StreamConfig, MultiStreamManager
+from .frame_ring import SharedFrameRing
 from .monitoring import PerformanceMonitor, ViolationAnalytics, SystemMetrics, AlertRule
 
 __all__ = [
@@ -19,6 +20,7 @@ __all__ = [
     'VideoStreamService',
     'StreamConfig',
     'MultiStreamManager',
+    'SharedFrameRing',
     
     # Monitoring and analytics
     'PerformanceMonitor',
@@ -23,6 +23,7 @@ from ..plate_recognition.plate_detector import PlateDetector, PlateResult
 from ..speed.speed_analyzer import SpeedAnalyzer, SpeedViolation
 from ..violations.violation_manager import ViolationManager, TrafficViolation
 from ..violations.notification_system import NotificationSystem
+from .stage_executor import StagePipelineExecutor, PipelineStage
 
 
 @dataclass
@@ -49,6 +50,13 @@ class StreamMetrics:
     errors_count: int = 0
     last_error: Optional[str] = None
     
+    # Pipelined execution: stages overlap, so throughput is bound by the
+    # slowest stage and queue depths show where frames are piling up
+    pipelined: bool = False
+    frames_dropped: int = 0
+    queue_depths: Dict[str, int] = field(default_factory=dict)
+    bottleneck_stage: Optional[str] = None
+    
     def update_timing(self, stage: str, duration_ms: float):
         """Update timing metrics for a specific stage."""
         if stage == "detection":
@@ -70,8 +78,23 @@ class StreamMetrics:
             self.violation_detection_time_ms
         )
         
-        if self.total_processing_time_ms > 0:
+        if self.pipelined:
+            stage_times = {
+                "detection": self.detection_time_ms,
+                "tracking": self.tracking_time_ms,
+                "plate_recognition": self.plate_recognition_time_ms,
+                "speed_analysis": self.speed_analysis_time_ms,
+                "violation_detection": self.violation_detection_time_ms
+            }
+            self.bottleneck_stage = max(stage_times, key=stage_times.get)
+            if stage_times[self.bottleneck_stage] > 0:
+                self.fps = 1000.0 / stage_times[self.bottleneck_stage]
+        elif self.total_processing_time_ms > 0:
             self.fps = 1000.0 / self.total_processing_time_ms
+    
+    def update_queues(self, depths: Dict[str, int]):
+        """Update the backlog of each stage input queue."""
+        self.queue_depths = dict(depths)
 
 
 @dataclass
@@ -103,6 +126,8 @@ class PipelineConfig:
     
     # Stream processing configuration
     target_fps: float = 30.0
+    pipelined_execution: bool = True  # One worker per stage instead of back-to-back stages
+    stage_queue_size: int = 4  # Frames waiting per stage before dropping the oldest
     max_frame_buffer_size: int = 300  # 10 seconds at 30fps
     reconnect_delay_seconds: float = 5.0
     
@@ -186,6 +211,11 @@ class RealTimeAnalysisPipeline:
         
         # Threading for async processing
         self._processing_lock = threading.Lock()
+        
+        # Stage executor (pipelined mode)
+        self._executor: Optional[StagePipelineExecutor] = None
+        self._next_frame_id = 0
+        self._last_completion: Optional[float] = None
     
     def _init_components(self):
         """Initialize all ML components."""
@@ -288,15 +318,7 @@ class RealTimeAnalysisPipeline:
             processing_time = (time.perf_counter() - processing_start) * 1000
             result.processing_time_ms = processing_time
             
-            self._update_metrics(result)
-            
-            # Call callbacks
-            for callback in self.result_callbacks:
-                try:
-                    callback(result)
-                except Exception as e:
-                    self.logger.error(f"Result callback error: {e}")
-            
+            self._finalize_result(result)
             return result
             
         except Exception as e:
@@ -317,74 +339,177 @@ class RealTimeAnalysisPipeline:
             )
     
     def _process_frame_internal(self, frame_data: FrameData) -> ProcessingResult:
-        """Internal frame processing logic."""
-        detections = []
-        tracked_vehicles = []
-        plate_results = []
-        speed_violations = []
-        traffic_violations = []
-        
-        # Stage 1: Vehicle Detection
-        detection_start = time.perf_counter()
-        detections = self.detector.detect(frame_data.frame)
-        detection_time = (time.perf_counter() - detection_start) * 1000
-        self.metrics.update_timing("detection", detection_time)
-        
-        self.logger.debug(f"Detected {len(detections)} vehicles in {detection_time:.1f}ms")
-        
-        # Stage 2: Vehicle Tracking
-        tracking_start = time.perf_counter()
-        tracked_vehicles = self.tracker.update(detections, frame_data.frame)
-        tracking_time = (time.perf_counter() - tracking_start) * 1000
-        self.metrics.update_timing("tracking", tracking_time)
-        
-        self.logger.debug(f"Tracking {len(tracked_vehicles)} vehicles in {tracking_time:.1f}ms")
-        
-        # Stage 3: Plate Recognition (if enabled and vehicles detected)
-        if self.plate_detector and tracked_vehicles:
-            plate_start = time.perf_counter()
-            plate_results = self._process_plate_recognition(tracked_vehicles, frame_data.frame)
-            plate_time = (time.perf_counter() - plate_start) * 1000
-            self.metrics.update_timing("plate_recognition", plate_time)
-            
-            self.logger.debug(f"Recognized {len(plate_results)} plates in {plate_time:.1f}ms")
-        
-        # Stage 4: Speed Analysis (if enabled and tracking data available)
-        if self.speed_analyzer and tracked_vehicles:
-            speed_start = time.perf_counter()
-            speed_violations = self._process_speed_analysis(tracked_vehicles, frame_data)
-            speed_time = (time.perf_counter() - speed_start) * 1000
-            self.metrics.update_timing("speed_analysis", speed_time)
-            
-            self.logger.debug(f"Detected {len(speed_violations)} speed violations in {speed_time:.1f}ms")
+        """Internal frame processing logic (stages back to back)."""
+        result = self._new_result(frame_data)
         
-        # Stage 5: Violation Detection (if enabled)
+        for stage in self._build_stages():
+            stage_start = time.perf_counter()
+            stage.func(result)
+            self.metrics.update_timing(stage.name, (time.perf_counter() - stage_start) * 1000)
+        
+        return result
+    
+    def _new_result(self, frame_data: FrameData) -> ProcessingResult:
+        """Empty result that the stages fill in."""
+        return ProcessingResult(
+            frame_data=frame_data,
+            detections=[],
+            tracked_vehicles=[],
+            plate_results=[],
+            speed_violations=[],
+            traffic_violations=[],
+            processing_time_ms=0.0  # Will be set by caller
+        )
+    
+    def _build_stages(self) -> List[PipelineStage]:
+        """Enabled stages in execution order."""
+        stages = [
+            PipelineStage("detection", self._stage_detection),
+            PipelineStage("tracking", self._stage_tracking),
+        ]
+        if self.plate_detector:
+            stages.append(PipelineStage("plate_recognition", self._stage_plate_recognition))
+        if self.speed_analyzer:
+            stages.append(PipelineStage("speed_analysis", self._stage_speed_analysis))
         if self.violation_manager:
-            violation_start = time.perf_counter()
-            traffic_violations = self._process_violation_detection(
-                tracked_vehicles, speed_violations, frame_data
+            stages.append(PipelineStage("violation_detection", self._stage_violation_detection))
+        return stages
+    
+    # Stage 1: Vehicle Detection
+    def _stage_detection(self, result: ProcessingResult) -> ProcessingResult:
+        result.detections = self.detector.detect(result.frame_data.frame)
+        self.logger.debug(f"Detected {len(result.detections)} vehicles")
+        return result
+    
+    # Stage 2: Vehicle Tracking
+    def _stage_tracking(self, result: ProcessingResult) -> ProcessingResult:
+        result.tracked_vehicles = self.tracker.update(result.detections, result.frame_data.frame)
+        self.logger.debug(f"Tracking {len(result.tracked_vehicles)} vehicles")
+        return result
+    
+    # Stage 3: Plate Recognition (if vehicles detected)
+    def _stage_plate_recognition(self, result: ProcessingResult) -> ProcessingResult:
+        if result.tracked_vehicles:
+            result.plate_results = self._process_plate_recognition(
+                result.tracked_vehicles, result.frame_data.frame
             )
-            violation_time = (time.perf_counter() - violation_start) * 1000
-            self.metrics.update_timing("violation_detection", violation_time)
-            
-            self.logger.debug(f"Detected {len(traffic_violations)} violations in {violation_time:.1f}ms")
-            
-            # Send notifications if enabled
-            if self.notification_system and traffic_violations:
-                self._send_notifications(traffic_violations)
+            self.logger.debug(f"Recognized {len(result.plate_results)} plates")
+        return result
+    
+    # Stage 4: Speed Analysis (if tracking data available)
+    def _stage_speed_analysis(self, result: ProcessingResult) -> ProcessingResult:
+        if result.tracked_vehicles:
+            result.speed_violations = self._process_speed_analysis(
+                result.tracked_vehicles, result.frame_data
+            )
+            self.logger.debug(f"Detected {len(result.speed_violations)} speed violations")
+        return result
+    
+    # Stage 5: Violation Detection
+    def _stage_violation_detection(self, result: ProcessingResult) -> ProcessingResult:
+        result.traffic_violations = self._process_violation_detection(
+            result.tracked_vehicles, result.speed_violations, result.frame_data
+        )
+        self.logger.debug(f"Detected {len(result.traffic_violations)} violations")
         
+        # Send notifications if enabled
+        if self.notification_system and result.traffic_violations:
+            self._send_notifications(result.traffic_violations)
+        return result
+    
+    def _finalize_result(self, result: ProcessingResult):
+        """Buffer the frame, update metrics and notify callbacks."""
         # Add frame to buffer
-        self.frame_buffer.append(frame_data)
+        self.frame_buffer.append(result.frame_data)
         
-        return ProcessingResult(
-            frame_data=frame_data,
-            detections=detections,
-            tracked_vehicles=tracked_vehicles,
-            plate_results=plate_results,
-            speed_violations=speed_violations,
-            traffic_violations=traffic_violations,
-            processing_time_ms=0.0  # Will be set by caller
+        self._update_metrics(result)
+        
+        # Call callbacks
+        for callback in self.result_callbacks:
+            try:
+                callback(result)
+            except Exception as e:
+                self.logger.error(f"Result callback error: {e}")
+    
+    def start_pipelined(self):
+        """
+        Run the stages on one worker thread each, connected by bounded queues.
+        
+        Frames are then fed with submit_frame() and results are delivered to
+        the result callbacks.
+        """
+        if self._executor and self._executor.is_running:
+            return
+        
+        self._executor = StagePipelineExecutor(
+            self._build_stages(),
+            queue_size=self.config.stage_queue_size,
+            on_result=self._on_pipelined_result,
+            on_error=self._on_stage_error,
+            on_drop=self._on_frame_dropped,
+            on_stage_timing=self._on_stage_timing,
+            name=self.device_id
         )
+        self.metrics.pipelined = True
+        self._executor.start()
+        self.logger.info(f"Pipelined execution started ({len(self._executor.stages)} stages)")
+    
+    def stop_pipelined(self):
+        """Stop the stage workers."""
+        if self._executor:
+            self._executor.stop()
+            self._executor = None
+    
+    def submit_frame(self, frame: np.ndarray, timestamp: Optional[float] = None) -> bool:
+        """
+        Queue a frame for pipelined processing without blocking.
+        
+        Args:
+            frame: Input video frame
+            timestamp: Frame timestamp (current time if None)
+            
+        Returns:
+            False if an older pending frame had to be dropped
+        """
+        if not self._executor:
+            raise RuntimeError("Pipelined execution not started")
+        
+        frame_data = FrameData(
+            frame=frame,
+            timestamp=timestamp if timestamp is not None else time.time(),
+            frame_id=self._next_frame_id,
+            device_id=self.device_id,
+            metadata={"submitted_at": time.perf_counter()}
+        )
+        self._next_frame_id += 1
+        return self._executor.submit(self._new_result(frame_data))
+    
+    def get_stage_stats(self) -> Dict[str, Any]:
+        """Per-stage executor statistics (empty when not pipelined)."""
+        return self._executor.get_stats() if self._executor else {}
+    
+    def _on_pipelined_result(self, result: ProcessingResult):
+        submitted_at = result.frame_data.metadata.get("submitted_at")
+        if submitted_at is not None:
+            result.processing_time_ms = (time.perf_counter() - submitted_at) * 1000
+        self._finalize_result(result)
+    
+    def _on_stage_error(self, stage: str, result: ProcessingResult, error: Exception):
+        self.logger.error(f"Frame {result.frame_data.frame_id} failed in {stage}: {error}")
+        self.metrics.errors_count += 1
+        self.metrics.last_error = f"{stage}: {error}"
+    
+    def _on_frame_dropped(self, stage: str, result: ProcessingResult):
+        self.metrics.frames_dropped += 1
+        self.logger.debug(f"Dropped frame {result.frame_data.frame_id} waiting for {stage}")
+    
+    def _on_stage_timing(self, stage: str, duration_ms: float):
+        self.metrics.update_timing(stage, duration_ms)
+        if self._executor:
+            self.metrics.update_queues({
+                name: snapshot.depth
+                for name, snapshot in self._executor.queue_snapshot().items()
+            })
     
     def _process_plate_recognition(self, vehicles: List[TrackedVehicle], frame: np.ndarray) -> List[PlateResult]:
         """Process plate recognition for tracked vehicles."""
@@ -494,8 +619,18 @@ class RealTimeAnalysisPipeline:
                 (1 - alpha) * self.metrics.avg_latency_ms
             )
         
-        # Calculate FPS based on processing time
-        if result.processing_time_ms > 0:
+        # Calculate FPS: completions per second when stages overlap,
+        # otherwise based on processing time
+        if self.metrics.pipelined:
+            now = time.perf_counter()
+            if self._last_completion is not None and now > self._last_completion:
+                instantaneous_fps = 1.0 / (now - self._last_completion)
+                if self.metrics.fps == 0:
+                    self.metrics.fps = instantaneous_fps
+                else:
+                    self.metrics.fps = 0.9 * self.metrics.fps + 0.1 * instantaneous_fps
+            self._last_completion = now
+        elif result.processing_time_ms > 0:
             instantaneous_fps = 1000.0 / result.processing_time_ms
             if self.metrics.fps == 0:
                 self.metrics.fps = instantaneous_fps
@@ -536,6 +671,13 @@ class RealTimeAnalysisPipeline:
             f"Speed: {self.metrics.speed_analysis_time_ms:.1f}ms, "
             f"Violations: {self.metrics.violation_detection_time_ms:.1f}ms"
         )
+        
+        if self.metrics.pipelined:
+            self.logger.debug(
+                f"Stage queues - {self.metrics.queue_depths}, "
+                f"bottleneck: {self.metrics.bottleneck_stage}, "
+                f"dropped: {self.metrics.frames_dropped}"
+            )
     
     def get_metrics(self) -> StreamMetrics:
         """Get current pipeline metrics."""
@@ -556,8 +698,12 @@ class RealTimeAnalysisPipeline:
                 "detections_count": self.metrics.detections_count,
                 "violations_count": self.metrics.violations_count,
                 "errors_count": self.metrics.errors_count,
-                "last_error": self.metrics.last_error
+                "last_error": self.metrics.last_error,
+                "frames_dropped": self.metrics.frames_dropped,
+                "queue_depths": self.metrics.queue_depths,
+                "bottleneck_stage": self.metrics.bottleneck_stage
             },
+            "stages": self.get_stage_stats(),
             "components": {
                 "detector": "enabled",
                 "tracker": "enabled", 
@@ -580,17 +726,20 @@ class RealTimeAnalysisPipeline:
         self.is_running = True
         self.start_time = time.time()
         self.frame_counter = 0
+        self._next_frame_id = 0
+        self._last_completion = None
         self.metrics = StreamMetrics()
         self.logger.info(f"Pipeline started for device {self.device_id}")
     
     def stop(self):
         """Stop the pipeline."""
         self.is_running = False
+        self.stop_pipelined()
         self.logger.info(f"Pipeline stopped for device {self.device_id}")
     
     def reset_metrics(self):
         """Reset all metrics."""
-        self.metrics = StreamMetrics()
+        self.metrics = StreamMetrics(pipelined=self._executor is not None)
         self.last_metrics_log = 0
         self.logger.info("Pipeline metrics reset")
 
@@ -605,7 +754,9 @@ class StreamProcessor:
         self.logger = logging.getLogger("stream_processor")
         self.pipelines: Dict[str, RealTimeAnalysisPipeline] = {}
         self.streams: Dict[str, cv2.VideoCapture] = {}
+        self.stream_urls: Dict[str, str] = {}
         self.processing_tasks: Dict[str, asyncio.Task] = {}
+        self.reader_stops: Dict[str, threading.Event] = {}
     
     def add_camera_stream(self, device_id: str, rtsp_url: str, config: PipelineConfig):
         """
@@ -630,6 +781,7 @@ class StreamProcessor:
                 raise RuntimeError(f"Failed to open RTSP stream: {rtsp_url}")
             
             self.streams[device_id] = cap
+            self.stream_urls[device_id] = rtsp_url
             
             self.logger.info(f"Added camera stream: {device_id} -> {rtsp_url}")
             
@@ -639,6 +791,7 @@ class StreamProcessor:
     
     def remove_camera_stream(self, device_id: str):
         """Remove a camera stream."""
+        self._stop_reader(device_id)
         if device_id in self.processing_tasks:
             self.processing_tasks[device_id].cancel()
             del self.processing_tasks[device_id]
@@ -646,6 +799,7 @@ class StreamProcessor:
         if device_id in self.streams:
             self.streams[device_id].release()
             del self.streams[device_id]
+        self.stream_urls.pop(device_id, None)
         
         if device_id in self.pipelines:
             self.pipelines[device_id].stop()
@@ -675,6 +829,7 @@ class StreamProcessor:
     
     async def stop_processing(self, device_id: str):
         """Stop processing a specific camera stream."""
+        self._stop_reader(device_id)
         if device_id in self.processing_tasks:
             self.processing_tasks[device_id].cancel()
             del self.processing_tasks[device_id]
@@ -684,42 +839,88 @@ class StreamProcessor:
         
         self.logger.info(f"Stopped processing for device {device_id}")
     
+    def _stop_reader(self, device_id: str):
+        """Signal the capture thread of a stream to exit."""
+        stop_event = self.reader_stops.pop(device_id, None)
+        if stop_event:
+            stop_event.set()
+    
     async def _process_stream(self, device_id: str, pipeline: RealTimeAnalysisPipeline, stream: cv2.VideoCapture):
-        """Process a single stream asynchronously."""
+        """
+        Supervise a single stream.
+        
+        Frames are read by a dedicated capture thread, so a blocking
+        stream.read() never stalls the event loop (and the other cameras).
+        In pipelined mode the thread only submits frames; the stage workers
+        do the processing.
+        """
+        stop_event = threading.Event()
+        self.reader_stops[device_id] = stop_event
+        
+        if pipeline.config.pipelined_execution:
+            pipeline.start_pipelined()
+        
+        reader = threading.Thread(
+            target=self._read_stream,
+            args=(device_id, pipeline, stream, stop_event),
+            name=f"capture-{device_id}",
+            daemon=True
+        )
+        reader.start()
+        
+        try:
+            while reader.is_alive():
+                await asyncio.sleep(0.5)
+        except asyncio.CancelledError:
+            self.logger.info(f"Stream processing cancelled for {device_id}")
+        finally:
+            stop_event.set()
+            pipeline.stop_pipelined()
+    
+    def _read_stream(
+        self,
+        device_id: str,
+        pipeline: RealTimeAnalysisPipeline,
+        stream: cv2.VideoCapture,
+        stop_event: threading.Event
+    ):
+        """Capture loop of one camera (runs in its own thread)."""
         try:
             target_frame_time = 1.0 / pipeline.config.target_fps
             
-            while pipeline.is_running:
+            while pipeline.is_running and not stop_event.is_set():
                 loop_start = time.perf_counter()
                 
                 # Read frame
                 ret, frame = stream.read()
                 if not ret:
                     self.logger.warning(f"Failed to read frame from {device_id}, attempting reconnection...")
-                    await asyncio.sleep(pipeline.config.reconnect_delay_seconds)
+                    if stop_event.wait(pipeline.config.reconnect_delay_seconds):
+                        break
                     
                     # Try to reconnect
                     stream.release()
-                    stream.open(stream.getBackendName())  # Reopen with same URL
+                    stream.open(self.stream_urls.get(device_id, ""))  # Reopen with same URL
                     continue
                 
                 # Process frame
-                result = pipeline.process_frame(frame)
+                if pipeline.config.pipelined_execution:
+                    pipeline.submit_frame(frame)
+                else:
+                    pipeline.process_frame(frame)
                 
                 # Calculate sleep time to maintain target FPS
                 processing_time = time.perf_counter() - loop_start
                 sleep_time = max(0, target_frame_time - processing_time)
                 
                 if sleep_time > 0:
-                    await asyncio.sleep(sleep_time)
+                    stop_event.wait(sleep_time)
                 elif processing_time > target_frame_time * 1.5:  # 50% over target
                     self.logger.warning(
                         f"Processing too slow for {device_id}: "
                         f"{processing_time*1000:.1f}ms (target: {target_frame_time*1000:.1f}ms)"
                     )
         
-        except asyncio.CancelledError:
-            self.logger.info(f"Stream processing cancelled for {device_id}")
         except Exception as e:
             self.logger.error(f"Stream processing error for {device_id}: {e}")
             # Could implement auto-restart logic here
@@ -748,6 +949,7 @@ class StreamProcessor:
             "total_detections": total_detections,
             "total_violations": total_violations,
             "total_errors": total_errors,
+            "total_frames_dropped": sum(p.metrics.frames_dropped for p in self.pipelines.values()),
             "average_fps": avg_fps,
             "average_latency_ms": avg_latency,
             "streams": list(self.pipelines.keys())
@@ -0,0 +1,301 @@
+"""
+Shared-memory frame ring buffer.
+
+A preallocated block of fixed-size frame slots in multiprocessing.shared_memory.
+One capture process writes decoded frames into it and any number of
+inference processes attach by name and read zero-copy numpy views, so frames
+are never pickled between processes and the memory of a camera is fixed at
+slots * frame size (plus a small header).
+
+Layout of the block:
+    header    int64[HEADER_FIELDS]  write counter and frame geometry
+    seqs      int64[slots]          frame number stored in each slot (-1 = being written)
+    stamps    float64[slots]        capture timestamp of each slot
+    frames    uint8[slots, h, w, c] pixel data
+
+Frame number n (1-based) lives in slot (n - 1) % slots. The writer marks the
+slot as -1 before copying and stores n afterwards, so a reader can detect a
+frame that was overwritten or torn by comparing the slot number before and
+after using it (seqlock). There must be a single writer per ring.
+"""
+
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Header fields (int64)
+_HEAD = 0
+_SLOTS = 1
+_HEIGHT = 2
+_WIDTH = 3
+_CHANNELS = 4
+HEADER_FIELDS = 8
+
+_WRITING = -1
+
+
+@dataclass
+class RingFrame:
+    """A frame read from the ring."""
+    seq: int
+    timestamp: float
+    frame: np.ndarray
+
+
+class SharedFrameRing:
+    """
+    Fixed-slot frame ring in shared memory with per-slot sequence numbers.
+
+    Use create() in the capture process and attach() (by name) in the
+    readers. Views returned with copy=False point into shared memory and
+    stay valid only until the writer wraps around to their slot; check
+    is_current() after using one, or read with copy=True.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        """
+        Wrap an existing shared memory block (use create() or attach()).
+
+        Args:
+            shm: Shared memory block holding the ring
+            owner: Whether this instance created the block (and unlinks it)
+        """
+        self._shm = shm
+        self.owner = owner
+
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        self.slots = int(header[_SLOTS])
+        self.shape = (int(header[_HEIGHT]), int(header[_WIDTH]), int(header[_CHANNELS]))
+        self._header = header
+
+        offset = header.nbytes
+        self._seqs = np.ndarray((self.slots,), dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset += self._seqs.nbytes
+        self._stamps = np.ndarray((self.slots,), dtype=np.float64, buffer=shm.buf, offset=offset)
+        offset += self._stamps.nbytes
+        self._frames = np.ndarray((self.slots,) + self.shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+
+        # Writer statistics (local to this process)
+        self.frames_written = 0
+
+    @staticmethod
+    def required_bytes(shape: Tuple[int, int, int], slots: int) -> int:
+        """Size of the shared memory block for a ring."""
+        frame_bytes = int(np.prod(shape))
+        return 8 * HEADER_FIELDS + 8 * slots + 8 * slots + frame_bytes * slots
+
+    @classmethod
+    def create(
+        cls,
+        shape: Tuple[int, ...],
+        slots: int = 8,
+        name: Optional[str] = None
+    ) -> "SharedFrameRing":
+        """
+        Allocate a new ring.
+
+        Args:
+            shape: Frame shape (height, width) or (height, width, channels), uint8
+            slots: Number of frame slots
+            name: Shared memory name (random if None)
+        """
+        if slots < 2:
+            raise ValueError("A ring needs at least 2 slots")
+        if len(shape) == 2:
+            shape = (shape[0], shape[1], 1)
+        if len(shape) != 3:
+            raise ValueError(f"Unsupported frame shape: {shape}")
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls.required_bytes(shape, slots))
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[_SLOTS] = slots
+        header[_HEIGHT], header[_WIDTH], header[_CHANNELS] = shape
+        del header
+
+        ring = cls(shm, owner=True)
+        ring._seqs[:] = 0
+        ring._stamps[:] = 0.0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedFrameRing":
+        """
+        Attach to a ring created by another process.
+
+        Before Python 3.13 readers should be started with multiprocessing
+        from the capture process (they share its resource tracker); the
+        tracker of an unrelated process would unlink the block on exit.
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    @property
+    def latest_seq(self) -> int:
+        """Number of the newest complete frame (0 = none yet)."""
+        return int(self._header[_HEAD])
+
+    # ------------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------------
+
+    def write(self, frame: np.ndarray, timestamp: Optional[float] = None) -> int:
+        """
+        Copy a frame into the next slot.
+
+        Args:
+            frame: uint8 frame with the ring shape
+            timestamp: Capture time (current time if None)
+
+        Returns:
+            Sequence number of the written frame
+        """
+        if frame.ndim == 2:
+            frame = frame[:, :, np.newaxis]
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match ring shape {self.shape}")
+
+        seq = int(self._header[_HEAD]) + 1
+        slot = (seq - 1) % self.slots
+
+        self._seqs[slot] = _WRITING
+        np.copyto(self._frames[slot], frame, casting="unsafe")
+        self._stamps[slot] = time.time() if timestamp is None else timestamp
+        self._seqs[slot] = seq
+        self._header[_HEAD] = seq
+
+        self.frames_written += 1
+        return seq
+
+    # ------------------------------------------------------------------
+    # Readers
+    # ------------------------------------------------------------------
+
+    def read(self, seq: int, copy: bool = False) -> Optional[RingFrame]:
+        """
+        Read frame number seq.
+
+        Returns:
+            The frame, or None if it was not written yet or already overwritten
+        """
+        if seq < 1:
+            return None
+        slot = (seq - 1) % self.slots
+        if self._seqs[slot] != seq:
+            return None
+
+        timestamp = float(self._stamps[slot])
+        frame = self._frames[slot]
+        if copy:
+            frame = frame.copy()
+
+        # Overwritten while reading
+        if self._seqs[slot] != seq:
+            return None
+        return RingFrame(seq=seq, timestamp=timestamp, frame=frame)
+
+    def read_latest(self, copy: bool = False) -> Optional[RingFrame]:
+        """Read the newest complete frame."""
+        for _ in range(3):
+            seq = self.latest_seq
+            if seq == 0:
+                return None
+            frame = self.read(seq, copy=copy)
+            if frame is not None:
+                return frame
+        return None
+
+    def read_since(self, after_seq: int, count: Optional[int] = None, copy: bool = False) -> List[RingFrame]:
+        """
+        Read the frames newer than after_seq still held in the ring (oldest first).
+
+        Args:
+            after_seq: Last sequence number already consumed
+            count: Return at most the newest count frames
+            copy: Copy the pixels out of shared memory
+        """
+        latest = self.latest_seq
+        first = max(after_seq + 1, latest - self.slots + 1, 1)
+        if count is not None:
+            first = max(first, latest - count + 1)
+
+        frames = []
+        for seq in range(first, latest + 1):
+            frame = self.read(seq, copy=copy)
+            if frame is not None:
+                frames.append(frame)
+        return frames
+
+    def wait_for(
+        self,
+        after_seq: int,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.002
+    ) -> Optional[RingFrame]:
+        """
+        Wait for a frame newer than after_seq and return the newest one.
+
+        Readers in other processes cannot share a Condition with the writer,
+        so this polls the write counter.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.latest_seq > after_seq:
+                frame = self.read_latest()
+                if frame is not None and frame.seq > after_seq:
+                    return frame
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    def is_current(self, seq: int) -> bool:
+        """Whether frame seq is still in its slot (i.e. a view of it is still valid)."""
+        return seq >= 1 and self._seqs[(seq - 1) % self.slots] == seq
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Ring statistics."""
+        return {
+            "name": self.name,
+            "slots": self.slots,
+            "shape": self.shape,
+            "nbytes": self.nbytes,
+            "latest_seq": self.latest_seq,
+            "frames_written": self.frames_written
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def close(self):
+        """Detach from the shared memory (drop every view first)."""
+        # numpy views keep exported pointers into the buffer
+        self._header = self._seqs = self._stamps = self._frames = None
+        self._shm.close()
+
+    def unlink(self):
+        """Free the shared memory block (owner only, after every reader closed)."""
+        if self.owner:
+            self._shm.unlink()
+
+    def __enter__(self) -> "SharedFrameRing":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        self.unlink()
@@ -0,0 +1,313 @@
+"""
+Stage-pipelined executor for the real-time analysis pipeline.
+
+Each stage (detection, tracking, plate recognition, speed analysis,
+violation detection) runs on its own worker thread and the stages are
+connected by bounded queues. While frame N is in plate recognition,
+frame N+1 can already be in detection, so throughput is bound by the
+slowest stage instead of the sum of all stage latencies.
+
+Backpressure is drop-oldest: when a stage falls behind, its input queue
+discards the oldest pending frame instead of blocking the producer, so a
+slow stage never stalls the camera reader and latency stays bounded.
+
+Threads (not processes) are used on purpose: the heavy stages run inside
+ONNX Runtime / OpenCV / EasyOCR, which release the GIL, and the stateful
+stages (tracking, speed) must keep their state in one place and see the
+frames in order.
+"""
+
+import threading
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+
+class DropOldestQueue:
+    """
+    Thread-safe bounded FIFO that drops the oldest item when full.
+    """
+
+    def __init__(self, maxsize: int):
+        """
+        Initialize the queue.
+
+        Args:
+            maxsize: Maximum number of pending items
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+
+        self.maxsize = maxsize
+        self._items: deque = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+        # Statistics
+        self.dropped = 0
+        self.high_watermark = 0
+
+    def put(self, item: Any) -> Optional[Any]:
+        """
+        Add an item without blocking.
+
+        Returns:
+            The dropped item if the queue was full, otherwise None
+        """
+        dropped = None
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                dropped = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self.high_watermark = max(self.high_watermark, len(self._items))
+            self._condition.notify()
+        return dropped
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Remove and return the oldest item.
+
+        Returns:
+            The item, or None on timeout or when closed and empty
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items or self._closed, timeout=timeout):
+                return None
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        """Wake up every waiting consumer."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._items)
+
+
+@dataclass
+class PipelineStage:
+    """A named stage: takes the frame context and returns it (or None to drop it)."""
+    name: str
+    func: Callable[[Any], Optional[Any]]
+
+
+@dataclass
+class StageStats:
+    """Per-stage counters of the executor."""
+    processed: int = 0
+    errors: int = 0
+    busy_time_ms: float = 0.0
+    last_time_ms: float = 0.0
+    avg_time_ms: float = 0.0
+
+    def record(self, duration_ms: float):
+        """Record one processed item."""
+        self.processed += 1
+        self.busy_time_ms += duration_ms
+        self.last_time_ms = duration_ms
+        if self.processed == 1:
+            self.avg_time_ms = duration_ms
+        else:
+            self.avg_time_ms = 0.1 * duration_ms + 0.9 * self.avg_time_ms
+
+
+@dataclass
+class QueueSnapshot:
+    """Backlog of the input queue of one stage."""
+    depth: int = 0
+    high_watermark: int = 0
+    dropped: int = 0
+
+
+class StagePipelineExecutor:
+    """
+    Runs a list of stages as a pipeline of worker threads.
+
+    submit() puts a frame context in the first queue; each worker takes
+    from its queue, runs its stage and hands the result to the next queue.
+    The context returned by the last stage goes to on_result.
+    """
+
+    def __init__(
+        self,
+        stages: List[PipelineStage],
+        queue_size: int = 4,
+        on_result: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[str, Any, Exception], None]] = None,
+        on_drop: Optional[Callable[[str, Any], None]] = None,
+        on_stage_timing: Optional[Callable[[str, float], None]] = None,
+        name: str = "pipeline"
+    ):
+        """
+        Initialize the executor.
+
+        Args:
+            stages: Ordered stages
+            queue_size: Capacity of each stage input queue
+            on_result: Called with the context that left the last stage
+            on_error: Called with (stage name, context, exception); the context is dropped
+            on_drop: Called with (stage name, context) when backpressure drops a context
+            on_stage_timing: Called with (stage name, duration_ms) after every stage run
+            name: Name used for threads and logging
+        """
+        if not stages:
+            raise ValueError("At least one stage is required")
+
+        self.stages = stages
+        self.queue_size = queue_size
+        self.on_result = on_result
+        self.on_error = on_error
+        self.on_drop = on_drop
+        self.on_stage_timing = on_stage_timing
+        self.name = name
+        self.logger = logging.getLogger(f"stage_executor.{name}")
+
+        self.queues = [DropOldestQueue(queue_size) for _ in stages]
+        self.stats = {stage.name: StageStats() for stage in stages}
+
+        self._threads: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self.submitted = 0
+        self.completed = 0
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._threads) and not self._stop_event.is_set()
+
+    def start(self):
+        """Start one worker thread per stage."""
+        if self.is_running:
+            return
+
+        self._stop_event.clear()
+        self.queues = [DropOldestQueue(self.queue_size) for _ in self.stages]
+        self._threads = []
+        for index, stage in enumerate(self.stages):
+            thread = threading.Thread(
+                target=self._worker,
+                args=(index,),
+                name=f"{self.name}-{stage.name}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        self.logger.info(f"Started {len(self.stages)} stage workers")
+
+    def submit(self, context: Any) -> bool:
+        """
+        Queue a frame context for the first stage without blocking.
+
+        Returns:
+            False if an older pending context had to be dropped
+        """
+        self.submitted += 1
+        dropped = self.queues[0].put(context)
+        if dropped is not None:
+            self._dropped(self.stages[0].name, dropped)
+            return False
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the workers; pending contexts are discarded."""
+        self._stop_event.set()
+        for queue in self.queues:
+            queue.close()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        self.logger.info("Stage workers stopped")
+
+    def queue_snapshot(self) -> Dict[str, QueueSnapshot]:
+        """Current backlog of every stage input queue."""
+        return {
+            stage.name: QueueSnapshot(
+                depth=len(queue),
+                high_watermark=queue.high_watermark,
+                dropped=queue.dropped
+            )
+            for stage, queue in zip(self.stages, self.queues)
+        }
+
+    def bottleneck_stage(self) -> Optional[str]:
+        """Stage with the highest average time (the one that bounds throughput)."""
+        timed = [(stats.avg_time_ms, name) for name, stats in self.stats.items() if stats.processed]
+        return max(timed)[1] if timed else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Executor statistics per stage."""
+        queues = self.queue_snapshot()
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "dropped": sum(q.dropped for q in queues.values()),
+            "bottleneck_stage": self.bottleneck_stage(),
+            "stages": {
+                name: {
+                    "processed": stats.processed,
+                    "errors": stats.errors,
+                    "avg_time_ms": round(stats.avg_time_ms, 2),
+                    "queue_depth": queues[name].depth,
+                    "queue_high_watermark": queues[name].high_watermark,
+                    "dropped": queues[name].dropped,
+                }
+                for name, stats in self.stats.items()
+            }
+        }
+
+    def _worker(self, index: int):
+        """Worker loop of one stage."""
+        stage = self.stages[index]
+        stats = self.stats[stage.name]
+        queue = self.queues[index]
+        next_queue = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        next_name = self.stages[index + 1].name if next_queue is not None else None
+
+        while not self._stop_event.is_set():
+            context = queue.get(timeout=0.5)
+            if context is None:
+                continue
+
+            start = time.perf_counter()
+            try:
+                output = stage.func(context)
+            except Exception as e:
+                stats.errors += 1
+                self.logger.error(f"Stage {stage.name} failed: {e}")
+                if self.on_error:
+                    self._safe_call(self.on_error, stage.name, context, e)
+                continue
+            finally:
+                duration_ms = (time.perf_counter() - start) * 1000
+                stats.record(duration_ms)
+                if self.on_stage_timing:
+                    self._safe_call(self.on_stage_timing, stage.name, duration_ms)
+
+            if output is None:
+                continue
+
+            if next_queue is not None:
+                dropped = next_queue.put(output)
+                if dropped is not None:
+                    self._dropped(next_name, dropped)
+            else:
+                self.completed += 1
+                if self.on_result:
+                    self._safe_call(self.on_result, output)
+
+    def _dropped(self, stage_name: str, context: Any):
+        if self.on_drop:
+            self._safe_call(self.on_drop, stage_name, context)
+
+    def _safe_call(self, callback: Callable, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            self.logger.error(f"Executor callback error: {e}")
@@ -14,6 +14,8 @@ from collections import deque
 import numpy as np
 from urllib.parse import urlparse
 
+from .frame_ring import SharedFrameRing
+
 
 @dataclass
 class StreamConfig:
@@ -27,6 +29,8 @@ class StreamConfig:
     # Buffer settings
     buffer_size: int = 10  # Number of frames to buffer
     drop_frames_on_delay: bool = True  # Drop frames if processing is slow
+    shared_memory_slots: int = 0  # > 0: keep frames in a SharedFrameRing instead of the deque
+    shared_memory_name: Optional[str] = None  # Ring name for readers in other processes (random if None)
     
     # Stream settings  
     rtsp_transport: str = "tcp"  # "tcp" or "udp"
@@ -98,6 +102,9 @@ class VideoStreamService:
         self.current_frame: Optional[np.ndarray] = None
         self.current_timestamp: Optional[float] = None
         
+        # Shared-memory ring (created on the first frame, when its shape is known)
+        self.frame_ring: Optional[SharedFrameRing] = None
+        
         # Statistics and monitoring
         self.stats = StreamStats()
         self.last_fps_calc = time.time()
@@ -165,6 +172,7 @@ class VideoStreamService:
             self.reading_thread.join(timeout=5.0)
         
         self._disconnect()
+        self._release_ring()
         self.logger.info("Video stream stopped")
     
     def _connect(self) -> bool:
@@ -296,16 +304,19 @@ class VideoStreamService:
                 current_time = time.time()
                 
                 # Update buffer and current frame
-                with self._lock:
-                    if self.config.drop_frames_on_delay and len(self.frame_buffer) >= self.config.buffer_size:
-                        # Drop oldest frame if buffer is full
-                        dropped_frame = self.frame_buffer.popleft()
-                        self.stats.frames_dropped += 1
+                if self.config.shared_memory_slots > 0:
+                    self._write_ring(processed_frame, current_time)
+                else:
+                    with self._lock:
+                        if self.config.drop_frames_on_delay and len(self.frame_buffer) >= self.config.buffer_size:
+                            # Drop oldest frame if buffer is full
+                            dropped_frame = self.frame_buffer.popleft()
+                            self.stats.frames_dropped += 1
                     
-                    self.frame_buffer.append((processed_frame, current_time))
-                    self.current_frame = processed_frame
-                    self.current_timestamp = current_time
-                    self.stats.last_frame_time = current_time
+                        self.frame_buffer.append((processed_frame, current_time))
+                        self.current_frame = processed_frame
+                        self.current_timestamp = current_time
+                        self.stats.last_frame_time = current_time
                 
                 # Update statistics
                 self.stats.frames_read += 1
@@ -359,6 +370,39 @@ class VideoStreamService:
         
         return processed
     
+    def _write_ring(self, frame: np.ndarray, timestamp: float):
+        """Publish a frame in the shared-memory ring."""
+        if self.frame_ring is None:
+            self.frame_ring = SharedFrameRing.create(
+                frame.shape,
+                slots=self.config.shared_memory_slots,
+                name=self.config.shared_memory_name
+            )
+            self.logger.info(
+                f"Shared frame ring {self.frame_ring.name}: "
+                f"{self.frame_ring.slots} x {frame.shape} ({self.frame_ring.nbytes / 1e6:.1f} MB)"
+            )
+        
+        if frame.shape != self.frame_ring.shape and frame.shape + (1,) != self.frame_ring.shape:
+            # Source changed resolution after a reconnect: keep the ring geometry
+            height, width = self.frame_ring.shape[:2]
+            frame = cv2.resize(frame, (width, height))
+        
+        self.frame_ring.write(frame, timestamp)
+        with self._lock:
+            self.current_timestamp = timestamp
+            self.stats.last_frame_time = timestamp
+    
+    def _release_ring(self):
+        """Free the shared-memory ring."""
+        if self.frame_ring is not None:
+            try:
+                self.frame_ring.close()
+                self.frame_ring.unlink()
+            except Exception as e:
+                self.logger.warning(f"Error releasing frame ring: {e}")
+            self.frame_ring = None
+    
     def _handle_read_error(self):
         """Handle frame read errors."""
         self.stats.error_count_recent += 1
@@ -388,6 +432,10 @@ class VideoStreamService:
         Returns:
             Tuple of (frame, timestamp) or (None, None) if no frame available
         """
+        if self.frame_ring is not None:
+            latest = self.frame_ring.read_latest(copy=True)
+            return (latest.frame, latest.timestamp) if latest else (None, None)
+        
         with self._lock:
             return self.current_frame, self.current_timestamp
     
@@ -401,6 +449,12 @@ class VideoStreamService:
         Returns:
             List of (frame, timestamp) tuples
         """
+        if self.frame_ring is not None:
+            return [
+                (ring_frame.frame, ring_frame.timestamp)
+                for ring_frame in self.frame_ring.read_since(0, count=count, copy=True)
+            ]
+        
         with self._lock:
             frames = list(self.frame_buffer)
             return frames[-count:] if frames else []
@@ -423,6 +477,7 @@ class VideoStreamService:
             "total_errors": self.stats.total_errors,
             "last_error": self.stats.last_error,
             "buffer_size": len(self.frame_buffer),
+            "shared_memory": self.frame_ring.get_stats() if self.frame_ring else None,
             "uptime_seconds": time.time() - self.stats.connection_start_time if self.stats.connection_start_time else 0
         }
     
@@ -13,7 +13,7 @@ import os
 import time
 import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Union, Any, Tuple
 from pathlib import Path
 import json
@@ -122,10 +122,14 @@ class TrafficDataAnalyzer:
     def analyze_traffic_flow(self, start_date: datetime, end_date: datetime,
                            device_ids: List[str] = None) -> TrafficMetrics:
         """Analyze traffic flow patterns."""
-        # Get violation records for analysis
-        violations = self._get_violations_data(start_date, end_date, device_ids)
+        # Aggregated violations (hour of day x type x class) and plate counts
+        rollups, plates = self._get_aggregates(
+            start_date, end_date, device_ids,
+            group_by=("hour_of_day", "violation_type", "vehicle_class")
+        )
         
-        if not violations:
+        violation_count = sum(r['violation_count'] for r in rollups)
+        if not violation_count:
             return TrafficMetrics(
                 total_vehicles=0,
                 average_speed=0.0,
@@ -137,50 +141,33 @@ class TrafficDataAnalyzer:
                 device_uptime=0.0
             )
         
-        # Analyze violations data
-        total_vehicles = len(set(v.get('license_plate', f"unknown_{i}") 
-                               for i, v in enumerate(violations) if v.get('license_plate')))
-        
-        speeds = [v['speed_kmh'] for v in violations if v.get('speed_kmh')]
-        average_speed = statistics.mean(speeds) if speeds else 0.0
-        
-        # Hourly distribution
-        hourly_dist = {}
-        for v in violations:
-            hour = v['timestamp'].hour
-            hourly_dist[hour] = hourly_dist.get(hour, 0) + 1
+        speed_count = sum(r['speed_count'] for r in rollups)
+        average_speed = sum(r['speed_sum'] for r in rollups) / speed_count if speed_count else 0.0
         
+        hourly_dist = self._sum_by(rollups, 'hour_of_day')
         peak_hour = max(hourly_dist.keys(), key=lambda h: hourly_dist[h]) if hourly_dist else 12
         
-        # Vehicle types distribution
-        vehicle_types = {}
-        for v in violations:
-            vtype = v.get('vehicle_class', 'unknown')
-            vehicle_types[vtype] = vehicle_types.get(vtype, 0) + 1
-        
-        # Violation types distribution
-        violation_types = {}
-        for v in violations:
-            vtype = v.get('violation_type', 'unknown')
-            violation_types[vtype] = violation_types.get(vtype, 0) + 1
-        
         return TrafficMetrics(
-            total_vehicles=total_vehicles,
+            total_vehicles=plates[0]['distinct_plates'] if plates else 0,
             average_speed=average_speed,
-            violation_count=len(violations),
+            violation_count=violation_count,
             peak_hour=peak_hour,
-            vehicle_types=vehicle_types,
+            vehicle_types=self._sum_by(rollups, 'vehicle_class'),
             hourly_distribution=hourly_dist,
-            violation_types=violation_types,
+            violation_types=self._sum_by(rollups, 'violation_type'),
             device_uptime=95.0  # Simulated uptime
         )
     
     def analyze_violations(self, start_date: datetime, end_date: datetime,
                           device_ids: List[str] = None) -> ViolationSummary:
         """Analyze violation patterns and statistics."""
-        violations = self._get_violations_data(start_date, end_date, device_ids)
+        rollups, plates = self._get_aggregates(
+            start_date, end_date, device_ids,
+            group_by=("device_id", "hour_of_day", "violation_type")
+        )
         
-        if not violations:
+        total_violations = sum(r['violation_count'] for r in rollups)
+        if not total_violations:
             return ViolationSummary(
                 total_violations=0,
                 by_type={},
@@ -191,72 +178,36 @@ class TrafficDataAnalyzer:
                 repeat_offenders=0
             )
         
-        # Violations by type
-        by_type = {}
-        for v in violations:
-            vtype = v.get('violation_type', 'unknown')
-            by_type[vtype] = by_type.get(vtype, 0) + 1
-        
-        # Violations by device
-        by_device = {}
-        for v in violations:
-            device = v.get('device_id', 'unknown')
-            by_device[device] = by_device.get(device, 0) + 1
-        
-        # Violations by hour
-        by_hour = {}
-        for v in violations:
-            hour = v['timestamp'].hour
-            by_hour[hour] = by_hour.get(hour, 0) + 1
-        
-        # Calculate repeat offenders (same license plate)
-        plates = [v.get('license_plate') for v in violations if v.get('license_plate')]
-        plate_counts = {}
-        for plate in plates:
-            plate_counts[plate] = plate_counts.get(plate, 0) + 1
-        
-        repeat_offenders = sum(1 for count in plate_counts.values() if count > 1)
-        
         return ViolationSummary(
-            total_violations=len(violations),
-            by_type=by_type,
-            by_device=by_device,
-            by_hour=by_hour,
+            total_violations=total_violations,
+            by_type=self._sum_by(rollups, 'violation_type'),
+            by_device=self._sum_by(rollups, 'device_id'),
+            by_hour=self._sum_by(rollups, 'hour_of_day'),
             average_severity=2.5,  # Simulated severity (1-5 scale)
             resolution_rate=0.85,  # Simulated resolution rate
-            repeat_offenders=repeat_offenders
+            repeat_offenders=plates[0]['repeat_offenders'] if plates else 0
         )
     
     def analyze_device_performance(self, start_date: datetime, end_date: datetime,
                                  device_ids: List[str] = None) -> List[DeviceMetrics]:
         """Analyze device performance metrics."""
-        violations = self._get_violations_data(start_date, end_date, device_ids)
-        
-        # Group by device
-        devices = {}
-        for v in violations:
-            device_id = v.get('device_id', 'unknown')
-            if device_id not in devices:
-                devices[device_id] = []
-            devices[device_id].append(v)
+        rollups, _ = self._get_aggregates(
+            start_date, end_date, device_ids, group_by=("device_id",), plates=False
+        )
         
         device_metrics = []
-        for device_id, device_violations in devices.items():
+        for row in rollups:
+            device_id = row['device_id']
+            count = row['violation_count']
+            
             # Calculate metrics
-            frames_processed = len(device_violations) * 30  # Estimate 30 frames per detection
+            frames_processed = count * 30  # Estimate 30 frames per detection
             
-            processing_times = [v.get('processing_time_ms', 150) 
-                              for v in device_violations]
-            avg_processing_time = statistics.mean(processing_times) if processing_times else 150
+            avg_processing_time = row['processing_time_sum'] / count
             average_fps = 1000 / avg_processing_time if avg_processing_time > 0 else 6.7
             
             # Accuracy based on confidence scores
-            confidences = [v.get('confidence', 0.8) for v in device_violations]
-            accuracy_score = statistics.mean(confidences) if confidences else 0.8
-            
-            # Last activity
-            timestamps = [v['timestamp'] for v in device_violations]
-            last_active = max(timestamps) if timestamps else start_date
+            accuracy_score = row['confidence_sum'] / count
             
             device_metrics.append(DeviceMetrics(
                 device_id=device_id,
@@ -264,31 +215,168 @@ class TrafficDataAnalyzer:
                 frames_processed=frames_processed,
                 average_fps=average_fps,
                 error_count=hash(device_id) % 5,  # Simulated error count
-                last_active=last_active,
-                violations_detected=len(device_violations),
+                last_active=row['last_violation_at'] or start_date,
+                violations_detected=count,
                 accuracy_score=accuracy_score
             ))
         
         return device_metrics
     
-    def _get_violations_data(self, start_date: datetime, end_date: datetime,
-                           device_ids: List[str] = None) -> List[Dict[str, Any]]:
-        """Get violations data from storage."""
+    def analyze_daily_trend(self, start_date: datetime, end_date: datetime,
+                            device_ids: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Per-day vehicles, violations and average speed.
+        
+        One grouped query for the whole range instead of a full analysis per day;
+        days without violations are reported with zeros.
+        """
+        rollups, plates = self._get_aggregates(
+            start_date, end_date, device_ids, group_by=("day",), plates_by_day=True
+        )
+        by_day = {self._as_date(r['day']): r for r in rollups}
+        plates_by_day = {self._as_date(p['day']): p['distinct_plates'] for p in plates}
+        
+        daily_metrics = []
+        current_date = start_date
+        while current_date <= end_date:
+            day = current_date.date()
+            row = by_day.get(day)
+            daily_metrics.append({
+                'date': current_date.strftime('%Y-%m-%d'),
+                'day_name': current_date.strftime('%A'),
+                'vehicles': plates_by_day.get(day, 0),
+                'violations': row['violation_count'] if row else 0,
+                'avg_speed': row['speed_sum'] / row['speed_count'] if row and row['speed_count'] else 0.0
+            })
+            current_date += timedelta(days=1)
+        
+        return daily_metrics
+    
+    def analyze_hourly_heatmap(self, start_date: datetime, end_date: datetime,
+                               device_ids: List[str] = None) -> List[List[int]]:
+        """Violations per hour of day (rows) and day of the range (columns)."""
+        rollups, _ = self._get_aggregates(
+            start_date, end_date, device_ids, group_by=("day", "hour_of_day"), plates=False
+        )
+        
+        days = (end_date.date() - start_date.date()).days + 1
+        heatmap = [[0] * days for _ in range(24)]
+        for row in rollups:
+            column = (self._as_date(row['day']) - start_date.date()).days
+            if 0 <= column < days:
+                heatmap[row['hour_of_day']][column] += row['violation_count']
+        
+        return heatmap
+    
+    def _get_aggregates(self, start_date: datetime, end_date: datetime,
+                        device_ids: Optional[List[str]], group_by: Tuple[str, ...],
+                        plates: bool = True, plates_by_day: bool = False
+                        ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Get violation rollups (and plate statistics) from storage.
+        
+        With storage the hourly rollup tables are queried, so the result has
+        one row per group instead of one per violation. Without storage the
+        simulated violations are aggregated the same way.
+        """
         if self.storage_service:
-            violations = self.storage_service.get_violation_records(
+            rollups = self.storage_service.get_violation_rollups(
                 start_time=start_date,
                 end_time=end_date,
-                limit=10000
+                device_ids=device_ids,
+                group_by=group_by
             )
+            plate_stats = []
+            if plates or plates_by_day:
+                plate_stats = self.storage_service.get_plate_statistics(
+                    start_time=start_date,
+                    end_time=end_date,
+                    device_ids=device_ids,
+                    by_day=plates_by_day
+                )
+            return rollups, plate_stats
+        
+        # Simulated data for testing
+        violations = self._generate_simulated_violations(start_date, end_date, device_ids)
+        plate_stats = []
+        if plates or plates_by_day:
+            plate_stats = self._plate_statistics(violations, plates_by_day)
+        return self._rollup_violations(violations, group_by), plate_stats
+    
+    @staticmethod
+    def _sum_by(rollups: List[Dict[str, Any]], dimension: str) -> Dict[Any, int]:
+        """Violation counts per value of one dimension."""
+        totals = {}
+        for row in rollups:
+            key = row[dimension]
+            totals[key] = totals.get(key, 0) + row['violation_count']
+        return totals
+    
+    @staticmethod
+    def _as_date(value: Union[datetime, date]) -> date:
+        return value.date() if isinstance(value, datetime) else value
+    
+    @staticmethod
+    def _rollup_violations(violations: List[Dict[str, Any]],
+                           group_by: Tuple[str, ...]) -> List[Dict[str, Any]]:
+        """Aggregate violation dicts into rollup rows (same shape as the rollup query)."""
+        dimensions = {
+            'device_id': lambda v: v.get('device_id', 'unknown'),
+            'violation_type': lambda v: v.get('violation_type', 'unknown'),
+            'vehicle_class': lambda v: v.get('vehicle_class', 'unknown'),
+            'hour_of_day': lambda v: v['timestamp'].hour,
+            'day': lambda v: v['timestamp'].replace(hour=0, minute=0, second=0, microsecond=0)
+        }
+        
+        rollups = {}
+        for v in violations:
+            key = tuple(dimensions[d](v) for d in group_by)
+            row = rollups.get(key)
+            if row is None:
+                row = dict(zip(group_by, key))
+                row.update(violation_count=0, speed_count=0, speed_sum=0.0, speed_max=None,
+                           confidence_sum=0.0, processing_time_sum=0.0, last_violation_at=None)
+                rollups[key] = row
             
-            # Filter by device IDs if specified
-            if device_ids:
-                violations = [v for v in violations if v.get('device_id') in device_ids]
-            
-            return violations
-        else:
-            # Generate simulated data for testing
-            return self._generate_simulated_violations(start_date, end_date, device_ids)
+            row['violation_count'] += 1
+            speed = v.get('speed_kmh')
+            if speed is not None:
+                row['speed_count'] += 1
+                row['speed_sum'] += speed
+                row['speed_max'] = speed if row['speed_max'] is None else max(row['speed_max'], speed)
+            row['confidence_sum'] += v.get('confidence', 0.8)
+            row['processing_time_sum'] += v.get('processing_time_ms', 150)
+            if row['last_violation_at'] is None or v['timestamp'] > row['last_violation_at']:
+                row['last_violation_at'] = v['timestamp']
+        
+        return list(rollups.values())
+    
+    @staticmethod
+    def _plate_statistics(violations: List[Dict[str, Any]], by_day: bool) -> List[Dict[str, Any]]:
+        """Distinct plates and repeat offenders of violation dicts."""
+        sightings = {}
+        for v in violations:
+            plate = v.get('license_plate')
+            if plate:
+                day = v['timestamp'].date() if by_day else None
+                sightings.setdefault(day, {})
+                sightings[day][plate] = sightings[day].get(plate, 0) + 1
+        
+        if not by_day:
+            counts = sightings.get(None, {})
+            return [{
+                'distinct_plates': len(counts),
+                'repeat_offenders': sum(1 for n in counts.values() if n > 1)
+            }]
+        
+        return [
+            {
+                'day': day,
+                'distinct_plates': len(counts),
+                'repeat_offenders': sum(1 for n in counts.values() if n > 1)
+            }
+            for day, counts in sorted(sightings.items())
+        ]
     
     def _generate_simulated_violations(self, start_date: datetime, end_date: datetime,
                                      device_ids: List[str] = None) -> List[Dict[str, Any]]:
@@ -769,29 +857,10 @@ class ReportGenerator:
     
     async def _generate_weekly_analysis(self, config: ReportConfig) -> Dict[str, Any]:
         """Generate weekly analysis report."""
-        # Analyze data day by day for trend analysis
-        daily_metrics = []
-        current_date = config.start_date
-        
-        while current_date <= config.end_date:
-            day_end = current_date.replace(hour=23, minute=59, second=59)
-            
-            day_traffic = self.analyzer.analyze_traffic_flow(
-                current_date, day_end, config.device_ids
-            )
-            day_violations = self.analyzer.analyze_violations(
-                current_date, day_end, config.device_ids
-            )
-            
-            daily_metrics.append({
-                'date': current_date.strftime('%Y-%m-%d'),
-                'day_name': current_date.strftime('%A'),
-                'vehicles': day_traffic.total_vehicles,
-                'violations': day_violations.total_violations,
-                'avg_speed': day_traffic.average_speed
-            })
-            
-            current_date += timedelta(days=1)
+        # Per-day metrics for trend analysis (one grouped query for the week)
+        daily_metrics = self.analyzer.analyze_daily_trend(
+            config.start_date, config.end_date, config.device_ids
+        )
         
         # Generate trend charts
         charts = {}
@@ -919,17 +988,10 @@ class ReportGenerator:
         charts = {}
         if config.include_charts:
             # Monthly violation heatmap (hour vs day)
-            days_in_month = (config.end_date - config.start_date).days + 1
-            heatmap_data = []
-            
-            for hour in range(24):
-                hour_data = []
-                for day in range(days_in_month):
-                    # Simulate violation count for each hour/day combination
-                    base_violations = traffic_metrics.hourly_distribution.get(hour, 0)
-                    day_factor = 0.5 + (hash(f"{hour}_{day}") % 100) / 100
-                    hour_data.append(int(base_violations * day_factor / days_in_month))
-                heatmap_data.append(hour_data)
+            heatmap_data = self.analyzer.analyze_hourly_heatmap(
+                config.start_date, config.end_date, config.device_ids
+            )
+            days_in_month = len(heatmap_data[0])
             
             charts['monthly_heatmap'] = self.chart_generator.create_heatmap(
                 heatmap_data,
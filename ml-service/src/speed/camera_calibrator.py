@@ -9,13 +9,16 @@ import logging
 import json
 import numpy as np
 import cv2
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Sequence, Union
 from dataclasses import dataclass, asdict
 from pathlib import Path
 import time
 
 logger = logging.getLogger(__name__)
 
+# Points whose projective weight is ~0 map to infinity (horizon line)
+_HOMOGRAPHY_EPS = 1e-12
+
 @dataclass
 class CalibrationPoint:
     """Single calibration point with pixel and real-world coordinates."""
@@ -59,6 +62,10 @@ class CameraCalibrator:
         self.pixels_per_meter = None
         self.is_calibrated = False
         
+        # Zone-index raster: pixel -> position in calibration_zones + 1 (0 = no zone)
+        self._zone_raster: Optional[np.ndarray] = None
+        self._zone_list: List[CalibrationZone] = []
+        
         # Calibration quality metrics
         self.calibration_error = None
         self.confidence_score = 0.0
@@ -190,6 +197,33 @@ class CameraCalibrator:
             logger.error(f"Failed to convert pixel to real coordinates: {e}")
             return None
     
+    def pixel_to_real_many(self, points: Union[np.ndarray, Sequence[Tuple[float, float]]]) -> Optional[np.ndarray]:
+        """
+        Convert many pixel coordinates to real-world coordinates at once.
+        
+        Args:
+            points: (N, 2) pixel coordinates (array or sequence of (x, y))
+            
+        Returns:
+            (N, 2) float array in meters (NaN rows for points on the horizon)
+            or None if not calibrated
+        """
+        if not self.is_calibrated:
+            return None
+        
+        pixels = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(pixels) == 0:
+            return np.empty((0, 2), dtype=np.float64)
+        
+        H = np.asarray(self.homography_matrix, dtype=np.float64)
+        projected = pixels @ H[:, :2].T + H[:, 2]
+        weights = projected[:, 2:3]
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            real = projected[:, :2] / weights
+        real[np.abs(weights[:, 0]) < _HOMOGRAPHY_EPS] = np.nan
+        return real
+    
     def real_to_pixel(self, real_x: float, real_y: float) -> Optional[Tuple[int, int]]:
         """
         Convert real-world coordinates to pixel coordinates.
@@ -236,14 +270,66 @@ class CameraCalibrator:
     def add_calibration_zone(self, zone: CalibrationZone):
         """Add a calibration zone for speed measurement."""
         self.calibration_zones[zone.zone_id] = zone
+        self._zone_raster = None
         logger.info(f"Added calibration zone: {zone.name} (limit: {zone.speed_limit} km/h)")
     
     def get_zone_for_point(self, pixel_x: int, pixel_y: int) -> Optional[CalibrationZone]:
         """Get the calibration zone containing the given pixel point."""
-        for zone in self.calibration_zones.values():
-            if self._point_in_polygon((pixel_x, pixel_y), zone.pixel_points):
-                return zone
-        return None
+        return self.get_zones_for_points([(pixel_x, pixel_y)])[0]
+    
+    def get_zones_for_points(self, points: Union[np.ndarray, Sequence[Tuple[float, float]]]) -> List[Optional[CalibrationZone]]:
+        """
+        Get the calibration zone of many pixel points at once.
+        
+        Args:
+            points: (N, 2) pixel coordinates
+            
+        Returns:
+            Zone (or None) for each point
+        """
+        indexes = self.zone_indexes_for_points(points)
+        return [self._zone_list[i] if i >= 0 else None for i in indexes.tolist()]
+    
+    def zone_indexes_for_points(self, points: Union[np.ndarray, Sequence[Tuple[float, float]]]) -> np.ndarray:
+        """
+        Look up many pixel points in the zone-index raster.
+        
+        Returns:
+            (N,) array with the position of each point's zone in
+            calibration_zones, or -1 outside every zone
+        """
+        pixels = np.rint(np.asarray(points, dtype=np.float64).reshape(-1, 2)).astype(np.int64)
+        raster = self._get_zone_raster()
+        result = np.full(len(pixels), -1, dtype=np.int64)
+        if raster is None or len(pixels) == 0:
+            return result
+        
+        xs, ys = pixels[:, 0], pixels[:, 1]
+        inside = (xs >= 0) & (ys >= 0) & (xs < raster.shape[1]) & (ys < raster.shape[0])
+        result[inside] = raster[ys[inside], xs[inside]].astype(np.int64) - 1
+        return result
+    
+    def _get_zone_raster(self) -> Optional[np.ndarray]:
+        """Zone-index raster of the calibrated view, built on first use."""
+        if self._zone_raster is not None or not self.calibration_zones:
+            return self._zone_raster
+        
+        self._zone_list = list(self.calibration_zones.values())
+        polygons = [np.array(zone.pixel_points, dtype=np.int32).reshape(-1, 2) for zone in self._zone_list]
+        
+        # Covers every zone; anything beyond it is outside all zones
+        width = max(int(polygon[:, 0].max()) for polygon in polygons) + 1
+        height = max(int(polygon[:, 1].max()) for polygon in polygons) + 1
+        dtype = np.uint8 if len(polygons) < 255 else np.uint16
+        raster = np.zeros((max(height, 1), max(width, 1)), dtype=dtype)
+        
+        # Reverse order so the first matching zone wins, like a linear search
+        for index in range(len(polygons) - 1, -1, -1):
+            cv2.fillPoly(raster, [polygons[index]], int(index + 1))
+        
+        self._zone_raster = raster
+        logger.debug(f"Zone raster built: {len(polygons)} zones, {width}x{height}")
+        return raster
     
     def _point_in_polygon(self, point: Tuple[int, int], polygon: List[Tuple[int, int]]) -> bool:
         """Check if point is inside polygon using ray casting algorithm."""
@@ -352,6 +438,7 @@ class CameraCalibrator:
             self.calibration_zones = {}
             for zone_id, zone_data in calibration_data.get("calibration_zones", {}).items():
                 self.calibration_zones[zone_id] = CalibrationZone(**zone_data)
+            self._zone_raster = None
             
             # Load metrics
             self.calibration_error = calibration_data.get("calibration_error")
@@ -380,6 +467,7 @@ class CameraCalibrator:
         # Clear existing calibration
         self.calibration_points.clear()
         self.calibration_zones.clear()
+        self._zone_raster = None
         
         # Define highway lanes (assumption: 3.5m lane width, 50m visible distance)
         lane_width = 3.5  # meters
@@ -149,15 +149,19 @@ class SpeedAnalyzer:
                         timestamp
                     )
             
-            # Step 4: Calculate speeds for stable tracks
-            speed_measurements = []
+            # Step 4: Calculate speeds for stable tracks (one batch for all trajectories)
+            stable_trajectories = []
             for vehicle in tracked_vehicles:
                 if vehicle.consecutive_frames >= self.min_tracking_frames:
                     trajectory = self.trajectory_manager.get_trajectory(vehicle.track_id)
                     if trajectory and len(trajectory.positions) >= 5:
-                        measurement = self.speed_calculator.calculate_speed_from_trajectory(trajectory)
-                        if measurement:
-                            speed_measurements.append(measurement)
+                        stable_trajectories.append(trajectory)
+            
+            speed_measurements = [
+                measurement
+                for measurement in self.speed_calculator.calculate_speeds(stable_trajectories)
+                if measurement
+            ]
             
             # Step 5: Detect violations
             violations = []
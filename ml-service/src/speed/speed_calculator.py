@@ -96,100 +96,148 @@ class SpeedCalculator:
         Returns:
             Speed measurement or None if calculation failed
         """
+        return self.calculate_speeds([trajectory], zone_id)[0]
+    
+    def calculate_speeds(self, trajectories: List[Trajectory], zone_id: Optional[str] = None) -> List[Optional[SpeedMeasurement]]:
+        """
+        Calculate speeds for many trajectories at once.
+        
+        Every point of every trajectory is converted with a single homography
+        operation and the measurement zones are looked up in one batch.
+        
+        Args:
+            trajectories: Vehicle trajectories
+            zone_id: Optional specific zone for measurement
+            
+        Returns:
+            Speed measurement (or None) for each trajectory
+        """
+        results: List[Optional[SpeedMeasurement]] = [None] * len(trajectories)
+        
         if not self.calibrator.is_calibrated:
             logger.warning("Camera not calibrated, cannot calculate speed")
-            return None
-        
-        if len(trajectory.positions) < 2:
-            logger.warning(f"Insufficient trajectory data for vehicle {trajectory.vehicle_id}")
-            return None
+            return results
+        
+        # Gather all pixel positions of the usable trajectories
+        pixel_arrays = []
+        timestamp_arrays = []
+        indexes = []
+        for index, trajectory in enumerate(trajectories):
+            positions = np.asarray(trajectory.positions, dtype=np.float64).reshape(-1, 2)
+            if len(positions) < 2:
+                logger.warning(f"Insufficient trajectory data for vehicle {trajectory.track_id}")
+                continue
+            pixel_arrays.append(positions)
+            timestamp_arrays.append(np.asarray(trajectory.timestamps, dtype=np.float64))
+            indexes.append(index)
+        
+        if not indexes:
+            return results
         
         try:
-            # Convert pixel trajectory to real-world coordinates
-            real_positions = []
-            valid_timestamps = []
+            # Convert pixel trajectories to real-world coordinates (one matrix operation)
+            real_all = self.calibrator.pixel_to_real_many(np.concatenate(pixel_arrays))
+            bounds = np.cumsum([0] + [len(positions) for positions in pixel_arrays])
             
-            for i, (pixel_x, pixel_y) in enumerate(trajectory.positions):
-                real_coords = self.calibrator.pixel_to_real(pixel_x, pixel_y)
-                if real_coords is not None:
-                    real_positions.append(real_coords)
-                    valid_timestamps.append(trajectory.timestamps[i])
-            
-            if len(real_positions) < 2:
-                logger.warning(f"Insufficient valid real-world positions for vehicle {trajectory.vehicle_id}")
-                return None
+            # Determine measurement zones (auto-detect from the trajectory center point)
+            zones: List[Optional[CalibrationZone]] = [None] * len(indexes)
+            if not zone_id:
+                centers = [positions[len(positions) // 2] for positions in pixel_arrays]
+                zones = self.calibrator.get_zones_for_points(centers)
+        except Exception as e:
+            logger.error(f"Failed to calculate speed from trajectory: {e}")
+            return results
+        
+        for slot, index in enumerate(indexes):
+            trajectory = trajectories[index]
             
-            # Determine measurement zone
             measurement_zone = "default"
             if zone_id:
                 if zone_id in self.calibrator.calibration_zones:
                     measurement_zone = zone_id
-            else:
-                # Auto-detect zone from trajectory
-                center_pixel = trajectory.positions[len(trajectory.positions) // 2]
-                zone = self.calibrator.get_zone_for_point(center_pixel[0], center_pixel[1])
-                if zone:
-                    measurement_zone = zone.zone_id
-            
-            # Calculate distance and time
-            start_pos = real_positions[0]
-            end_pos = real_positions[-1]
-            start_time = valid_timestamps[0]
-            end_time = valid_timestamps[-1]
-            
-            distance_traveled = math.sqrt(
-                (end_pos[0] - start_pos[0])**2 + 
-                (end_pos[1] - start_pos[1])**2
-            )
-            
-            time_elapsed = end_time - start_time
-            
-            # Validate measurement parameters
-            if distance_traveled < self.min_measurement_distance:
-                logger.warning(f"Measurement distance too short: {distance_traveled:.2f}m")
-                return None
-            
-            if time_elapsed < self.min_measurement_time:
-                logger.warning(f"Measurement time too short: {time_elapsed:.2f}s")
-                return None
-            
-            # Calculate speed
-            speed_mps = distance_traveled / time_elapsed
-            speed_kmh = speed_mps * 3.6
-            
-            # Calculate confidence based on trajectory quality
-            confidence = self._calculate_speed_confidence(
-                trajectory, real_positions, distance_traveled, time_elapsed
-            )
-            
-            measurement = SpeedMeasurement(
-                vehicle_id=trajectory.vehicle_id,
-                timestamp=end_time,
-                speed_kmh=speed_kmh,
-                speed_mps=speed_mps,
-                distance_traveled=distance_traveled,
-                time_elapsed=time_elapsed,
-                measurement_zone=measurement_zone,
-                confidence=confidence,
-                entry_point=start_pos,
-                exit_point=end_pos,
-                entry_time=start_time,
-                exit_time=end_time,
-                pixel_trajectory=trajectory.positions.copy(),
-                real_trajectory=real_positions
-            )
-            
-            # Store measurement
-            if trajectory.vehicle_id not in self.speed_measurements:
-                self.speed_measurements[trajectory.vehicle_id] = []
-            self.speed_measurements[trajectory.vehicle_id].append(measurement)
+            elif zones[slot]:
+                measurement_zone = zones[slot].zone_id
             
-            logger.info(f"Speed calculated for vehicle {trajectory.vehicle_id}: {speed_kmh:.2f} km/h")
-            return measurement
-            
-        except Exception as e:
-            logger.error(f"Failed to calculate speed from trajectory: {e}")
+            try:
+                results[index] = self._measure_trajectory(
+                    trajectory,
+                    pixel_arrays[slot],
+                    real_all[bounds[slot]:bounds[slot + 1]],
+                    timestamp_arrays[slot],
+                    measurement_zone
+                )
+            except Exception as e:
+                logger.error(f"Failed to calculate speed from trajectory: {e}")
+        
+        return results
+    
+    def _measure_trajectory(self, trajectory: Trajectory, pixels: np.ndarray, real: np.ndarray,
+                            timestamps: np.ndarray, measurement_zone: str) -> Optional[SpeedMeasurement]:
+        """Build the speed measurement of one trajectory from its converted points."""
+        valid = np.isfinite(real).all(axis=1)
+        if valid.sum() < 2:
+            logger.warning(f"Insufficient valid real-world positions for vehicle {trajectory.track_id}")
+            return None
+        
+        real_valid = real[valid]
+        valid_timestamps = timestamps[valid]
+        real_positions = list(map(tuple, real_valid.tolist()))
+        
+        # Calculate distance and time
+        start_pos = real_positions[0]
+        end_pos = real_positions[-1]
+        start_time = float(valid_timestamps[0])
+        end_time = float(valid_timestamps[-1])
+        
+        distance_traveled = math.sqrt(
+            (end_pos[0] - start_pos[0])**2 + 
+            (end_pos[1] - start_pos[1])**2
+        )
+        
+        time_elapsed = end_time - start_time
+        
+        # Validate measurement parameters
+        if distance_traveled < self.min_measurement_distance:
+            logger.warning(f"Measurement distance too short: {distance_traveled:.2f}m")
             return None
+        
+        if time_elapsed < self.min_measurement_time:
+            logger.warning(f"Measurement time too short: {time_elapsed:.2f}s")
+            return None
+        
+        # Calculate speed
+        speed_mps = distance_traveled / time_elapsed
+        speed_kmh = speed_mps * 3.6
+        
+        # Calculate confidence based on trajectory quality
+        confidence = self._calculate_speed_confidence(
+            trajectory, real_positions, distance_traveled, time_elapsed
+        )
+        
+        measurement = SpeedMeasurement(
+            vehicle_id=trajectory.track_id,
+            timestamp=end_time,
+            speed_kmh=speed_kmh,
+            speed_mps=speed_mps,
+            distance_traveled=distance_traveled,
+            time_elapsed=time_elapsed,
+            measurement_zone=measurement_zone,
+            confidence=confidence,
+            entry_point=start_pos,
+            exit_point=end_pos,
+            entry_time=start_time,
+            exit_time=end_time,
+            pixel_trajectory=list(map(tuple, pixels.astype(int).tolist())),
+            real_trajectory=real_positions
+        )
+        
+        # Store measurement
+        if trajectory.track_id not in self.speed_measurements:
+            self.speed_measurements[trajectory.track_id] = []
+        self.speed_measurements[trajectory.track_id].append(measurement)
+        
+        logger.info(f"Speed calculated for vehicle {trajectory.track_id}: {speed_kmh:.2f} km/h")
+        return measurement
     
     def calculate_instantaneous_speed(self, trajectory: Trajectory, window_size: int = 3) -> List[float]:
         """
@@ -205,42 +253,29 @@ class SpeedCalculator:
         if not self.calibrator.is_calibrated or len(trajectory.positions) < window_size:
             return []
         
+        # Convert the whole trajectory at once
+        real = self.calibrator.pixel_to_real_many(trajectory.positions)
+        timestamps = np.asarray(trajectory.timestamps, dtype=np.float64)
+        valid = np.isfinite(real).all(axis=1)
+        
+        if valid.all():
+            # Speed over each window: first -> last point
+            span = window_size - 1
+            distances = np.sqrt(((real[span:] - real[:len(real) - span]) ** 2).sum(axis=1))
+            time_diffs = timestamps[span:] - timestamps[:len(timestamps) - span]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                speeds = np.where(time_diffs > 0, distances / time_diffs * 3.6, 0.0)
+            return speeds.tolist()
+        
+        # Some points could not be converted: use the first/last valid point of each window
         speeds = []
-        
-        for i in range(len(trajectory.positions) - window_size + 1):
-            # Get window of positions
-            window_positions = trajectory.positions[i:i + window_size]
-            window_timestamps = trajectory.timestamps[i:i + window_size]
-            
-            # Convert to real-world coordinates
-            real_positions = []
-            valid_timestamps = []
-            
-            for j, (px, py) in enumerate(window_positions):
-                real_coords = self.calibrator.pixel_to_real(px, py)
-                if real_coords is not None:
-                    real_positions.append(real_coords)
-                    valid_timestamps.append(window_timestamps[j])
-            
-            if len(real_positions) >= 2:
-                # Calculate speed over window
-                start_pos = real_positions[0]
-                end_pos = real_positions[-1]
-                start_time = valid_timestamps[0]
-                end_time = valid_timestamps[-1]
-                
-                distance = math.sqrt(
-                    (end_pos[0] - start_pos[0])**2 + 
-                    (end_pos[1] - start_pos[1])**2
-                )
-                
-                time_diff = end_time - start_time
-                if time_diff > 0:
-                    speed_mps = distance / time_diff
-                    speed_kmh = speed_mps * 3.6
-                    speeds.append(speed_kmh)
-                else:
-                    speeds.append(0.0)
+        for i in range(len(real) - window_size + 1):
+            window_valid = np.flatnonzero(valid[i:i + window_size]) + i
+            if len(window_valid) >= 2:
+                first, last = window_valid[0], window_valid[-1]
+                distance = float(np.sqrt(((real[last] - real[first]) ** 2).sum()))
+                time_diff = timestamps[last] - timestamps[first]
+                speeds.append(distance / time_diff * 3.6 if time_diff > 0 else 0.0)
             else:
                 speeds.append(0.0)
         
@@ -337,33 +372,23 @@ class SpeedCalculator:
         # Penalize irregular trajectories
         if len(real_positions) > 2:
             # Calculate trajectory smoothness
-            direction_changes = 0
-            prev_direction = None
+            steps = np.diff(np.asarray(real_positions, dtype=np.float64), axis=0)
+            
+            # Ignore very small movements
+            moving = (np.abs(steps[:, 0]) > 0.1) | (np.abs(steps[:, 1]) > 0.1)
+            directions = np.arctan2(steps[moving, 1], steps[moving, 0])
+            
+            angle_diffs = np.abs(np.diff(directions))
+            # Normalize to [0, π]
+            angle_diffs = np.where(angle_diffs > math.pi, 2 * math.pi - angle_diffs, angle_diffs)
             
-            for i in range(1, len(real_positions)):
-                dx = real_positions[i][0] - real_positions[i-1][0]
-                dy = real_positions[i][1] - real_positions[i-1][1]
-                
-                if abs(dx) > 0.1 or abs(dy) > 0.1:  # Ignore very small movements
-                    current_direction = math.atan2(dy, dx)
-                    
-                    if prev_direction is not None:
-                        angle_diff = abs(current_direction - prev_direction)
-                        # Normalize to [0, π]
-                        if angle_diff > math.pi:
-                            angle_diff = 2 * math.pi - angle_diff
-                        
-                        # Consider significant direction changes
-                        if angle_diff > math.pi / 4:  # 45 degrees
-                            direction_changes += 1
-                    
-                    prev_direction = current_direction
+            # Consider significant direction changes (45 degrees)
+            direction_changes = int(np.count_nonzero(angle_diffs > math.pi / 4))
             
             # Penalize excessive direction changes
-            if len(real_positions) > 0:
-                change_ratio = direction_changes / len(real_positions)
-                if change_ratio > 0.2:
-                    confidence *= (1.0 - change_ratio)
+            change_ratio = direction_changes / len(real_positions)
+            if change_ratio > 0.2:
+                confidence *= (1.0 - change_ratio)
         
         # Ensure confidence is in [0, 1]
         return max(0.0, min(1.0, confidence))
@@ -23,6 +23,8 @@ from .storage_service import (
     ArchiveManager
 )
 
+from .tiering import TieringEngine
+
 from .data_utils import (
     DataValidator,
     DataLifecycleManager,
@@ -49,6 +51,7 @@ __all__ = [
     'StorageService',
     'StorageStrategy',
     'ArchiveManager',
+    'TieringEngine',
     
     # Data utilities
     'DataValidator',
@@ -15,14 +15,17 @@ import asyncio
 import hashlib
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Union, Any, BinaryIO
+from typing import Dict, List, Optional, Tuple, Union, Any, BinaryIO
 from pathlib import Path
 import json
 import pickle
 import gzip
+import shutil
 import sqlite3
+import zlib
 from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass, asdict
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, replace
 import threading
 from enum import Enum
 import uuid
@@ -31,10 +34,12 @@ import numpy as np
 import cv2
 from PIL import Image
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 import redis
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, Json, execute_values
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 
 
 logger = logging.getLogger(__name__)
@@ -59,6 +64,10 @@ class DataType(Enum):
     METADATA = "metadata"
 
 
+# Data types worth gzipping on local storage
+COMPRESSIBLE_TYPES = {DataType.JSON, DataType.TEXT, DataType.METADATA}
+
+
 @dataclass
 class StorageConfig:
     """Storage configuration."""
@@ -72,6 +81,10 @@ class StorageConfig:
     db_name: str = "traffic_system"
     db_user: str = "admin"
     db_password: str = "password"
+    db_pool_min_connections: int = 1
+    db_pool_max_connections: int = 10
+    db_pool_timeout_seconds: float = 30.0
+    db_batch_page_size: int = 500
     
     # S3/MinIO configuration
     s3_endpoint: Optional[str] = None
@@ -90,6 +103,12 @@ class StorageConfig:
     video_retention_days: int = 30
     metadata_retention_days: int = 365
     
+    # Tiering to S3/MinIO (watermarks in % of max_local_size_gb)
+    tiering_high_watermark: float = 85.0
+    tiering_low_watermark: float = 70.0
+    tiering_min_age_hours: float = 24.0
+    tiering_batch_size: int = 200
+    
     # Performance settings
     compression_enabled: bool = True
     parallel_uploads: int = 4
@@ -141,15 +160,105 @@ class ViolationRecord:
     model_versions: Dict[str, str]
 
 
+class StorageUsageLedger:
+    """
+    Incremental usage index of local storage.
+    
+    Keeps bytes and file counts per data type and per day directory
+    (``%Y/%m/%d``) in a sidecar SQLite file next to the stored data, so usage
+    and retention queries do not walk the file tree. The ledger is updated by
+    LocalStorageManager on every store and delete.
+    """
+    
+    def __init__(self, db_path: Union[str, Path]):
+        self.db_path = Path(db_path)
+        self.created = not self.db_path.exists()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS storage_usage (
+                data_type TEXT NOT NULL,
+                day TEXT NOT NULL,
+                bytes INTEGER NOT NULL DEFAULT 0,
+                files INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (data_type, day)
+            )
+        """)
+        self._conn.commit()
+    
+    def record(self, data_type: DataType, day: str, bytes_delta: int, files_delta: int):
+        """Add bytes/files to a day directory (negative deltas on delete)."""
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO storage_usage (data_type, day, bytes, files)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (data_type, day) DO UPDATE SET
+                bytes = MAX(bytes + excluded.bytes, 0),
+                files = MAX(files + excluded.files, 0)
+            """, (data_type.value, day, bytes_delta, files_delta))
+            self._conn.execute(
+                "DELETE FROM storage_usage WHERE data_type = ? AND day = ? AND files <= 0",
+                (data_type.value, day)
+            )
+    
+    def totals(self) -> Dict[str, Tuple[int, int]]:
+        """(bytes, files) per data type."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data_type, SUM(bytes), SUM(files) FROM storage_usage GROUP BY data_type"
+            ).fetchall()
+        return {data_type: (size, files) for data_type, size, files in rows}
+    
+    def days(self, data_type: DataType, before: Optional[str] = None) -> List[Tuple[str, int, int]]:
+        """(day, bytes, files) of a data type, oldest first, optionally only days before a day."""
+        query = "SELECT day, bytes, files FROM storage_usage WHERE data_type = ?"
+        params: List[Any] = [data_type.value]
+        if before is not None:
+            query += " AND day < ?"
+            params.append(before)
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY day", params).fetchall()
+    
+    def remove_day(self, data_type: DataType, day: str):
+        """Forget a day directory (after it was deleted)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM storage_usage WHERE data_type = ? AND day = ?",
+                (data_type.value, day)
+            )
+    
+    def replace_all(self, rows: List[Tuple[DataType, str, int, int]]):
+        """Replace the whole index (used when rebuilding it from disk)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM storage_usage")
+            self._conn.executemany(
+                "INSERT INTO storage_usage (data_type, day, bytes, files) VALUES (?, ?, ?, ?)",
+                [(data_type.value, day, size, files) for data_type, day, size, files in rows]
+            )
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
 class LocalStorageManager:
     """Local file system storage manager."""
     
+    USAGE_INDEX_FILE = "usage_index.db"
+    
     def __init__(self, config: StorageConfig):
         self.config = config
         self.base_path = Path(config.local_base_path)
         self.executor = ThreadPoolExecutor(max_workers=config.parallel_uploads)
         self._ensure_directories()
         
+        # Usage per type and day directory, so usage/retention do not walk the tree
+        self.usage_ledger = StorageUsageLedger(self.base_path / self.USAGE_INDEX_FILE)
+        if self.usage_ledger.created:
+            self.rebuild_usage_index()
+        
     def _ensure_directories(self):
         """Ensure required directories exist."""
         directories = [
@@ -176,31 +285,125 @@ class LocalStorageManager:
             
         return self.base_path / type_dir / date_str / filename
     
-    def _calculate_checksum(self, file_path: Path) -> str:
-        """Calculate file checksum."""
-        hash_sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_sha256.update(chunk)
-        return hash_sha256.hexdigest()
+    def _type_dir(self, data_type: DataType) -> Path:
+        return self.base_path / (data_type.value + "s")
     
-    def store_image(self, image: np.ndarray, file_id: str, 
-                   metadata: Optional[Dict] = None) -> StorageMetadata:
-        """Store image to local storage."""
-        file_path = self._get_file_path(file_id, DataType.IMAGE, "jpg")
+    def _ledger_key(self, file_path: Path) -> Optional[Tuple[DataType, str]]:
+        """(data type, day directory) of a stored file, None if outside the layout."""
+        try:
+            parts = Path(file_path).relative_to(self.base_path).parts
+        except ValueError:
+            return None
+        if len(parts) != 5:
+            return None
+        for data_type in DataType:
+            if parts[0] == data_type.value + "s":
+                return data_type, "/".join(parts[1:4])
+        return None
+    
+    def _record_usage(self, file_path: Path, bytes_delta: int, files_delta: int):
+        key = self._ledger_key(file_path)
+        if key is not None:
+            self.usage_ledger.record(key[0], key[1], bytes_delta, files_delta)
+    
+    def _should_compress(self, data_type: DataType) -> bool:
+        """Only text formats gain from gzip (JPEG/MP4 are already compressed)."""
+        return self.config.compression_enabled and data_type in COMPRESSIBLE_TYPES
+    
+    def _write_atomic(self, file_path: Path, data: Union[bytes, bytearray, memoryview],
+                      compress: bool = False) -> Tuple[int, str]:
+        """
+        Write data to file_path in a single pass.
+        
+        The SHA-256 of the data is computed while writing (gzip applied on the
+        fly if compress), the temporary file is fsynced and then renamed over
+        file_path, so readers never see a partial file.
+        
+        Returns:
+            Tuple of (bytes on disk, checksum of the uncompressed data)
+        """
         file_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = file_path.with_name(f".{file_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        chunk_size = max(1, self.config.chunk_size_mb) * 1024 * 1024
+        hash_sha256 = hashlib.sha256()
+        view = memoryview(data)
         
-        # Save image
-        cv2.imwrite(str(file_path), image)
+        try:
+            with open(temp_path, "wb") as raw:
+                out = gzip.GzipFile(fileobj=raw, mode="wb") if compress else raw
+                try:
+                    for offset in range(0, len(view), chunk_size):
+                        chunk = view[offset:offset + chunk_size]
+                        hash_sha256.update(chunk)
+                        out.write(chunk)
+                finally:
+                    if compress:
+                        out.close()
+                raw.flush()
+                os.fsync(raw.fileno())
+                file_size = raw.tell()
+            try:
+                replaced_size = file_path.stat().st_size
+            except FileNotFoundError:
+                replaced_size = None
+            os.replace(temp_path, file_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        
+        self._fsync_directory(file_path.parent)
+        if replaced_size is None:
+            self._record_usage(file_path, file_size, 1)
+        else:
+            self._record_usage(file_path, file_size - replaced_size, 0)
+        return file_size, hash_sha256.hexdigest()
+    
+    @staticmethod
+    def _fsync_directory(directory: Path):
+        """Persist the rename (no-op where directories cannot be opened)."""
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+    
+    async def _run_in_executor(self, func, *args):
+        """Run a blocking write on the storage thread pool."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+    
+    def store_image(self, image: np.ndarray, file_id: str, 
+                   metadata: Optional[Dict] = None,
+                   encoded: Optional[bytes] = None) -> StorageMetadata:
+        """
+        Store image to local storage.
         
-        # Compress if enabled
-        if self.config.compression_enabled:
-            self._compress_file(file_path)
-            file_path = file_path.with_suffix(file_path.suffix + '.gz')
+        Args:
+            image: BGR image
+            file_id: File identifier
+            metadata: Tags stored with the file
+            encoded: JPEG bytes of image if the caller already encoded it
+        """
+        if encoded is None:
+            ok, buffer = cv2.imencode(".jpg", image)
+            if not ok:
+                raise ValueError(f"Failed to encode image {file_id}")
+            encoded = buffer.tobytes()
         
-        # Calculate metadata
-        file_size = file_path.stat().st_size
-        checksum = self._calculate_checksum(file_path)
+        storage_metadata = self.store_encoded_image(encoded, file_id, metadata)
+        logger.info(f"Stored image {file_id} at {storage_metadata.file_path}")
+        return storage_metadata
+    
+    def store_encoded_image(self, image_data: bytes, file_id: str,
+                            metadata: Optional[Dict] = None) -> StorageMetadata:
+        """Store an already JPEG-encoded image (written as is, JPEG does not gzip)."""
+        file_path = self._get_file_path(file_id, DataType.IMAGE, "jpg")
+        file_size, checksum = self._write_atomic(file_path, image_data)
         
         storage_metadata = StorageMetadata(
             id=file_id,
@@ -212,29 +415,17 @@ class LocalStorageManager:
             created_at=datetime.now(),
             expires_at=datetime.now() + timedelta(days=self.config.image_retention_days),
             tags=metadata,
-            compressed=self.config.compression_enabled
+            compressed=False
         )
         
-        logger.info(f"Stored image {file_id} at {file_path}")
+        logger.debug(f"Stored encoded image {file_id} at {file_path}")
         return storage_metadata
     
     def store_video_segment(self, video_data: bytes, file_id: str,
                            duration_seconds: float) -> StorageMetadata:
-        """Store video segment to local storage."""
+        """Store video segment to local storage (MP4 is written as is)."""
         file_path = self._get_file_path(file_id, DataType.VIDEO, "mp4")
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Write video data
-        with open(file_path, "wb") as f:
-            f.write(video_data)
-        
-        # Compress if enabled
-        if self.config.compression_enabled:
-            self._compress_file(file_path)
-            file_path = file_path.with_suffix(file_path.suffix + '.gz')
-        
-        file_size = file_path.stat().st_size
-        checksum = self._calculate_checksum(file_path)
+        file_size, checksum = self._write_atomic(file_path, video_data)
         
         storage_metadata = StorageMetadata(
             id=file_id,
@@ -246,28 +437,18 @@ class LocalStorageManager:
             created_at=datetime.now(),
             expires_at=datetime.now() + timedelta(days=self.config.video_retention_days),
             tags={"duration_seconds": str(duration_seconds)},
-            compressed=self.config.compression_enabled
+            compressed=False
         )
         
         logger.info(f"Stored video segment {file_id} at {file_path}")
         return storage_metadata
     
     def store_metadata(self, data: Dict[str, Any], file_id: str) -> StorageMetadata:
-        """Store metadata as JSON."""
-        file_path = self._get_file_path(file_id, DataType.METADATA, "json")
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Save as JSON
-        with open(file_path, "w") as f:
-            json.dump(data, f, indent=2, default=str)
-        
-        # Compress if enabled
-        if self.config.compression_enabled:
-            self._compress_file(file_path)
-            file_path = file_path.with_suffix(file_path.suffix + '.gz')
-        
-        file_size = file_path.stat().st_size
-        checksum = self._calculate_checksum(file_path)
+        """Store metadata as JSON (gzipped if compression is enabled)."""
+        compress = self._should_compress(DataType.METADATA)
+        file_path = self._get_file_path(file_id, DataType.METADATA, "json.gz" if compress else "json")
+        payload = json.dumps(data, indent=2, default=str).encode("utf-8")
+        file_size, checksum = self._write_atomic(file_path, payload, compress=compress)
         
         storage_metadata = StorageMetadata(
             id=file_id,
@@ -278,22 +459,26 @@ class LocalStorageManager:
             checksum=checksum,
             created_at=datetime.now(),
             expires_at=datetime.now() + timedelta(days=self.config.metadata_retention_days),
-            compressed=self.config.compression_enabled
+            compressed=compress
         )
         
         logger.info(f"Stored metadata {file_id} at {file_path}")
         return storage_metadata
     
-    def _compress_file(self, file_path: Path):
-        """Compress file using gzip."""
-        compressed_path = file_path.with_suffix(file_path.suffix + '.gz')
-        
-        with open(file_path, 'rb') as f_in:
-            with gzip.open(compressed_path, 'wb') as f_out:
-                f_out.writelines(f_in)
-        
-        # Remove original file
-        file_path.unlink()
+    async def store_image_async(self, image: np.ndarray, file_id: str,
+                                metadata: Optional[Dict] = None,
+                                encoded: Optional[bytes] = None) -> StorageMetadata:
+        """Store image on the storage thread pool."""
+        return await self._run_in_executor(self.store_image, image, file_id, metadata, encoded)
+    
+    async def store_video_segment_async(self, video_data: bytes, file_id: str,
+                                        duration_seconds: float) -> StorageMetadata:
+        """Store video segment on the storage thread pool."""
+        return await self._run_in_executor(self.store_video_segment, video_data, file_id, duration_seconds)
+    
+    async def store_metadata_async(self, data: Dict[str, Any], file_id: str) -> StorageMetadata:
+        """Store metadata on the storage thread pool."""
+        return await self._run_in_executor(self.store_metadata, data, file_id)
     
     def retrieve_file(self, file_id: str, storage_metadata: StorageMetadata) -> bytes:
         """Retrieve file from local storage."""
@@ -323,7 +508,9 @@ class LocalStorageManager:
         
         try:
             if file_path.exists():
+                file_size = file_path.stat().st_size
                 file_path.unlink()
+                self._record_usage(file_path, -file_size, -1)
                 logger.info(f"Deleted file {storage_metadata.id}")
                 return True
             else:
@@ -334,18 +521,11 @@ class LocalStorageManager:
             return False
     
     def get_storage_usage(self) -> Dict[str, Any]:
-        """Get storage usage statistics."""
-        total_size = 0
-        file_count = 0
-        type_sizes = {}
-        
-        for data_type in DataType:
-            type_dir = self.base_path / (data_type.value + "s")
-            if type_dir.exists():
-                type_size = sum(f.stat().st_size for f in type_dir.rglob("*") if f.is_file())
-                type_sizes[data_type.value] = type_size
-                total_size += type_size
-                file_count += len(list(type_dir.rglob("*")))
+        """Get storage usage statistics (read from the usage index, no file walk)."""
+        totals = self.usage_ledger.totals()
+        type_sizes = {data_type.value: totals.get(data_type.value, (0, 0))[0] for data_type in DataType}
+        total_size = sum(type_sizes.values())
+        file_count = sum(files for _, files in totals.values())
         
         usage_percentage = (total_size / (self.config.max_local_size_gb * 1024**3)) * 100
         
@@ -358,40 +538,85 @@ class LocalStorageManager:
             "max_size_gb": self.config.max_local_size_gb
         }
     
+    def rebuild_usage_index(self) -> Dict[str, Any]:
+        """
+        Rebuild the usage index from disk.
+        
+        Only needed when the index is missing (first start on an existing
+        tree) or suspected to be out of sync; this is the one place that
+        walks every stored file.
+        """
+        rows = []
+        for data_type in DataType:
+            type_dir = self._type_dir(data_type)
+            for day_dir in sorted(type_dir.glob("*/*/*")):
+                if not day_dir.is_dir():
+                    continue
+                size = files = 0
+                with os.scandir(day_dir) as entries:
+                    for entry in entries:
+                        if entry.is_file() and not entry.name.startswith("."):
+                            size += entry.stat().st_size
+                            files += 1
+                if files:
+                    rows.append((data_type, day_dir.relative_to(type_dir).as_posix(), size, files))
+        
+        self.usage_ledger.replace_all(rows)
+        logger.info(f"Rebuilt storage usage index: {len(rows)} day directories")
+        return self.get_storage_usage()
+    
     def cleanup_expired_files(self) -> Dict[str, int]:
-        """Clean up expired files based on retention policies."""
+        """
+        Clean up expired files based on retention policies.
+        
+        Whole day directories are removed once every file in them is past
+        retention (the day is older than the cutoff date); expired days are
+        found in the usage index, individual files are never stat-ed.
+        """
         deleted_counts = {"images": 0, "videos": 0, "metadata": 0}
         now = datetime.now()
         
         # Define retention periods
         retention_policies = {
-            "images": timedelta(days=self.config.image_retention_days),
-            "videos": timedelta(days=self.config.video_retention_days),
-            "metadata": timedelta(days=self.config.metadata_retention_days)
+            "images": (DataType.IMAGE, timedelta(days=self.config.image_retention_days)),
+            "videos": (DataType.VIDEO, timedelta(days=self.config.video_retention_days)),
+            "metadata": (DataType.METADATA, timedelta(days=self.config.metadata_retention_days))
         }
         
-        for data_type, retention_period in retention_policies.items():
-            type_dir = self.base_path / data_type
-            if not type_dir.exists():
-                continue
+        for name, (data_type, retention_period) in retention_policies.items():
+            type_dir = self._type_dir(data_type)
+            cutoff_day = (now - retention_period).strftime("%Y/%m/%d")
+            
+            for day, _, files in self.usage_ledger.days(data_type, before=cutoff_day):
+                day_dir = type_dir / day
+                try:
+                    shutil.rmtree(day_dir)
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    logger.error(f"Error deleting expired directory {day_dir}: {e}")
+                    continue
                 
-            cutoff_time = now - retention_period
-            
-            for file_path in type_dir.rglob("*"):
-                if file_path.is_file():
-                    file_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-                    if file_time < cutoff_time:
-                        try:
-                            file_path.unlink()
-                            deleted_counts[data_type] += 1
-                            logger.debug(f"Deleted expired file: {file_path}")
-                        except Exception as e:
-                            logger.error(f"Error deleting expired file {file_path}: {e}")
+                self.usage_ledger.remove_day(data_type, day)
+                deleted_counts[name] += files
+                logger.debug(f"Deleted expired directory: {day_dir}")
+                
+                # Drop month/year directories left empty
+                for parent in (day_dir.parent, day_dir.parent.parent):
+                    try:
+                        parent.rmdir()
+                    except OSError:
+                        break
         
         total_deleted = sum(deleted_counts.values())
         logger.info(f"Cleanup completed: {total_deleted} files deleted")
         
         return deleted_counts
+    
+    def close(self):
+        """Release the thread pool and the usage index."""
+        self.executor.shutdown(wait=True)
+        self.usage_ledger.close()
 
 
 class CloudStorageManager:
@@ -427,6 +652,62 @@ class CloudStorageManager:
             
         return f"{type_prefix}/{date_str}/{filename}"
     
+    @staticmethod
+    def _content_type(data_type: DataType) -> Tuple[str, str]:
+        """(content type, extension) of a data type."""
+        if data_type == DataType.IMAGE:
+            return "image/jpeg", "jpg"
+        elif data_type == DataType.VIDEO:
+            return "video/mp4", "mp4"
+        elif data_type in (DataType.JSON, DataType.METADATA):
+            return "application/json", "json"
+        return "application/octet-stream", "bin"
+    
+    @property
+    def part_size(self) -> int:
+        """Multipart part size (S3 requires at least 5 MiB per part)."""
+        return max(5, self.config.chunk_size_mb) * 1024 * 1024
+    
+    def _transfer_config(self) -> TransferConfig:
+        """Files of part_size or more are uploaded as parallel multipart uploads."""
+        return TransferConfig(
+            multipart_threshold=self.part_size,
+            multipart_chunksize=self.part_size,
+            max_concurrency=self.config.parallel_uploads,
+            use_threads=True
+        )
+    
+    @staticmethod
+    def file_digests(file_path: Path, part_size: int, compressed: bool = False) -> Tuple[str, str, int]:
+        """
+        Checksums of a local file in a single read.
+        
+        Returns:
+            Tuple of (SHA-256 of the content, gunzipped if compressed;
+            S3 ETag expected for an upload with part_size parts; size)
+        """
+        hash_sha256 = hashlib.sha256()
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS) if compressed else None
+        part_md5s = []
+        size = 0
+        
+        with open(file_path, "rb") as f:
+            while True:
+                chunk = f.read(part_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                part_md5s.append(hashlib.md5(chunk).digest())
+                hash_sha256.update(inflater.decompress(chunk) if inflater else chunk)
+        if inflater:
+            hash_sha256.update(inflater.flush())
+        
+        if size < part_size:
+            etag = part_md5s[0].hex() if part_md5s else hashlib.md5(b"").hexdigest()
+        else:
+            etag = f"{hashlib.md5(b''.join(part_md5s)).hexdigest()}-{len(part_md5s)}"
+        return hash_sha256.hexdigest(), etag, size
+    
     async def upload_file_async(self, data: bytes, file_id: str, data_type: DataType,
                                metadata: Optional[Dict] = None) -> StorageMetadata:
         """Upload file to cloud storage asynchronously."""
@@ -440,24 +721,15 @@ class CloudStorageManager:
     def _upload_file_sync(self, data: bytes, file_id: str, data_type: DataType,
                          metadata: Optional[Dict] = None) -> StorageMetadata:
         """Upload file to cloud storage synchronously."""
-        # Determine content type and extension
-        if data_type == DataType.IMAGE:
-            content_type = "image/jpeg"
-            extension = "jpg"
-        elif data_type == DataType.VIDEO:
-            content_type = "video/mp4"
-            extension = "mp4"
-        elif data_type == DataType.JSON:
-            content_type = "application/json"
-            extension = "json"
-        else:
-            content_type = "application/octet-stream"
-            extension = "bin"
-        
+        content_type, extension = self._content_type(data_type)
         key = self._generate_key(file_id, data_type, extension)
         
-        # Compress if enabled
-        if self.config.compression_enabled:
+        # Checksum of the original data (download_file verifies after gunzip)
+        checksum = hashlib.sha256(data).hexdigest()
+        
+        # Compress only text formats (JPEG/MP4 are already compressed)
+        compress = self.config.compression_enabled and data_type in COMPRESSIBLE_TYPES
+        if compress:
             data = gzip.compress(data)
             key += ".gz"
             content_type = "application/gzip"
@@ -466,7 +738,8 @@ class CloudStorageManager:
         s3_metadata = {
             "file-id": file_id,
             "data-type": data_type.value,
-            "created-at": datetime.now().isoformat()
+            "created-at": datetime.now().isoformat(),
+            "sha256": checksum
         }
         
         if metadata:
@@ -483,9 +756,6 @@ class CloudStorageManager:
                 Metadata=s3_metadata
             )
             
-            # Calculate checksum
-            checksum = hashlib.sha256(data).hexdigest()
-            
             storage_metadata = StorageMetadata(
                 id=file_id,
                 storage_type=StorageType.S3,
@@ -495,7 +765,7 @@ class CloudStorageManager:
                 checksum=checksum,
                 created_at=datetime.now(),
                 tags=metadata,
-                compressed=self.config.compression_enabled
+                compressed=compress
             )
             
             logger.info(f"Uploaded {file_id} to S3: {key}")
@@ -505,6 +775,71 @@ class CloudStorageManager:
             logger.error(f"Failed to upload {file_id} to S3: {e}")
             raise
     
+    def upload_local_file(self, storage_metadata: StorageMetadata, key: str) -> StorageMetadata:
+        """
+        Upload a locally stored file and verify it.
+        
+        The file is streamed from disk (multipart with parallel parts from
+        part_size on). Before uploading, its content is checked against
+        storage_metadata.checksum; after uploading, the object size and ETag
+        are compared with the ones computed locally and the object is removed
+        if they differ.
+        
+        Compressed files written before the single-pass write path carry the
+        checksum of the gzip bytes instead of the content; those are accepted
+        and the returned metadata carries the content checksum.
+        
+        Args:
+            storage_metadata: Metadata of the local file
+            key: Destination object key
+            
+        Returns:
+            Metadata of the uploaded object (same compression, content checksum)
+        """
+        file_path = Path(storage_metadata.file_path)
+        checksum, expected_etag, size = self.file_digests(
+            file_path, self.part_size, storage_metadata.compressed
+        )
+        if checksum != storage_metadata.checksum:
+            legacy = (
+                storage_metadata.compressed
+                and self.file_digests(file_path, self.part_size)[0] == storage_metadata.checksum
+            )
+            if not legacy:
+                raise ValueError(f"Local checksum mismatch for {storage_metadata.id}, not uploading")
+            logger.info(f"Legacy checksum of compressed bytes for {storage_metadata.id}, replacing it")
+        
+        content_type, _ = self._content_type(storage_metadata.data_type)
+        if storage_metadata.compressed:
+            content_type = "application/gzip"
+        
+        s3_metadata = {
+            "file-id": storage_metadata.id,
+            "data-type": storage_metadata.data_type.value,
+            "created-at": storage_metadata.created_at.isoformat(),
+            "sha256": checksum
+        }
+        
+        self.client.upload_file(
+            str(file_path), self.config.s3_bucket, key,
+            ExtraArgs={"ContentType": content_type, "Metadata": s3_metadata},
+            Config=self._transfer_config()
+        )
+        
+        head = self.client.head_object(Bucket=self.config.s3_bucket, Key=key)
+        etag = head.get("ETag", "").strip('"')
+        if head.get("ContentLength") != size or etag != expected_etag:
+            self.client.delete_object(Bucket=self.config.s3_bucket, Key=key)
+            raise ValueError(
+                f"Upload verification failed for {storage_metadata.id}: "
+                f"size {head.get('ContentLength')}/{size}, etag {etag}/{expected_etag}"
+            )
+        
+        logger.info(f"Uploaded {storage_metadata.id} to S3: {key} ({size} bytes)")
+        return replace(
+            storage_metadata, storage_type=StorageType.S3, file_path=key, file_size=size, checksum=checksum
+        )
+    
     def download_file(self, storage_metadata: StorageMetadata) -> bytes:
         """Download file from cloud storage."""
         try:
@@ -565,24 +900,172 @@ class CloudStorageManager:
             raise
 
 
+INSERT_VIOLATION_RECORDS_SQL = """
+    INSERT INTO violation_records (
+        violation_id, device_id, violation_type, timestamp,
+        vehicle_bbox, license_plate, vehicle_class, confidence,
+        speed_kmh, speed_limit, trajectory,
+        image_path, video_segment_path,
+        camera_info, processing_time_ms, model_versions
+    ) VALUES %s
+    ON CONFLICT (violation_id) DO NOTHING
+    RETURNING violation_id
+"""
+
+INSERT_STORAGE_METADATA_SQL = """
+    INSERT INTO storage_metadata (
+        file_id, storage_type, data_type, file_path,
+        file_size, checksum, created_at, expires_at,
+        tags, compressed, encrypted
+    ) VALUES %s
+    ON CONFLICT (file_id) DO NOTHING
+    RETURNING file_id
+"""
+
+VIOLATION_RECORD_TEMPLATE = """(
+    %(violation_id)s, %(device_id)s, %(violation_type)s, %(timestamp)s,
+    %(vehicle_bbox)s, %(license_plate)s, %(vehicle_class)s, %(confidence)s,
+    %(speed_kmh)s, %(speed_limit)s, %(trajectory)s,
+    %(image_path)s, %(video_segment_path)s,
+    %(camera_info)s, %(processing_time_ms)s, %(model_versions)s
+)"""
+
+UPSERT_VIOLATION_ROLLUPS_SQL = """
+    INSERT INTO violation_hourly_rollups AS r (
+        device_id, hour_start, violation_type, vehicle_class,
+        violation_count, speed_count, speed_sum, speed_max,
+        confidence_sum, processing_time_sum, last_violation_at
+    ) VALUES %s
+    ON CONFLICT (device_id, hour_start, violation_type, vehicle_class) DO UPDATE SET
+    violation_count = r.violation_count + excluded.violation_count,
+    speed_count = r.speed_count + excluded.speed_count,
+    speed_sum = r.speed_sum + excluded.speed_sum,
+    speed_max = GREATEST(r.speed_max, excluded.speed_max),
+    confidence_sum = r.confidence_sum + excluded.confidence_sum,
+    processing_time_sum = r.processing_time_sum + excluded.processing_time_sum,
+    last_violation_at = GREATEST(r.last_violation_at, excluded.last_violation_at)
+"""
+
+# Columns a rollup query can group by
+ROLLUP_DIMENSIONS = {
+    "device_id": "device_id",
+    "violation_type": "violation_type",
+    "vehicle_class": "vehicle_class",
+    "hour_of_day": "EXTRACT(HOUR FROM hour_start)::int",
+    "day": "date_trunc('day', hour_start)"
+}
+
+STORAGE_METADATA_TEMPLATE = """(
+    %(file_id)s, %(storage_type)s, %(data_type)s, %(file_path)s,
+    %(file_size)s, %(checksum)s, %(created_at)s, %(expires_at)s,
+    %(tags)s, %(compressed)s, %(encrypted)s
+)"""
+
+
+def violation_rollup_rows(records: List[ViolationRecord]) -> List[Tuple]:
+    """
+    Rows of violation_hourly_rollups for a set of violation records.
+    
+    Records are aggregated per (device, hour, violation type, vehicle
+    class) first, so a batch upserts each rollup row once.
+    """
+    rollups: Dict[Tuple, List] = {}
+    for record in records:
+        hour_start = record.timestamp.replace(minute=0, second=0, microsecond=0)
+        key = (record.device_id, hour_start, record.violation_type, record.vehicle_class)
+        row = rollups.setdefault(key, [0, 0, 0.0, None, 0.0, 0.0, record.timestamp])
+        row[0] += 1
+        if record.speed_kmh is not None:
+            row[1] += 1
+            row[2] += record.speed_kmh
+            row[3] = record.speed_kmh if row[3] is None else max(row[3], record.speed_kmh)
+        row[4] += record.confidence
+        row[5] += record.processing_time_ms
+        row[6] = max(row[6], record.timestamp)
+    
+    return [key + tuple(row) for key, row in rollups.items()]
+
+
 class DatabaseManager:
-    """Database manager for violation records and metadata."""
+    """
+    Database manager for violation records and metadata.
+    
+    Connections come from a bounded thread-safe pool opened once; callers
+    wait for a free connection (up to db_pool_timeout_seconds) instead of
+    connecting to Postgres for every statement.
+    """
     
     def __init__(self, config: StorageConfig):
         self.config = config
-        self.connection_pool = []
+        self.connection_pool = ThreadedConnectionPool(
+            config.db_pool_min_connections,
+            config.db_pool_max_connections,
+            host=config.db_host,
+            port=config.db_port,
+            database=config.db_name,
+            user=config.db_user,
+            password=config.db_password,
+            cursor_factory=RealDictCursor
+        )
+        # ThreadedConnectionPool raises when exhausted; this makes callers wait
+        self._pool_slots = threading.BoundedSemaphore(config.db_pool_max_connections)
         self._initialize_schema()
     
+    @contextmanager
     def _get_connection(self):
-        """Get database connection."""
-        return psycopg2.connect(
-            host=self.config.db_host,
-            port=self.config.db_port,
-            database=self.config.db_name,
-            user=self.config.db_user,
-            password=self.config.db_password,
-            cursor_factory=RealDictCursor
-        )
+        """
+        Borrow a pooled connection.
+        
+        The transaction is committed when the block exits normally and
+        rolled back on error; the connection always goes back to the pool
+        (closed if it broke).
+        """
+        if not self._pool_slots.acquire(timeout=self.config.db_pool_timeout_seconds):
+            raise PoolError("Timed out waiting for a database connection")
+        
+        conn = None
+        try:
+            conn = self.connection_pool.getconn()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+        finally:
+            if conn is not None:
+                self.connection_pool.putconn(conn, close=bool(conn.closed))
+            self._pool_slots.release()
+    
+    def close(self):
+        """Close every pooled connection."""
+        self.connection_pool.closeall()
+    
+    @staticmethod
+    def _violation_params(record: ViolationRecord) -> Dict[str, Any]:
+        """Insert parameters of a violation record (JSONB columns wrapped)."""
+        params = asdict(record)
+        for column in ("trajectory", "camera_info", "model_versions"):
+            params[column] = Json(params[column])
+        return params
+    
+    @staticmethod
+    def _storage_metadata_params(metadata: StorageMetadata) -> Dict[str, Any]:
+        """Insert parameters of a storage metadata row."""
+        return {
+            'file_id': metadata.id,
+            'storage_type': metadata.storage_type.value,
+            'data_type': metadata.data_type.value,
+            'file_path': metadata.file_path,
+            'file_size': metadata.file_size,
+            'checksum': metadata.checksum,
+            'created_at': metadata.created_at,
+            'expires_at': metadata.expires_at,
+            'tags': json.dumps(metadata.tags) if metadata.tags else None,
+            'compressed': metadata.compressed,
+            'encrypted': metadata.encrypted
+        }
     
     def _initialize_schema(self):
         """Initialize database schema."""
@@ -643,17 +1126,63 @@ class DatabaseManager:
         
         CREATE INDEX IF NOT EXISTS idx_storage_expires 
         ON storage_metadata(expires_at);
+        
+        CREATE INDEX IF NOT EXISTS idx_storage_type_created 
+        ON storage_metadata(storage_type, created_at);
+        
+        CREATE TABLE IF NOT EXISTS violation_hourly_rollups (
+            device_id VARCHAR(50) NOT NULL,
+            hour_start TIMESTAMP WITH TIME ZONE NOT NULL,
+            violation_type VARCHAR(50) NOT NULL,
+            vehicle_class VARCHAR(50) NOT NULL,
+            violation_count INTEGER NOT NULL DEFAULT 0,
+            speed_count INTEGER NOT NULL DEFAULT 0,
+            speed_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+            speed_max REAL,
+            confidence_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+            processing_time_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+            last_violation_at TIMESTAMP WITH TIME ZONE,
+            PRIMARY KEY (device_id, hour_start, violation_type, vehicle_class)
+        );
+        
+        CREATE INDEX IF NOT EXISTS idx_rollup_hour 
+        ON violation_hourly_rollups(hour_start);
         """
         
         try:
             with self._get_connection() as conn:
                 with conn.cursor() as cursor:
+                    cursor.execute("SELECT to_regclass('violation_hourly_rollups') IS NULL AS missing")
+                    rollups_created = cursor.fetchone()['missing']
                     cursor.execute(schema_sql)
-                    conn.commit()
             logger.info("Database schema initialized")
         except Exception as e:
             logger.error(f"Failed to initialize database schema: {e}")
             raise
+        
+        if rollups_created:
+            self._backfill_violation_rollups()
+    
+    def _backfill_violation_rollups(self):
+        """
+        Build the rollups of records written before the rollup table existed.
+        
+        Runs once, when _initialize_schema creates violation_hourly_rollups.
+        A failure is logged instead of raised so the service still starts;
+        compact_violation_rollups can be run again for the same range.
+        """
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT MIN(timestamp) AS first_at, MAX(timestamp) AS last_at FROM violation_records"
+                    )
+                    row = cursor.fetchone()
+            
+            if row['first_at'] is not None:
+                self.compact_violation_rollups(row['first_at'], row['last_at'])
+        except Exception as e:
+            logger.error(f"Failed to backfill violation rollups: {e}")
     
     def store_violation_record(self, record: ViolationRecord) -> str:
         """Store violation record in database."""
@@ -674,10 +1203,10 @@ class DatabaseManager:
                             %(image_path)s, %(video_segment_path)s,
                             %(camera_info)s, %(processing_time_ms)s, %(model_versions)s
                         ) RETURNING id
-                    """, asdict(record))
+                    """, self._violation_params(record))
                     
                     record_id = cursor.fetchone()['id']
-                    conn.commit()
+                    self._upsert_rollups(cursor, [record])
                     
             logger.info(f"Stored violation record {record.violation_id}")
             return str(record_id)
@@ -701,22 +1230,9 @@ class DatabaseManager:
                             %(file_size)s, %(checksum)s, %(created_at)s, %(expires_at)s,
                             %(tags)s, %(compressed)s, %(encrypted)s
                         ) RETURNING id
-                    """, {
-                        'file_id': metadata.id,
-                        'storage_type': metadata.storage_type.value,
-                        'data_type': metadata.data_type.value,
-                        'file_path': metadata.file_path,
-                        'file_size': metadata.file_size,
-                        'checksum': metadata.checksum,
-                        'created_at': metadata.created_at,
-                        'expires_at': metadata.expires_at,
-                        'tags': json.dumps(metadata.tags) if metadata.tags else None,
-                        'compressed': metadata.compressed,
-                        'encrypted': metadata.encrypted
-                    })
+                    """, self._storage_metadata_params(metadata))
                     
                     record_id = cursor.fetchone()['id']
-                    conn.commit()
                     
             logger.info(f"Stored storage metadata for {metadata.id}")
             return str(record_id)
@@ -725,6 +1241,238 @@ class DatabaseManager:
             logger.error(f"Failed to store storage metadata for {metadata.id}: {e}")
             raise
     
+    def store_batch(self, records: Optional[List[ViolationRecord]] = None,
+                    storage_metadata: Optional[List[StorageMetadata]] = None) -> Dict[str, int]:
+        """
+        Store many violation records and storage metadata rows in one transaction.
+        
+        Rows are sent with execute_values (db_batch_page_size rows per
+        statement). Rows whose violation_id / file_id already exist are
+        skipped, so a batch can be resubmitted after a timeout.
+        
+        Args:
+            records: Violation records
+            storage_metadata: Storage metadata rows (e.g. the evidence files)
+            
+        Returns:
+            Rows inserted per table
+        """
+        records = records or []
+        storage_metadata = storage_metadata or []
+        inserted = {"violation_records": 0, "storage_metadata": 0}
+        if not records and not storage_metadata:
+            return inserted
+        
+        page_size = self.config.db_batch_page_size
+        
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cursor:
+                    # fetch=True collects RETURNING rows of every page (rowcount only has the last)
+                    if records:
+                        rows = execute_values(
+                            cursor, INSERT_VIOLATION_RECORDS_SQL,
+                            [self._violation_params(record) for record in records],
+                            template=VIOLATION_RECORD_TEMPLATE, page_size=page_size, fetch=True
+                        )
+                        inserted["violation_records"] = len(rows)
+                        
+                        # Only records actually inserted count in the rollups
+                        new_ids = {row['violation_id'] for row in rows}
+                        self._upsert_rollups(
+                            cursor, [record for record in records if record.violation_id in new_ids]
+                        )
+                    
+                    if storage_metadata:
+                        rows = execute_values(
+                            cursor, INSERT_STORAGE_METADATA_SQL,
+                            [self._storage_metadata_params(metadata) for metadata in storage_metadata],
+                            template=STORAGE_METADATA_TEMPLATE, page_size=page_size, fetch=True
+                        )
+                        inserted["storage_metadata"] = len(rows)
+                    
+            logger.info(
+                f"Stored batch of {inserted['violation_records']}/{len(records)} violation records "
+                f"and {inserted['storage_metadata']}/{len(storage_metadata)} storage metadata rows"
+            )
+            return inserted
+            
+        except Exception as e:
+            logger.error(f"Failed to store batch of {len(records)} violation records: {e}")
+            raise
+    
+    def _upsert_rollups(self, cursor, records: List[ViolationRecord]):
+        """Add records to the hourly rollups (inside the caller's transaction)."""
+        rows = violation_rollup_rows(records)
+        if rows:
+            execute_values(cursor, UPSERT_VIOLATION_ROLLUPS_SQL, rows,
+                           page_size=self.config.db_batch_page_size)
+    
+    def compact_violation_rollups(self, start_time: datetime, end_time: datetime) -> int:
+        """
+        Rebuild the hourly rollups of a time range from violation_records.
+        
+        Rollups are maintained on insert; this backfills rows written before
+        the rollup table existed (or by other writers) and repairs drift.
+        Whole hours touched by the range are recomputed.
+        
+        Returns:
+            Number of rollup rows written
+        """
+        params = {'start_time': start_time, 'end_time': end_time}
+        hour_range = (
+            "{column} >= date_trunc('hour', %(start_time)s::timestamptz) "
+            "AND {column} < date_trunc('hour', %(end_time)s::timestamptz) + INTERVAL '1 hour'"
+        )
+        
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "DELETE FROM violation_hourly_rollups WHERE "
+                        + hour_range.format(column="hour_start"), params
+                    )
+                    cursor.execute("""
+                        INSERT INTO violation_hourly_rollups (
+                            device_id, hour_start, violation_type, vehicle_class,
+                            violation_count, speed_count, speed_sum, speed_max,
+                            confidence_sum, processing_time_sum, last_violation_at
+                        )
+                        SELECT device_id, date_trunc('hour', timestamp), violation_type, vehicle_class,
+                               COUNT(*), COUNT(speed_kmh), COALESCE(SUM(speed_kmh), 0), MAX(speed_kmh),
+                               SUM(confidence), SUM(processing_time_ms), MAX(timestamp)
+                        FROM violation_records
+                        WHERE """ + hour_range.format(column="timestamp") + """
+                        GROUP BY 1, 2, 3, 4
+                    """, params)
+                    written = cursor.rowcount
+                    
+            logger.info(f"Compacted {written} violation rollup rows for {start_time} - {end_time}")
+            return written
+            
+        except Exception as e:
+            logger.error(f"Failed to compact violation rollups: {e}")
+            raise
+    
+    def get_violation_rollups(self, start_time: datetime, end_time: datetime,
+                              device_ids: Optional[List[str]] = None,
+                              group_by: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+        """
+        Aggregated violations from the hourly rollups.
+        
+        Granularity is one hour: every hour overlapping [start_time,
+        end_time] is included.
+        
+        Args:
+            start_time: Range start
+            end_time: Range end
+            device_ids: Only these devices
+            group_by: Dimensions from ROLLUP_DIMENSIONS (device_id,
+                violation_type, vehicle_class, hour_of_day, day)
+            
+        Returns:
+            One dict per group with the dimensions and violation_count,
+            speed_count, speed_sum, speed_max, confidence_sum,
+            processing_time_sum and last_violation_at
+        """
+        unknown = set(group_by) - set(ROLLUP_DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown rollup dimensions: {sorted(unknown)}")
+        
+        conditions = [
+            "hour_start >= date_trunc('hour', %(start_time)s::timestamptz)",
+            "hour_start <= %(end_time)s"
+        ]
+        params = {'start_time': start_time, 'end_time': end_time}
+        
+        if device_ids:
+            conditions.append("device_id = ANY(%(device_ids)s)")
+            params['device_ids'] = list(device_ids)
+        
+        columns = [f"{ROLLUP_DIMENSIONS[dimension]} AS {dimension}" for dimension in group_by]
+        group_clause = ""
+        if group_by:
+            positions = ", ".join(str(i + 1) for i in range(len(group_by)))
+            group_clause = f"GROUP BY {positions} ORDER BY {positions}"
+        
+        query = f"""
+            SELECT {''.join(column + ', ' for column in columns)}
+                   COALESCE(SUM(violation_count), 0) AS violation_count,
+                   COALESCE(SUM(speed_count), 0) AS speed_count,
+                   COALESCE(SUM(speed_sum), 0) AS speed_sum,
+                   MAX(speed_max) AS speed_max,
+                   COALESCE(SUM(confidence_sum), 0) AS confidence_sum,
+                   COALESCE(SUM(processing_time_sum), 0) AS processing_time_sum,
+                   MAX(last_violation_at) AS last_violation_at
+            FROM violation_hourly_rollups
+            WHERE {" AND ".join(conditions)}
+            {group_clause}
+        """
+        
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall()
+                    
+            return [dict(row) for row in rows if row['violation_count']]
+            
+        except Exception as e:
+            logger.error(f"Failed to retrieve violation rollups: {e}")
+            raise
+    
+    def get_plate_statistics(self, start_time: datetime, end_time: datetime,
+                             device_ids: Optional[List[str]] = None,
+                             by_day: bool = False) -> List[Dict[str, Any]]:
+        """
+        Distinct plates and repeat offenders (plates seen more than once).
+        
+        Distinct counts cannot be summed from the rollups, so they are
+        computed in Postgres on the raw records; only the counts come back.
+        
+        Returns:
+            One dict (distinct_plates, repeat_offenders), or one per day
+            (with a day key) if by_day
+        """
+        conditions = [
+            "license_plate IS NOT NULL",
+            "timestamp >= %(start_time)s",
+            "timestamp <= %(end_time)s"
+        ]
+        params = {'start_time': start_time, 'end_time': end_time}
+        
+        if device_ids:
+            conditions.append("device_id = ANY(%(device_ids)s)")
+            params['device_ids'] = list(device_ids)
+        
+        day_column = "date_trunc('day', timestamp) AS day, " if by_day else ""
+        plate_group = "1, 2" if by_day else "1"
+        outer = "day, " if by_day else ""
+        
+        query = f"""
+            SELECT {outer}COUNT(*) AS distinct_plates,
+                   COUNT(*) FILTER (WHERE sightings > 1) AS repeat_offenders
+            FROM (
+                SELECT {day_column}license_plate, COUNT(*) AS sightings
+                FROM violation_records
+                WHERE {" AND ".join(conditions)}
+                GROUP BY {plate_group}
+            ) plates
+            {"GROUP BY day ORDER BY day" if by_day else ""}
+        """
+        
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall()
+                    
+            return [dict(row) for row in rows]
+            
+        except Exception as e:
+            logger.error(f"Failed to retrieve plate statistics: {e}")
+            raise
+    
     def get_violation_records(self, device_id: Optional[str] = None,
                              violation_type: Optional[str] = None,
                              start_time: Optional[datetime] = None,
@@ -772,6 +1520,26 @@ class DatabaseManager:
             logger.error(f"Failed to retrieve violation records: {e}")
             raise
     
+    @staticmethod
+    def _storage_metadata_from_row(record: Dict[str, Any]) -> StorageMetadata:
+        tags = record['tags']
+        if isinstance(tags, str):
+            tags = json.loads(tags)
+        
+        return StorageMetadata(
+            id=record['file_id'],
+            storage_type=StorageType(record['storage_type']),
+            data_type=DataType(record['data_type']),
+            file_path=record['file_path'],
+            file_size=record['file_size'],
+            checksum=record['checksum'],
+            created_at=record['created_at'],
+            expires_at=record['expires_at'],
+            tags=tags or None,
+            compressed=record['compressed'],
+            encrypted=record['encrypted']
+        )
+    
     def get_storage_metadata(self, file_id: str) -> Optional[StorageMetadata]:
         """Retrieve storage metadata by file ID."""
         try:
@@ -786,23 +1554,93 @@ class DatabaseManager:
             if not record:
                 return None
             
-            return StorageMetadata(
-                id=record['file_id'],
-                storage_type=StorageType(record['storage_type']),
-                data_type=DataType(record['data_type']),
-                file_path=record['file_path'],
-                file_size=record['file_size'],
-                checksum=record['checksum'],
-                created_at=record['created_at'],
-                expires_at=record['expires_at'],
-                tags=json.loads(record['tags']) if record['tags'] else None,
-                compressed=record['compressed'],
-                encrypted=record['encrypted']
-            )
+            return self._storage_metadata_from_row(record)
             
         except Exception as e:
             logger.error(f"Failed to retrieve storage metadata for {file_id}: {e}")
             raise
+    
+    def get_migration_candidates(self, created_before: datetime, limit: int = 100,
+                                 exclude_ids: Optional[List[str]] = None) -> List[StorageMetadata]:
+        """
+        Local files to move to cloud storage, oldest day first.
+        
+        Within a day the largest files come first, so each upload frees as
+        much local space as possible. Files already expired are left to
+        retention cleanup.
+        
+        Args:
+            created_before: Only files created before this time
+            limit: Maximum number of files
+            exclude_ids: File IDs to skip (e.g. failed earlier in the run)
+        """
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                        SELECT * FROM storage_metadata
+                        WHERE storage_type = %(storage_type)s
+                          AND created_at < %(created_before)s
+                          AND (expires_at IS NULL OR expires_at > NOW())
+                          AND NOT (file_id = ANY(%(exclude_ids)s))
+                        ORDER BY date_trunc('day', created_at), file_size DESC
+                        LIMIT %(limit)s
+                    """, {
+                        'storage_type': StorageType.LOCAL.value,
+                        'created_before': created_before,
+                        'exclude_ids': list(exclude_ids or []),
+                        'limit': limit
+                    })
+                    
+                    records = cursor.fetchall()
+                    
+            return [self._storage_metadata_from_row(record) for record in records]
+            
+        except Exception as e:
+            logger.error(f"Failed to retrieve migration candidates: {e}")
+            raise
+    
+    def update_storage_location(self, file_id: str, storage_type: StorageType, file_path: str,
+                                expected_path: Optional[str] = None,
+                                checksum: Optional[str] = None) -> bool:
+        """
+        Point a file's metadata to a new location.
+        
+        Args:
+            file_id: File identifier
+            storage_type: New storage type
+            file_path: New path or object key
+            expected_path: Only update if the current path is this one
+            checksum: New content checksum (None keeps the current one)
+            
+        Returns:
+            True if the record was updated
+        """
+        query = "UPDATE storage_metadata SET storage_type = %(storage_type)s, file_path = %(file_path)s"
+        if checksum is not None:
+            query += ", checksum = %(checksum)s"
+        query += " WHERE file_id = %(file_id)s"
+        if expected_path is not None:
+            query += " AND file_path = %(expected_path)s"
+        
+        try:
+            with self._get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, {
+                        'file_id': file_id,
+                        'storage_type': storage_type.value,
+                        'file_path': file_path,
+                        'expected_path': expected_path,
+                        'checksum': checksum
+                    })
+                    updated = cursor.rowcount == 1
+                    
+            logger.debug(f"Moved storage metadata for {file_id} to {storage_type.value}:{file_path}")
+            return updated
+            
+        except Exception as e:
+            logger.error(f"Failed to update storage location for {file_id}: {e}")
+            raise
 
 
 class CacheManager:
@@ -24,6 +24,7 @@ from .storage_manager import (
     StorageConfig, StorageType, DataType, StorageMetadata, ViolationRecord,
     LocalStorageManager, CloudStorageManager, DatabaseManager, CacheManager
 )
+from .tiering import TieringEngine
 
 
 logger = logging.getLogger(__name__)
@@ -52,8 +53,10 @@ class StorageService:
         
         # Initialize cloud manager if configured
         self.cloud_manager = None
+        self.tiering = None
         if config.s3_access_key and config.s3_secret_key:
             self.cloud_manager = CloudStorageManager(config)
+            self.tiering = TieringEngine(config, self.local_manager, self.cloud_manager, self.db_manager)
         
         # Performance tracking
         self.operation_times = {}
@@ -68,6 +71,7 @@ class StorageService:
         # Background tasks
         self.cleanup_task = None
         self.sync_task = None
+        self.tiering_task = None
         self._start_background_tasks()
     
     def _start_background_tasks(self):
@@ -114,18 +118,24 @@ class StorageService:
         """Sync local files to cloud storage."""
         logger.info("Starting local to cloud sync")
         
-        # Get local storage usage
-        usage = self.local_manager.get_storage_usage()
-        
-        # If usage is high, prioritize syncing older files
-        if usage['usage_percentage'] > 80:
-            await self._sync_oldest_files_to_cloud(limit=100)
+        # Migrates oldest files only above the high watermark, down to the low one
+        if self.tiering:
+            await self.tiering.run()
+    
+    async def _sync_oldest_files_to_cloud(self, limit: int = 50) -> Dict[str, Any]:
+        """Sync oldest local files to cloud storage, regardless of usage."""
+        if not self.tiering:
+            raise ValueError("Cloud storage not configured")
+        return await self.tiering.run(force=True, max_files=limit)
     
-    async def _sync_oldest_files_to_cloud(self, limit: int = 50):
-        """Sync oldest local files to cloud storage."""
-        # This would need to track file metadata to determine oldest files
-        # For now, we'll implement a basic version
-        pass
+    def _check_tiering_watermark(self):
+        """Start a migration in the background once local usage reaches the high watermark."""
+        if not self.tiering or self.strategy not in (StorageStrategy.LOCAL_THEN_CLOUD, StorageStrategy.HYBRID):
+            return
+        if self.tiering_task and not self.tiering_task.done():
+            return
+        if self.tiering.needs_migration():
+            self.tiering_task = asyncio.create_task(self.tiering.run())
     
     def _calculate_image_hash(self, image: np.ndarray) -> str:
         """Calculate hash of image for duplicate detection."""
@@ -225,6 +235,22 @@ class StorageService:
             self.storage_stats["errors"] += 1
             raise
     
+    async def store_violation_batch(self, violation_records: List[ViolationRecord],
+                                    storage_metadata: Optional[List[StorageMetadata]] = None) -> Dict[str, int]:
+        """
+        Store many violation records (and their evidence metadata) in one transaction.
+        
+        For bursts of violations: the batch goes to Postgres with one pooled
+        connection and execute_values, on a worker thread so the event loop
+        keeps running.
+        """
+        loop = asyncio.get_running_loop()
+        inserted = await loop.run_in_executor(
+            None, self.db_manager.store_batch, violation_records, storage_metadata
+        )
+        self.storage_stats["files_stored"] += inserted["storage_metadata"]
+        return inserted
+    
     async def store_image(self, image: np.ndarray, file_id: str,
                          metadata: Optional[Dict] = None) -> StorageMetadata:
         """Store image with intelligent storage placement."""
@@ -243,24 +269,24 @@ class StorageService:
             
             self.storage_stats["cache_misses"] += 1
             
-            # Estimate file size
-            encoded_image = cv2.imencode('.jpg', image)[1]
-            file_size = len(encoded_image.tobytes())
+            # Encode once: used for size estimation and for the write itself
+            image_bytes = cv2.imencode('.jpg', image)[1].tobytes()
+            file_size = len(image_bytes)
             
             # Determine storage location
             storage_location = self._get_storage_location(DataType.IMAGE, file_size)
             
             # Store based on location
-            if storage_location == StorageType.LOCAL:
-                storage_metadata = self.local_manager.store_image(image, file_id, metadata)
-            elif storage_location == StorageType.S3 and self.cloud_manager:
-                image_bytes = encoded_image.tobytes()
+            if storage_location == StorageType.S3 and self.cloud_manager:
                 storage_metadata = await self.cloud_manager.upload_file_async(
                     image_bytes, file_id, DataType.IMAGE, metadata
                 )
             else:
-                # Fallback to local
-                storage_metadata = self.local_manager.store_image(image, file_id, metadata)
+                # Local (also the fallback)
+                storage_metadata = await self.local_manager.store_image_async(
+                    image, file_id, metadata, image_bytes
+                )
+                self._check_tiering_watermark()
             
             # Store metadata in database
             self.db_manager.store_storage_metadata(storage_metadata)
@@ -293,20 +319,17 @@ class StorageService:
             storage_location = self._get_storage_location(DataType.VIDEO, file_size)
             
             # Store based on location
-            if storage_location == StorageType.LOCAL:
-                storage_metadata = self.local_manager.store_video_segment(
-                    video_data, file_id, duration_seconds
-                )
-            elif storage_location == StorageType.S3 and self.cloud_manager:
+            if storage_location == StorageType.S3 and self.cloud_manager:
                 storage_metadata = await self.cloud_manager.upload_file_async(
                     video_data, file_id, DataType.VIDEO,
                     metadata={"duration_seconds": str(duration_seconds)}
                 )
             else:
-                # Fallback to local
-                storage_metadata = self.local_manager.store_video_segment(
+                # Local (also the fallback)
+                storage_metadata = await self.local_manager.store_video_segment_async(
                     video_data, file_id, duration_seconds
                 )
+                self._check_tiering_watermark()
             
             # Store metadata in database
             self.db_manager.store_storage_metadata(storage_metadata)
@@ -334,15 +357,14 @@ class StorageService:
             storage_location = self._get_storage_location(DataType.METADATA, file_size)
             
             # Store based on location
-            if storage_location == StorageType.LOCAL:
-                storage_metadata = self.local_manager.store_metadata(data, file_id)
-            elif storage_location == StorageType.S3 and self.cloud_manager:
+            if storage_location == StorageType.S3 and self.cloud_manager:
                 storage_metadata = await self.cloud_manager.upload_file_async(
                     json_data.encode(), file_id, DataType.JSON
                 )
             else:
-                # Fallback to local
-                storage_metadata = self.local_manager.store_metadata(data, file_id)
+                # Local (also the fallback)
+                storage_metadata = await self.local_manager.store_metadata_async(data, file_id)
+                self._check_tiering_watermark()
             
             # Store metadata in database
             self.db_manager.store_storage_metadata(storage_metadata)
@@ -421,6 +443,14 @@ class StorageService:
         """Retrieve violation records with filters."""
         return self.db_manager.get_violation_records(**kwargs)
     
+    def get_violation_rollups(self, **kwargs) -> List[Dict[str, Any]]:
+        """Retrieve aggregated violations from the hourly rollups."""
+        return self.db_manager.get_violation_rollups(**kwargs)
+    
+    def get_plate_statistics(self, **kwargs) -> List[Dict[str, Any]]:
+        """Retrieve distinct plate / repeat offender counts."""
+        return self.db_manager.get_plate_statistics(**kwargs)
+    
     def generate_access_url(self, file_id: str, expires_in: int = 3600) -> str:
         """Generate temporary access URL for file."""
         storage_metadata = self.db_manager.get_storage_metadata(file_id)
@@ -455,7 +485,8 @@ class StorageService:
         if self.cloud_manager:
             stats["cloud_storage"] = {
                 "bucket": self.config.s3_bucket,
-                "region": self.config.s3_region
+                "region": self.config.s3_region,
+                "tiering": self.tiering.stats.copy()
             }
         
         return stats
@@ -496,18 +527,17 @@ class StorageService:
         if not self.cloud_manager:
             raise ValueError("Cloud storage not configured")
         
+        results = await self.tiering.run(
+            force=True, min_age_hours=file_age_days * 24, max_files=batch_size
+        )
+        
         migration_results = {
-            "files_migrated": 0,
-            "files_failed": 0,
-            "bytes_migrated": 0,
-            "errors": []
+            "files_migrated": results["files_migrated"],
+            "files_failed": results["files_failed"],
+            "bytes_migrated": results["bytes_migrated"],
+            "errors": results["errors"]
         }
         
-        cutoff_date = datetime.now() - timedelta(days=file_age_days)
-        
-        # This would need to be implemented based on file tracking
-        # For now, return empty results
-        
         return migration_results
     
     async def verify_data_integrity(self) -> Dict[str, Any]:
@@ -548,6 +578,9 @@ class StorageService:
             
             if self.sync_task and not self.sync_task.done():
                 self.sync_task.cancel()
+            
+            if self.tiering_task and not self.tiering_task.done():
+                self.tiering_task.cancel()
         except Exception as e:
             logger.error(f"Error during StorageService cleanup: {e}")
 
@@ -0,0 +1,203 @@
+"""
+Tiered migration of local evidence to S3/MinIO.
+
+When local usage reaches the high watermark, the oldest local files (by
+day, largest first within a day) are taken from the storage metadata index
+and moved to cloud storage until usage drops to the low watermark. Each
+file is uploaded from disk with bounded concurrency (multipart for large
+files such as video segments), verified, its metadata is rewritten to the
+object key, and only then is the local copy deleted.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .storage_manager import (
+    StorageConfig, StorageMetadata,
+    LocalStorageManager, CloudStorageManager, DatabaseManager
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class TieringEngine:
+    """
+    Moves local files to cloud storage between a high and a low watermark.
+
+    Features:
+    - Watermarks in % of max_local_size_gb, read from the local usage index
+    - Oldest-first candidates from the storage_metadata table
+    - At most parallel_uploads files in flight, each on the cloud thread pool
+    - Local checksum check before upload, size/ETag check after upload
+    - Metadata rewritten before the local copy is deleted, so a crash can
+      leave a duplicate but never a record pointing to a missing file
+    """
+
+    def __init__(self, config: StorageConfig,
+                 local_manager: LocalStorageManager,
+                 cloud_manager: CloudStorageManager,
+                 db_manager: DatabaseManager):
+        """
+        Initialize tiering engine.
+
+        Args:
+            config: Storage configuration (watermarks, batch size, concurrency)
+            local_manager: Source of the files
+            cloud_manager: Destination of the files
+            db_manager: Storage metadata index
+        """
+        self.config = config
+        self.local_manager = local_manager
+        self.cloud_manager = cloud_manager
+        self.db_manager = db_manager
+
+        self._lock = asyncio.Lock()
+
+        # Statistics
+        self.stats = {
+            "runs": 0,
+            "files_migrated": 0,
+            "bytes_migrated": 0,
+            "files_failed": 0,
+            "last_run_time_s": 0.0
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return self._lock.locked()
+
+    def needs_migration(self, usage: Optional[Dict[str, Any]] = None) -> bool:
+        """True once local usage reaches the high watermark."""
+        usage = usage or self.local_manager.get_storage_usage()
+        return usage["usage_percentage"] >= self.config.tiering_high_watermark
+
+    def bytes_to_free(self, usage: Dict[str, Any]) -> int:
+        """Bytes to migrate to bring usage down to the low watermark."""
+        max_bytes = self.config.max_local_size_gb * 1024**3
+        target = max_bytes * self.config.tiering_low_watermark / 100
+        return max(0, int(usage["total_size_bytes"] - target))
+
+    def _object_key(self, metadata: StorageMetadata) -> str:
+        """Object key keeping the local day layout: <type>/<Y/m/d>/<file name>."""
+        date_str = metadata.created_at.strftime("%Y/%m/%d")
+        return f"{metadata.data_type.value}/{date_str}/{Path(metadata.file_path).name}"
+
+    def _migrate_file(self, metadata: StorageMetadata) -> int:
+        """Move one file to cloud storage (runs on the cloud thread pool)."""
+        key = self._object_key(metadata)
+        cloud_metadata = self.cloud_manager.upload_local_file(metadata, key)
+
+        if not self.db_manager.update_storage_location(
+            metadata.id, cloud_metadata.storage_type, key, expected_path=metadata.file_path,
+            checksum=cloud_metadata.checksum
+        ):
+            # The record changed meanwhile (deleted or moved): keep the local file
+            self.cloud_manager.delete_file(cloud_metadata)
+            raise RuntimeError(f"Storage metadata for {metadata.id} changed during migration")
+
+        self.local_manager.delete_file(metadata)
+        return cloud_metadata.file_size
+
+    async def run(self, force: bool = False, min_age_hours: Optional[float] = None,
+                  max_files: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Run one migration pass.
+
+        Args:
+            force: Migrate even below the high watermark (and past the low one)
+            min_age_hours: Only files older than this (default tiering_min_age_hours)
+            max_files: Maximum files to migrate in this pass
+
+        Returns:
+            Results of the pass
+        """
+        results = {
+            "triggered": False,
+            "files_migrated": 0,
+            "files_failed": 0,
+            "bytes_migrated": 0,
+            "bytes_to_free": 0,
+            "errors": []
+        }
+
+        async with self._lock:
+            usage = self.local_manager.get_storage_usage()
+            results["usage_before"] = usage["usage_percentage"]
+            if not force and not self.needs_migration(usage):
+                results["usage_after"] = usage["usage_percentage"]
+                return results
+
+            results["triggered"] = True
+            start_time = time.perf_counter()
+            target = None if force else self.bytes_to_free(usage)
+            results["bytes_to_free"] = target or 0
+
+            if min_age_hours is None:
+                min_age_hours = self.config.tiering_min_age_hours
+            created_before = datetime.now() - timedelta(hours=min_age_hours)
+
+            semaphore = asyncio.Semaphore(max(1, self.config.parallel_uploads))
+            loop = asyncio.get_running_loop()
+            failed_ids: List[str] = []
+
+            async def migrate(metadata: StorageMetadata) -> int:
+                async with semaphore:
+                    return await loop.run_in_executor(
+                        self.cloud_manager.executor, self._migrate_file, metadata
+                    )
+
+            while target is None or results["bytes_migrated"] < target:
+                limit = self.config.tiering_batch_size
+                if max_files is not None:
+                    limit = min(limit, max_files - results["files_migrated"])
+                    if limit <= 0:
+                        break
+
+                candidates = await loop.run_in_executor(
+                    None, self.db_manager.get_migration_candidates, created_before, limit, list(failed_ids)
+                )
+                if not candidates:
+                    break
+
+                # Only as many files as needed to reach the low watermark
+                batch = []
+                planned = results["bytes_migrated"]
+                for metadata in candidates:
+                    if target is not None and planned >= target:
+                        break
+                    batch.append(metadata)
+                    planned += metadata.file_size
+
+                outcomes = await asyncio.gather(*(migrate(m) for m in batch), return_exceptions=True)
+                for metadata, outcome in zip(batch, outcomes):
+                    if isinstance(outcome, Exception):
+                        failed_ids.append(metadata.id)
+                        results["files_failed"] += 1
+                        results["errors"].append(f"{metadata.id}: {outcome}")
+                        logger.error(f"Failed to migrate {metadata.id} to cloud storage: {outcome}")
+                    else:
+                        results["files_migrated"] += 1
+                        results["bytes_migrated"] += outcome
+
+            elapsed = time.perf_counter() - start_time
+            results["usage_after"] = self.local_manager.get_storage_usage()["usage_percentage"]
+
+            self.stats["runs"] += 1
+            self.stats["files_migrated"] += results["files_migrated"]
+            self.stats["bytes_migrated"] += results["bytes_migrated"]
+            self.stats["files_failed"] += results["files_failed"]
+            self.stats["last_run_time_s"] = elapsed
+
+            logger.info(
+                f"Tiering migrated {results['files_migrated']} files "
+                f"({results['bytes_migrated'] / 1024**2:.1f} MB) in {elapsed:.1f}s, "
+                f"usage {results['usage_before']:.1f}% -> {results['usage_after']:.1f}%, "
+                f"{results['files_failed']} failed"
+            )
+
+        return results
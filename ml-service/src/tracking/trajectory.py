@@ -24,61 +24,123 @@ class TrajectoryPoint:
 
 @dataclass
 class Trajectory:
-    """Complete trajectory for a tracked vehicle."""
+    """
+    Complete trajectory for a tracked vehicle.
+    
+    Points are kept in a fixed-size numpy ring (the newest max_points), and
+    distance, speed, duration and bounding box are running totals over the
+    whole track, so adding a point is O(1) no matter how long the vehicle
+    has been tracked (e.g. stopped at a red light).
+    """
     track_id: int
-    points: List[TrajectoryPoint] = field(default_factory=list)
+    max_points: int = 300  # 10 seconds at 30fps
     created_at: float = field(default_factory=time.time)
     last_updated: float = field(default_factory=time.time)
     total_distance: float = 0.0
     avg_speed: float = 0.0
     direction_vector: Tuple[float, float] = (0.0, 0.0)
+    direction_window: int = 5  # Points used for the direction (stability)
     is_active: bool = True
     
+    def __post_init__(self):
+        # Ring buffer storage
+        self._xy = np.zeros((self.max_points, 2), dtype=np.int64)
+        self._timestamps = np.zeros(self.max_points, dtype=np.float64)
+        self._frame_numbers = np.full(self.max_points, -1, dtype=np.int64)
+        self._next = 0  # Slot of the next point
+        self._count = 0  # Points held in the ring
+        
+        # Running totals over the whole track
+        self.points_added = 0
+        self._first_timestamp: Optional[float] = None
+        self._bbox: Optional[List[int]] = None
+    
+    def __len__(self) -> int:
+        return self._count
+    
     def add_point(self, x: int, y: int, timestamp: Optional[float] = None, frame_number: Optional[int] = None):
         """Add a new point to the trajectory."""
         if timestamp is None:
             timestamp = time.time()
         
-        point = TrajectoryPoint(x, y, timestamp, frame_number)
-        self.points.append(point)
+        if self._count:
+            last_x, last_y = self._xy[self._slot(-1)]
+            self.total_distance += math.sqrt((x - int(last_x))**2 + (y - int(last_y))**2)
+        else:
+            self._first_timestamp = timestamp
+        
+        slot = self._next
+        self._xy[slot] = (x, y)
+        self._timestamps[slot] = timestamp
+        self._frame_numbers[slot] = -1 if frame_number is None else frame_number
+        self._next = (slot + 1) % self.max_points
+        self._count = min(self._count + 1, self.max_points)
+        self.points_added += 1
         self.last_updated = timestamp
         
+        if self._bbox is None:
+            self._bbox = [x, y, x, y]
+        else:
+            bbox = self._bbox
+            bbox[0], bbox[1] = min(bbox[0], x), min(bbox[1], y)
+            bbox[2], bbox[3] = max(bbox[2], x), max(bbox[3], y)
+        
         # Update trajectory metrics
         self._update_metrics()
     
+    def _slot(self, index: int) -> int:
+        """Ring slot of a point index (negative indexes count from the newest)."""
+        if index < 0:
+            index += self._count
+        return (self._next - self._count + index) % self.max_points
+    
+    def _ordered(self, values: np.ndarray) -> np.ndarray:
+        """Ring contents in chronological order."""
+        if self._count < self.max_points:
+            return values[:self._count]
+        return np.concatenate((values[self._next:], values[:self._next]))
+    
     def _update_metrics(self):
-        """Update trajectory metrics (distance, speed, direction)."""
-        if len(self.points) < 2:
+        """Update trajectory metrics (speed, direction) from the running totals."""
+        if self.points_added < 2:
             return
         
-        # Calculate total distance
-        total_dist = 0.0
-        for i in range(1, len(self.points)):
-            p1, p2 = self.points[i-1], self.points[i]
-            dist = math.sqrt((p2.x - p1.x)**2 + (p2.y - p1.y)**2)
-            total_dist += dist
-        
-        self.total_distance = total_dist
-        
         # Calculate average speed (pixels per second)
-        if len(self.points) >= 2:
-            time_diff = self.points[-1].timestamp - self.points[0].timestamp
-            if time_diff > 0:
-                self.avg_speed = total_dist / time_diff
-        
-        # Calculate direction vector (last 5 points for stability)
-        if len(self.points) >= 3:
-            recent_points = self.points[-min(5, len(self.points)):]
-            start_point = recent_points[0]
-            end_point = recent_points[-1]
+        time_diff = self.last_updated - self._first_timestamp
+        if time_diff > 0:
+            self.avg_speed = self.total_distance / time_diff
+        
+        # Calculate direction vector (last points for stability)
+        if self._count >= 3:
+            start_x, start_y = self._xy[self._slot(-min(self.direction_window, self._count))]
+            end_x, end_y = self._xy[self._slot(-1)]
             
-            dx = end_point.x - start_point.x
-            dy = end_point.y - start_point.y
+            dx = int(end_x - start_x)
+            dy = int(end_y - start_y)
             length = math.sqrt(dx**2 + dy**2)
             
             if length > 0:
                 self.direction_vector = (dx / length, dy / length)
     
+    @property
+    def positions(self) -> np.ndarray:
+        """Held (x, y) positions as an (n, 2) array, oldest first."""
+        return self._ordered(self._xy)
+    
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Timestamps of the held positions, oldest first."""
+        return self._ordered(self._timestamps)
+    
+    @property
+    def points(self) -> List[TrajectoryPoint]:
+        """Held points as TrajectoryPoint objects, oldest first (built on demand)."""
+        frame_numbers = self._ordered(self._frame_numbers)
+        return [
+            TrajectoryPoint(int(x), int(y), float(ts), None if frame < 0 else int(frame))
+            for (x, y), ts, frame in zip(self.positions, self.timestamps, frame_numbers)
+        ]
+    
     def get_smoothed_trajectory(self, window_size: int = 5) -> List[Tuple[int, int]]:
         """
         Get smoothed trajectory using moving average.
@@ -89,21 +151,22 @@ class Trajectory:
         Returns:
             List of smoothed (x, y) coordinates
         """
-        if len(self.points) < window_size:
-            return [(p.x, p.y) for p in self.points]
-        
-        smoothed = []
-        for i in range(len(self.points)):
-            start_idx = max(0, i - window_size // 2)
-            end_idx = min(len(self.points), i + window_size // 2 + 1)
-            
-            window_points = self.points[start_idx:end_idx]
-            avg_x = sum(p.x for p in window_points) / len(window_points)
-            avg_y = sum(p.y for p in window_points) / len(window_points)
-            
-            smoothed.append((int(avg_x), int(avg_y)))
-        
-        return smoothed
+        positions = self.positions
+        if self._count < window_size:
+            return [(int(x), int(y)) for x, y in positions]
+        
+        # Centered window, truncated at both ends
+        half = window_size // 2
+        kernel = np.ones(2 * half + 1, dtype=np.int64)
+        centered = slice(half, half + self._count)
+        counts = np.convolve(np.ones(self._count, dtype=np.int64), kernel)[centered]
+        sums_x = np.convolve(positions[:, 0], kernel)[centered]
+        sums_y = np.convolve(positions[:, 1], kernel)[centered]
+        
+        smoothed_x = (sums_x / counts).astype(int)
+        smoothed_y = (sums_y / counts).astype(int)
+        
+        return list(zip(smoothed_x.tolist(), smoothed_y.tolist()))
     
     def predict_next_position(self, time_ahead: float = 0.033) -> Tuple[int, int]:
         """
@@ -115,33 +178,32 @@ class Trajectory:
         Returns:
             Predicted (x, y) position
         """
-        if len(self.points) < 2:
-            return (0, 0) if not self.points else (self.points[-1].x, self.points[-1].y)
+        if self._count == 0:
+            return (0, 0)
+        
+        last_x, last_y = (int(v) for v in self._xy[self._slot(-1)])
+        if self.points_added < 2:
+            return (last_x, last_y)
         
-        last_point = self.points[-1]
         velocity_x = self.direction_vector[0] * self.avg_speed
         velocity_y = self.direction_vector[1] * self.avg_speed
         
-        pred_x = int(last_point.x + velocity_x * time_ahead)
-        pred_y = int(last_point.y + velocity_y * time_ahead)
+        pred_x = int(last_x + velocity_x * time_ahead)
+        pred_y = int(last_y + velocity_y * time_ahead)
         
         return (pred_x, pred_y)
     
     def get_duration(self) -> float:
         """Get trajectory duration in seconds."""
-        if len(self.points) < 2:
+        if self.points_added < 2:
             return 0.0
-        return self.points[-1].timestamp - self.points[0].timestamp
+        return self.last_updated - self._first_timestamp
     
     def get_bounding_box(self) -> Tuple[int, int, int, int]:
         """Get trajectory bounding box (x_min, y_min, x_max, y_max)."""
-        if not self.points:
+        if self._bbox is None:
             return (0, 0, 0, 0)
-        
-        x_coords = [p.x for p in self.points]
-        y_coords = [p.y for p in self.points]
-        
-        return (min(x_coords), min(y_coords), max(x_coords), max(y_coords))
+        return tuple(self._bbox)
 
 class TrajectoryManager:
     """
@@ -150,16 +212,18 @@ class TrajectoryManager:
     Handles trajectory storage, analysis, and cleanup for the tracking system.
     """
     
-    def __init__(self, max_trajectories: int = 1000, cleanup_interval: float = 60.0):
+    def __init__(self, max_trajectories: int = 1000, cleanup_interval: float = 60.0, max_points: int = 300):
         """
         Initialize trajectory manager.
         
         Args:
             max_trajectories: Maximum number of trajectories to keep
             cleanup_interval: Interval for cleaning old trajectories (seconds)
+            max_points: Points kept per trajectory (older points are overwritten)
         """
         self.trajectories: Dict[int, Trajectory] = {}
         self.max_trajectories = max_trajectories
+        self.max_points = max_points
         self.cleanup_interval = cleanup_interval
         self.last_cleanup = time.time()
         
@@ -178,7 +242,7 @@ class TrajectoryManager:
         x, y = position
         
         if track_id not in self.trajectories:
-            self.trajectories[track_id] = Trajectory(track_id)
+            self.trajectories[track_id] = Trajectory(track_id, max_points=self.max_points)
             logger.debug(f"Created new trajectory for track {track_id}")
         
         self.trajectories[track_id].add_point(x, y, timestamp, frame_number)
@@ -287,7 +351,7 @@ class TrajectoryManager:
             if current_time - trajectory.last_updated <= 30.0:  # Active if updated in last 30s
                 active_count += 1
             
-            total_points += len(trajectory.points)
+            total_points += len(trajectory)
             total_duration += trajectory.get_duration()
             total_distance += trajectory.total_distance
         
@@ -313,10 +377,13 @@ class TrajectoryManager:
         intersecting = []
         
         for trajectory in self.trajectories.values():
-            for point in trajectory.points:
-                if x_min <= point.x <= x_max and y_min <= point.y <= y_max:
-                    intersecting.append(trajectory)
-                    break
+            positions = trajectory.positions
+            inside = (
+                (positions[:, 0] >= x_min) & (positions[:, 0] <= x_max) &
+                (positions[:, 1] >= y_min) & (positions[:, 1] <= y_max)
+            )
+            if inside.any():
+                intersecting.append(trajectory)
         
         return intersecting
     
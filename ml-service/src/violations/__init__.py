@@ -6,9 +6,11 @@ speed violations, lane violations, and automated notification systems.
 """
 
 from .violation_detector import ViolationDetector, ViolationType, ViolationSeverity
+from .evidence_store import EvidenceStore, EvidenceHandle
 from .lane_detector import LaneDetector, LaneViolation
 from .notification_system import NotificationSystem, NotificationChannel, Alert
 from .violation_manager import ViolationManager, ViolationReport, ViolationStatistics
+from .violation_writer import ViolationWriter
 
 __version__ = "1.0.0"
 
@@ -16,6 +18,8 @@ __all__ = [
     "ViolationDetector",
     "ViolationType",
     "ViolationSeverity",
+    "EvidenceStore",
+    "EvidenceHandle",
     "LaneDetector", 
     "LaneViolation",
     "NotificationSystem",
@@ -23,7 +27,8 @@ __all__ = [
     "Alert",
     "ViolationManager",
     "ViolationReport",
-    "ViolationStatistics"
+    "ViolationStatistics",
+    "ViolationWriter"
 ]
 
 # Violation severity thresholds
@@ -0,0 +1,355 @@
+"""
+Evidence snapshot store for traffic violations.
+
+Violations used to keep a raw BGR copy of the full frame (6 MB at 1080p)
+plus a crop each, for as long as they stayed in the detector history.
+Instead, a frame is JPEG-encoded once, stored under the hash of its bytes
+(content-addressed) and shared by every violation from that frame; the
+violations only hold an EvidenceHandle. Encoded snapshots live in a
+size-bounded LRU and the least recently used ones spill to disk through
+LocalStorageManager, so evidence of violations still in history stays
+readable. Snapshots are released (spilled files deleted) when the detector
+drops their last violation, and the spill is capped at a number of files.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple, Union, TYPE_CHECKING
+
+import cv2
+import numpy as np
+
+from ..config import ml_settings
+
+if TYPE_CHECKING:
+    from ..storage.storage_manager import LocalStorageManager, StorageMetadata
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class EvidenceHandle:
+    """Reference to an encoded snapshot (optionally a crop of it)."""
+    key: str
+    bbox: Optional[Tuple[int, int, int, int]] = None  # (x1, y1, x2, y2) for crops
+    store: Optional["EvidenceStore"] = field(default=None, compare=False, repr=False)
+
+    def crop(self, bbox: Tuple[int, int, int, int]) -> "EvidenceHandle":
+        """Handle to a region of the same snapshot (no extra encoding)."""
+        return EvidenceHandle(self.key, tuple(int(v) for v in bbox), self.store)
+
+    def load(self) -> Optional[np.ndarray]:
+        """Decode the snapshot (or crop) as a BGR image."""
+        return self.store.load(self) if self.store else None
+
+    def jpeg(self) -> Optional[bytes]:
+        """Encoded JPEG of the snapshot (or crop)."""
+        return self.store.get_jpeg(self) if self.store else None
+
+
+class EvidenceStore:
+    """
+    Content-addressed, size-bounded store of JPEG evidence snapshots.
+
+    Features:
+    - One encoding per frame, shared by all violations of that frame
+    - Deduplication by content hash
+    - LRU bounded by encoded size, spilling to local storage (disk writes
+      happen outside the lock)
+    - Spill bounded by file count, oldest spilled snapshots deleted first
+    """
+
+    def __init__(self, max_memory_mb: float = 64.0, jpeg_quality: int = 90,
+                 storage: Optional["LocalStorageManager"] = None,
+                 storage_path: Optional[Union[str, Path]] = None,
+                 max_spill_files: Optional[int] = None):
+        """
+        Initialize evidence store.
+
+        Args:
+            max_memory_mb: Budget for encoded snapshots kept in memory
+            jpeg_quality: JPEG quality of the snapshots
+            storage: Local storage for snapshots evicted from memory
+            storage_path: Directory of a LocalStorageManager created on the
+                          first spill when storage is None (evicted snapshots
+                          are dropped if both are None)
+            max_spill_files: Snapshots kept on disk before the oldest spilled
+                             ones are deleted (EVIDENCE_SPILL_MAX_FILES if None)
+        """
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.jpeg_quality = jpeg_quality
+        self.storage = storage
+        self.storage_path = storage_path
+        self.max_spill_files = (
+            ml_settings.EVIDENCE_SPILL_MAX_FILES if max_spill_files is None else max_spill_files
+        )
+
+        self._lock = threading.Lock()
+        self._storage_lock = threading.Lock()
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cache_bytes = 0
+        self._spilling: Dict[str, bytes] = {}  # Evicted, being written to disk
+        self._spilled: Dict[str, "StorageMetadata"] = {}  # Insertion order: oldest spill first
+
+        # Last frame put (frames are shared by all violations of a frame)
+        self._last_frame_key: Optional[Hashable] = None
+        self._last_frame: Optional[np.ndarray] = None
+        self._last_handle: Optional[EvidenceHandle] = None
+
+        # Statistics
+        self.stats = {
+            "frames_encoded": 0,
+            "frame_reuses": 0,
+            "duplicates": 0,
+            "spilled": 0,
+            "dropped": 0,
+            "disk_reads": 0,
+            "released": 0,
+            "spill_evictions": 0
+        }
+
+    def __deepcopy__(self, memo):
+        # Handles are copied with the violations; the store is shared
+        return self
+
+    def put_frame(self, frame: np.ndarray, frame_key: Optional[Hashable] = None) -> EvidenceHandle:
+        """
+        Store a frame snapshot.
+
+        Args:
+            frame: BGR frame
+            frame_key: Sequence number (or any key) of the frame; calling it
+                       again with the same frame and key returns the same
+                       handle without encoding again. Without a key the frame
+                       is always encoded (capture buffers are reused, so the
+                       object alone does not identify the content).
+        """
+        with self._lock:
+            if (frame_key is not None and frame_key == self._last_frame_key
+                    and frame is self._last_frame and self._last_handle is not None):
+                self.stats["frame_reuses"] += 1
+                return self._last_handle
+
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise ValueError("Failed to encode evidence frame")
+        data = buffer.tobytes()
+        key = hashlib.sha256(data).hexdigest()
+        handle = EvidenceHandle(key, store=self)
+
+        evicted: List[Tuple[str, bytes]] = []
+        with self._lock:
+            self.stats["frames_encoded"] += 1
+            if key in self._cache or key in self._spilling or key in self._spilled:
+                self.stats["duplicates"] += 1
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+            else:
+                self._cache[key] = data
+                self._cache_bytes += len(data)
+                evicted = self._evict()
+
+            self._last_frame_key = frame_key
+            self._last_frame = frame if frame_key is not None else None
+            self._last_handle = handle
+
+        if evicted:
+            self._spill(evicted)
+        return handle
+
+    def put_crop(self, frame: np.ndarray, bbox: Tuple[int, int, int, int],
+                 frame_key: Optional[Hashable] = None) -> EvidenceHandle:
+        """Store a region of a frame (shares the frame snapshot)."""
+        return self.put_frame(frame, frame_key).crop(bbox)
+
+    def get_frame_jpeg(self, key: str) -> Optional[bytes]:
+        """Encoded snapshot bytes by key (from memory or disk)."""
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                return data
+            data = self._spilling.get(key)
+            if data is not None:
+                return data
+            metadata = self._spilled.get(key)
+
+        if metadata is None or self.storage is None:
+            return None
+
+        try:
+            data = self.storage.retrieve_file(key, metadata)
+            with self._lock:
+                self.stats["disk_reads"] += 1
+            return data
+        except Exception as e:
+            logger.error(f"Failed to read evidence {key[:12]} from disk: {e}")
+            return None
+
+    def load(self, handle: EvidenceHandle) -> Optional[np.ndarray]:
+        """Decode a snapshot or crop."""
+        data = self.get_frame_jpeg(handle.key)
+        if data is None:
+            return None
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None or handle.bbox is None:
+            return image
+
+        x1, y1, x2, y2 = handle.bbox
+        return image[max(0, y1):max(0, y2), max(0, x1):max(0, x2)].copy()
+
+    def get_jpeg(self, handle: EvidenceHandle) -> Optional[bytes]:
+        """Encoded JPEG of a snapshot (crops are encoded on demand)."""
+        if handle.bbox is None:
+            return self.get_frame_jpeg(handle.key)
+
+        crop = self.load(handle)
+        if crop is None or crop.size == 0:
+            return None
+        ok, buffer = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        return buffer.tobytes() if ok else None
+
+    def __contains__(self, handle: EvidenceHandle) -> bool:
+        with self._lock:
+            return handle.key in self._cache or handle.key in self._spilling or handle.key in self._spilled
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get store statistics."""
+        with self._lock:
+            return {
+                **self.stats,
+                "in_memory": len(self._cache),
+                "memory_bytes": self._cache_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "on_disk": len(self._spilled),
+                "spilling": len(self._spilling)
+            }
+
+    def release(self, keys: Iterable[str]) -> int:
+        """
+        Forget snapshots no longer referenced by any violation.
+
+        Args:
+            keys: Snapshot keys to drop from memory and disk
+
+        Returns:
+            Number of snapshots released
+        """
+        keys = set(keys)
+        deleted = []
+        released = 0
+        with self._lock:
+            for key in keys:
+                data = self._cache.pop(key, None)
+                if data is not None:
+                    self._cache_bytes -= len(data)
+                    released += 1
+                elif self._spilling.pop(key, None) is not None:
+                    released += 1  # _spill deletes the file once written
+                elif key in self._spilled:
+                    deleted.append(self._spilled.pop(key))
+                    released += 1
+            if self._last_handle is not None and self._last_handle.key in keys:
+                self._last_frame_key = None
+                self._last_frame = None
+                self._last_handle = None
+            self.stats["released"] += released
+
+        self._delete_spilled(deleted)
+        return released
+
+    def clear(self):
+        """Forget every snapshot and delete the spilled files."""
+        with self._lock:
+            deleted = list(self._spilled.values())
+            self._cache.clear()
+            self._cache_bytes = 0
+            self._spilling.clear()
+            self._spilled.clear()
+            self._last_frame_key = None
+            self._last_frame = None
+            self._last_handle = None
+        self._delete_spilled(deleted)
+
+    def _get_storage(self) -> Optional["LocalStorageManager"]:
+        """Local storage for spills, created on first use from storage_path."""
+        with self._storage_lock:
+            if self.storage is None and self.storage_path is not None:
+                from ..storage.storage_manager import LocalStorageManager, StorageConfig
+
+                try:
+                    self.storage = LocalStorageManager(StorageConfig(local_base_path=str(self.storage_path)))
+                except Exception as e:
+                    logger.error(f"Failed to open evidence spill storage at {self.storage_path}: {e}")
+                    self.storage_path = None
+            return self.storage
+
+    def _evict(self) -> List[Tuple[str, bytes]]:
+        """
+        Evict least recently used snapshots over the memory budget (lock held).
+
+        Returns:
+            Snapshots to write to disk once the lock is released; until then
+            they are still served from _spilling
+        """
+        evicted = []
+        can_spill = self.storage is not None or self.storage_path is not None
+        while self._cache_bytes > self.max_memory_bytes and len(self._cache) > 1:
+            key, data = self._cache.popitem(last=False)
+            self._cache_bytes -= len(data)
+
+            if can_spill:
+                self._spilling[key] = data
+                evicted.append((key, data))
+            else:
+                self.stats["dropped"] += 1
+        return evicted
+
+    def _spill(self, evicted: List[Tuple[str, bytes]]):
+        """Write evicted snapshots to local storage (lock not held)."""
+        storage = self._get_storage()
+        deleted = []
+        for key, data in evicted:
+            metadata = None
+            if storage is not None:
+                try:
+                    metadata = storage.store_encoded_image(data, key, {"source": "evidence_store"})
+                except Exception as e:
+                    logger.error(f"Failed to spill evidence {key[:12]} to disk: {e}")
+
+            with self._lock:
+                if self._spilling.pop(key, None) is None:
+                    # Released or cleared meanwhile
+                    if metadata is not None:
+                        deleted.append(metadata)
+                    continue
+                if metadata is not None:
+                    self._spilled[key] = metadata
+                    self.stats["spilled"] += 1
+                    while len(self._spilled) > self.max_spill_files:
+                        deleted.append(self._spilled.pop(next(iter(self._spilled))))
+                        self.stats["spill_evictions"] += 1
+                else:
+                    self.stats["dropped"] += 1
+
+        self._delete_spilled(deleted)
+
+    def _delete_spilled(self, deleted: List["StorageMetadata"]):
+        """Delete spilled snapshot files (lock not held)."""
+        if not deleted or self.storage is None:
+            return
+        for metadata in deleted:
+            try:
+                self.storage.delete_file(metadata)
+            except Exception as e:
+                logger.error(f"Failed to delete spilled evidence {metadata.id[:12]}: {e}")
+
+
+# Default store shared by the violation detectors of this process; evicted
+# snapshots spill to EVIDENCE_SPILL_DIR
+evidence_store = EvidenceStore(storage_path=ml_settings.EVIDENCE_SPILL_DIR)
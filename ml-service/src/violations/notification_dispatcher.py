@@ -0,0 +1,466 @@
+"""
+Asynchronous notification dispatcher.
+
+An asyncio event loop running on its own thread takes alerts from the
+producers without blocking them, coalesces the alerts of each channel into
+digests (up to digest_size alerts or digest_window seconds) and hands each
+digest to a pool of channel workers. The blocking senders (SMTP, HTTP,
+SQLite, files) run on a thread pool per channel, so a slow SMTP server
+never delays the webhook or the database channel.
+
+Rate limits are token buckets: one token per message sent, refilled
+continuously at rate_limit tokens per hour.
+"""
+
+import asyncio
+import logging
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.message import Message
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class TokenBucket:
+    """Token bucket rate limiter (thread-safe)."""
+
+    def __init__(self, rate_per_hour: float, capacity: Optional[float] = None):
+        """
+        Initialize token bucket.
+
+        Args:
+            rate_per_hour: Tokens added per hour
+            capacity: Maximum burst (rate_per_hour if None)
+        """
+        self.rate = rate_per_hour / 3600.0
+        self.capacity = float(capacity if capacity is not None else rate_per_hour)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        """Tokens currently available."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def available(self, tokens: float = 1.0) -> bool:
+        """Whether tokens could be taken now."""
+        return self.tokens >= tokens
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens if available."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def consume(self, tokens: float = 1.0):
+        """Take tokens unconditionally (may go negative)."""
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+
+
+class SMTPConnectionPool:
+    """
+    Reusable authenticated SMTP sessions.
+
+    A session is reused across messages and replaced when the server drops
+    it; sessions idle for longer than idle_timeout are checked with NOOP
+    before being reused.
+    """
+
+    def __init__(self, host: str, port: int, username: str = "", password: str = "",
+                 use_tls: bool = True, timeout: float = 30.0, idle_timeout: float = 60.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+
+        self._idle: List[Any] = []  # (smtp, last_used)
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.connections_opened = 0
+        self.messages_sent = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        self.connections_opened += 1
+        return server
+
+    def _acquire(self) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, last_used = self._idle.pop()
+            if time.monotonic() - last_used < self.idle_timeout:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._close(server)
+        return self._connect()
+
+    def _release(self, server: smtplib.SMTP):
+        with self._lock:
+            self._idle.append((server, time.monotonic()))
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def send(self, msg: Message):
+        """Send a message, reconnecting once if the session was dropped."""
+        server = self._acquire()
+        try:
+            server.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, OSError):
+            self._close(server)
+            server = self._connect()
+            server.send_message(msg)
+        except Exception:
+            self._close(server)
+            raise
+
+        self.messages_sent += 1
+        self._release(server)
+
+    def close(self):
+        """Close every idle session."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._close(server)
+
+
+@dataclass
+class ChannelPolicy:
+    """Batching, concurrency and retry policy of a channel."""
+    digest_size: int = 1          # Maximum alerts per message
+    digest_window: float = 0.0    # Maximum wait to fill a digest (seconds)
+    workers: int = 1              # Concurrent senders
+    retry_attempts: int = 3
+    retry_delay: float = 5.0
+
+
+@dataclass
+class _ChannelLane:
+    """Queues, workers and counters of one channel (event loop thread only)."""
+    items: asyncio.Queue
+    batches: asyncio.Queue
+    executor: ThreadPoolExecutor
+    tasks: List[asyncio.Task]
+
+
+class NotificationDispatcher:
+    """
+    Per-channel digest batching and delivery on an asyncio event loop.
+
+    submit() is thread-safe and never blocks. For every delivered (or
+    failed) digest on_result is called on the dispatcher thread with
+    (channel, items, success, attempts, error).
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[Hashable, List[Any]], bool],
+        get_policy: Callable[[Hashable], ChannelPolicy],
+        on_result: Optional[Callable[[Hashable, List[Any], bool, int, Optional[str]], None]] = None,
+        rate_limiters: Optional[Dict[Hashable, TokenBucket]] = None,
+        is_urgent: Optional[Callable[[Any], bool]] = None,
+        max_pending: int = 10000
+    ):
+        """
+        Initialize dispatcher.
+
+        Args:
+            send_batch: Blocking sender called with (channel, items); returns success
+            get_policy: Policy of a channel
+            on_result: Delivery callback
+            rate_limiters: Token bucket per channel (one token per message)
+            is_urgent: Items that flush their digest immediately
+            max_pending: Maximum queued items over all channels (extra items are dropped)
+        """
+        self.send_batch = send_batch
+        self.get_policy = get_policy
+        self.on_result = on_result
+        self.rate_limiters = rate_limiters if rate_limiters is not None else {}
+        self.is_urgent = is_urgent or (lambda item: False)
+        self.max_pending = max_pending
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._stopping: Optional[asyncio.Event] = None
+        self._lanes: Dict[Hashable, _ChannelLane] = {}
+        self._drain_last: List[Hashable] = []
+
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+        # Statistics per channel
+        self.stats: Dict[Hashable, Dict[str, float]] = {}
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def pending(self) -> int:
+        """Items queued or being sent."""
+        return self._pending
+
+    def start(self):
+        """Start the event loop thread."""
+        if self.is_running:
+            return
+
+        self._ready.clear()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="notification-dispatcher", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        logger.info("Notification dispatcher started")
+
+    def stop(self, timeout: float = 10.0, drain_last: Optional[List[Hashable]] = None):
+        """
+        Deliver pending digests and stop.
+
+        Args:
+            timeout: Maximum wait for the loop thread
+            drain_last: Channels stopped after all the others (they may
+                        receive items from on_result while the rest drain)
+        """
+        if not self.is_running:
+            return
+
+        self._drain_last = list(drain_last or [])
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        logger.info("Notification dispatcher stopped")
+
+    def submit(self, channel: Hashable, item: Any) -> bool:
+        """
+        Queue an item for a channel (thread-safe, non-blocking).
+
+        Returns:
+            False if the dispatcher is not running or too many items are pending
+        """
+        if not self.is_running:
+            return False
+
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                self._channel_stats(channel)["dropped"] += 1
+                return False
+            self._pending += 1
+
+        self._loop.call_soon_threadsafe(self._enqueue, channel, item)
+        return True
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get dispatcher statistics."""
+        return {
+            "running": self.is_running,
+            "pending": self._pending,
+            "channels": {str(getattr(channel, "value", channel)): dict(stats)
+                         for channel, stats in self.stats.items()}
+        }
+
+    # ------------------------------------------------------------------
+    # Event loop
+    # ------------------------------------------------------------------
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        self._stopping = asyncio.Event()
+        self._lanes = {}
+        self._ready.set()
+
+        await self._stopping.wait()
+
+        # Flush every channel, then the channels fed by on_result
+        first = [channel for channel in self._lanes if channel not in self._drain_last]
+        await self._close_lanes(first)
+        await self._close_lanes([channel for channel in self._lanes if channel not in first])
+
+    async def _close_lanes(self, channels: List[Hashable]):
+        for channel in channels:
+            self._lanes[channel].items.put_nowait(_STOP)
+        for channel in channels:
+            lane = self._lanes[channel]
+            await asyncio.gather(*lane.tasks, return_exceptions=True)
+            lane.executor.shutdown(wait=True)
+
+    def _channel_stats(self, channel: Hashable) -> Dict[str, float]:
+        stats = self.stats.get(channel)
+        if stats is None:
+            stats = self.stats[channel] = {
+                "submitted": 0,
+                "delivered": 0,
+                "messages": 0,
+                "failed": 0,
+                "rate_limited": 0,
+                "dropped": 0,
+                "avg_send_ms": 0.0
+            }
+        return stats
+
+    def _enqueue(self, channel: Hashable, item: Any):
+        lane = self._lanes.get(channel)
+        if lane is None:
+            lane = self._start_lane(channel)
+        self._channel_stats(channel)["submitted"] += 1
+        lane.items.put_nowait(item)
+
+    def _start_lane(self, channel: Hashable) -> _ChannelLane:
+        policy = self.get_policy(channel)
+        workers = max(1, policy.workers)
+        lane = _ChannelLane(
+            items=asyncio.Queue(),
+            batches=asyncio.Queue(maxsize=workers * 2),
+            executor=ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"notify-{getattr(channel, 'value', channel)}"),
+            tasks=[]
+        )
+        lane.tasks.append(asyncio.ensure_future(self._batcher(channel, lane, workers)))
+        lane.tasks.extend(asyncio.ensure_future(self._worker(channel, lane)) for _ in range(workers))
+        self._lanes[channel] = lane
+        return lane
+
+    async def _batcher(self, channel: Hashable, lane: _ChannelLane, workers: int):
+        """Coalesce the items of a channel into digests."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await lane.items.get()
+            if item is _STOP:
+                break
+
+            policy = self.get_policy(channel)
+            batch = [item]
+            deadline = loop.time() + policy.digest_window
+
+            while len(batch) < policy.digest_size and not self.is_urgent(batch[-1]):
+                if not lane.items.empty():
+                    item = lane.items.get_nowait()
+                else:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(lane.items.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await lane.batches.put(batch)
+
+        for _ in range(workers):
+            await lane.batches.put(None)
+
+    async def _worker(self, channel: Hashable, lane: _ChannelLane):
+        """Send the digests of a channel."""
+        while True:
+            batch = await lane.batches.get()
+            if batch is None:
+                break
+            try:
+                await self._deliver(channel, lane, batch)
+            finally:
+                with self._pending_lock:
+                    self._pending -= len(batch)
+
+    async def _deliver(self, channel: Hashable, lane: _ChannelLane, batch: List[Any]):
+        loop = asyncio.get_running_loop()
+        policy = self.get_policy(channel)
+        stats = self._channel_stats(channel)
+
+        limiter = self.rate_limiters.get(channel)
+        if limiter is not None and not limiter.try_acquire():
+            stats["rate_limited"] += len(batch)
+            logger.warning(f"Rate limit exceeded for {getattr(channel, 'value', channel)}, "
+                           f"dropping {len(batch)} alerts")
+            self._report(channel, batch, False, 0, "rate limit exceeded")
+            return
+
+        success = False
+        error = None
+        attempts = 0
+        for attempts in range(1, max(1, policy.retry_attempts) + 1):
+            start_time = time.perf_counter()
+            try:
+                success = bool(await loop.run_in_executor(lane.executor, self.send_batch, channel, batch))
+                error = None if success else "send failed"
+            except Exception as e:
+                success = False
+                error = str(e)
+            send_ms = (time.perf_counter() - start_time) * 1000
+            stats["avg_send_ms"] = send_ms if stats["messages"] == 0 else 0.9 * stats["avg_send_ms"] + 0.1 * send_ms
+
+            if success:
+                break
+            if attempts < policy.retry_attempts and not self._stopping.is_set():
+                # Non-blocking backoff: the other channels keep sending
+                await asyncio.sleep(policy.retry_delay)
+            else:
+                break
+
+        if success:
+            stats["delivered"] += len(batch)
+            stats["messages"] += 1
+        else:
+            stats["failed"] += len(batch)
+            logger.warning(f"Failed to send {len(batch)} alerts via "
+                           f"{getattr(channel, 'value', channel)}: {error}")
+
+        self._report(channel, batch, success, attempts, error)
+
+    def _report(self, channel: Hashable, batch: List[Any], success: bool, attempts: int, error: Optional[str]):
+        if self.on_result is None:
+            return
+        try:
+            self.on_result(channel, batch, success, attempts, error)
+        except Exception as e:
+            logger.error(f"Notification result callback failed: {e}")
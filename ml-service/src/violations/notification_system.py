@@ -11,11 +11,12 @@ import json
 import smtplib
 import requests
 from typing import List, Dict, Optional, Any, Callable
+from collections import Counter
 from dataclasses import dataclass, asdict
 from enum import Enum
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
-from email.mime.image import MimeImage
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from email.mime.image import MIMEImage
 from pathlib import Path
 import threading
 import queue
@@ -25,6 +26,7 @@ import cv2
 import numpy as np
 
 from .violation_detector import TrafficViolation, ViolationType, ViolationSeverity
+from .notification_dispatcher import ChannelPolicy, NotificationDispatcher, SMTPConnectionPool, TokenBucket
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +56,10 @@ class NotificationConfig:
     config: Dict[str, Any]
     retry_attempts: int = 3
     retry_delay: float = 5.0
-    rate_limit: Optional[int] = None  # Max notifications per hour
+    rate_limit: Optional[int] = None  # Max notifications (messages) per hour
+    digest_size: int = 1  # Max alerts coalesced into one message
+    digest_window: float = 0.0  # Max seconds to wait for a digest to fill
+    workers: int = 1  # Concurrent senders for the channel
 
 @dataclass
 class Alert:
@@ -81,8 +86,12 @@ class NotificationSystem:
     - Template-based messages
     - Evidence attachment support
     - Real-time and batch notifications
+    - Non-blocking dispatch with per-channel digests and persistent connections
     """
     
+    # Internal lane that persists the final status of every alert
+    STATUS_LANE = "alert_status"
+    
     def __init__(self, config_file: Optional[str] = None):
         """
         Initialize notification system.
@@ -91,15 +100,27 @@ class NotificationSystem:
             config_file: Path to notification configuration file
         """
         self.notification_configs: Dict[NotificationChannel, NotificationConfig] = {}
-        self.alert_queue = queue.Queue()
+        self.alert_queue = queue.Queue()  # Alerts queued before start()
         self.sent_alerts: List[Alert] = []
         
-        # Rate limiting tracking
-        self.rate_limit_counters: Dict[NotificationChannel, List[float]] = {}
+        # Rate limiting (token bucket per channel)
+        self.rate_limiters: Dict[NotificationChannel, TokenBucket] = {}
         
-        # Threading for async notifications
-        self.notification_thread = None
+        # Async dispatch
+        self.dispatcher = NotificationDispatcher(
+            send_batch=self._send_batch_to_channel,
+            get_policy=self._get_channel_policy,
+            on_result=self._on_delivery,
+            rate_limiters=self.rate_limiters,
+            is_urgent=lambda alert: alert.priority == AlertPriority.CRITICAL
+        )
         self.running = False
+        self._pending_channels: Dict[int, set] = {}  # id(alert) -> channels not reported yet
+        self._pending_lock = threading.Lock()
+        
+        # Persistent connections
+        self._http_session = requests.Session()
+        self._smtp_pool: Optional[SMTPConnectionPool] = None
         
         # Database for persistence
         self.db_path = "notifications.db"
@@ -148,7 +169,9 @@ class NotificationSystem:
         self.add_notification_config(NotificationConfig(
             channel=NotificationChannel.DATABASE,
             enabled=True,
-            config={"db_path": self.db_path}
+            config={"db_path": self.db_path},
+            digest_size=100,
+            digest_window=0.5
         ))
         
         # File notifications
@@ -158,7 +181,9 @@ class NotificationSystem:
             config={
                 "log_file": "violations.log",
                 "evidence_dir": "evidence"
-            }
+            },
+            digest_size=100,
+            digest_window=0.5
         ))
         
         # Email notifications (disabled by default)
@@ -172,9 +197,12 @@ class NotificationSystem:
                 "password": "",
                 "from_email": "",
                 "to_emails": [],
-                "use_tls": True
+                "use_tls": True,
+                "max_attachments": 5
             },
-            rate_limit=50  # Max 50 emails per hour
+            rate_limit=50,  # Max 50 emails per hour
+            digest_size=25,
+            digest_window=10.0
         ))
         
         # Webhook notifications
@@ -186,13 +214,19 @@ class NotificationSystem:
                 "headers": {"Content-Type": "application/json"},
                 "timeout": 10
             },
-            rate_limit=100
+            rate_limit=100,
+            digest_size=50,
+            digest_window=2.0,
+            workers=2
         ))
     
     def add_notification_config(self, config: NotificationConfig):
         """Add notification channel configuration."""
         self.notification_configs[config.channel] = config
-        self.rate_limit_counters[config.channel] = []
+        if config.rate_limit:
+            self.rate_limiters[config.channel] = TokenBucket(config.rate_limit)
+        else:
+            self.rate_limiters.pop(config.channel, None)
         logger.info(f"Added notification config for {config.channel.value}")
     
     def load_config(self, config_file: str):
@@ -210,7 +244,10 @@ class NotificationSystem:
                         config=channel_config.get("config", {}),
                         retry_attempts=channel_config.get("retry_attempts", 3),
                         retry_delay=channel_config.get("retry_delay", 5.0),
-                        rate_limit=channel_config.get("rate_limit")
+                        rate_limit=channel_config.get("rate_limit"),
+                        digest_size=channel_config.get("digest_size", 1),
+                        digest_window=channel_config.get("digest_window", 0.0),
+                        workers=channel_config.get("workers", 1)
                     )
                     self.add_notification_config(config)
                 except ValueError:
@@ -222,19 +259,27 @@ class NotificationSystem:
             logger.error(f"Failed to load notification config: {e}")
     
     def start(self):
-        """Start notification processing thread."""
+        """Start notification dispatching."""
         if not self.running:
+            self.dispatcher.start()
             self.running = True
-            self.notification_thread = threading.Thread(target=self._process_notifications)
-            self.notification_thread.daemon = True
-            self.notification_thread.start()
+            
+            # Alerts queued before start
+            while True:
+                try:
+                    self._dispatch(self.alert_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
             logger.info("Notification system started")
     
     def stop(self):
-        """Stop notification processing."""
+        """Deliver pending digests and stop notification dispatching."""
         self.running = False
-        if self.notification_thread:
-            self.notification_thread.join(timeout=5.0)
+        self.dispatcher.stop(drain_last=[self.STATUS_LANE])
+        
+        if self._smtp_pool:
+            self._smtp_pool.close()
         logger.info("Notification system stopped")
     
     def send_violation_alert(self, violation: TrafficViolation, 
@@ -277,8 +322,11 @@ class NotificationSystem:
             }
         )
         
-        # Queue alert for processing
-        self.alert_queue.put(alert)
+        # Queue alert for processing (never blocks the caller)
+        if self.running:
+            self._dispatch(alert)
+        else:
+            self.alert_queue.put(alert)
         
         logger.info(f"Queued alert {alert.alert_id} for violation {violation.violation_id}")
         return alert.alert_id
@@ -354,123 +402,129 @@ Location: {violation.location.zone_name}
         
         return message.strip()
     
-    def _process_notifications(self):
-        """Process notification queue in background thread."""
-        while self.running:
-            try:
-                # Get alert from queue (with timeout)
-                alert = self.alert_queue.get(timeout=1.0)
-                
-                # Process alert
-                self._send_alert(alert)
-                
-                # Mark task as done
-                self.alert_queue.task_done()
-                
-            except queue.Empty:
-                continue
-            except Exception as e:
-                logger.error(f"Error processing notification: {e}")
+    def _dispatch(self, alert: Alert):
+        """Hand an alert to the dispatcher, one item per channel."""
+        channels = list(dict.fromkeys(alert.channels))
+        if not channels:
+            self._finalize_alert(alert)
+            return
+        
+        with self._pending_lock:
+            self._pending_channels[id(alert)] = set(channels)
+        
+        for channel in channels:
+            if not self.dispatcher.submit(channel, alert):
+                logger.warning(f"Notification queue full, dropping {alert.alert_id} for {channel.value}")
+                self._on_delivery(channel, [alert], False, 0, "queue full")
     
-    def _send_alert(self, alert: Alert):
-        """Send alert through configured channels."""
-        success_channels = []
-        failed_channels = []
+    def _get_channel_policy(self, channel) -> ChannelPolicy:
+        """Dispatch policy of a channel."""
+        if channel == self.STATUS_LANE:
+            return ChannelPolicy(digest_size=100, digest_window=1.0, retry_attempts=1)
         
-        for channel in alert.channels:
-            if not self._check_rate_limit(channel):
-                logger.warning(f"Rate limit exceeded for {channel.value}")
-                continue
+        config = self.notification_configs.get(channel)
+        if config is None:
+            return ChannelPolicy(retry_attempts=1)
+        return ChannelPolicy(
+            digest_size=max(1, config.digest_size),
+            digest_window=config.digest_window,
+            workers=max(1, config.workers),
+            retry_attempts=max(1, config.retry_attempts),
+            retry_delay=config.retry_delay
+        )
+    
+    def _on_delivery(self, channel, alerts: List[Alert], success: bool, attempts: int, error: Optional[str]):
+        """Record the result of a digest (dispatcher thread)."""
+        if channel == self.STATUS_LANE:
+            return
+        
+        for alert in alerts:
+            alert.attempts = max(alert.attempts, attempts)
+            if success:
+                alert.sent = True
+            elif error:
+                alert.error = error
             
-            try:
-                success = self._send_to_channel(alert, channel)
-                if success:
-                    success_channels.append(channel)
-                    self._update_rate_limit(channel)
-                else:
-                    failed_channels.append(channel)
-            except Exception as e:
-                logger.error(f"Failed to send alert via {channel.value}: {e}")
-                failed_channels.append(channel)
-                alert.error = str(e)
-        
-        # Update alert status
-        alert.attempts += 1
-        alert.sent = len(success_channels) > 0
-        
-        # Store alert
+            with self._pending_lock:
+                remaining = self._pending_channels.get(id(alert))
+                if remaining is None:
+                    continue
+                remaining.discard(channel)
+                done = not remaining
+                if done:
+                    del self._pending_channels[id(alert)]
+            
+            if done:
+                self._finalize_alert(alert)
+    
+    def _finalize_alert(self, alert: Alert):
+        """Keep and persist an alert once every channel has been tried."""
         self.sent_alerts.append(alert)
-        self._store_alert_in_db(alert)
+        if alert.sent:
+            logger.info(f"Alert {alert.alert_id} sent")
         
-        if success_channels:
-            logger.info(f"Alert {alert.alert_id} sent via: {[c.value for c in success_channels]}")
-        
-        if failed_channels:
-            logger.warning(f"Alert {alert.alert_id} failed via: {[c.value for c in failed_channels]}")
-            
-            # Retry logic for failed channels
-            if alert.attempts < 3:  # Max 3 attempts
-                # Re-queue with only failed channels after delay
-                time.sleep(5.0)
-                retry_alert = Alert(
-                    alert_id=alert.alert_id + f"_retry_{alert.attempts}",
-                    timestamp=time.time(),
-                    priority=alert.priority,
-                    violation=alert.violation,
-                    message=alert.message,
-                    channels=failed_channels,
-                    metadata=alert.metadata,
-                    attempts=alert.attempts
-                )
-                self.alert_queue.put(retry_alert)
+        if not self.dispatcher.submit(self.STATUS_LANE, alert):
+            self._store_alert_in_db(alert)
     
-    def _send_to_channel(self, alert: Alert, channel: NotificationChannel) -> bool:
-        """Send alert to specific channel."""
+    def _send_batch_to_channel(self, channel, alerts: List[Alert]) -> bool:
+        """Send a digest of alerts to a channel (dispatcher worker thread)."""
+        if channel == self.STATUS_LANE:
+            return self._send_database_notifications(alerts, self.notification_configs[NotificationChannel.DATABASE])
+        
         config = self.notification_configs.get(channel)
         if not config or not config.enabled:
             return False
         
+        if channel == NotificationChannel.DATABASE:
+            return self._send_database_notifications(alerts, config)
+        elif channel == NotificationChannel.FILE:
+            return self._send_file_notifications(alerts, config)
+        elif channel == NotificationChannel.EMAIL:
+            return self._send_email_digest(alerts, config)
+        elif channel in (NotificationChannel.WEBHOOK, NotificationChannel.API):
+            return self._send_webhook_digest(alerts, config)
+        else:
+            logger.warning(f"Unsupported notification channel: {channel.value}")
+            return False
+    
+    def _send_to_channel(self, alert: Alert, channel: NotificationChannel) -> bool:
+        """Send alert to specific channel."""
         try:
-            if channel == NotificationChannel.DATABASE:
-                return self._send_database_notification(alert, config)
-            elif channel == NotificationChannel.FILE:
-                return self._send_file_notification(alert, config)
-            elif channel == NotificationChannel.EMAIL:
-                return self._send_email_notification(alert, config)
-            elif channel == NotificationChannel.WEBHOOK:
-                return self._send_webhook_notification(alert, config)
-            elif channel == NotificationChannel.API:
-                return self._send_api_notification(alert, config)
-            else:
-                logger.warning(f"Unsupported notification channel: {channel.value}")
-                return False
+            return self._send_batch_to_channel(channel, [alert])
         except Exception as e:
             logger.error(f"Error sending to {channel.value}: {e}")
             return False
     
     def _send_database_notification(self, alert: Alert, config: NotificationConfig) -> bool:
         """Send notification to database."""
+        return self._send_database_notifications([alert], config)
+    
+    def _send_database_notifications(self, alerts: List[Alert], config: NotificationConfig) -> bool:
+        """Write a batch of notifications to the database in one transaction."""
         try:
             conn = sqlite3.connect(config.config["db_path"])
             cursor = conn.cursor()
             
-            cursor.execute("""
+            cursor.executemany("""
                 INSERT OR REPLACE INTO notifications 
                 (alert_id, timestamp, priority, violation_id, violation_type, 
                  message, channels, sent, attempts, error)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                alert.alert_id,
-                alert.timestamp,
-                alert.priority.value,
-                alert.violation.violation_id,
-                alert.violation.violation_type.value,
-                alert.message,
-                json.dumps([c.value for c in alert.channels]),
-                alert.sent,
-                alert.attempts,
-                alert.error
-            ))
+            """, [
+                (
+                    alert.alert_id,
+                    alert.timestamp,
+                    alert.priority.value,
+                    alert.violation.violation_id,
+                    alert.violation.violation_type.value,
+                    alert.message,
+                    json.dumps([c.value for c in alert.channels]),
+                    alert.sent,
+                    alert.attempts,
+                    alert.error
+                )
+                for alert in alerts
+            ])
             
             conn.commit()
             conn.close()
@@ -482,22 +536,32 @@ Location: {violation.location.zone_name}
     
     def _send_file_notification(self, alert: Alert, config: NotificationConfig) -> bool:
         """Send notification to log file."""
+        return self._send_file_notifications([alert], config)
+    
+    def _send_file_notifications(self, alerts: List[Alert], config: NotificationConfig) -> bool:
+        """Append a batch of notifications to the log file."""
         try:
             log_file = config.config.get("log_file", "violations.log")
             
-            with open(log_file, 'a') as f:
+            log_entries = []
+            for alert in alerts:
                 timestamp_str = datetime.fromtimestamp(alert.timestamp).strftime("%Y-%m-%d %H:%M:%S")
                 log_entry = f"[{timestamp_str}] {alert.priority.value.upper()} - {alert.alert_id}\n"
                 log_entry += f"{alert.message}\n"
                 log_entry += "-" * 80 + "\n"
-                f.write(log_entry)
+                log_entries.append(log_entry)
+            
+            with open(log_file, 'a') as f:
+                f.write("".join(log_entries))
             
             # Save evidence if available
             evidence_dir = Path(config.config.get("evidence_dir", "evidence"))
-            if alert.violation.evidence_frame is not None:
-                evidence_dir.mkdir(exist_ok=True)
-                evidence_file = evidence_dir / f"{alert.alert_id}_evidence.jpg"
-                cv2.imwrite(str(evidence_file), alert.violation.evidence_frame)
+            for alert in alerts:
+                evidence_jpeg = alert.violation.get_evidence_jpeg()
+                if evidence_jpeg is not None:
+                    evidence_dir.mkdir(exist_ok=True)
+                    evidence_file = evidence_dir / f"{alert.alert_id}_evidence.jpg"
+                    evidence_file.write_bytes(evidence_jpeg)
             
             return True
             
@@ -507,67 +571,117 @@ Location: {violation.location.zone_name}
     
     def _send_email_notification(self, alert: Alert, config: NotificationConfig) -> bool:
         """Send email notification."""
-        try:
-            email_config = config.config
-            
-            msg = MimeMultipart()
-            msg['From'] = email_config['from_email']
-            msg['To'] = ', '.join(email_config['to_emails'])
-            msg['Subject'] = f"Traffic Violation Alert - {alert.violation.violation_type.value.title()}"
-            
-            # Add text content
-            msg.attach(MimeText(alert.message, 'plain'))
-            
-            # Add evidence image if available
-            if alert.violation.evidence_frame is not None:
-                # Convert frame to JPEG
-                _, img_buffer = cv2.imencode('.jpg', alert.violation.evidence_frame)
-                img_data = img_buffer.tobytes()
-                
-                img_attachment = MimeImage(img_data)
+        return self._send_email_digest([alert], config)
+    
+    def _get_smtp_pool(self, email_config: Dict[str, Any]) -> SMTPConnectionPool:
+        """SMTP sessions reused across emails."""
+        pool = self._smtp_pool
+        if pool is None or (pool.host, pool.port, pool.username) != (
+                email_config['smtp_server'], email_config['smtp_port'], email_config.get('username', '')):
+            if pool:
+                pool.close()
+            pool = self._smtp_pool = SMTPConnectionPool(
+                host=email_config['smtp_server'],
+                port=email_config['smtp_port'],
+                username=email_config.get('username', ''),
+                password=email_config.get('password', ''),
+                use_tls=email_config.get('use_tls', True),
+                timeout=email_config.get('timeout', 30)
+            )
+        return pool
+    
+    def _build_email(self, alerts: List[Alert], email_config: Dict[str, Any]) -> MIMEMultipart:
+        """Email for one alert or a digest of alerts."""
+        msg = MIMEMultipart()
+        msg['From'] = email_config['from_email']
+        msg['To'] = ', '.join(email_config['to_emails'])
+        
+        if len(alerts) == 1:
+            msg['Subject'] = f"Traffic Violation Alert - {alerts[0].violation.violation_type.value.title()}"
+            body = alerts[0].message
+        else:
+            types = Counter(alert.violation.violation_type.value for alert in alerts)
+            summary = ", ".join(f"{count} {name.replace('_', ' ')}" for name, count in types.most_common())
+            msg['Subject'] = f"Traffic Violation Alerts - {len(alerts)} violations"
+            body = f"{len(alerts)} violations: {summary}\n\n" + ("\n\n" + "-" * 60 + "\n\n").join(
+                alert.message for alert in alerts
+            )
+        
+        # Add text content
+        msg.attach(MIMEText(body, 'plain'))
+        
+        # Add evidence images if available
+        max_attachments = email_config.get('max_attachments', 5)
+        attached = 0
+        for alert in alerts:
+            if attached >= max_attachments:
+                break
+            img_data = alert.violation.get_evidence_jpeg()
+            if img_data is not None:
+                img_attachment = MIMEImage(img_data)
                 img_attachment.add_header('Content-Disposition', 
                                         f'attachment; filename={alert.alert_id}_evidence.jpg')
                 msg.attach(img_attachment)
-            
-            # Send email
-            server = smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port'])
-            if email_config.get('use_tls', True):
-                server.starttls()
-            server.login(email_config['username'], email_config['password'])
-            server.send_message(msg)
-            server.quit()
-            
+                attached += 1
+        
+        return msg
+    
+    def _send_email_digest(self, alerts: List[Alert], config: NotificationConfig) -> bool:
+        """Send one email for a batch of alerts over a reused SMTP session."""
+        try:
+            email_config = config.config
+            msg = self._build_email(alerts, email_config)
+            self._get_smtp_pool(email_config).send(msg)
             return True
             
         except Exception as e:
             logger.error(f"Email notification failed: {e}")
             return False
     
+    def _webhook_payload(self, alert: Alert) -> Dict[str, Any]:
+        """Webhook payload of an alert."""
+        return {
+            "alert_id": alert.alert_id,
+            "timestamp": alert.timestamp,
+            "priority": alert.priority.value,
+            "violation": {
+                "id": alert.violation.violation_id,
+                "type": alert.violation.violation_type.value,
+                "severity": alert.violation.severity.value,
+                "description": alert.violation.description,
+                "vehicle_id": alert.violation.vehicle_id,
+                "location": asdict(alert.violation.location),
+                "speed_limit": alert.violation.speed_limit,
+                "measured_speed": alert.violation.measured_speed,
+                "license_plate": alert.violation.license_plate,
+                "confidence": alert.violation.confidence
+            },
+            "message": alert.message
+        }
+    
     def _send_webhook_notification(self, alert: Alert, config: NotificationConfig) -> bool:
         """Send webhook notification."""
+        return self._send_webhook_digest([alert], config)
+    
+    def _send_webhook_digest(self, alerts: List[Alert], config: NotificationConfig) -> bool:
+        """
+        Send a batch of alerts in one webhook request (keep-alive session).
+        
+        A single alert keeps the original payload; digests are sent as
+        {"count": n, "alerts": [...]}.
+        """
         try:
             webhook_config = config.config
             
-            payload = {
-                "alert_id": alert.alert_id,
-                "timestamp": alert.timestamp,
-                "priority": alert.priority.value,
-                "violation": {
-                    "id": alert.violation.violation_id,
-                    "type": alert.violation.violation_type.value,
-                    "severity": alert.violation.severity.value,
-                    "description": alert.violation.description,
-                    "vehicle_id": alert.violation.vehicle_id,
-                    "location": asdict(alert.violation.location),
-                    "speed_limit": alert.violation.speed_limit,
-                    "measured_speed": alert.violation.measured_speed,
-                    "license_plate": alert.violation.license_plate,
-                    "confidence": alert.violation.confidence
-                },
-                "message": alert.message
-            }
+            if len(alerts) == 1:
+                payload = self._webhook_payload(alerts[0])
+            else:
+                payload = {
+                    "count": len(alerts),
+                    "alerts": [self._webhook_payload(alert) for alert in alerts]
+                }
             
-            response = requests.post(
+            response = self._http_session.post(
                 webhook_config['url'],
                 json=payload,
                 headers=webhook_config.get('headers', {}),
@@ -587,25 +701,14 @@ Location: {violation.location.zone_name}
     
     def _check_rate_limit(self, channel: NotificationChannel) -> bool:
         """Check if channel is within rate limits."""
-        config = self.notification_configs.get(channel)
-        if not config or not config.rate_limit:
-            return True
-        
-        current_time = time.time()
-        hour_ago = current_time - 3600  # 1 hour ago
-        
-        # Clean old timestamps
-        self.rate_limit_counters[channel] = [
-            timestamp for timestamp in self.rate_limit_counters[channel]
-            if timestamp > hour_ago
-        ]
-        
-        # Check if under limit
-        return len(self.rate_limit_counters[channel]) < config.rate_limit
+        limiter = self.rate_limiters.get(channel)
+        return limiter is None or limiter.available()
     
     def _update_rate_limit(self, channel: NotificationChannel):
         """Update rate limit counter for channel."""
-        self.rate_limit_counters[channel].append(time.time())
+        limiter = self.rate_limiters.get(channel)
+        if limiter is not None:
+            limiter.consume()
     
     def _store_alert_in_db(self, alert: Alert):
         """Store alert in database for tracking."""
@@ -625,7 +728,9 @@ Location: {violation.location.zone_name}
             channel_stats[channel.value] = {
                 "total": len(channel_alerts),
                 "sent": len([a for a in channel_alerts if a.sent]),
-                "rate_limit_count": len(self.rate_limit_counters.get(channel, []))
+                "rate_limit_tokens": (
+                    round(self.rate_limiters[channel].tokens, 2) if channel in self.rate_limiters else None
+                )
             }
         
         return {
@@ -633,6 +738,7 @@ Location: {violation.location.zone_name}
             "sent_alerts": sent_count,
             "failed_alerts": total_alerts - sent_count,
             "success_rate": sent_count / max(1, total_alerts),
-            "queue_size": self.alert_queue.qsize(),
-            "channel_statistics": channel_stats
+            "queue_size": self.alert_queue.qsize() + self.dispatcher.pending,
+            "channel_statistics": channel_stats,
+            "dispatcher": self.dispatcher.get_statistics()
         }
\ No newline at end of file
@@ -18,6 +18,7 @@ from pathlib import Path
 from ..speed.speed_analyzer import SpeedViolation, ViolationEvent as SpeedViolationEvent
 from ..tracking.vehicle_tracker import TrackedVehicle
 from ..detection.vehicle_detector import Detection
+from .evidence_store import EvidenceHandle, EvidenceStore, evidence_store as default_evidence_store
 
 logger = logging.getLogger(__name__)
 
@@ -64,7 +65,9 @@ class TrafficViolation:
     speed_limit: Optional[float] = None
     measured_speed: Optional[float] = None
     
-    # Evidence
+    # Evidence (snapshots live in the EvidenceStore; the arrays are legacy)
+    evidence: Optional[EvidenceHandle] = None
+    crop_evidence: Optional[EvidenceHandle] = None
     evidence_frame: Optional[np.ndarray] = None
     vehicle_crop: Optional[np.ndarray] = None
     license_plate: Optional[str] = None
@@ -81,6 +84,27 @@ class TrafficViolation:
     processed_by: str = "automated_system"
     reviewed: bool = False
     false_positive: bool = False
+    
+    def get_evidence_frame(self) -> Optional[np.ndarray]:
+        """Decode the full-frame evidence."""
+        if self.evidence_frame is not None:
+            return self.evidence_frame
+        return self.evidence.load() if self.evidence else None
+    
+    def get_vehicle_crop(self) -> Optional[np.ndarray]:
+        """Decode the vehicle crop evidence."""
+        if self.vehicle_crop is not None:
+            return self.vehicle_crop
+        return self.crop_evidence.load() if self.crop_evidence else None
+    
+    def get_evidence_jpeg(self) -> Optional[bytes]:
+        """Full-frame evidence as JPEG bytes (no re-encoding for stored snapshots)."""
+        if self.evidence is not None:
+            return self.evidence.jpeg()
+        if self.evidence_frame is not None:
+            ok, buffer = cv2.imencode('.jpg', self.evidence_frame)
+            return buffer.tobytes() if ok else None
+        return None
 
 @dataclass
 class ViolationRule:
@@ -105,8 +129,15 @@ class ViolationDetector:
     - Real-time and batch processing
     """
     
-    def __init__(self):
-        """Initialize violation detector."""
+    def __init__(self, evidence_store: Optional[EvidenceStore] = None):
+        """
+        Initialize violation detector.
+        
+        Args:
+            evidence_store: Store for evidence snapshots (process-wide store if None)
+        """
+        self.evidence_store = evidence_store or default_evidence_store
+        self.frame_sequence: Optional[int] = None  # Set by begin_frame()
         self.violations: List[TrafficViolation] = []
         self.violation_rules: Dict[str, ViolationRule] = {}
         self.active_violations: Dict[int, List[str]] = {}  # vehicle_id -> violation_ids
@@ -151,6 +182,17 @@ class ViolationDetector:
         
         logger.info("ViolationDetector initialized")
     
+    def begin_frame(self) -> int:
+        """
+        Start a new frame.
+        
+        The detect_* calls that follow share one evidence snapshot of the
+        frame; call it before each frame (capture buffers are reused, so the
+        frame object alone does not tell frames apart).
+        """
+        self.frame_sequence = 0 if self.frame_sequence is None else self.frame_sequence + 1
+        return self.frame_sequence
+    
     def add_violation_rule(self, rule: ViolationRule):
         """Add a violation detection rule."""
         self.violation_rules[rule.rule_id] = rule
@@ -199,9 +241,8 @@ class ViolationDetector:
                 coordinates=(vehicle.center_x, vehicle.center_y)
             )
             
-            # Extract evidence
-            x1, y1, x2, y2 = vehicle.bbox
-            vehicle_crop = frame[y1:y2, x1:x2].copy()
+            # Extract evidence (one snapshot per frame, shared by its violations)
+            evidence = self.evidence_store.put_frame(frame, self.frame_sequence)
             
             # Create violation record
             violation = TrafficViolation(
@@ -215,8 +256,8 @@ class ViolationDetector:
                 location=location,
                 speed_limit=speed_violation.speed_limit,
                 measured_speed=speed_violation.measured_speed,
-                evidence_frame=frame.copy(),
-                vehicle_crop=vehicle_crop,
+                evidence=evidence,
+                crop_evidence=evidence.crop(vehicle.bbox),
                 detection_confidence=vehicle.confidence,
                 tracking_quality=vehicle.confidence
             )
@@ -274,7 +315,7 @@ class ViolationDetector:
                         coordinates=(vehicle.center_x, vehicle.center_y)
                     )
                     
-                    vehicle_crop = frame[y1:y2, x1:x2].copy()
+                    evidence = self.evidence_store.put_frame(frame, self.frame_sequence)
                     
                     violation = TrafficViolation(
                         violation_id=str(uuid.uuid4()),
@@ -285,8 +326,8 @@ class ViolationDetector:
                         description=f"Lane violation: {violation_amount*100:.1f}% outside valid lanes",
                         confidence=0.8,  # Lane detection confidence
                         location=location,
-                        evidence_frame=frame.copy(),
-                        vehicle_crop=vehicle_crop,
+                        evidence=evidence,
+                        crop_evidence=evidence.crop(vehicle.bbox),
                         detection_confidence=vehicle.confidence,
                         tracking_quality=vehicle.confidence
                     )
@@ -344,15 +385,13 @@ class ViolationDetector:
                     
                     # Check if driving in wrong direction (angle > 90 degrees)
                     if angle_diff > np.pi / 2:
-                        x1, y1, x2, y2 = vehicle.bbox
-                        
                         location = ViolationLocation(
                             zone_id="main_road",
                             zone_name="Main Road",
                             coordinates=(vehicle.center_x, vehicle.center_y)
                         )
                         
-                        vehicle_crop = frame[y1:y2, x1:x2].copy()
+                        evidence = self.evidence_store.put_frame(frame, self.frame_sequence)
                         
                         violation = TrafficViolation(
                             violation_id=str(uuid.uuid4()),
@@ -363,8 +402,8 @@ class ViolationDetector:
                             description=f"Wrong-way driving detected (angle: {np.degrees(angle_diff):.1f}°)",
                             confidence=0.9,
                             location=location,
-                            evidence_frame=frame.copy(),
-                            vehicle_crop=vehicle_crop,
+                            evidence=evidence,
+                            crop_evidence=evidence.crop(vehicle.bbox),
                             detection_confidence=vehicle.confidence,
                             tracking_quality=vehicle.confidence
                         )
@@ -420,15 +459,13 @@ class ViolationDetector:
                     if real_distance < min_distance * 0.3:
                         severity = ViolationSeverity.CRITICAL
                     
-                    x1, y1, x2, y2 = vehicle1.bbox
-                    
                     location = ViolationLocation(
                         zone_id="main_road",
                         zone_name="Main Road",
                         coordinates=(vehicle1.center_x, vehicle1.center_y)
                     )
                     
-                    vehicle_crop = frame[y1:y2, x1:x2].copy()
+                    evidence = self.evidence_store.put_frame(frame, self.frame_sequence)
                     
                     violation = TrafficViolation(
                         violation_id=str(uuid.uuid4()),
@@ -439,8 +476,8 @@ class ViolationDetector:
                         description=f"Following too closely: {real_distance:.1f}m (min: {min_distance:.1f}m)",
                         confidence=0.7,
                         location=location,
-                        evidence_frame=frame.copy(),
-                        vehicle_crop=vehicle_crop,
+                        evidence=evidence,
+                        crop_evidence=evidence.crop(vehicle1.bbox),
                         detection_confidence=vehicle1.confidence,
                         tracking_quality=vehicle1.confidence
                     )
@@ -554,9 +591,16 @@ class ViolationDetector:
         
         # Remove old violations
         initial_count = len(self.violations)
+        removed = [v for v in self.violations if (current_time - v.timestamp) > max_age]
         self.violations = [v for v in self.violations if (current_time - v.timestamp) <= max_age]
         removed_count = initial_count - len(self.violations)
         
+        # Release evidence snapshots no remaining violation refers to
+        released_keys = {v.evidence.key for v in removed if v.evidence is not None}
+        released_keys -= {v.evidence.key for v in self.violations if v.evidence is not None}
+        if released_keys:
+            self.evidence_store.release(released_keys)
+        
         # Clean up active violations
         for vehicle_id in list(self.active_violations.keys()):
             self.active_violations[vehicle_id] = [
@@ -10,7 +10,7 @@ import time
 import json
 import sqlite3
 import numpy as np
-from typing import List, Dict, Optional, Any, Tuple
+from typing import List, Dict, Optional, Any, Tuple, TYPE_CHECKING
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -20,9 +20,13 @@ from collections import defaultdict, Counter
 from .violation_detector import ViolationDetector, TrafficViolation, ViolationType, ViolationSeverity
 from .lane_detector import LaneDetector, LaneViolation
 from .notification_system import NotificationSystem, AlertPriority
+from .violation_writer import ViolationWriter, connect, write_violations
 from ..speed.speed_analyzer import SpeedAnalyzer, ViolationEvent as SpeedViolationEvent
 from ..tracking.vehicle_tracker import TrackedVehicle
 
+if TYPE_CHECKING:
+    from ..storage.storage_service import StorageService
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -65,12 +69,15 @@ class ViolationManager:
     - Performance monitoring
     """
     
-    def __init__(self, notification_system: Optional[NotificationSystem] = None):
+    def __init__(self, notification_system: Optional[NotificationSystem] = None,
+                 storage_service: Optional["StorageService"] = None):
         """
         Initialize violation manager.
         
         Args:
             notification_system: Optional notification system instance
+            storage_service: Optional storage service; with async_storage the
+                writer thread also stores each batch there
         """
         # Core components
         self.violation_detector = ViolationDetector()
@@ -79,6 +86,8 @@ class ViolationManager:
         
         # Data storage
         self.db_path = "violations.db"
+        self.storage_service = storage_service
+        self.writer: Optional[ViolationWriter] = None
         self._init_database()
         
         # Processing state
@@ -98,7 +107,9 @@ class ViolationManager:
             "max_violations_per_vehicle_per_hour": 5,
             "confidence_threshold": 0.7,
             "enable_lane_detection": True,
-            "enable_speed_detection": True
+            "enable_speed_detection": True,
+            "async_storage": True,
+            "write_batch_size": 64
         }
         
         # Threading for background tasks
@@ -110,7 +121,7 @@ class ViolationManager:
     def _init_database(self):
         """Initialize violation management database."""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             
             # Main violations table
@@ -168,7 +179,19 @@ class ViolationManager:
                 )
             """)
             
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_violations_timestamp ON violations (timestamp)")
             conn.commit()
+            
+            # Target of the statistics upsert (fails on old databases with duplicate rows)
+            try:
+                cursor.execute("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_violation_statistics_key
+                    ON violation_statistics (date, hour, violation_type, severity)
+                """)
+                conn.commit()
+            except sqlite3.IntegrityError as e:
+                logger.warning(f"Cannot create violation statistics key: {e}")
+            
             conn.close()
             
         except Exception as e:
@@ -200,6 +223,10 @@ class ViolationManager:
         if self.background_thread:
             self.background_thread.join(timeout=5.0)
         
+        # Write pending violations
+        if self.writer:
+            self.writer.stop()
+        
         logger.info("ViolationManager stopped")
     
     def process_frame(self, frame: np.ndarray, speed_analyzer: SpeedAnalyzer, 
@@ -230,6 +257,7 @@ class ViolationManager:
             
             session = self.active_sessions[session_id]
             session["frames_processed"] += 1
+            self.violation_detector.begin_frame()
             
             # 1. Process speed violations
             if self.config["enable_speed_detection"]:
@@ -274,9 +302,9 @@ class ViolationManager:
             # 4. Process violations
             self.violation_detector.process_violations(filtered_violations)
             
-            # 5. Store in database
-            for violation in filtered_violations:
-                self._store_violation(violation)
+            # 5. Store in database (queued for the writer thread)
+            if filtered_violations:
+                self._store_violations(filtered_violations)
             
             # 6. Send notifications
             if self.config["auto_notification"]:
@@ -302,72 +330,41 @@ class ViolationManager:
             logger.error(f"Failed to process frame for violations: {e}")
             return []
     
-    def _store_violation(self, violation: TrafficViolation):
-        """Store violation in database."""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT OR REPLACE INTO violations (
-                    violation_id, timestamp, violation_type, severity, vehicle_id,
-                    description, confidence, location_zone_id, location_zone_name,
-                    location_coordinates, speed_limit, measured_speed, license_plate,
-                    plate_confidence, detection_confidence, tracking_quality, camera_id
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                violation.violation_id,
-                violation.timestamp,
-                violation.violation_type.value,
-                violation.severity.value,
-                violation.vehicle_id,
-                violation.description,
-                violation.confidence,
-                violation.location.zone_id,
-                violation.location.zone_name,
-                json.dumps(violation.location.coordinates),
-                violation.speed_limit,
-                violation.measured_speed,
-                violation.license_plate,
-                violation.plate_confidence,
-                violation.detection_confidence,
-                violation.tracking_quality,
-                violation.camera_id
-            ))
-            
-            conn.commit()
-            conn.close()
-            
-            # Update statistics
-            self._update_statistics(violation)
-            
-        except Exception as e:
-            logger.error(f"Failed to store violation: {e}")
+    def _get_writer(self) -> ViolationWriter:
+        """Get the running writer for the current database, starting it if needed."""
+        if self.writer is None or self.writer.db_path != self.db_path:
+            if self.writer:
+                self.writer.stop()
+            self.writer = ViolationWriter(self.db_path, batch_size=self.config["write_batch_size"],
+                                          storage_service=self.storage_service)
+        self.writer.start()
+        return self.writer
     
-    def _update_statistics(self, violation: TrafficViolation):
-        """Update violation statistics."""
+    def _store_violations(self, violations: List[TrafficViolation]):
+        """Store violations (queued when async_storage is enabled)."""
+        if self.config["async_storage"]:
+            self._get_writer().submit(violations)
+            return
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get date and hour
-            dt = datetime.fromtimestamp(violation.timestamp)
-            date_str = dt.strftime("%Y-%m-%d")
-            hour = dt.hour
-            
-            # Update or insert statistics
-            cursor.execute("""
-                INSERT INTO violation_statistics (date, hour, violation_type, severity, count)
-                VALUES (?, ?, ?, ?, 1)
-                ON CONFLICT (date, hour, violation_type, severity) DO UPDATE SET
-                count = count + 1
-            """, (date_str, hour, violation.violation_type.value, violation.severity.value))
-            
-            conn.commit()
-            conn.close()
-            
+            conn = connect(self.db_path)
+            try:
+                write_violations(conn, violations)
+            finally:
+                conn.close()
         except Exception as e:
-            logger.error(f"Failed to update statistics: {e}")
+            logger.error(f"Failed to store violations: {e}")
+    
+    def _store_violation(self, violation: TrafficViolation):
+        """Store violation in database and wait until it is written."""
+        self._store_violations([violation])
+        self.flush()
+    
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued violation is written."""
+        if self.writer is None:
+            return True
+        return self.writer.flush(timeout)
     
     def get_current_statistics(self) -> ViolationStatistics:
         """Get current violation statistics."""
@@ -380,67 +377,45 @@ class ViolationManager:
             day_ago = current_time - 86400
             week_ago = current_time - 604800
             
-            # Current violations (last hour)
+            # Single scan of the last week, grouped by type
             cursor.execute("""
-                SELECT COUNT(*) FROM violations 
-                WHERE timestamp > ? AND false_positive = FALSE
-            """, (hour_ago,))
-            current_violations = cursor.fetchone()[0]
+                SELECT
+                    violation_type,
+                    SUM(CASE WHEN false_positive = FALSE AND timestamp > ? THEN 1 ELSE 0 END),
+                    SUM(CASE WHEN false_positive = FALSE AND timestamp > ? THEN 1 ELSE 0 END),
+                    SUM(CASE WHEN false_positive = FALSE THEN 1 ELSE 0 END),
+                    SUM(CASE WHEN false_positive = FALSE AND timestamp > ? AND severity = 'critical' THEN 1 ELSE 0 END),
+                    SUM(CASE WHEN false_positive = FALSE AND timestamp > ? THEN confidence ELSE 0 END),
+                    SUM(CASE WHEN timestamp > ? THEN 1 ELSE 0 END),
+                    SUM(CASE WHEN false_positive = TRUE AND timestamp > ? THEN 1 ELSE 0 END)
+                FROM violations
+                WHERE timestamp > ?
+                GROUP BY violation_type
+            """, (hour_ago, day_ago, day_ago, day_ago, day_ago, day_ago, week_ago))
+            rows = cursor.fetchall()
             
-            # Hourly rate
-            hourly_rate = current_violations  # Violations in last hour
+            conn.close()
             
-            # Daily total
-            cursor.execute("""
-                SELECT COUNT(*) FROM violations 
-                WHERE timestamp > ? AND false_positive = FALSE
-            """, (day_ago,))
-            daily_total = cursor.fetchone()[0]
+            current_violations = sum(row[1] for row in rows)
+            daily_total = sum(row[2] for row in rows)
+            weekly_total = sum(row[3] for row in rows)
+            highest_severity_count = sum(row[4] for row in rows)
+            confidence_sum = sum(row[5] for row in rows)
+            total = sum(row[6] for row in rows)
+            false_positives = sum(row[7] for row in rows)
             
-            # Weekly total
-            cursor.execute("""
-                SELECT COUNT(*) FROM violations 
-                WHERE timestamp > ? AND false_positive = FALSE
-            """, (week_ago,))
-            weekly_total = cursor.fetchone()[0]
+            # Hourly rate
+            hourly_rate = current_violations  # Violations in last hour
             
-            # Most common violation
-            cursor.execute("""
-                SELECT violation_type, COUNT(*) as count FROM violations 
-                WHERE timestamp > ? AND false_positive = FALSE
-                GROUP BY violation_type ORDER BY count DESC LIMIT 1
-            """, (day_ago,))
-            most_common_result = cursor.fetchone()
-            most_common_violation = most_common_result[0] if most_common_result else "none"
-            
-            # Highest severity count
-            cursor.execute("""
-                SELECT COUNT(*) FROM violations 
-                WHERE severity = 'critical' AND timestamp > ? AND false_positive = FALSE
-            """, (day_ago,))
-            highest_severity_count = cursor.fetchone()[0]
+            # Most common violation (last day)
+            most_common = max(rows, key=lambda row: row[2], default=None)
+            most_common_violation = most_common[0] if most_common and most_common[2] else "none"
             
-            # Average confidence
-            cursor.execute("""
-                SELECT AVG(confidence) FROM violations 
-                WHERE timestamp > ? AND false_positive = FALSE
-            """, (day_ago,))
-            avg_confidence_result = cursor.fetchone()[0]
-            average_confidence = avg_confidence_result if avg_confidence_result else 0.0
+            average_confidence = confidence_sum / daily_total if daily_total else 0.0
             
             # Detection accuracy (1 - false positive rate)
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN false_positive = TRUE THEN 1 ELSE 0 END) as false_positives
-                FROM violations WHERE timestamp > ?
-            """, (day_ago,))
-            accuracy_result = cursor.fetchone()
-            total, false_positives = accuracy_result
             detection_accuracy = 1.0 - (false_positives / max(1, total))
             
-            conn.close()
-            
             return ViolationStatistics(
                 current_violations=current_violations,
                 hourly_rate=hourly_rate,
@@ -575,6 +550,9 @@ class ViolationManager:
     def mark_false_positive(self, violation_id: str):
         """Mark a violation as false positive."""
         try:
+            # The violation may still be queued
+            self.flush()
+            
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
@@ -693,6 +671,7 @@ class ViolationManager:
                 "processing_stats": self.processing_stats
             },
             "violation_detector": self.violation_detector.get_statistics(),
+            "violation_writer": self.writer.get_statistics() if self.writer else None,
             "notification_system": self.notification_system.get_alert_statistics(),
             "current_statistics": asdict(current_stats),
             "configuration": self.config
@@ -0,0 +1,310 @@
+"""
+Batched SQLite writer for violation records.
+
+A single writer thread owns one long-lived WAL-mode connection, takes
+violations from a queue and writes them with executemany in one
+transaction per batch (together with the hourly statistics counters), so
+the frame loop only enqueues and never waits for a commit.
+
+If a StorageService is given, every written batch is also sent to it with
+store_violation_batch (one Postgres transaction per batch).
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from .violation_detector import TrafficViolation
+
+if TYPE_CHECKING:
+    from ..storage.storage_manager import ViolationRecord
+    from ..storage.storage_service import StorageService
+
+logger = logging.getLogger(__name__)
+
+INSERT_VIOLATION_SQL = """
+    INSERT OR REPLACE INTO violations (
+        violation_id, timestamp, violation_type, severity, vehicle_id,
+        description, confidence, location_zone_id, location_zone_name,
+        location_coordinates, speed_limit, measured_speed, license_plate,
+        plate_confidence, detection_confidence, tracking_quality, camera_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPSERT_STATISTICS_SQL = """
+    INSERT INTO violation_statistics (date, hour, violation_type, severity, count)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (date, hour, violation_type, severity) DO UPDATE SET
+    count = count + excluded.count
+"""
+
+
+def connect(db_path: str, timeout: float = 30.0) -> sqlite3.Connection:
+    """Open a connection in WAL mode (readers do not block the writer)."""
+    conn = sqlite3.connect(db_path, timeout=timeout)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL + NORMAL: fsync on checkpoint, not on every commit
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def violation_row(violation: TrafficViolation) -> Tuple:
+    """Row of the violations table for a violation."""
+    return (
+        violation.violation_id,
+        violation.timestamp,
+        violation.violation_type.value,
+        violation.severity.value,
+        violation.vehicle_id,
+        violation.description,
+        violation.confidence,
+        violation.location.zone_id,
+        violation.location.zone_name,
+        json.dumps(violation.location.coordinates),
+        violation.speed_limit,
+        violation.measured_speed,
+        violation.license_plate,
+        violation.plate_confidence,
+        violation.detection_confidence,
+        violation.tracking_quality,
+        violation.camera_id
+    )
+
+
+def violation_record(violation: TrafficViolation) -> "ViolationRecord":
+    """
+    Storage service record for a violation.
+
+    The detector does not know the vehicle class, trajectory or processing
+    time; those fields are left empty. image_path is the evidence store key.
+    """
+    from ..storage.storage_manager import ViolationRecord
+
+    crop = violation.crop_evidence
+    return ViolationRecord(
+        violation_id=violation.violation_id,
+        device_id=violation.camera_id or violation.location.zone_id,
+        violation_type=violation.violation_type.value,
+        timestamp=datetime.fromtimestamp(violation.timestamp),
+        vehicle_bbox=[int(v) for v in crop.bbox] if crop and crop.bbox else [],
+        license_plate=violation.license_plate,
+        vehicle_class="unknown",
+        confidence=violation.confidence,
+        speed_kmh=violation.measured_speed,
+        speed_limit=violation.speed_limit,
+        trajectory=[],
+        image_path=violation.evidence.key if violation.evidence else "",
+        video_segment_path=None,
+        camera_info={
+            "zone_id": violation.location.zone_id,
+            "zone_name": violation.location.zone_name,
+            "coordinates": list(violation.location.coordinates)
+        },
+        processing_time_ms=0.0,
+        model_versions={}
+    )
+
+
+def write_violations(conn: sqlite3.Connection, violations: List[TrafficViolation]):
+    """
+    Write violations and their hourly statistics in one transaction.
+
+    Args:
+        conn: Database connection
+        violations: Violations to write
+    """
+    counts = Counter()
+    for violation in violations:
+        dt = datetime.fromtimestamp(violation.timestamp)
+        counts[(dt.strftime("%Y-%m-%d"), dt.hour,
+                violation.violation_type.value, violation.severity.value)] += 1
+
+    with conn:
+        conn.executemany(INSERT_VIOLATION_SQL, [violation_row(v) for v in violations])
+        conn.executemany(UPSERT_STATISTICS_SQL, [key + (count,) for key, count in counts.items()])
+
+
+class ViolationWriter:
+    """
+    Background writer of violation records.
+
+    Features:
+    - Single long-lived WAL connection owned by the writer thread
+    - executemany batches, one transaction per batch
+    - Non-blocking submit (violations are dropped if the queue is full)
+    - flush() to wait until everything submitted so far is written
+    - Optional copy of each batch to a StorageService (Postgres)
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 64,
+                 flush_interval: float = 0.5, max_queue_size: int = 10000,
+                 storage_service: Optional["StorageService"] = None):
+        """
+        Initialize violation writer.
+
+        Args:
+            db_path: SQLite database path
+            batch_size: Maximum violations per transaction
+            flush_interval: Maximum time a violation waits in the queue (seconds)
+            max_queue_size: Maximum pending violations
+            storage_service: Also store each batch with store_violation_batch
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.storage_service = storage_service
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        # Statistics
+        self.stats = {
+            "submitted": 0,
+            "written": 0,
+            "batches": 0,
+            "dropped": 0,
+            "errors": 0,
+            "stored_in_service": 0,
+            "service_errors": 0,
+            "last_batch_time_ms": 0.0
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the writer thread."""
+        if self.is_running:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="violation-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"Violation writer started for {self.db_path}")
+
+    def stop(self, timeout: float = 5.0):
+        """Write pending violations and stop the writer thread."""
+        if not self.is_running:
+            return
+
+        self._stop_event.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        logger.info("Violation writer stopped")
+
+    def submit(self, violations: Iterable[TrafficViolation]) -> int:
+        """
+        Queue violations for writing without blocking.
+
+        Returns:
+            Number of violations queued
+        """
+        queued = 0
+        for violation in violations:
+            try:
+                self._queue.put_nowait(violation)
+                queued += 1
+            except queue.Full:
+                self.stats["dropped"] += 1
+                logger.warning(f"Violation writer queue full, dropping {violation.violation_id}")
+
+        self.stats["submitted"] += queued
+        return queued
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until every violation submitted before this call is written.
+
+        Returns:
+            False on timeout or if the writer is not running
+        """
+        if not self.is_running:
+            return False
+
+        marker = threading.Event()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.wait(timeout)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get writer statistics."""
+        return {
+            **self.stats,
+            "pending": self._queue.qsize(),
+            "running": self.is_running
+        }
+
+    def _run(self):
+        """Writer loop."""
+        try:
+            conn = connect(self.db_path)
+        except Exception as e:
+            logger.error(f"Violation writer failed to open {self.db_path}: {e}")
+            return
+
+        # Event loop of this thread for the (async) storage service API
+        loop = asyncio.new_event_loop() if self.storage_service is not None else None
+
+        try:
+            while not (self._stop_event.is_set() and self._queue.empty()):
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+
+                batch: List[TrafficViolation] = []
+                markers: List[threading.Event] = []
+                while True:
+                    if isinstance(item, threading.Event):
+                        markers.append(item)
+                        # Everything before the marker must be written first
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+
+                if batch:
+                    self._write_batch(conn, batch, loop)
+                for marker in markers:
+                    marker.set()
+        finally:
+            conn.close()
+            if loop is not None:
+                loop.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[TrafficViolation],
+                     loop: Optional[asyncio.AbstractEventLoop] = None):
+        start_time = time.perf_counter()
+        try:
+            write_violations(conn, batch)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Failed to write {len(batch)} violations: {e}")
+
+        if loop is not None:
+            try:
+                inserted = loop.run_until_complete(
+                    self.storage_service.store_violation_batch([violation_record(v) for v in batch])
+                )
+                self.stats["stored_in_service"] += inserted["violation_records"]
+            except Exception as e:
+                self.stats["service_errors"] += 1
+                logger.error(f"Failed to store {len(batch)} violations in the storage service: {e}")
+        self.stats["last_batch_time_ms"] = (time.perf_counter() - start_time) * 1000
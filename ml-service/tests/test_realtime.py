@@ -18,6 +18,8 @@ from ..analysis_pipeline import (
     RealTimeAnalysisPipeline, PipelineConfig, StreamProcessor,
     FrameData, ProcessingResult, StreamMetrics
 )
+from ..frame_ring import SharedFrameRing
+from ..stage_executor import DropOldestQueue, PipelineStage, StagePipelineExecutor
 from ..stream_service import VideoStreamService, StreamConfig, MultiStreamManager
 from ..monitoring import PerformanceMonitor, ViolationAnalytics, AlertRule, Alert
 from ...detection.yolo_detector import Detection
@@ -136,6 +138,216 @@ class TestRealTimeAnalysisPipeline:
         assert isinstance(status["metrics"], dict)
 
 
+class TestStagePipelineExecutor:
+    """Test the stage-pipelined executor."""
+    
+    def test_drop_oldest_queue(self):
+        """Test that a full queue drops the oldest item."""
+        queue = DropOldestQueue(maxsize=2)
+        
+        assert queue.put(1) is None
+        assert queue.put(2) is None
+        assert queue.put(3) == 1
+        
+        assert len(queue) == 2
+        assert queue.dropped == 1
+        assert queue.high_watermark == 2
+        assert queue.get(timeout=0.1) == 2
+        assert queue.get(timeout=0.1) == 3
+        assert queue.get(timeout=0.01) is None
+    
+    def test_results_in_order(self):
+        """Test that every context goes through all stages in order."""
+        results = []
+        done = threading.Event()
+        
+        def on_result(context):
+            results.append(context)
+            if len(results) == 5:
+                done.set()
+        
+        executor = StagePipelineExecutor(
+            [
+                PipelineStage("double", lambda x: x * 2),
+                PipelineStage("increment", lambda x: x + 1),
+            ],
+            queue_size=10,
+            on_result=on_result
+        )
+        executor.start()
+        try:
+            for i in range(5):
+                assert executor.submit(i)
+            assert done.wait(timeout=5.0)
+        finally:
+            executor.stop()
+        
+        assert results == [1, 3, 5, 7, 9]
+        assert executor.completed == 5
+    
+    def test_stages_overlap(self):
+        """Test that throughput is bound by the slowest stage, not the sum."""
+        stage_time = 0.05
+        frames = 8
+        done = threading.Event()
+        completed = []
+        
+        def slow(x):
+            time.sleep(stage_time)
+            return x
+        
+        def on_result(context):
+            completed.append(context)
+            if len(completed) == frames:
+                done.set()
+        
+        executor = StagePipelineExecutor(
+            [PipelineStage(f"stage_{i}", slow) for i in range(3)],
+            queue_size=frames,
+            on_result=on_result
+        )
+        executor.start()
+        try:
+            start = time.perf_counter()
+            for i in range(frames):
+                executor.submit(i)
+            assert done.wait(timeout=10.0)
+            elapsed = time.perf_counter() - start
+        finally:
+            executor.stop()
+        
+        # Sequential would take frames * 3 * stage_time = 1.2s
+        assert elapsed < frames * 3 * stage_time * 0.75
+    
+    def test_backpressure_drops_oldest(self):
+        """Test that a slow stage drops frames instead of blocking submit."""
+        dropped = []
+        release = threading.Event()
+        
+        executor = StagePipelineExecutor(
+            [PipelineStage("blocked", lambda x: release.wait(5.0) and x)],
+            queue_size=2,
+            on_drop=lambda stage, context: dropped.append((stage, context))
+        )
+        executor.start()
+        try:
+            executor.submit(0)
+            time.sleep(0.1)  # Worker picks frame 0 and blocks
+            
+            start = time.perf_counter()
+            for i in range(1, 6):
+                executor.submit(i)
+            assert time.perf_counter() - start < 0.1
+        finally:
+            release.set()
+            executor.stop()
+        
+        assert [context for _, context in dropped] == [1, 2, 3]
+        assert executor.get_stats()["dropped"] == 3
+    
+    def test_stage_errors_and_timing(self):
+        """Test that a failing frame is reported and the stage keeps running."""
+        errors = []
+        timings = []
+        results = []
+        done = threading.Event()
+        
+        def flaky(x):
+            if x == 1:
+                raise ValueError("bad frame")
+            return x
+        
+        def on_result(context):
+            results.append(context)
+            if context == 2:
+                done.set()
+        
+        executor = StagePipelineExecutor(
+            [PipelineStage("flaky", flaky)],
+            on_result=on_result,
+            on_error=lambda stage, context, error: errors.append((stage, context)),
+            on_stage_timing=lambda stage, ms: timings.append(stage)
+        )
+        executor.start()
+        try:
+            for i in range(3):
+                executor.submit(i)
+            assert done.wait(timeout=5.0)
+        finally:
+            executor.stop()
+        
+        assert results == [0, 2]
+        assert errors == [("flaky", 1)]
+        assert timings == ["flaky"] * 3
+        assert executor.get_stats()["stages"]["flaky"]["errors"] == 1
+
+
+class TestSharedFrameRing:
+    """Test the shared-memory frame ring."""
+    
+    def setup_method(self):
+        """Setup test fixtures."""
+        self.ring = SharedFrameRing.create((48, 64, 3), slots=4)
+    
+    def teardown_method(self):
+        """Free the shared memory."""
+        self.ring.close()
+        self.ring.unlink()
+    
+    def _frame(self, value: int) -> np.ndarray:
+        return np.full((48, 64, 3), value, dtype=np.uint8)
+    
+    def test_write_and_read_latest(self):
+        """Test writing frames and reading the newest one."""
+        assert self.ring.read_latest() is None
+        
+        self.ring.write(self._frame(1), timestamp=10.0)
+        seq = self.ring.write(self._frame(2), timestamp=11.0)
+        
+        latest = self.ring.read_latest()
+        assert latest.seq == seq == 2
+        assert latest.timestamp == 11.0
+        assert latest.frame.shape == (48, 64, 3)
+        assert latest.frame[0, 0, 0] == 2
+    
+    def test_wraparound_invalidates_old_frames(self):
+        """Test that overwritten slots are detected through their sequence number."""
+        for value in range(1, 7):
+            self.ring.write(self._frame(value))
+        
+        assert self.ring.read(1) is None
+        assert not self.ring.is_current(2)
+        assert [f.seq for f in self.ring.read_since(0)] == [3, 4, 5, 6]
+        assert [f.seq for f in self.ring.read_since(4)] == [5, 6]
+        assert [f.seq for f in self.ring.read_since(0, count=1)] == [6]
+    
+    def test_zero_copy_views(self):
+        """Test that a reader attached by name sees the writer frames without copies."""
+        reader = SharedFrameRing.attach(self.ring.name)
+        try:
+            self.ring.write(self._frame(7))
+            
+            view = reader.read_latest()
+            assert view.frame[10, 10, 1] == 7
+            assert not view.frame.flags.owndata
+            
+            copy = reader.read_latest(copy=True)
+            assert copy.frame.flags.owndata
+            del view, copy
+        finally:
+            reader.close()
+    
+    def test_rejects_wrong_shape(self):
+        """Test that frames must match the ring geometry."""
+        with pytest.raises(ValueError):
+            self.ring.write(np.zeros((10, 10, 3), dtype=np.uint8))
+    
+    def test_memory_is_fixed(self):
+        """Test that the block size only depends on slots and frame shape."""
+        assert self.ring.nbytes >= SharedFrameRing.required_bytes((48, 64, 3), 4)
+        assert SharedFrameRing.required_bytes((1080, 1920, 3), 8) < 8 * 6.3e6
+
+
 class TestVideoStreamService:
     """Test video stream service."""
     
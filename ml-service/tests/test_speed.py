@@ -116,6 +116,38 @@ class TestCameraCalibrator:
         assert len(self.calibrator.calibration_zones) == 1
         assert "test_zone" in self.calibrator.calibration_zones
     
+    def test_pixel_to_real_many(self):
+        """Test batch conversion matches single-point conversion."""
+        self.calibrator.create_default_highway_calibration(1920, 1080)
+        
+        pixels = [(960, 900), (700, 600), (1100, 400)]
+        real = self.calibrator.pixel_to_real_many(pixels)
+        
+        assert real.shape == (3, 2)
+        for (px, py), (rx, ry) in zip(pixels, real):
+            expected = self.calibrator.pixel_to_real(px, py)
+            assert abs(rx - expected[0]) < 1e-3
+            assert abs(ry - expected[1]) < 1e-3
+    
+    def test_get_zones_for_points(self):
+        """Test batch zone lookup through the zone raster."""
+        for zone_id, x in (("left", 100), ("right", 300)):
+            self.calibrator.add_calibration_zone(CalibrationZone(
+                zone_id=zone_id,
+                name=zone_id,
+                pixel_points=[(x, 100), (x + 100, 100), (x + 100, 200), (x, 200)],
+                real_world_points=[(0, 0), (10, 0), (10, 10), (0, 10)],
+                speed_limit=60.0,
+                measurement_distance=20.0,
+                entry_line=((x, 150), (x + 100, 150)),
+                exit_line=((x, 120), (x + 100, 120))
+            ))
+        
+        zones = self.calibrator.get_zones_for_points([(150, 150), (350, 150), (250, 150), (5000, 5000)])
+        
+        assert [zone.zone_id if zone else None for zone in zones] == ["left", "right", None, None]
+        assert self.calibrator.get_zone_for_point(350, 150).zone_id == "right"
+    
     def test_point_in_polygon(self):
         """Test point in polygon detection."""
         polygon = [(100, 100), (200, 100), (200, 200), (100, 200)]
@@ -204,7 +236,7 @@ class TestSpeedCalculator:
     
     def create_test_trajectory(self) -> Trajectory:
         """Create a test trajectory."""
-        trajectory = Trajectory(vehicle_id=1, max_history=100)
+        trajectory = Trajectory(track_id=1, max_points=100)
         
         # Add positions simulating vehicle movement
         base_time = time.time()
@@ -217,7 +249,7 @@ class TestSpeedCalculator:
         ]
         
         for x, y, t in positions:
-            trajectory.add_position((x, y), t)
+            trajectory.add_point(x, y, t)
         
         return trajectory
     
@@ -241,6 +273,18 @@ class TestSpeedCalculator:
         assert measurement.time_elapsed > 0
         assert 0.0 <= measurement.confidence <= 1.0
     
+    def test_batch_speed_calculation(self):
+        """Test that the batch API gives the same result as one trajectory at a time."""
+        self.calibrator.create_default_highway_calibration(1920, 1080)
+        trajectory = self.create_test_trajectory()
+        
+        measurements = self.calculator.calculate_speeds([trajectory, trajectory])
+        single = self.calculator.calculate_speed_from_trajectory(trajectory)
+        
+        assert len(measurements) == 2
+        assert measurements[0].speed_kmh == pytest.approx(single.speed_kmh)
+        assert measurements[1].speed_kmh == pytest.approx(single.speed_kmh)
+    
     def test_instantaneous_speed_calculation(self):
         """Test instantaneous speed calculation."""
         trajectory = self.create_test_trajectory()
@@ -12,6 +12,8 @@ import os
 import time
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock, AsyncMock
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from pathlib import Path
 import json
 import gzip
@@ -21,12 +23,15 @@ import numpy as np
 import cv2
 import redis
 import psycopg2
+from botocore.exceptions import ClientError
 
 from ..storage_manager import (
     StorageConfig, StorageType, DataType, StorageMetadata, ViolationRecord,
-    LocalStorageManager, CloudStorageManager, DatabaseManager, CacheManager
+    LocalStorageManager, CloudStorageManager, DatabaseManager, CacheManager,
+    violation_rollup_rows
 )
 from ..storage_service import StorageService, StorageStrategy, ArchiveManager
+from ..tiering import TieringEngine
 from ..data_utils import (
     DataValidator, DataLifecycleManager, DataMigrationManager,
     DataAnalyzer, DataExporter
@@ -211,25 +216,103 @@ class TestLocalStorageManager:
         assert usage["file_count"] >= 3
     
     def test_compression(self, temp_config):
-        """Test file compression."""
+        """Test file compression (only JSON metadata is gzipped)."""
         temp_config.compression_enabled = True
         storage_manager = LocalStorageManager(temp_config)
         
         test_image = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
-        file_id = "test_compression_001"
+        image_metadata = storage_manager.store_image(test_image, "test_compression_001")
         
-        storage_metadata = storage_manager.store_image(test_image, file_id)
+        # JPEG is stored as is
+        assert image_metadata.compressed is False
+        assert image_metadata.file_path.endswith('.jpg')
+        
+        data = {"violation_id": "V001", "detections": [{"confidence": 0.95}] * 50}
+        storage_metadata = storage_manager.store_metadata(data, "test_compression_002")
         
         assert storage_metadata.compressed is True
-        assert storage_metadata.file_path.endswith('.gz')
+        assert storage_metadata.file_path.endswith('.json.gz')
         
         # Verify file exists and is compressed
         file_path = Path(storage_metadata.file_path)
         assert file_path.exists()
+        assert storage_metadata.file_size == file_path.stat().st_size
         
-        # Verify can retrieve and decompress
-        retrieved_data = storage_manager.retrieve_file(file_id, storage_metadata)
-        assert len(retrieved_data) > 0
+        # Verify can retrieve and decompress (checksum is over the uncompressed data)
+        retrieved_data = storage_manager.retrieve_file("test_compression_002", storage_metadata)
+        assert json.loads(retrieved_data) == data
+        assert hashlib.sha256(retrieved_data).hexdigest() == storage_metadata.checksum
+    
+    def test_write_is_atomic(self, storage_manager, test_image):
+        """Test writes leave no temporary files and report the on-disk size."""
+        storage_metadata = storage_manager.store_image(test_image, "test_atomic_001")
+        file_path = Path(storage_metadata.file_path)
+        
+        assert storage_metadata.file_size == file_path.stat().st_size
+        assert storage_metadata.checksum == hashlib.sha256(file_path.read_bytes()).hexdigest()
+        assert [p.name for p in file_path.parent.iterdir()] == [file_path.name]
+    
+    @pytest.mark.asyncio
+    async def test_async_store_uses_executor(self, storage_manager):
+        """Test async writes run on the storage thread pool."""
+        video_data = b"fake_video_data" * 1000
+        
+        with patch.object(storage_manager, "executor", wraps=storage_manager.executor) as executor:
+            storage_metadata = await storage_manager.store_video_segment_async(video_data, "test_async_001", 5.0)
+            assert executor.submit.called
+        
+        assert Path(storage_metadata.file_path).read_bytes() == video_data
+
+    
+    def test_usage_index_tracks_store_and_delete(self, storage_manager, test_image):
+        """Test usage comes from the index, updated on store, overwrite and delete."""
+        first = storage_manager.store_image(test_image, "ledger_001")
+        storage_manager.store_image(test_image, "ledger_002")
+        storage_manager.store_image(test_image, "ledger_002")  # overwrite is not a new file
+        
+        usage = storage_manager.get_storage_usage()
+        sizes = sum(p.stat().st_size for p in Path(first.file_path).parent.iterdir())
+        assert usage["file_count"] == 2
+        assert usage["by_type"]["image"] == sizes
+        
+        storage_manager.delete_file(first)
+        usage = storage_manager.get_storage_usage()
+        assert usage["file_count"] == 1
+        assert usage["by_type"]["image"] == sizes - first.file_size
+        
+        with patch.object(Path, "rglob", side_effect=AssertionError("tree walked")):
+            storage_manager.get_storage_usage()
+    
+    def test_usage_index_rebuilt_for_existing_tree(self, storage_manager, temp_config, test_image):
+        """Test a missing index is rebuilt from the files already on disk."""
+        storage_manager.store_image(test_image, "ledger_rebuild_001")
+        storage_manager.store_video_segment(b"fake_video_data" * 100, "ledger_rebuild_002", 1.0)
+        expected = storage_manager.get_storage_usage()
+        storage_manager.close()
+        
+        index_path = Path(temp_config.local_base_path) / LocalStorageManager.USAGE_INDEX_FILE
+        for path in index_path.parent.glob(index_path.name + "*"):
+            path.unlink()
+        
+        reopened = LocalStorageManager(temp_config)
+        assert reopened.get_storage_usage() == expected
+    
+    def test_cleanup_removes_expired_day_directories(self, storage_manager, temp_config, test_image):
+        """Test retention deletes whole expired day directories found in the index."""
+        today = storage_manager.store_image(test_image, "retention_today")
+        
+        old_day = (datetime.now() - timedelta(days=temp_config.image_retention_days + 2)).strftime("%Y/%m/%d")
+        old_path = storage_manager.base_path / "images" / old_day / "retention_old.jpg"
+        with patch.object(storage_manager, "_get_file_path", return_value=old_path):
+            storage_manager.store_image(test_image, "retention_old")
+        
+        with patch.object(Path, "stat", side_effect=AssertionError("file stat-ed")):
+            deleted = storage_manager.cleanup_expired_files()
+        
+        assert deleted["images"] == 1
+        assert not old_path.parent.exists()
+        assert Path(today.file_path).exists()
+        assert storage_manager.get_storage_usage()["file_count"] == 1
 
 
 class TestCloudStorageManager:
@@ -334,6 +417,261 @@ class TestCloudStorageManager:
         assert url == expected_url
         mock_s3_client.generate_presigned_url.assert_called_once()
 
+    
+    def test_file_digests_multipart_etag(self, tmp_path):
+        """Test the expected ETag follows the S3 single/multipart format."""
+        data = os.urandom(10)
+        file_path = tmp_path / "part.bin"
+        file_path.write_bytes(data)
+        
+        checksum, etag, size = CloudStorageManager.file_digests(file_path, part_size=16)
+        assert checksum == hashlib.sha256(data).hexdigest()
+        assert etag == hashlib.md5(data).hexdigest()
+        assert size == 10
+        
+        _, etag, _ = CloudStorageManager.file_digests(file_path, part_size=4)
+        parts = b"".join(hashlib.md5(data[i:i + 4]).digest() for i in range(0, 10, 4))
+        assert etag == f"{hashlib.md5(parts).hexdigest()}-3"
+    
+    def test_upload_local_file_verifies_upload(self, cloud_config, mock_s3_client, tmp_path):
+        """Test local files are streamed, verified and removed on mismatch."""
+        manager = CloudStorageManager(cloud_config)
+        data = b"fake_video_data" * 1000
+        file_path = tmp_path / "segment.mp4"
+        file_path.write_bytes(data)
+        
+        local_metadata = StorageMetadata(
+            id="test_tier_001",
+            storage_type=StorageType.LOCAL,
+            data_type=DataType.VIDEO,
+            file_path=str(file_path),
+            file_size=len(data),
+            checksum=hashlib.sha256(data).hexdigest(),
+            created_at=datetime.now()
+        )
+        
+        mock_s3_client.head_object.return_value = {
+            'ContentLength': len(data), 'ETag': f'"{hashlib.md5(data).hexdigest()}"'
+        }
+        cloud_metadata = manager.upload_local_file(local_metadata, "video/2025/11/01/segment.mp4")
+        
+        assert cloud_metadata.storage_type == StorageType.S3
+        assert cloud_metadata.file_path == "video/2025/11/01/segment.mp4"
+        assert cloud_metadata.checksum == local_metadata.checksum
+        args, kwargs = mock_s3_client.upload_file.call_args
+        assert args[0] == str(file_path)
+        assert kwargs['ExtraArgs']['ContentType'] == "video/mp4"
+        mock_s3_client.delete_object.assert_not_called()
+        
+        mock_s3_client.head_object.return_value = {'ContentLength': len(data), 'ETag': '"0000"'}
+        with pytest.raises(ValueError):
+            manager.upload_local_file(local_metadata, "video/2025/11/01/segment.mp4")
+        mock_s3_client.delete_object.assert_called_once()
+    
+    def test_upload_local_file_accepts_legacy_compressed_checksum(self, cloud_config, mock_s3_client, tmp_path):
+        """Test pre single-pass .gz rows (checksum of the gzip bytes) are tiered with the content checksum."""
+        manager = CloudStorageManager(cloud_config)
+        data = b"fake_jpeg_data" * 1000
+        compressed = gzip.compress(data)
+        file_path = tmp_path / "evidence.jpg.gz"
+        file_path.write_bytes(compressed)
+        
+        legacy_metadata = StorageMetadata(
+            id="test_tier_legacy",
+            storage_type=StorageType.LOCAL,
+            data_type=DataType.IMAGE,
+            file_path=str(file_path),
+            file_size=len(compressed),
+            checksum=hashlib.sha256(compressed).hexdigest(),
+            created_at=datetime.now(),
+            compressed=True
+        )
+        
+        mock_s3_client.head_object.return_value = {
+            'ContentLength': len(compressed), 'ETag': f'"{hashlib.md5(compressed).hexdigest()}"'
+        }
+        cloud_metadata = manager.upload_local_file(legacy_metadata, "image/2025/11/01/evidence.jpg.gz")
+        
+        assert cloud_metadata.checksum == hashlib.sha256(data).hexdigest()
+        assert cloud_metadata.compressed
+        _, kwargs = mock_s3_client.upload_file.call_args
+        assert kwargs['ExtraArgs']['Metadata']['sha256'] == hashlib.sha256(data).hexdigest()
+        
+        corrupt_metadata = replace(legacy_metadata, checksum=hashlib.sha256(b"other").hexdigest())
+        with pytest.raises(ValueError):
+            manager.upload_local_file(corrupt_metadata, "image/2025/11/01/evidence.jpg.gz")
+
+
+class TestTieringEngine:
+    """Test oldest-first migration from local to cloud storage."""
+    
+    @pytest.fixture
+    def temp_config(self):
+        """Configuration where four 1000-byte files fill local storage."""
+        temp_dir = tempfile.mkdtemp()
+        config = StorageConfig(
+            local_base_path=temp_dir,
+            max_local_size_gb=4000 / 1024**3,
+            tiering_high_watermark=85.0,
+            tiering_low_watermark=70.0,
+            tiering_min_age_hours=0
+        )
+        yield config
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    @pytest.fixture
+    def local_manager(self, temp_config):
+        return LocalStorageManager(temp_config)
+    
+    @pytest.fixture
+    def cloud_manager(self):
+        """Cloud manager that accepts every upload."""
+        manager = Mock()
+        manager.executor = ThreadPoolExecutor(max_workers=2)
+        manager.upload_local_file.side_effect = lambda metadata, key: replace(
+            metadata, storage_type=StorageType.S3, file_path=key
+        )
+        yield manager
+        manager.executor.shutdown()
+    
+    @staticmethod
+    def _store_segments(local_manager, count):
+        return [
+            local_manager.store_video_segment(os.urandom(1000), f"tier_segment_{i}", 1.0)
+            for i in range(count)
+        ]
+    
+    @staticmethod
+    def _db_manager(stored):
+        """Metadata index returning the stored files still local, in order."""
+        db_manager = Mock()
+        migrated = set()
+        
+        def candidates(created_before, limit, exclude_ids):
+            return [m for m in stored if m.id not in migrated and m.id not in exclude_ids][:limit]
+        
+        def update(file_id, storage_type, file_path, expected_path=None, checksum=None):
+            migrated.add(file_id)
+            return True
+        
+        db_manager.get_migration_candidates.side_effect = candidates
+        db_manager.update_storage_location.side_effect = update
+        return db_manager
+    
+    @pytest.mark.asyncio
+    async def test_migrates_oldest_down_to_low_watermark(self, temp_config, local_manager, cloud_manager):
+        """Test usage above the high watermark is brought down to the low one."""
+        stored = self._store_segments(local_manager, 4)
+        db_manager = self._db_manager(stored)
+        engine = TieringEngine(temp_config, local_manager, cloud_manager, db_manager)
+        
+        results = await engine.run()
+        
+        assert results["triggered"] is True
+        assert results["files_migrated"] == 2
+        assert results["usage_after"] <= temp_config.tiering_low_watermark
+        assert not Path(stored[0].file_path).exists()
+        assert not Path(stored[1].file_path).exists()
+        assert Path(stored[2].file_path).exists()
+        assert local_manager.get_storage_usage()["file_count"] == 2
+        
+        file_id, storage_type, key = db_manager.update_storage_location.call_args_list[0][0]
+        assert file_id == stored[0].id
+        assert storage_type == StorageType.S3
+        assert key.startswith("video/") and key.endswith("tier_segment_0.mp4")
+        assert db_manager.update_storage_location.call_args_list[0][1]["checksum"] == stored[0].checksum
+    
+    @pytest.mark.asyncio
+    async def test_below_high_watermark_does_nothing(self, temp_config, local_manager, cloud_manager):
+        """Test no migration below the high watermark unless forced."""
+        stored = self._store_segments(local_manager, 3)
+        db_manager = self._db_manager(stored)
+        engine = TieringEngine(temp_config, local_manager, cloud_manager, db_manager)
+        
+        results = await engine.run()
+        assert results["triggered"] is False
+        cloud_manager.upload_local_file.assert_not_called()
+        
+        results = await engine.run(force=True, max_files=1)
+        assert results["files_migrated"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_failed_upload_keeps_local_file(self, temp_config, local_manager, cloud_manager):
+        """Test a failed upload is skipped and the next candidate is migrated."""
+        stored = self._store_segments(local_manager, 4)
+        db_manager = self._db_manager(stored)
+        upload = cloud_manager.upload_local_file.side_effect
+        
+        def flaky_upload(metadata, key):
+            if metadata.id == stored[0].id:
+                raise ValueError("Upload verification failed")
+            return upload(metadata, key)
+        
+        cloud_manager.upload_local_file.side_effect = flaky_upload
+        engine = TieringEngine(temp_config, local_manager, cloud_manager, db_manager)
+        
+        results = await engine.run()
+        
+        assert results["files_failed"] == 1
+        assert results["files_migrated"] == 2
+        assert Path(stored[0].file_path).exists()
+        assert not Path(stored[1].file_path).exists()
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(not os.getenv("MINIO_ENDPOINT"), reason="MINIO_ENDPOINT not set")
+class TestTieringMinio:
+    """
+    Tiering against a real MinIO (docker-compose minio service).
+    
+    Run with: MINIO_ENDPOINT=http://localhost:9000 MINIO_ACCESS_KEY=... MINIO_SECRET_KEY=...
+    """
+    
+    @pytest.mark.asyncio
+    async def test_migrate_to_minio(self, tmp_path):
+        """Test a multipart video and an image are uploaded, verified and freed locally."""
+        config = StorageConfig(
+            local_base_path=str(tmp_path),
+            s3_endpoint=os.getenv("MINIO_ENDPOINT"),
+            s3_access_key=os.getenv("MINIO_ACCESS_KEY", "admin"),
+            s3_secret_key=os.getenv("MINIO_SECRET_KEY", "SecurePassword123!"),
+            s3_bucket="traffic-evidence-test",
+            chunk_size_mb=5,
+            tiering_min_age_hours=0
+        )
+        local_manager = LocalStorageManager(config)
+        cloud_manager = CloudStorageManager(config)
+        try:
+            cloud_manager.client.create_bucket(Bucket=config.s3_bucket)
+        except ClientError:
+            pass
+        
+        video_data = os.urandom(12 * 1024 * 1024)  # 3 parts of 5 MiB
+        stored = [
+            local_manager.store_video_segment(video_data, "minio_segment", 10.0),
+            local_manager.store_image(np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8), "minio_image")
+        ]
+        db_manager = TestTieringEngine._db_manager(stored)
+        engine = TieringEngine(config, local_manager, cloud_manager, db_manager)
+        
+        results = await engine.run(force=True)
+        
+        assert results["files_migrated"] == 2
+        assert local_manager.get_storage_usage()["file_count"] == 0
+        
+        key = db_manager.update_storage_location.call_args_list[0][0][2]
+        head = cloud_manager.client.head_object(Bucket=config.s3_bucket, Key=key)
+        assert head["ETag"].strip('"').endswith("-3")
+        
+        cloud_metadata = replace(stored[0], storage_type=StorageType.S3, file_path=key)
+        assert cloud_manager.download_file(cloud_metadata) == video_data
+        
+        for metadata in stored:
+            cloud_manager.client.delete_object(
+                Bucket=config.s3_bucket,
+                Key=engine._object_key(metadata)
+            )
+
 
 class TestCacheManager:
     """Test cache manager."""
@@ -421,16 +759,19 @@ class TestDatabaseManager:
     def mock_db_connection(self):
         """Mock database connection."""
         with patch('psycopg2.connect') as mock_connect:
-            mock_conn = Mock()
+            mock_conn = MagicMock()
+            mock_conn.closed = 0
+            mock_conn.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
             mock_cursor = Mock()
             mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
-            mock_connect.return_value.__enter__.return_value = mock_conn
+            mock_connect.return_value = mock_conn
             yield mock_conn, mock_cursor
     
     @pytest.fixture
     def db_manager(self, mock_db_connection):
         """Create database manager with mocked connection."""
-        config = StorageConfig()
+        config = StorageConfig(db_batch_page_size=2, db_pool_max_connections=2,
+                               db_pool_timeout_seconds=0.1)
         with patch.object(DatabaseManager, '_initialize_schema'):
             return DatabaseManager(config)
     
@@ -459,13 +800,17 @@ class TestDatabaseManager:
     def test_store_violation_record(self, db_manager, mock_db_connection, test_violation_record):
         """Test storing violation record."""
         mock_conn, mock_cursor = mock_db_connection
+        mock_cursor.connection.encoding = 'UTF8'
+        mock_cursor.mogrify.side_effect = lambda template, args: b"(row)"
         
         mock_cursor.fetchone.return_value = {'id': 'record_uuid_123'}
         
         record_id = db_manager.store_violation_record(test_violation_record)
         
         assert record_id == 'record_uuid_123'
-        mock_cursor.execute.assert_called_once()
+        # Record insert + hourly rollup upsert in the same transaction
+        assert mock_cursor.execute.call_count == 2
+        assert b"violation_hourly_rollups" in mock_cursor.execute.call_args_list[1][0][0]
         mock_conn.commit.assert_called_once()
     
     def test_get_violation_records(self, db_manager, mock_db_connection):
@@ -517,6 +862,116 @@ class TestDatabaseManager:
         mock_cursor.execute.assert_called_once()
         mock_conn.commit.assert_called_once()
 
+    
+    def test_connections_are_pooled(self, db_manager, mock_db_connection):
+        """Test statements reuse pooled connections instead of reconnecting."""
+        mock_conn, mock_cursor = mock_db_connection
+        mock_cursor.fetchone.return_value = None
+        
+        with patch('psycopg2.connect') as mock_connect:
+            for _ in range(5):
+                db_manager.get_storage_metadata("file_001")
+            mock_connect.assert_not_called()
+        
+        assert mock_conn.commit.call_count == 5
+    
+    def test_failed_statement_rolls_back(self, db_manager, mock_db_connection):
+        """Test errors roll back and return the connection to the pool."""
+        mock_conn, mock_cursor = mock_db_connection
+        mock_cursor.execute.side_effect = psycopg2.OperationalError("boom")
+        
+        with pytest.raises(psycopg2.OperationalError):
+            db_manager.get_storage_metadata("file_001")
+        
+        mock_conn.rollback.assert_called_once()
+        mock_conn.commit.assert_not_called()
+        with db_manager._get_connection() as conn:
+            assert conn is mock_conn
+    
+    def test_pool_is_bounded(self, db_manager):
+        """Test callers wait for a free connection and time out."""
+        with patch('psycopg2.connect', side_effect=lambda **kwargs: MagicMock(closed=0)), \
+             db_manager._get_connection(), db_manager._get_connection():
+            with pytest.raises(psycopg2.pool.PoolError):
+                with db_manager._get_connection():
+                    pass
+    
+    def test_store_batch(self, db_manager, mock_db_connection, test_violation_record):
+        """Test records and metadata are written with execute_values in one transaction."""
+        mock_conn, mock_cursor = mock_db_connection
+        mock_cursor.connection.encoding = 'UTF8'
+        mock_cursor.mogrify.side_effect = lambda template, args: b"(row)"
+        mock_cursor.fetchall.side_effect = [[{'violation_id': 'V0'}, {'violation_id': 'V1'}],
+                                            [{'violation_id': 'V2'}],
+                                            [{'file_id': 'F0'}]]
+        
+        records = [replace(test_violation_record, violation_id=f"V{i}") for i in range(3)]
+        metadata = StorageMetadata(
+            id="F0",
+            storage_type=StorageType.LOCAL,
+            data_type=DataType.IMAGE,
+            file_path="/path/to/file.jpg",
+            file_size=1024,
+            checksum="abc123",
+            created_at=datetime.now()
+        )
+        
+        inserted = db_manager.store_batch(records, [metadata])
+        
+        assert inserted == {"violation_records": 3, "storage_metadata": 1}
+        # 3 records in pages of 2 + 1 rollup row + 1 metadata row
+        assert mock_cursor.execute.call_count == 4
+        assert b"INSERT INTO violation_records" in mock_cursor.execute.call_args_list[0][0][0]
+        assert b"violation_hourly_rollups" in mock_cursor.execute.call_args_list[2][0][0]
+        mock_conn.commit.assert_called_once()
+    
+    def test_schema_backfills_new_rollup_table(self, mock_db_connection):
+        """Test existing records are compacted when the rollup table is created."""
+        mock_conn, mock_cursor = mock_db_connection
+        first_at = datetime(2024, 1, 1, 8, 30)
+        last_at = datetime(2024, 3, 1, 17, 5)
+        mock_cursor.fetchone.side_effect = [{'missing': True}, {'first_at': first_at, 'last_at': last_at}]
+        
+        with patch.object(DatabaseManager, 'compact_violation_rollups') as mock_compact:
+            DatabaseManager(StorageConfig())
+        
+        mock_compact.assert_called_once_with(first_at, last_at)
+    
+    def test_schema_skips_backfill_for_existing_rollup_table(self, mock_db_connection):
+        """Test the backfill only runs the first time."""
+        mock_conn, mock_cursor = mock_db_connection
+        mock_cursor.fetchone.return_value = {'missing': False}
+        
+        with patch.object(DatabaseManager, 'compact_violation_rollups') as mock_compact:
+            DatabaseManager(StorageConfig())
+        
+        mock_compact.assert_not_called()
+        # Table check + schema script only
+        assert mock_cursor.execute.call_count == 2
+    
+    def test_violation_rollup_rows(self, test_violation_record):
+        """Test records are aggregated per device, hour, type and class."""
+        hour = datetime(2024, 1, 15, 8)
+        base = replace(test_violation_record, timestamp=hour + timedelta(minutes=5))
+        records = [
+            base,
+            replace(base, speed_kmh=95.0, confidence=0.85, timestamp=hour + timedelta(minutes=50)),
+            replace(base, violation_type="red_light", speed_kmh=None),
+            replace(base, timestamp=hour + timedelta(hours=1))
+        ]
+        
+        rows = {row[:4]: row[4:] for row in violation_rollup_rows(records)}
+        
+        assert len(rows) == 3
+        count, speed_count, speed_sum, speed_max, confidence_sum, processing_sum, last_at = \
+            rows[("cam_001", hour, "speed", "car")]
+        assert (count, speed_count, speed_sum, speed_max) == (2, 2, 180.0, 95.0)
+        assert confidence_sum == pytest.approx(1.8)
+        assert processing_sum == 300.0
+        assert last_at == hour + timedelta(minutes=50)
+        assert rows[("cam_001", hour, "red_light", "car")][:4] == (1, 0, 0.0, None)
+        assert rows[("cam_001", hour + timedelta(hours=1), "speed", "car")][0] == 1
+
 
 class TestStorageService:
     """Test unified storage service."""
@@ -572,13 +1027,13 @@ class TestStorageService:
             created_at=datetime.now()
         )
         
-        storage_service.local_manager.store_image.return_value = expected_metadata
+        storage_service.local_manager.store_image_async = AsyncMock(return_value=expected_metadata)
         storage_service.cache_manager.get_processed_frame.return_value = None
         
         result = await storage_service.store_image(test_image, file_id)
         
         assert result.id == file_id
-        storage_service.local_manager.store_image.assert_called_once()
+        storage_service.local_manager.store_image_async.assert_awaited_once()
         storage_service.db_manager.store_storage_metadata.assert_called_once()
     
     @pytest.mark.asyncio
@@ -131,6 +131,78 @@ class TestYOLOv8VehicleDetector:
         # Should remove one overlapping detection
         assert len(filtered) <= len(detections)
     
+    def test_postprocess_applies_letterbox_padding(self, detector):
+        """Test box conversion undoes the letterbox padding and scale"""
+        # 1280x720 -> scale 0.5, image 640x360 with 140px vertical padding
+        mock_output = np.zeros((8400, 84), dtype=np.float32)
+        mock_output[0, :4] = [320, 320, 100, 100]
+        mock_output[0, 4 + 2] = 0.9  # car
+        
+        detections = detector.postprocess([mock_output], 0.5, (720, 1280))
+        
+        assert len(detections) == 1
+        assert detections[0].class_name == "car"
+        assert detections[0].bbox == (540, 260, 740, 460)
+    
+    def test_postprocess_batch(self, detector):
+        """Test vectorized postprocessing over several frames"""
+        predictions = np.zeros((2, 84, 8400), dtype=np.float32)
+        predictions[0, :4, 0] = [320, 320, 100, 100]
+        predictions[0, 4 + 2, 0] = 0.9  # car
+        predictions[1, :4, 5] = [200, 300, 80, 60]
+        predictions[1, 4 + 7, 5] = 0.8  # truck
+        predictions[1, 4 + 0, 6] = 0.95  # person, not a vehicle class
+        
+        results = detector.postprocess_batch(predictions, [0.5, 0.5], [(720, 1280), (720, 1280)])
+        
+        assert len(results) == 2
+        assert [d.class_name for d in results[0]] == ["car"]
+        assert [d.class_name for d in results[1]] == ["truck"]
+    
+    def test_nms_is_per_class(self, detector):
+        """Test overlapping boxes of different classes survive NMS"""
+        detections = [
+            Detection(
+                class_id=2,
+                class_name="car",
+                confidence=0.9,
+                bbox=(100, 100, 200, 200),
+                center=(150, 150),
+                area=10000
+            ),
+            Detection(
+                class_id=7,
+                class_name="truck",
+                confidence=0.8,
+                bbox=(105, 105, 205, 205),
+                center=(155, 155),
+                area=10000
+            )
+        ]
+        
+        filtered = detector._apply_nms(detections)
+        
+        assert len(filtered) == 2
+    
+    def test_detect_batch(self, detector, sample_frame, mock_onnx_session):
+        """Test batched detection returns one result list per frame"""
+        mock_onnx_session.run.return_value = [np.zeros((2, 84, 8400), dtype=np.float32)]
+        
+        results, metrics = detector.detect_batch([sample_frame, sample_frame])
+        
+        assert len(results) == 2
+        assert isinstance(metrics, PerformanceMetrics)
+        assert metrics.detections_count == 0
+    
+    def test_benchmark_postprocess(self, detector):
+        """Test postprocess timing is reported separately from inference"""
+        results = detector.benchmark_postprocess(num_iterations=3)
+        
+        assert results["iterations"] == 3
+        assert "inference_time_ms" in results
+        assert "postprocessing_time_ms" in results
+        assert "per_frame_mean" in results["postprocessing_time_ms"]
+    
     def test_visualization(self, detector, sample_frame):
         """Test detection visualization"""
         # Create mock detection
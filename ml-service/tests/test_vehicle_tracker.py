@@ -156,6 +156,25 @@ class TestTrajectory:
         assert x_max == 200
         assert y_min == 50
         assert y_max == 300
+    
+    def test_bounded_points_keep_running_totals(self):
+        """Test that old points are overwritten but totals cover the whole track."""
+        trajectory = Trajectory(track_id=1, max_points=10)
+        base_time = time.time()
+        
+        for i in range(25):
+            trajectory.add_point(i * 10, 0, base_time + i, i)
+        
+        assert len(trajectory.points) == 10
+        assert trajectory.points[0].x == 150
+        assert trajectory.points[-1].frame_number == 24
+        assert trajectory.positions.shape == (10, 2)
+        
+        assert trajectory.total_distance == 240.0
+        assert trajectory.get_duration() == 24
+        assert trajectory.avg_speed == 10.0
+        assert trajectory.get_bounding_box() == (0, 0, 240, 0)
+        assert trajectory.get_smoothed_trajectory(window_size=3)[:2] == [(155, 0), (160, 0)]
 
 class TestTrajectoryManager:
     """Test TrajectoryManager class."""
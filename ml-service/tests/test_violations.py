@@ -10,7 +10,7 @@ import cv2
 import time
 import tempfile
 import sqlite3
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, AsyncMock
 from typing import List, Dict
 
 from ..violation_detector import (
@@ -22,6 +22,9 @@ from ..notification_system import (
     NotificationSystem, Alert, AlertPriority, NotificationChannel, NotificationConfig
 )
 from ..violation_manager import ViolationManager, ViolationReport, ViolationStatistics
+from ..evidence_store import EvidenceStore, EvidenceHandle
+from ..notification_dispatcher import NotificationDispatcher, ChannelPolicy, TokenBucket
+from ...storage.storage_manager import LocalStorageManager, StorageConfig
 from ...speed.speed_analyzer import SpeedViolation
 from ...tracking.vehicle_tracker import TrackedVehicle
 
@@ -215,6 +218,190 @@ class TestViolationDetector:
         assert stats["violations_by_severity"]["moderate"] >= 1
 
 
+class TestEvidenceStore:
+    """Test evidence snapshot store."""
+    
+    def _frame(self, seed: int = 0) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        frame[60:180, 80:240] = rng.integers(0, 255, (120, 160, 3), dtype=np.uint8)
+        return frame
+    
+    def test_violations_share_frame_snapshot(self):
+        """Test that violations of the same frame share one encoded snapshot."""
+        store = EvidenceStore()
+        detector = ViolationDetector(evidence_store=store)
+        frame = self._frame()
+        
+        vehicle1 = Mock(spec=TrackedVehicle)
+        vehicle1.track_id = 1
+        vehicle1.center_x = 150
+        vehicle1.center_y = 200
+        vehicle1.bbox = (100, 180, 200, 220)
+        vehicle1.confidence = 0.8
+        vehicle1.trajectory = [(150, 300), (150, 280), (150, 260), (150, 240), (150, 220)]
+        
+        detector.begin_frame()
+        violations = detector.detect_wrong_way_driving([vehicle1], np.array([0, 1]), frame)
+        violations += detector.detect_wrong_way_driving([vehicle1], np.array([0, 1]), frame)
+        detector.violation_cooldowns.clear()
+        violations += detector.detect_wrong_way_driving([vehicle1], np.array([0, 1]), frame)
+        
+        assert len(violations) == 2
+        assert violations[0].evidence_frame is None
+        assert violations[0].evidence == violations[1].evidence
+        assert store.get_statistics()["frames_encoded"] == 1
+        
+        crop = violations[0].get_vehicle_crop()
+        assert crop.shape == (40, 100, 3)
+        assert violations[0].get_evidence_frame().shape == frame.shape
+        assert violations[0].get_evidence_jpeg()[:2] == b"\xff\xd8"
+    
+    def test_reused_frame_buffer_is_encoded_again(self):
+        """Test that a new frame in the same buffer does not reuse the last snapshot."""
+        store = EvidenceStore()
+        frame = self._frame(1)
+        
+        handle1 = store.put_frame(frame, frame_key=0)
+        assert store.put_frame(frame, frame_key=0) is handle1
+        
+        frame[:] = self._frame(2)
+        handle2 = store.put_frame(frame, frame_key=1)
+        
+        assert handle2 != handle1
+        assert store.get_statistics()["frames_encoded"] == 2
+        assert not np.array_equal(handle1.load(), handle2.load())
+    
+    def test_content_addressing(self):
+        """Test that identical frames are stored once."""
+        store = EvidenceStore()
+        handle1 = store.put_frame(self._frame(1))
+        handle2 = store.put_frame(self._frame(1))
+        handle3 = store.put_frame(self._frame(2))
+        
+        assert handle1 == handle2
+        assert handle1 != handle3
+        stats = store.get_statistics()
+        assert stats["duplicates"] == 1
+        assert stats["in_memory"] == 2
+    
+    def test_spill_to_local_storage(self, tmp_path):
+        """Test that snapshots over the memory budget spill to disk."""
+        storage = LocalStorageManager(StorageConfig(local_base_path=str(tmp_path)))
+        store = EvidenceStore(max_memory_mb=0.05, storage=storage)
+        
+        handles = [store.put_frame(self._frame(seed)) for seed in range(6)]
+        
+        stats = store.get_statistics()
+        assert stats["spilled"] > 0
+        assert stats["memory_bytes"] <= store.max_memory_bytes or stats["in_memory"] == 1
+        assert all(handle in store for handle in handles)
+        
+        # Spilled snapshots are read back from disk
+        image = handles[0].load()
+        assert image.shape == (240, 320, 3)
+        assert store.get_statistics()["disk_reads"] == 1
+    
+    def test_spill_to_storage_path(self, tmp_path):
+        """Test that evicted evidence is written under storage_path and read back."""
+        store = EvidenceStore(max_memory_mb=0.05, storage_path=tmp_path / "evidence")
+        frames = [self._frame(seed) for seed in range(6)]
+        handles = [store.put_frame(frame) for frame in frames]
+        
+        stats = store.get_statistics()
+        assert stats["spilled"] > 0
+        assert stats["dropped"] == 0
+        assert stats["spilling"] == 0
+        assert isinstance(store.storage, LocalStorageManager)
+        for frame, handle in zip(frames, handles):
+            image = handle.load()
+            assert image.shape == frame.shape
+        assert store.get_statistics()["disk_reads"] > 0
+    
+    def test_spill_writes_outside_lock(self):
+        """Test that disk writes do not hold the store lock."""
+        storage = Mock()
+        store = EvidenceStore(max_memory_mb=0.05, storage=storage)
+        
+        def store_encoded_image(data, key, metadata):
+            assert not store._lock.locked()
+            assert store.get_frame_jpeg(key) == data  # Still readable while written
+            return Mock()
+        
+        storage.store_encoded_image.side_effect = store_encoded_image
+        for seed in range(6):
+            store.put_frame(self._frame(seed))
+        
+        assert storage.store_encoded_image.call_count == store.get_statistics()["spilled"] > 0
+    
+    def test_release_deletes_spilled_files(self, tmp_path):
+        """Test that released snapshots leave memory and their spilled files are deleted."""
+        store = EvidenceStore(max_memory_mb=0.05, storage_path=tmp_path / "evidence")
+        handles = [store.put_frame(self._frame(seed)) for seed in range(6)]
+        assert list((tmp_path / "evidence").rglob("*.jpg"))
+        
+        released = store.release(handle.key for handle in handles)
+        
+        assert released == 6
+        assert not any(handle in store for handle in handles)
+        assert not list((tmp_path / "evidence").rglob("*.jpg"))
+        stats = store.get_statistics()
+        assert stats["on_disk"] == 0 and stats["in_memory"] == 0 and stats["memory_bytes"] == 0
+    
+    def test_spill_is_capped(self, tmp_path):
+        """Test that the oldest spilled snapshots are deleted past max_spill_files."""
+        store = EvidenceStore(max_memory_mb=0.05, storage_path=tmp_path / "evidence", max_spill_files=2)
+        handles = [store.put_frame(self._frame(seed)) for seed in range(8)]
+        
+        stats = store.get_statistics()
+        assert stats["on_disk"] == 2
+        assert stats["spill_evictions"] == stats["spilled"] - 2 > 0
+        assert len(list((tmp_path / "evidence").rglob("*.jpg"))) == 2
+        assert handles[0].load() is None
+        assert handles[-1].load() is not None
+    
+    def test_cleanup_releases_unreferenced_evidence(self, tmp_path):
+        """Test that cleaning up old violations releases only snapshots nothing else uses."""
+        store = EvidenceStore(max_memory_mb=0.05, storage_path=tmp_path / "evidence")
+        detector = ViolationDetector(evidence_store=store)
+        shared = store.put_frame(self._frame(1))
+        handles = [shared] + [store.put_frame(self._frame(seed)) for seed in range(2, 7)]
+        
+        def violation(violation_id, handle, age):
+            return TrafficViolation(
+                violation_id=violation_id,
+                timestamp=time.time() - age,
+                violation_type=ViolationType.WRONG_WAY,
+                severity=ViolationSeverity.SEVERE,
+                vehicle_id=1,
+                description="Test violation",
+                confidence=0.9,
+                location=ViolationLocation("zone_1", "Test Zone", (100, 100)),
+                evidence=handle,
+                crop_evidence=handle.crop((0, 0, 10, 10))
+            )
+        
+        detector.violations = [violation(f"old_{i}", handle, 7200) for i, handle in enumerate(handles)]
+        detector.violations.append(violation("recent", shared, 0))
+        
+        detector.cleanup_old_violations(max_age=3600)
+        
+        assert [v.violation_id for v in detector.violations] == ["recent"]
+        assert shared in store
+        assert not any(handle in store for handle in handles[1:])
+        assert store.get_statistics()["released"] == 5
+        assert len(list((tmp_path / "evidence").rglob("*.jpg"))) == store.get_statistics()["on_disk"]
+    
+    def test_eviction_without_storage(self):
+        """Test that snapshots are dropped when there is no storage."""
+        store = EvidenceStore(max_memory_mb=0.05)
+        handles = [store.put_frame(self._frame(seed)) for seed in range(6)]
+        
+        assert store.get_statistics()["dropped"] > 0
+        assert handles[0].load() is None
+        assert handles[-1].load() is not None
+
+
 class TestLaneDetector:
     """Test lane detection functionality."""
     
@@ -472,6 +659,65 @@ class TestNotificationSystem:
         # Second check should fail (rate limit exceeded)
         assert not self.notification_system._check_rate_limit(NotificationChannel.EMAIL)
     
+    def test_token_bucket(self):
+        """Test token bucket refill."""
+        bucket = TokenBucket(rate_per_hour=3600, capacity=2)  # 1 token per second
+        
+        assert bucket.try_acquire()
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+        
+        bucket._updated -= 1.0  # One second later
+        assert bucket.try_acquire()
+    
+    def test_dispatcher_digests(self):
+        """Test that the dispatcher coalesces alerts into digests."""
+        batches = []
+        results = []
+        
+        dispatcher = NotificationDispatcher(
+            send_batch=lambda channel, items: batches.append((channel, list(items))) or True,
+            get_policy=lambda channel: ChannelPolicy(digest_size=10, digest_window=0.2),
+            on_result=lambda channel, items, success, attempts, error: results.append((len(items), success)),
+            is_urgent=lambda item: item == "urgent"
+        )
+        dispatcher.start()
+        
+        for i in range(25):
+            assert dispatcher.submit("email", i)
+        dispatcher.stop()
+        
+        assert [len(items) for _, items in batches] == [10, 10, 5]
+        assert [item for _, items in batches for item in items] == list(range(25))
+        assert all(success for _, success in results)
+        assert dispatcher.get_statistics()["channels"]["email"]["messages"] == 3
+        
+        # Urgent items are sent without waiting for the digest window
+        batches.clear()
+        dispatcher.start()
+        dispatcher.submit("email", "urgent")
+        deadline = time.time() + 0.1
+        while not batches and time.time() < deadline:
+            time.sleep(0.005)
+        assert batches == [("email", ["urgent"])]
+        dispatcher.stop()
+    
+    def test_dispatcher_rate_limit(self):
+        """Test that rate-limited digests are reported as failed."""
+        results = []
+        dispatcher = NotificationDispatcher(
+            send_batch=lambda channel, items: True,
+            get_policy=lambda channel: ChannelPolicy(),
+            on_result=lambda channel, items, success, attempts, error: results.append((success, error)),
+            rate_limiters={"webhook": TokenBucket(rate_per_hour=1)}
+        )
+        dispatcher.start()
+        dispatcher.submit("webhook", "a")
+        dispatcher.submit("webhook", "b")
+        dispatcher.stop()
+        
+        assert results == [(True, None), (False, "rate limit exceeded")]
+    
     def test_database_notification(self, tmp_path):
         """Test database notification functionality."""
         # Use temporary database
@@ -571,6 +817,85 @@ class TestViolationManager:
         
         assert count == 1
     
+    def test_batched_writer(self):
+        """Test that queued violations are written in batches."""
+        current_time = time.time()
+        violations = [
+            TrafficViolation(
+                violation_id=f"batch_violation_{i}",
+                timestamp=current_time,
+                violation_type=ViolationType.SPEED_VIOLATION,
+                severity=ViolationSeverity.CRITICAL if i % 2 else ViolationSeverity.MODERATE,
+                vehicle_id=i,
+                description=f"Test violation {i}",
+                confidence=0.8,
+                location=ViolationLocation("zone_1", "Test Zone", (100, 100))
+            )
+            for i in range(100)
+        ]
+        
+        self.manager._store_violations(violations)
+        assert self.manager.flush()
+        
+        writer_stats = self.manager.writer.get_statistics()
+        assert writer_stats["written"] == 100
+        assert writer_stats["batches"] < 100
+        
+        conn = sqlite3.connect(self.manager.db_path)
+        cursor = conn.cursor()
+        assert cursor.execute("SELECT COUNT(*) FROM violations").fetchone()[0] == 100
+        assert cursor.execute("SELECT SUM(count) FROM violation_statistics").fetchone()[0] == 100
+        assert cursor.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
+        
+        stats = self.manager.get_current_statistics()
+        assert stats.current_violations == 100
+        assert stats.highest_severity_count == 50
+        assert stats.most_common_violation == "speed_violation"
+        assert stats.average_confidence == pytest.approx(0.8)
+        
+        self.manager.writer.stop()
+    
+    def test_writer_stores_batches_in_storage_service(self):
+        """Test written batches are also sent to the storage service batch API."""
+        storage_service = Mock()
+        storage_service.store_violation_batch = AsyncMock(
+            side_effect=lambda records: {"violation_records": len(records), "storage_metadata": 0}
+        )
+        self.manager.storage_service = storage_service
+        violations = [
+            TrafficViolation(
+                violation_id=f"service_violation_{i}",
+                timestamp=time.time(),
+                violation_type=ViolationType.SPEED_VIOLATION,
+                severity=ViolationSeverity.MODERATE,
+                vehicle_id=i,
+                description=f"Test violation {i}",
+                confidence=0.8,
+                location=ViolationLocation("zone_1", "Test Zone", (100, 100)),
+                speed_limit=60.0,
+                measured_speed=80.0,
+                camera_id="cam_001"
+            )
+            for i in range(10)
+        ]
+        
+        self.manager._store_violations(violations)
+        assert self.manager.flush()
+        
+        records = [
+            record
+            for call in storage_service.store_violation_batch.await_args_list
+            for record in call.args[0]
+        ]
+        assert [r.violation_id for r in records] == [v.violation_id for v in violations]
+        assert records[0].device_id == "cam_001"
+        assert records[0].violation_type == "speed_violation"
+        assert records[0].speed_kmh == 80.0
+        assert self.manager.writer.get_statistics()["stored_in_service"] == 10
+        
+        self.manager.writer.stop()
+    
     def test_statistics_generation(self):
         """Test violation statistics generation."""
         # Add some test violations